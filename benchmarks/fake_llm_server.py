@@ -0,0 +1,310 @@
+"""
+Fake LLM Server: 兼容 OpenAI Chat Completions 接口的本地模拟服务，用于离线基准测试
+
+1. POST /v1/chat/completions 支持流式(SSE)和非流式响应，流式请求带 stream_options.include_usage 时在末尾返回usage
+2. 首token延迟(first_token_latency)和生成速度(tokens_per_second)可配置，模拟真实模型的耗时特征
+3. 按prompt内容识别调用方(标题筛选/摘要/规划/选工具/写报告/judger评分等)，返回能让各流程正常结束的固定格式回复
+4. GET /stats 返回调用次数、token数、最大并发数(按调用方分类)，POST /reset 清零
+
+token数按 CJK字符1个token、其他字符每4个1个token 估算，同一请求在不同提交之间的计数一致即可。
+
+单独运行: python -m benchmarks.fake_llm_server --port 18000 --first-token-latency 0.2 --tokens-per-second 200
+"""
+import re
+import json
+import time
+import zlib
+import argparse
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_CJK_PATTERN = re.compile(r"[㐀-鿿豈-﫿]")
+
+DEFAULT_SYMBOLS = [("600519.SH", "贵州茅台"), ("000858.SZ", "五粮液"), ("300750.SZ", "宁德时代")]
+
+
+def count_tokens(text: str) -> int:
+    """粗略的token数估算"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + max(1, (len(text) - cjk) // 4)
+
+
+def _stable_int(text: str) -> int:
+    """与进程无关的稳定哈希(内置hash会随机化)"""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _message_text(content) -> str:
+    """content 可能是字符串，也可能是多模态的分段列表"""
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+class Responder:
+    """按prompt内容生成固定格式的回复"""
+
+    def __init__(self, completion_tokens: int = 300, signals_per_report: int = 2,
+                 symbols: Sequence[Tuple[str, str]] = DEFAULT_SYMBOLS):
+        self.completion_tokens = completion_tokens
+        self.signals_per_report = signals_per_report
+        self.symbols = list(symbols)
+
+    def filler(self, seed: str, tokens: int) -> str:
+        """约tokens个token的正文，带 [n] 引用标记"""
+        sentences = []
+        i = _stable_int(seed) % 7
+        while count_tokens("".join(sentences)) < tokens:
+            sentences.append(f"市场资金继续流入相关板块，成交量较前一交易日放大{i % 9 + 1}成，板块内个股普遍上涨[{i % 5 + 1}]。")
+            i += 1
+        return "\n".join(sentences)
+
+    def respond(self, messages: List[Dict]) -> Tuple[str, str]:
+        """返回 (调用方类型, 回复内容)"""
+        last = _message_text(messages[-1].get("content")) if messages else ""
+        system = _message_text(messages[0].get("content")) if messages and messages[0].get("role") == "system" else ""
+
+        if "Researcher ID:" in last:
+            return "judger", self._judger_scores(last)
+        if "most informative documents" in last:
+            return "data_filter", self._filter_ids(last)
+        if "merge the following multiple document batch summaries" in last:
+            return "data_merge", self.filler(last[-200:], self.completion_tokens)
+        if "step-by-step plan" in last:
+            return "research_plan", "1. 查询目标股票的近期行情\n2. 查询公司基本面信息\n3. 汇总信息并撰写报告"
+        if "select the next tool" in last:
+            return "research_tool", '<Output>\n{"tool_name": "final_report", "properties": {}}\n</Output>'
+        if "<signals>" in last and "<Output>" in last:
+            return "research_report", self._report(system or last)
+        if "Current time is:" in last:
+            return "data_summary", self.filler(last[-200:], self.completion_tokens)
+        return "other", self.filler(last[-200:], self.completion_tokens)
+
+    def _filter_ids(self, prompt: str) -> str:
+        match = re.search(r"select the (\d+) most", prompt)
+        count = int(match.group(1)) if match else 5
+        ids = re.findall(r"^ID: (\S+)$", prompt, flags=re.MULTILINE)
+        return ",".join(ids[:count])
+
+    def _judger_scores(self, prompt: str) -> str:
+        names = list(dict.fromkeys(re.findall(r"Researcher ID: (\S+)", prompt)))
+        return "\n".join(
+            f"{name}: {60 + _stable_int(name) % 30}|证据较少(-10)，风险提示不充分(-5)" for name in names
+        )
+
+    def _report(self, seed: str) -> str:
+        start = _stable_int(seed) % len(self.symbols)
+        blocks = []
+        for i in range(self.signals_per_report):
+            symbol_code, symbol_name = self.symbols[(start + i) % len(self.symbols)]
+            blocks.append(
+                "<signal>\n"
+                "<has_opportunity>yes</has_opportunity>\n"
+                f"<action>{'buy' if i % 2 == 0 else 'sell'}</action>\n"
+                f"<symbol_code>{symbol_code}</symbol_code>\n"
+                f"<symbol_name>{symbol_name}</symbol_name>\n"
+                "<evidence_list>\n"
+                f"<evidence>{self.filler(symbol_code, self.completion_tokens // (2 * self.signals_per_report))}</evidence>\n"
+                "<time>2025-06-09</time>\n"
+                "<from_source>fixture</from_source>\n"
+                "</evidence_list>\n"
+                "<limitations>\n<limitation>短期波动风险</limitation>\n</limitations>\n"
+                f"<probability>{55 + i * 5}</probability>\n"
+                "</signal>"
+            )
+        return "<Output>\n<signals>\n" + "\n".join(blocks) + "\n</signals>\n</Output>"
+
+
+class FakeLLMStats:
+    """线程安全的调用统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.in_flight = 0
+            self.peak_concurrency = 0
+            self.by_kind: Dict[str, Dict[str, int]] = {}
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_concurrency = max(self.peak_concurrency, self.in_flight)
+
+    def end(self, kind: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            item = self.by_kind.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            item["calls"] += 1
+            item["prompt_tokens"] += prompt_tokens
+            item["completion_tokens"] += completion_tokens
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "llm_calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "llm_peak_concurrency": self.peak_concurrency,
+                "by_kind": {kind: dict(item) for kind, item in sorted(self.by_kind.items())},
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(self.server.stats.snapshot())
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "fake-llm", "object": "model"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/").endswith("/reset"):
+            self.server.stats.reset()
+            self._send_json({"ok": True})
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat_completions(request)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _chat_completions(self, request: Dict):
+        settings = self.server
+        messages = request.get("messages", [])
+        kind, content = settings.responder.respond(messages)
+        prompt_tokens = sum(count_tokens(_message_text(m.get("content"))) for m in messages)
+        completion_tokens = count_tokens(content)
+        model = request.get("model", "fake-llm")
+        created = int(time.time())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+
+        settings.stats.begin()
+        try:
+            time.sleep(settings.first_token_latency)
+            if not request.get("stream"):
+                time.sleep(completion_tokens / settings.tokens_per_second)
+                self._send_json({
+                    "id": f"chatcmpl-fake-{created}", "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            base = {"id": f"chatcmpl-fake-{created}", "object": "chat.completion.chunk", "created": created, "model": model}
+            chunk_chars = max(1, settings.chunk_tokens * 2)
+            for start in range(0, len(content), chunk_chars):
+                piece = content[start:start + chunk_chars]
+                self._send_event({**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+                time.sleep(count_tokens(piece) / settings.tokens_per_second)
+            self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self._send_event({**base, "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端取消(如judger提前达成quorum)时连接被关闭
+            kind = f"{kind}_cancelled"
+        finally:
+            settings.stats.end(kind, prompt_tokens, completion_tokens)
+
+    def _send_event(self, payload: Dict):
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """在后台线程运行的模拟LLM服务"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, first_token_latency: float = 0.2,
+                 tokens_per_second: float = 200.0, chunk_tokens: int = 8, responder: Optional[Responder] = None):
+        super().__init__((host, port), _Handler)
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = chunk_tokens
+        self.responder = responder or Responder()
+        self.stats = FakeLLMStats()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def settings(self) -> Dict:
+        return {
+            "first_token_latency": self.first_token_latency,
+            "tokens_per_second": self.tokens_per_second,
+            "chunk_tokens": self.chunk_tokens,
+            "completion_tokens": self.responder.completion_tokens,
+            "signals_per_report": self.responder.signals_per_report,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI兼容的模拟LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="首token延迟(秒)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="生成速度")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="摘要类回复的token数")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.first_token_latency, args.tokens_per_second,
+                           responder=Responder(args.completion_tokens))
+    print(f"Fake LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Benchmark Fixtures: 基准测试用的隔离工作目录和离线数据
+
+1. build_sandbox: 把 contest_trade 复制到临时目录(不含 agents_workspace 和各数据缓存)，
+   生成指向模拟LLM服务的 config.yaml，各阶段互不影响，也不会写入仓库里的缓存
+2. install_fixtures: 在沙箱的解释器中运行，用沙箱代码自己的缓存接口写入确定性的合成数据:
+   - tushare: 价格(daily / stk_limit / adj_factor，按交易日分区)和新闻(major_news)，写入 utils/tushare_cache
+   - akshare类数据源: price_market_akshare / hot_money_akshare 等数据源在触发时间的缓存(data_source/data_cache)
+   - 历史研究报告(reports)和因子(factors)，供judger计算历史收益和评分
+3. benchmarks/fixture_overlay/ 存在时按相同的目录结构覆盖到沙箱的 contest_trade 下，
+   可以放入真实录制的 tushare_cache / akshare_cache 等缓存
+"""
+import json
+import shutil
+import zlib
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import yaml
+
+REPO_ROOT = Path(__file__).parent.parent.resolve()
+OVERLAY_DIR = Path(__file__).parent / "fixture_overlay"
+
+DEFAULT_TRIGGER_TIME = "2025-06-10 09:00:00"
+
+# 研究报告中使用的标的，保证在合成价格的股票池中
+FIXTURE_SYMBOLS = [
+    ("600519.SH", "贵州茅台"), ("000858.SZ", "五粮液"), ("300750.SZ", "宁德时代"),
+    ("601318.SH", "中国平安"), ("000001.SZ", "平安银行"), ("600036.SH", "招商银行"),
+]
+
+# 基准测试使用的data agent: 两个读取tushare缓存，两个读取akshare类数据源的data_cache
+BENCHMARK_DATA_AGENTS = [
+    {"agent_name": "sina_summary_agent", "data_source_list": ["data_source.sina_news.SinaNews"]},
+    {"agent_name": "thx_summary_agent", "data_source_list": ["data_source.thx_news.ThxNews"]},
+    {"agent_name": "price_market_agent", "data_source_list": ["data_source.price_market_akshare.PriceMarketAkshare"]},
+    {"agent_name": "hot_money_agent", "data_source_list": ["data_source.hot_money_akshare.HotMoneyAkshare"]},
+]
+
+# 通过 major_news 读取tushare的新闻数据源，参数与 data_source/sina_news.py / thx_news.py 一致
+NEWS_SOURCES = {"sina_news": "新浪财经", "thx_news": "同花顺"}
+NEWS_FIELDS = "title,content,pub_time, url"
+# 优先读取 data_cache 的数据源
+DATA_CACHE_SOURCES = ["price_market_akshare", "hot_money_akshare", "price_market", "hot_money",
+                      "xueqiu_community", "eastmoney_community"]
+
+# 不复制到沙箱的目录: 运行产物和数据缓存
+_SANDBOX_IGNORE = {"__pycache__", "agents_workspace", "data_cache", "tushare_cache", "akshare_cache",
+                   "fmp_cache", "finnhub_cache", "price_store"}
+
+# 合成价格覆盖的交易日范围(相对触发日)
+HISTORY_TRADE_DAYS = 30
+FORWARD_TRADE_DAYS = 6
+
+
+def _stable_int(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def build_config(base_url: str, num_judgers: int = 3, judger_quorum: int = 0,
+                 template_path: Optional[Path] = None) -> Dict:
+    """基于 config_template.yaml 生成基准测试配置，所有模型指向模拟LLM服务"""
+    template_path = template_path or REPO_ROOT / "config_template.yaml"
+    with open(template_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    config["tushare_key"] = "benchmark"
+    for name, model_name in [("llm", "fake-llm"), ("llm_thinking", "fake-llm-thinking"), ("vlm", "fake-vlm")]:
+        config[name] = {**(config.get(name) or {}), "base_url": base_url, "api_key": "benchmark", "model_name": model_name}
+    config["data_agents_config"] = BENCHMARK_DATA_AGENTS
+    config["researcher_contest_config"] = {
+        **(config.get("researcher_contest_config") or {}),
+        "contest_mode": True,
+        "judger_config": "llm",
+        "num_judgers": num_judgers,
+        "judger_quorum": judger_quorum,
+    }
+    config["llm_cache_config"] = {"mode": "off"}
+    config["tool_cache_config"] = {**(config.get("tool_cache_config") or {}), "persist": False}
+    config["run_budget_config"] = {"max_tokens": None, "max_seconds": None}
+    return config
+
+
+def build_sandbox(sandbox_dir: Path, config: Dict) -> Path:
+    """创建沙箱，返回沙箱中的 contest_trade 目录(即沙箱的 PROJECT_ROOT)"""
+    sandbox_dir = Path(sandbox_dir)
+    project_root = sandbox_dir / "contest_trade"
+    shutil.copytree(REPO_ROOT / "contest_trade", project_root,
+                    ignore=lambda _, names: [n for n in names if n in _SANDBOX_IGNORE])
+    if OVERLAY_DIR.exists():
+        shutil.copytree(OVERLAY_DIR, project_root, dirs_exist_ok=True)
+    with open(sandbox_dir / "config.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+    return project_root
+
+
+def make_documents(source: str, trigger_time: str, count: int):
+    """确定性的资讯文档，列为 title / content / pub_time / url"""
+    import pandas as pd
+
+    trigger = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
+    rows = []
+    for i in range(count):
+        symbol_code, symbol_name = FIXTURE_SYMBOLS[(_stable_int(source) + i) % len(FIXTURE_SYMBOLS)]
+        pub_time = trigger - timedelta(minutes=7 * (i + 1))
+        rows.append({
+            "title": f"{symbol_name}({symbol_code}) {source} 资讯 {i + 1}: 主力资金净流入，板块热度上升",
+            "content": (f"{symbol_name}今日公告经营数据，{source}第{i + 1}条。" * 12
+                        + f"分析人士认为{symbol_name}短期仍有催化，但需关注估值和成交量变化。"),
+            "pub_time": pub_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "url": f"https://fixture.local/{source}/{i + 1}",
+        })
+    return pd.DataFrame(rows)
+
+
+def make_report(agent_name: str, signal_time: str) -> Dict:
+    """ResearchAgentOutput 格式的历史研究报告，包含一个信号"""
+    symbol_code, symbol_name = FIXTURE_SYMBOLS[_stable_int(f"{agent_name}{signal_time}") % len(FIXTURE_SYMBOLS)]
+    action = "buy" if _stable_int(signal_time + agent_name) % 3 else "sell"
+    final_result = (
+        "<Output>\n<signals>\n<signal>\n<has_opportunity>yes</has_opportunity>\n"
+        f"<action>{action}</action>\n<symbol_code>{symbol_code}</symbol_code>\n<symbol_name>{symbol_name}</symbol_name>\n"
+        f"<evidence_list>\n<evidence>{symbol_name}资金持续流入，板块景气度提升</evidence>\n"
+        f"<time>{signal_time.split(' ')[0]}</time>\n<from_source>fixture</from_source>\n</evidence_list>\n"
+        "<limitations>\n<limitation>短期波动风险</limitation>\n</limitations>\n"
+        "<probability>60</probability>\n</signal>\n</signals>\n</Output>"
+    )
+    return {
+        "task": "benchmark fixture",
+        "trigger_time": signal_time,
+        "background_information": "",
+        "belief": "",
+        "final_result": final_result,
+        "final_result_thinking": "",
+    }
+
+
+def make_factor(agent_name: str, trigger_time: str) -> Dict:
+    """DataAnalysisAgentOutput 格式的因子"""
+    docs = make_documents(agent_name, trigger_time, 5)
+    context = "\n".join(f"{title}[{i + 1}]" for i, title in enumerate(docs["title"]))
+    return {
+        "agent_name": agent_name,
+        "trigger_time": trigger_time,
+        "source_list": [],
+        "bias_goal": "",
+        "context_string": context,
+        "references": [],
+        "batch_summaries": [],
+    }
+
+
+def _price_frames(symbols: List[str], trade_dates: List[str]):
+    """每个交易日一组 daily / stk_limit / adj_factor 数据，价格为按股票播种的随机游走"""
+    import numpy as np
+    import pandas as pd
+
+    closes = np.empty((len(symbols), len(trade_dates)))
+    for row, symbol in enumerate(symbols):
+        rng = np.random.default_rng(_stable_int(symbol))
+        start = 5 + rng.random() * 95
+        closes[row] = start * np.cumprod(1 + rng.normal(0.0005, 0.02, len(trade_dates)))
+    frames = {}
+    for col, trade_date in enumerate(trade_dates):
+        close = closes[:, col].round(2)
+        pre_close = (closes[:, col - 1] if col else closes[:, 0] / 1.001).round(2)
+        open_ = (pre_close * (1 + (close - pre_close) / pre_close / 3)).round(2)
+        daily = pd.DataFrame({
+            "ts_code": symbols, "trade_date": trade_date, "open": open_,
+            "high": np.maximum(open_, close) * 1.01, "low": np.minimum(open_, close) * 0.99,
+            "close": close, "pre_close": pre_close, "change": close - pre_close,
+            "pct_chg": (close - pre_close) / pre_close * 100, "vol": 1e5, "amount": 1e5 * close,
+        })
+        limit = pd.DataFrame({"ts_code": symbols, "trade_date": trade_date,
+                              "up_limit": (pre_close * 1.1).round(2), "down_limit": (pre_close * 0.9).round(2)})
+        adj = pd.DataFrame({"ts_code": symbols, "trade_date": trade_date, "adj_factor": 1.0})
+        frames[trade_date] = (daily, limit, adj)
+    return frames
+
+
+def install_fixtures(project_root: Path, trigger_time: str = DEFAULT_TRIGGER_TIME, docs_per_source: int = 60,
+                     universe_size: int = 300, history_days: int = 30, include_trigger_reports: bool = False) -> Dict:
+    """
+    在沙箱解释器中写入离线数据(需要沙箱的 contest_trade 在 sys.path 上)
+
+    Args:
+        docs_per_source: 每个数据源的文档数
+        universe_size: 合成价格的股票数
+        history_days: 历史研究报告覆盖的自然日数
+        include_trigger_reports: 是否同时写入触发时间的研究报告和因子(单独测试judger时使用)
+    """
+    from utils.tushare_utils import pro_cached
+    from utils.price_store import DEFAULT_QFQ_BASE_DATE
+    from utils.date_utils import get_previous_trading_date
+    from utils.market_manager import GLOBAL_MARKET_MANAGER
+    from utils.trading_calendar import to_trade_date
+    from data_source.data_source_base import DataSourceBase
+    from config.config import cfg
+
+    project_root = Path(project_root)
+    cache = pro_cached.cache
+
+    def put(func_name: str, func_kwargs: Dict, value):
+        cache.set(cache.make_key(func_name, func_kwargs), func_name, value)
+
+    # 1. tushare: 价格分区
+    calendar = GLOBAL_MARKET_MANAGER.get_trading_calendar("CN-Stock")
+    trigger_date = to_trade_date(trigger_time)
+    trade_dates = calendar.range(calendar.shift(trigger_date, -HISTORY_TRADE_DAYS),
+                                 calendar.shift(trigger_date, FORWARD_TRADE_DAYS))
+    # 前复权需要基准日的复权因子
+    trade_dates = sorted(set(trade_dates) | {DEFAULT_QFQ_BASE_DATE})
+    with open(project_root / "utils" / "cache" / "market_manager" / "stock_basic_cache.json", "r", encoding="utf-8") as f:
+        listed = [item["ts_code"] for item in json.load(f) if item.get("list_status", "L") == "L"]
+    symbols = list(dict.fromkeys([code for code, _ in FIXTURE_SYMBOLS] + listed[:universe_size]))
+    for trade_date, (daily, limit, adj) in _price_frames(symbols, trade_dates).items():
+        put("daily", {"trade_date": trade_date}, daily)
+        put("stk_limit", {"trade_date": trade_date}, limit)
+        put("adj_factor", {"trade_date": trade_date}, adj)
+
+    # 2. tushare: 新闻
+    previous_trading_datetime = get_previous_trading_date(trigger_time, output_format="%Y-%m-%d %H:%M:%S")
+    for source, src in NEWS_SOURCES.items():
+        put("major_news", {"src": src, "start_date": previous_trading_datetime, "end_date": trigger_time,
+                           "fields": NEWS_FIELDS}, make_documents(source, trigger_time, docs_per_source))
+
+    # 3. akshare类数据源: 触发时间的数据缓存
+    for source in DATA_CACHE_SOURCES:
+        DataSourceBase(source).save_data_cached(trigger_time, make_documents(source, trigger_time, docs_per_source))
+
+    # 4. 历史研究报告与因子(文件名与 judger_data_converter 一致)
+    workspace = project_root / "agents_workspace"
+    with open(project_root / cfg.research_agent_config["belief_list_path"], "r", encoding="utf-8") as f:
+        agent_names = [f"agent_{i}" for i in range(len(json.load(f)))]
+    trigger = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
+    signal_times = [(trigger - timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(1, history_days + 1)]
+    if include_trigger_reports:
+        signal_times.append(trigger_time)
+        for agent in BENCHMARK_DATA_AGENTS:
+            factor_dir = workspace / "factors" / agent["agent_name"]
+            factor_dir.mkdir(parents=True, exist_ok=True)
+            with open(factor_dir / f"{trigger_time.replace(' ', '_')}.json", "w", encoding="utf-8") as f:
+                json.dump(make_factor(agent["agent_name"], trigger_time), f, ensure_ascii=False)
+    for agent_name in agent_names:
+        report_dir = workspace / "reports" / agent_name
+        report_dir.mkdir(parents=True, exist_ok=True)
+        for signal_time in signal_times:
+            with open(report_dir / f"{signal_time.replace(' ', '_')}.json", "w", encoding="utf-8") as f:
+                json.dump(make_report(agent_name, signal_time), f, ensure_ascii=False)
+
+    return {
+        "symbols": len(symbols),
+        "trade_dates": len(trade_dates),
+        "documents_per_source": docs_per_source,
+        "history_reports": len(agent_names) * len(signal_times),
+    }
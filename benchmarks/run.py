@@ -0,0 +1,245 @@
+"""
+Benchmark Runner: 离线基准测试，结果写入JSON便于跨提交对比
+
+1. 启动模拟LLM服务(benchmarks/fake_llm_server.py)，首token延迟和生成速度可配置
+2. 每个阶段每次运行都创建全新的沙箱(benchmarks/fixtures.py)并写入离线数据，再以子进程运行 benchmarks/worker.py
+3. 阶段: data_agent(DataAnalysisAgent) / research_agent(ResearchAgent) / judger / workflow(完整SimpleTradeCompany)
+4. 每次运行记录墙钟耗时、LLM调用数、token数、LLM最大并发、峰值RSS和事件循环延迟，多次运行取中位数
+
+用法(在仓库根目录):
+    python -m benchmarks.run --repeat 3
+    python -m benchmarks.run --stages judger --first-token-latency 0.5 --tokens-per-second 50
+    python -m benchmarks.run compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.fake_llm_server import FakeLLMServer, Responder
+from benchmarks.fixtures import REPO_ROOT, DEFAULT_TRIGGER_TIME, FIXTURE_SYMBOLS, build_config, build_sandbox
+from benchmarks.worker import STAGES
+
+BENCHMARK_DIR = Path(__file__).parent
+RESULTS_DIR = BENCHMARK_DIR / "results"
+WORKER = BENCHMARK_DIR / "worker.py"
+# worker导入 utils/llm_utils.py 时需要的tiktoken编码；未设置TIKTOKEN_CACHE_DIR时缓存在这里，跨运行复用
+TIKTOKEN_ENCODING = "cl100k_base"
+DEFAULT_TIKTOKEN_CACHE_DIR = BENCHMARK_DIR / ".tiktoken_cache"
+
+# 参与汇总(取中位数)和对比的指标
+METRICS = ["wall_seconds", "llm_calls", "total_tokens", "llm_peak_concurrency", "peak_rss_mb",
+           "loop_lag_p99_ms", "loop_lag_max_ms"]
+
+
+def git_revision() -> Dict:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", "contest_trade")),
+    }
+
+
+def tiktoken_cache_dir() -> Path:
+    return Path(os.environ.get("TIKTOKEN_CACHE_DIR") or DEFAULT_TIKTOKEN_CACHE_DIR).resolve()
+
+
+def check_tiktoken_cache() -> Path:
+    """
+    运行前确认tiktoken编码可以加载(有网络时顺便下载到缓存目录)
+
+    离线且缓存目录中没有编码文件时直接退出并给出提示，而不是每个阶段的worker都导入失败
+    """
+    cache_dir = tiktoken_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, "TIKTOKEN_CACHE_DIR": str(cache_dir)}
+    check = subprocess.run([sys.executable, "-c", f"import tiktoken; tiktoken.get_encoding({TIKTOKEN_ENCODING!r})"],
+                           env=env, capture_output=True, text=True)
+    if check.returncode != 0:
+        error = (check.stderr.strip().splitlines() or ["unknown error"])[-1]
+        sys.exit(f"tiktoken encoding {TIKTOKEN_ENCODING} is not available in {cache_dir} ({error}).\n"
+                 f"Run once with network access to populate it, or set TIKTOKEN_CACHE_DIR to a directory "
+                 f"that already contains the encoding file.")
+    return cache_dir
+
+
+def run_worker(project_root: Path, stage: str, trigger_time: str, log_file: Path, timeout: float,
+               extra_args: Optional[List[str]] = None) -> Dict:
+    """以子进程运行worker，返回其JSON结果；HOME指向沙箱，tushare的token文件等不会写到用户目录"""
+    output = project_root.parent / f"{stage}.json"
+    env = {**os.environ, "HOME": str(project_root.parent), "PYTHONUNBUFFERED": "1",
+           "TIKTOKEN_CACHE_DIR": str(tiktoken_cache_dir())}
+    command = [sys.executable, str(WORKER), "--project-root", str(project_root), "--stage", stage,
+               "--trigger-time", trigger_time, "--output", str(output), *(extra_args or [])]
+    with open(log_file, "a", encoding="utf-8") as log:
+        try:
+            process = subprocess.run(command, env=env, stdout=log, stderr=subprocess.STDOUT, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"status": "error", "error": f"timeout after {timeout}s"}
+    if process.returncode != 0 or not output.exists():
+        return {"status": "error", "error": f"worker exited with code {process.returncode}, see {log_file}"}
+    with open(output, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_stage(server: FakeLLMServer, stage: str, args, run_index: int) -> Dict:
+    """在全新沙箱中运行一次阶段"""
+    sandbox_dir = Path(tempfile.mkdtemp(prefix=f"contest_bench_{stage}_"))
+    log_file = sandbox_dir / "worker.log"
+    try:
+        config = build_config(server.base_url, num_judgers=args.num_judgers, judger_quorum=args.judger_quorum)
+        project_root = build_sandbox(sandbox_dir, config)
+        fixture_options = {
+            "docs_per_source": args.docs,
+            "universe_size": args.universe,
+            "include_trigger_reports": stage == "judger",
+        }
+        fixtures = run_worker(project_root, "fixtures", args.trigger_time, log_file, args.timeout,
+                              ["--fixture-options", json.dumps(fixture_options)])
+        if fixtures.get("status") == "error":
+            return {**fixtures, "run": run_index}
+
+        server.stats.reset()
+        result = run_worker(project_root, stage, args.trigger_time, log_file, args.timeout,
+                            ["--lag-interval", str(args.lag_interval)])
+        llm_stats = server.stats.snapshot()
+        loop_lag = result.get("loop_lag") or {}
+        result.update(llm_stats)
+        result.update({
+            "run": run_index,
+            "loop_lag_p99_ms": loop_lag.get("p99_ms"),
+            "loop_lag_max_ms": loop_lag.get("max_ms"),
+            "fixtures": fixtures,
+        })
+        if result.get("status") != "ok":
+            result["log_tail"] = log_file.read_text(encoding="utf-8", errors="replace")[-4000:]
+        return result
+    finally:
+        if args.keep_sandbox:
+            print(f"  sandbox: {sandbox_dir}")
+        else:
+            shutil.rmtree(sandbox_dir, ignore_errors=True)
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    """成功运行的各指标中位数"""
+    ok_runs = [run for run in runs if run.get("status") == "ok"]
+    summary = {"runs": len(runs), "ok_runs": len(ok_runs)}
+    for metric in METRICS:
+        values = [run[metric] for run in ok_runs if isinstance(run.get(metric), (int, float))]
+        summary[metric] = round(statistics.median(values), 4) if values else None
+    return summary
+
+
+def run_benchmarks(args) -> Path:
+    print(f"tiktoken cache: {check_tiktoken_cache()}")
+    responder = Responder(args.completion_tokens, args.signals_per_report, FIXTURE_SYMBOLS)
+    server = FakeLLMServer(first_token_latency=args.first_token_latency, tokens_per_second=args.tokens_per_second,
+                           chunk_tokens=args.chunk_tokens, responder=responder).start()
+    print(f"Fake LLM server: {server.base_url}")
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {
+            "trigger_time": args.trigger_time,
+            "repeat": args.repeat,
+            "docs_per_source": args.docs,
+            "universe_size": args.universe,
+            "num_judgers": args.num_judgers,
+            "judger_quorum": args.judger_quorum,
+            "lag_interval": args.lag_interval,
+            "llm": server.settings(),
+        },
+        "stages": {},
+    }
+    try:
+        for stage in args.stages:
+            runs = []
+            for run_index in range(args.repeat):
+                print(f"[{stage}] run {run_index + 1}/{args.repeat} ...")
+                run = run_stage(server, stage, args, run_index)
+                print(f"  {run.get('status')}: {run.get('wall_seconds')}s, {run.get('llm_calls')} LLM calls, "
+                      f"{run.get('total_tokens')} tokens, peak RSS {run.get('peak_rss_mb')} MB"
+                      + (f", error: {run['error']}" if run.get("error") else ""))
+                runs.append(run)
+            results["stages"][stage] = {"summary": summarize(runs), "runs": runs}
+    finally:
+        server.stop()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now():%Y%m%d_%H%M%S}_{(results['git']['commit'] or 'nogit')[:10]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output}")
+    return output
+
+
+def compare(baseline_file: str, candidate_file: str):
+    """打印两次结果各阶段中位数指标的变化"""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(candidate_file, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+    print(f"baseline:  {baseline['git'].get('commit', '')[:10]} ({baseline['created_at']})")
+    print(f"candidate: {candidate['git'].get('commit', '')[:10]} ({candidate['created_at']})")
+    if baseline.get("settings") != candidate.get("settings"):
+        print("warning: settings differ between the two runs")
+    print(f"{'stage':<16}{'metric':<24}{'baseline':>14}{'candidate':>14}{'change':>10}")
+    for stage in candidate["stages"]:
+        if stage not in baseline["stages"]:
+            continue
+        old, new = baseline["stages"][stage]["summary"], candidate["stages"][stage]["summary"]
+        for metric in METRICS:
+            a, b = old.get(metric), new.get(metric)
+            change = f"{(b - a) / a * 100:+.1f}%" if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a else "-"
+            print(f"{stage:<16}{metric:<24}{str(a):>14}{str(b):>14}{change:>10}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="python -m benchmarks.run compare", description="对比两次基准测试结果")
+        parser.add_argument("baseline")
+        parser.add_argument("candidate")
+        args = parser.parse_args(sys.argv[2:])
+        compare(args.baseline, args.candidate)
+        return
+
+    parser = argparse.ArgumentParser(description="ContestTrade 离线基准测试")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=1, help="每个阶段运行次数，汇总取中位数")
+    parser.add_argument("--trigger-time", default=DEFAULT_TRIGGER_TIME)
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="模拟LLM首token延迟(秒)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="模拟LLM生成速度")
+    parser.add_argument("--chunk-tokens", type=int, default=8, help="流式响应每个chunk的token数")
+    parser.add_argument("--completion-tokens", type=int, default=300, help="摘要类回复的token数")
+    parser.add_argument("--signals-per-report", type=int, default=2, help="研究报告中的信号数")
+    parser.add_argument("--docs", type=int, default=60, help="每个数据源的文档数")
+    parser.add_argument("--universe", type=int, default=300, help="合成价格的股票数")
+    parser.add_argument("--num-judgers", type=int, default=3)
+    parser.add_argument("--judger-quorum", type=int, default=0)
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="事件循环延迟采样间隔(秒)")
+    parser.add_argument("--timeout", type=float, default=1800, help="单个阶段的超时(秒)")
+    parser.add_argument("--output", default=None, help="结果JSON路径，默认 benchmarks/results/<时间>_<commit>.json")
+    parser.add_argument("--keep-sandbox", action="store_true", help="保留沙箱目录(包含worker.log)")
+    run_benchmarks(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
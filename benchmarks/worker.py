@@ -0,0 +1,199 @@
+"""
+Benchmark Worker: 在沙箱中运行单个基准测试阶段(由 benchmarks/run.py 以子进程方式调用)
+
+每个阶段一个独立进程，ru_maxrss 即该阶段的峰值内存。测量:
+1. 导入耗时和导入后的峰值内存
+2. 阶段墙钟耗时
+3. 事件循环延迟: 后台task每隔interval休眠一次，实际唤醒时间与预期的差值
+
+用法: python benchmarks/worker.py --project-root <沙箱>/contest_trade --stage judger --output result.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+from pathlib import Path
+from typing import Dict, List
+
+STAGES = ["data_agent", "research_agent", "judger", "workflow"]
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值RSS，Linux下ru_maxrss单位为KB，macOS下为字节"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary(self) -> Dict:
+        if not self.lags:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        lags = sorted(self.lags)
+        return {
+            "samples": len(lags),
+            "mean_ms": round(sum(lags) / len(lags) * 1000, 3),
+            "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+            "max_ms": round(lags[-1] * 1000, 3),
+        }
+
+
+async def run_data_agents(trigger_time: str) -> Dict:
+    """依次运行配置中的每个DataAnalysisAgent"""
+    from config.config import cfg
+    from contest_trade.agents.data_analysis_agent import DataAnalysisAgent, DataAnalysisAgentConfig, DataAnalysisAgentInput
+
+    details = {}
+    for agent_config in cfg.data_agents_config:
+        agent = DataAnalysisAgent(DataAnalysisAgentConfig(
+            source_list=agent_config["data_source_list"],
+            agent_name=agent_config["agent_name"],
+            final_target_tokens=agent_config.get("final_target_tokens", 4000),
+            bias_goal=agent_config.get("bias_goal", ""),
+        ))
+        start = time.perf_counter()
+        output = await agent.run_with_monitoring(DataAnalysisAgentInput(trigger_time=trigger_time))
+        details[agent_config["agent_name"]] = {
+            "wall_seconds": round(time.perf_counter() - start, 4),
+            "ok": bool(output and output.context_string),
+        }
+    return {"agents": details, "ok": all(item["ok"] for item in details.values())}
+
+
+async def run_research_agent(trigger_time: str) -> Dict:
+    """用合成因子运行第一个ResearchAgent"""
+    from config.config import cfg, PROJECT_ROOT
+    from contest_trade.agents.research_agent import ResearchAgent, ResearchAgentConfig, ResearchAgentInput
+    from fixtures import BENCHMARK_DATA_AGENTS, make_factor
+
+    with open(PROJECT_ROOT / cfg.research_agent_config["belief_list_path"], "r", encoding="utf-8") as f:
+        belief = json.load(f)[0]
+    agent = ResearchAgent(ResearchAgentConfig(agent_name="agent_0", belief=belief))
+    factors = [make_factor(item["agent_name"], trigger_time) for item in BENCHMARK_DATA_AGENTS]
+    background_information = agent.build_background_information(trigger_time, belief, factors)
+    output = await agent.run_with_monitoring(ResearchAgentInput(
+        trigger_time=trigger_time,
+        background_information=background_information,
+        factor_count=len(factors),
+    ))
+    return {"ok": bool(output and output.final_result)}
+
+
+async def run_judger(trigger_time: str) -> Dict:
+    """对已写入的研究报告运行judger评分和权重优化"""
+    from config.config import PROJECT_ROOT
+    from contest.judger_executor import run_judger_critic_pipeline
+
+    result = await run_judger_critic_pipeline(trigger_time, str(PROJECT_ROOT / "agents_workspace"))
+    return {
+        "ok": result.get("status") == "success",
+        "scored_signals": len(result.get("consensus_scores", {}) or {}),
+    }
+
+
+async def run_workflow(trigger_time: str) -> Dict:
+    """完整的SimpleTradeCompany工作流"""
+    from contest_trade.main import SimpleTradeCompany
+
+    final_state = await SimpleTradeCompany().run_company(trigger_time)
+    step_results = final_state.get("step_results", {})
+    return {
+        "ok": bool(final_state.get("research_signals")),
+        "factors": step_results.get("data_team", {}).get("factors_count", len(final_state.get("data_factors", []))),
+        "signals": len(final_state.get("research_signals", [])),
+    }
+
+
+STAGE_RUNNERS = {
+    "data_agent": run_data_agents,
+    "research_agent": run_research_agent,
+    "judger": run_judger,
+    "workflow": run_workflow,
+}
+
+
+async def measure(stage: str, trigger_time: str, lag_interval: float) -> Dict:
+    monitor = LoopLagMonitor(lag_interval)
+    monitor.start()
+    start = time.perf_counter()
+    try:
+        details = await STAGE_RUNNERS[stage](trigger_time)
+        error = None
+    except Exception as e:
+        details, error = {"ok": False}, f"{type(e).__name__}: {e}"
+    wall_seconds = time.perf_counter() - start
+    await monitor.stop()
+    return {
+        "status": "ok" if details.get("ok") and error is None else "error",
+        "error": error,
+        "wall_seconds": round(wall_seconds, 4),
+        "loop_lag": monitor.summary(),
+        "details": details,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行单个基准测试阶段")
+    parser.add_argument("--project-root", required=True, help="沙箱中的 contest_trade 目录")
+    parser.add_argument("--stage", required=True, choices=STAGES + ["fixtures"])
+    parser.add_argument("--trigger-time", required=True)
+    parser.add_argument("--output", required=True, help="结果JSON路径")
+    parser.add_argument("--fixture-options", default="{}", help="install_fixtures 的参数(JSON)")
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="事件循环延迟采样间隔(秒)")
+    args = parser.parse_args()
+
+    # 与 cli/main.py 相同: 沙箱目录(包含 contest_trade 包)和 contest_trade 目录都在 sys.path 上
+    project_root = Path(args.project_root).resolve()
+    sys.path[1:1] = [str(project_root.parent), str(project_root)]
+    os.chdir(project_root)
+
+    start = time.perf_counter()
+    if args.stage == "fixtures":
+        from fixtures import install_fixtures
+        result = install_fixtures(project_root, args.trigger_time, **json.loads(args.fixture_options))
+        result["wall_seconds"] = round(time.perf_counter() - start, 4)
+    else:
+        # 先导入阶段用到的模块，导入耗时和内存单独统计
+        import contest_trade.main  # noqa: F401
+        import contest.judger_executor  # noqa: F401
+        import_seconds = time.perf_counter() - start
+        import_rss = peak_rss_mb()
+        result = asyncio.run(measure(args.stage, args.trigger_time, args.lag_interval))
+        result.update({
+            "import_seconds": round(import_seconds, 4),
+            "import_rss_mb": round(import_rss, 2),
+            "peak_rss_mb": round(peak_rss_mb(), 2),
+        })
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ from .static.report_template import display_final_report_interactive
 from contest_trade.config.config import cfg, PROJECT_ROOT
 sys.path.append(str(PROJECT_ROOT))
 from contest_trade.main import SimpleTradeCompany
+from contest_trade.backtest import BacktestRunner
 from contest_trade.utils.tushare_utils import get_trade_date
 from contest_trade.models.llm_model import GLOBAL_LLM
 
@@ -546,6 +547,11 @@ async def run_with_events_capture(company, trigger_time: str, display: ContestTr
                             "task": "🔄 Research Agent 研究分析阶段", 
                             "progress": "研究分析阶段 2/4"
                         },
+                        "run_streaming_agents": {
+                            "action": lambda: (display.start_data_agents(), display.start_research_agents()),
+                            "task": "🔄 数据收集与研究分析流水线阶段",
+                            "progress": "数据收集与研究分析阶段 2/4"
+                        },
                         "run_contest": {
                             "action": lambda: None,
                             "task": "🔄 竞赛评选阶段",
@@ -575,6 +581,10 @@ async def run_with_events_capture(company, trigger_time: str, display: ContestTr
                         "task": "✅ Research Agent 完成", 
                         "message": "✅ 所有Research Agent完成"
                     },
+                    "run_streaming_agents": {
+                        "task": "✅ 数据收集与研究分析完成",
+                        "message": "✅ 所有Data Analysis Agent和Research Agent完成"
+                    },
                     "run_contest": {
                         "task": "✅ 竞赛评选完成",
                         "message": None
@@ -944,6 +954,41 @@ def run(
     
     console.print("[green]感谢使用ContestTrade![/green]")
 
+@app.command()
+def backtest(
+    start_date: str = typer.Option(..., "--start", "-s", help="开始日期 (YYYY-MM-DD)"),
+    end_date: str = typer.Option(..., "--end", "-e", help="结束日期 (YYYY-MM-DD)"),
+    time_of_day: Optional[str] = typer.Option(None, "--time-of-day", help="每个交易日的触发时刻 (HH:MM:SS)，默认09:00:00"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="并发运行的触发时间数"),
+):
+    """在日期区间内批量回测，支持断点续跑"""
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+        if time_of_day:
+            datetime.strptime(time_of_day, "%H:%M:%S")
+    except ValueError:
+        console.print("[red]日期格式错误，请使用 YYYY-MM-DD 和 HH:MM:SS 格式[/red]")
+        raise typer.Exit(1)
+
+    if not validate_required_services():
+        console.print("[red]系统验证失败，无法启动回测[/red]")
+        raise typer.Exit(1)
+
+    runner = BacktestRunner(start_date, end_date, time_of_day=time_of_day, workers=workers)
+    try:
+        result_df = asyncio.run(runner.run())
+    except Exception as e:
+        console.print(f"[red]回测时发生错误: {e}[/red]")
+        raise typer.Exit(1)
+
+    if result_df.empty:
+        console.print("[yellow]回测区间内没有交易日[/yellow]")
+        return
+    success_count = int((result_df["status"] == "success").sum())
+    console.print(f"[green]回测完成: {success_count}/{len(result_df)} 个交易日成功[/green]")
+    console.print(f"结果目录: {runner.output_dir}")
+
 @app.command()
 def config():
     """显示当前配置"""
@@ -16,8 +16,9 @@ from langgraph.graph import StateGraph, END
 from dataclasses import dataclass
 from dataclasses import field
 from pathlib import Path
-from utils.llm_utils import count_tokens
+from utils.llm_utils import count_tokens_many
 from models.llm_model import GLOBAL_LLM
+from models.llm_usage import track_node, usage_tags
 from langchain_core.runnables import RunnableConfig
 from config.config import PROJECT_ROOT, cfg
 from agents.prompts import prompt_for_data_analysis_summary_doc, prompt_for_data_analysis_filter_doc, prompt_for_data_analysis_merge_summary
@@ -27,6 +28,7 @@ from agents.prompts import prompt_for_data_analysis_summary_doc, prompt_for_data
 class DataAnalysisAgentInput:
     """Data Analysis Agent Input"""
     trigger_time: str
+    run_budget: Any = None  # RunBudget，接近预算时跳过LLM标题筛选
 
 
 @dataclass
@@ -106,6 +108,7 @@ class DataAnalysisAgentState(TypedDict):
     summary: str
     processing_stats: Dict[str, Any]
     batch_details: List[Dict[str, Any]]
+    run_budget: Any
     result: DataAnalysisAgentOutput
 
 
@@ -201,13 +204,15 @@ class DataAnalysisAgent:
             print(f"Data does not exist for {state['trigger_time']}, recomputing factor")
             return "yes"
 
+    @track_node
     async def _preprocess(self, state: DataAnalysisAgentState) -> DataAnalysisAgentState:
         """Preprocess the document data"""
         try:
             data_dfs =[]
             for source in self.data_source_list:
                 print(f"Getting data from {source.__class__.__name__}...")
-                df = await source.get_data(state["trigger_time"])
+                with usage_tags(source=source.__class__.__name__):
+                    df = await source.get_data(state["trigger_time"])
                 required_columns = ['title', 'content', 'pub_time']
                 df = df[df['title'].str.strip() != '']
                 df = df[df['content'].str.strip() != '']
@@ -236,6 +241,7 @@ class DataAnalysisAgent:
         return state
     
    
+    @track_node
     async def _batch_process(self, state: DataAnalysisAgentState) -> DataAnalysisAgentState:
         """Asynchronously process all document batches, return detailed results"""
         print("begin batch process")
@@ -257,7 +263,7 @@ class DataAnalysisAgent:
             
             async def process_single_batch(task_data: Tuple[int, str, pd.DataFrame, int, str]) -> Dict[str, Any]:
                 async with semaphore:
-                    return await self._process_batch_detailed(task_data)
+                    return await self._process_batch_detailed(task_data, state.get("run_budget"))
             
             # Execute all batch tasks
             tasks = [process_single_batch(task) for task in batch_tasks]
@@ -276,6 +282,12 @@ class DataAnalysisAgent:
                 else:
                     batch_results.append(result)
             
+            # Count summary tokens for all batches at once
+            summary_lengths = count_tokens_many([result.get("summary", "") for result in batch_results])
+            for result, summary_length in zip(batch_results, summary_lengths):
+                if result["success"]:
+                    result["summary_length"] = summary_length
+            
         except Exception as e:
             print(f"Error processing batch: {e}")
             traceback.print_exc()
@@ -284,6 +296,7 @@ class DataAnalysisAgent:
         return state
     
 
+    @track_node
     async def _final_summary(self, state: DataAnalysisAgentState) -> DataAnalysisAgentState:
         """Merge multiple batch summaries into final document factor"""
         try:
@@ -388,7 +401,7 @@ class DataAnalysisAgent:
             return state
 
     
-    async def _process_batch_detailed(self, task_data: Tuple[int, str, pd.DataFrame, int, str]) -> Dict[str, Any]:
+    async def _process_batch_detailed(self, task_data: Tuple[int, str, pd.DataFrame, int, str], run_budget=None) -> Dict[str, Any]:
         """Asynchronously process single batch, return detailed results"""
         batch_idx, trigger_datetime, batch_df, titles_to_select, bias_goal = task_data
         batch_start_time = datetime.now()
@@ -407,7 +420,7 @@ class DataAnalysisAgent:
         
         try:
             # Filter document titles
-            filtered_df = await self._filter_docs_by_title(trigger_datetime, batch_df, titles_to_select)
+            filtered_df = await self._filter_docs_by_title(trigger_datetime, batch_df, titles_to_select, run_budget)
             
             # Record filtered document details
             batch_result["filtered_count"] = len(filtered_df)
@@ -426,7 +439,6 @@ class DataAnalysisAgent:
             summary = await self._summarize_doc_content(trigger_datetime, filtered_df, bias_goal)
             
             batch_result["summary"] = summary
-            batch_result["summary_length"] = count_tokens(summary) if summary else 0
             batch_result["success"] = True
             
             # Collect references from batch summary
@@ -449,11 +461,17 @@ class DataAnalysisAgent:
         return batch_result
     
     
-    async def _filter_docs_by_title(self, trigger_datetime: str, batch_df: pd.DataFrame, titles_to_select: int) -> pd.DataFrame:
+    @track_node
+    async def _filter_docs_by_title(self, trigger_datetime: str, batch_df: pd.DataFrame, titles_to_select: int, run_budget=None) -> pd.DataFrame:
         """Use LLM to filter most valuable documents based on titles"""
         if batch_df.empty or len(batch_df) <= titles_to_select:
             return batch_df
         
+        # Close to the run budget: skip the LLM filter and keep the first documents
+        if run_budget is not None and run_budget.degraded:
+            run_budget.note_degradation(self.config.agent_name, "skip_title_filter")
+            return batch_df.head(titles_to_select)
+        
         # Build title context
         titles_context = ""
         for idx, row in batch_df.iterrows():
@@ -494,6 +512,7 @@ class DataAnalysisAgent:
             return batch_df.head(titles_to_select)
     
     
+    @track_node
     async def _summarize_doc_content(self, trigger_datetime: str, batch_df: pd.DataFrame, bias_goal: str = None) -> str:
         """Summarize filtered document content"""
         if batch_df.empty:
@@ -571,6 +590,7 @@ class DataAnalysisAgent:
             summary="",
             processing_stats={},
             batch_details=[],
+            run_budget=input.run_budget,
             result=None
         )
         
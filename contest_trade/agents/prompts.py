@@ -1,38 +1,7 @@
-prompt_for_research_plan = """
-<Task>
-{task}
-</Task>
-
-<Current_Time>
-{current_time}
-</Current_Time>
-
-<Background_Information>
-{background_information}
-</Background_Information>
-
-<Available_Tools>
-{tools_info}
-</Available_Tools>
-
-Please create a detailed step-by-step plan to complete the following user task based on the background information provided.
-Each step should be a clear, actionable instruction. Each step should be a one-line description explaining what needs to be done.
-Steps should:
-1. Be specific and actionable
-2. Use appropriate tools from those provided
-3. Be arranged in logical order
-4. Consider contextual information
-5. Return a list of strings, where each element is a step, without unnecessary words or explanations
-6. Focus on information gathering or visualization, no analysis or summary steps needed
-7. Not exceed 5 steps
-8. Output result in language: {output_language}
-
-Please output the action plan in the following format, do not output any other information:
-1. xxx
-2. xxx
-"""
-
-prompt_for_research_choose_tool = """
+# ReAct研究循环的prompt按"稳定前缀 + 追加轮次"组织:
+# system消息只包含整次运行不变的内容，之后每一步只追加新的轮次，
+# 使provider侧的前缀缓存(DeepSeek/OpenAI prompt cache)在每一步都能命中
+prompt_for_research_system = """
 <Task>
 {task}
 </Task>
@@ -45,19 +14,13 @@ prompt_for_research_choose_tool = """
 {background_information}
 </Background_Information>
 
-<Your_Plan>
-{plan}
-</Your_Plan>
-
 <Available_Tools>
 {tools_info}
 </Available_Tools>
 
-<Current_Task_Context>
-{tool_call_context}
-</Current_Task_Context>
+You will complete the task above step by step: first create an action plan, then call tools according to the plan (one at a time, or several together when they are independent, see the rules below), and finally write the report.
+Tool results are returned to you in <Tool_Result> blocks.
 
-Analyze the following steps and select tools:
 ## Available Resources
 You currently have access to the following analysis tools:
 - **Financial Data Tools**: Get company financials, market data, and historical information
@@ -77,14 +40,21 @@ If you encounter limitations in your analytical capabilities that prevent you fr
 - Cryptocurrency and digital asset analysis
 - Or any other specialized analytical capability you deem essential
 
-## Output Format:
-You must and can only return a JSON object in the following format enclosed by <Output> and </Output> like:
+## Tool Call Format:
+When asked to select tools, you must and can only return a JSON object in the following format enclosed by <Output> and </Output> like:
 <Output>
 {{
     "tool_name": string, # tool name
     "properties": dict, # tool execution arguments
 }}
 </Output>
+If several tool calls are independent of each other (no call needs the result of another), return them together as a JSON list, they will be executed in parallel:
+<Output>
+[
+    {{"tool_name": string, "properties": dict}},
+    {{"tool_name": string, "properties": dict}}
+]
+</Output>
 
 ## Tool Usage Rules:
 You must always follow these rules to complete the task:
@@ -94,8 +64,8 @@ You must always follow these rules to complete the task:
     - When using the corp_info tool, pay attention to whether its stock_code parameter is valid. If invalid, you need to convert it to a valid format.
 4. Never repeat calls to tools that have already been used with exactly the same parameters
 5. Do not return any other text format, do not explain your choices, do not apologize, do not express inability to answer.
-6. If a step requires multiple tools, choose the most important one.
-7. If you have completed all action plans and obtained sufficient information, please use the tool action named "final_report" to provide the final report to the task. This is the only way to complete the task, otherwise you will fall into a loop.
+6. If a step requires multiple independent tools, return them together as a list (at most {max_parallel_tools}). Tools whose arguments depend on another tool's result must be called in a later step.
+7. If you have completed all action plans and obtained sufficient information, please use the tool action named "final_report" alone to provide the final report to the task. This is the only way to complete the task, otherwise you will fall into a loop.
 8. If you need to output string, please output in language: {output_language}
 
 Note: 
@@ -104,31 +74,44 @@ Note:
 - Focus on tools that would significantly enhance your research quality and depth.
 """
 
-prompt_for_research_write_result = """
-<Task>
-{task}
-</Task>
-
-<Current_Time>
-{current_time}
-</Current_Time>
+prompt_for_research_plan = """
+Please create a detailed step-by-step plan to complete the task based on the background information provided.
+Each step should be a clear, actionable instruction. Each step should be a one-line description explaining what needs to be done.
+Steps should:
+1. Be specific and actionable
+2. Use appropriate tools from those provided
+3. Be arranged in logical order
+4. Consider contextual information
+5. Return a list of strings, where each element is a step, without unnecessary words or explanations
+6. Focus on information gathering or visualization, no analysis or summary steps needed
+7. Not exceed 5 steps
+8. Output result in language: {output_language}
 
-<Background_Information>
-{background_information}
-</Background_Information>
+Please output the action plan in the following format, do not output any other information:
+1. xxx
+2. xxx
+"""
 
-<Your_Plan>
-{plan}
-</Your_Plan>
+prompt_for_research_tool_result = """
+<Tool_Result>
+{tool_result}
+</Tool_Result>
+"""
 
-<Available_Tools>
-{tools_info}
-</Available_Tools>
+prompt_for_research_late_factors = """
+<Late_Market_Information>
+{global_market_information}
+</Late_Market_Information>
+The market information above arrived after the research started, take it into account as part of the background information.
+"""
 
-<Current_Task_Context>
-{tool_call_context}
-</Current_Task_Context>
+prompt_for_research_choose_tool = """
+Analyze your plan and the tool results so far, then select the next tool, or a list of independent tools.
+Return only the JSON enclosed by <Output> and </Output> as described in the Tool Call Format.
+Use the tool named "final_report" if you have completed the plan and obtained sufficient information.
+"""
 
+prompt_for_research_write_result = """
 Please generate a complete answer based on the user task, current subtask, and the execution steps and results of the subtask.
 Requirements:
 1. Do not directly answer the user's original question, as the subtask you executed is only part of the reasoning process. Answering the original question prematurely may mislead the user.
@@ -16,10 +16,11 @@ from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 from langgraph.graph import StateGraph, END
-from utils.llm_utils import count_tokens
+from utils.llm_utils import IncrementalTokenCounter
 
-from agents.prompts import prompt_for_research_plan, prompt_for_research_choose_tool, prompt_for_research_write_result, prompt_for_research_invest_task, prompt_for_research_invest_output_format
+from agents.prompts import prompt_for_research_system, prompt_for_research_plan, prompt_for_research_choose_tool, prompt_for_research_tool_result, prompt_for_research_late_factors, prompt_for_research_write_result, prompt_for_research_invest_task, prompt_for_research_invest_output_format
 from models.llm_model import GLOBAL_LLM, GLOBAL_THINKING_LLM
+from models.llm_usage import track_node
 from tools.tool_utils import ToolManager, ToolManagerConfig
 from config.config import cfg, PROJECT_ROOT
 from langchain_core.runnables import RunnableConfig
@@ -30,6 +31,9 @@ class ResearchAgentInput:
     """Agent输入"""
     background_information: str
     trigger_time: str
+    factor_stream: Any = None  # 流水线模式下的FactorStream，写报告前合并迟到的因子
+    factor_count: int = 0  # background_information中已包含的因子数
+    run_budget: Any = None  # RunBudget，接近预算时跳过规划并提前写报告
 
 
 @dataclass
@@ -67,6 +71,8 @@ class ResearchAgentConfig:
         self.agent_name = agent_name
         self.belief = belief
         self.max_react_step = cfg.research_agent_config["max_react_step"]
+        # 单步内可并发执行的独立工具调用数
+        self.max_parallel_tools = cfg.research_agent_config.get("max_parallel_tools", 4)
         self.tool_config = ToolManagerConfig(cfg.research_agent_config["tools"])
         self.output_language = cfg.system_language
         if 'plan' in cfg.research_agent_config:
@@ -85,13 +91,19 @@ class ResearchAgentState(TypedDict):
     trigger_time: str = ""
     belief: str = ""
     background_information: str = ""
+    factor_stream: Any = None
+    factor_count: int = 0
+    run_budget: Any = None
+    token_counter: Any = None  # IncrementalTokenCounter，估算写报告prompt的长度
     
     # 上下文和预算
     plan_result: str = ""
     tool_call_context: str = ""
+    react_messages: list = []  # 已完成的对话轮次，首条为整次运行不变的system前缀
+    pending_observation: str = ""  # 尚未发送给LLM的工具结果/迟到因子，随下一轮user消息发送
     
     # 思考和决策
-    selected_tool: dict = {}
+    selected_tool: Any = {}  # 单个工具调用(dict)或同一步内并发执行的多个独立调用(list)
     tool_call_count: int = 0
     tool_call_results: list = []
     step_count: int = 0
@@ -127,6 +139,7 @@ class ResearchAgent:
         workflow.add_node("plan", self._plan)
         workflow.add_node("tool_selection", self._tool_selection)
         workflow.add_node("call_tool", self._call_tool)
+        workflow.add_node("merge_factors", self._merge_factors)
         workflow.add_node("write_result", self._write_result)
         workflow.add_node("submit_result", self._submit_result)
         
@@ -150,10 +163,11 @@ class ResearchAgent:
         workflow.add_conditional_edges("tool_selection",
             self._enough_information,
             {
-                "enough_information": "write_result",
+                "enough_information": "merge_factors",
                 "not_enough_information": "call_tool"
             })
         workflow.add_edge("call_tool", "tool_selection")
+        workflow.add_edge("merge_factors", "write_result")
         workflow.add_edge("write_result", "submit_result")
         workflow.add_edge("submit_result", END)
         return workflow.compile()
@@ -184,59 +198,92 @@ class ResearchAgent:
     async def _init_data(self, state: ResearchAgentState) -> ResearchAgentState:
         """初始化数据"""
         state["tool_call_count"] = 0
+        system_prompt = prompt_for_research_system.format(
+            current_time=state["trigger_time"],
+            task=state["task"],
+            background_information=state["background_information"],
+            tools_info=self.tool_manager.build_toolcall_context(),
+            max_parallel_tools=self.config.max_parallel_tools,
+            output_language=self.config.output_language,
+        )
+        state["react_messages"] = [{"role": "system", "content": system_prompt}]
+        state["pending_observation"] = ""
         return state
 
+    def _build_messages(self, state: ResearchAgentState, instruction: str) -> List[Dict[str, str]]:
+        """已完成的轮次 + 本轮user消息(未发送的工具结果 + 指令)，前面的消息在各步之间保持不变"""
+        content = state["pending_observation"] + instruction
+        return state["react_messages"] + [{"role": "user", "content": content}]
+
+    def _commit_turn(self, state: ResearchAgentState, messages: List[Dict[str, str]], reply: str):
+        """本轮成功后把user消息和LLM回复追加到历史"""
+        state["react_messages"] = messages + [{"role": "assistant", "content": reply}]
+        state["pending_observation"] = ""
+
+    def _budget_degraded(self, state: ResearchAgentState, action: str) -> bool:
+        """运行预算是否已接近上限，是则记录降级行为"""
+        run_budget = state.get("run_budget")
+        if run_budget is None or not run_budget.degraded:
+            return False
+        run_budget.note_degradation(self.config.agent_name, action)
+        return True
+
     async def _need_plan(self, state: ResearchAgentState) -> str:
         """判断是否需要规划"""
-        if self.plan:
+        if self.plan and not self._budget_degraded(state, "skip_plan"):
             return "yes"
         else:
             return "no"
 
+    @track_node
     async def _plan(self, state: ResearchAgentState) -> ResearchAgentState:
         """规划任务"""
         try:
             if not self.plan:
                 state["plan_result"] = ""
                 return state
-            prompt = prompt_for_research_plan.format(
-                current_time=state["trigger_time"],
-                task=state["task"],
-                background_information=state["background_information"],
-                tools_info=self.tool_manager.build_toolcall_context(),
-                output_language=self.config.output_language,
-            )
-            messages = [{"role": "user", "content": prompt}]
+            prompt = prompt_for_research_plan.format(output_language=self.config.output_language)
+            messages = self._build_messages(state, prompt)
             plan_result = await GLOBAL_LLM.a_run(messages, verbose=True, thinking=False, max_retries=10)
             plan_result = plan_result.content
             state["plan_result"] = plan_result.strip()
+            self._commit_turn(state, messages, state["plan_result"])
         except Exception as e:
             logger.error(f"Error in plan: {e}")
             state["plan_result"] = ""
         return state
 
+    @track_node
     async def _tool_selection(self, state: ResearchAgentState) -> ResearchAgentState:
         """选择工具"""
         if not self.react:
             state["selected_tool"] = {"tool_name": "final_report"}
             return state
 
-        prompt = prompt_for_research_choose_tool.format(
-            current_time=state["trigger_time"],
-            task=state["task"],
-            plan=state["plan_result"],
-            background_information=state["background_information"],
-            tool_call_context=state["tool_call_context"],
-            tools_info=self.tool_manager.build_toolcall_context(),
-            output_language=self.config.output_language,
-        )
+        # 接近运行预算时不再调用工具，直接写报告
+        if self._budget_degraded(state, "stop_react"):
+            state["selected_tool"] = {"tool_name": "final_report"}
+            return state
+
+        messages = self._build_messages(state, prompt_for_research_choose_tool)
         try:
             next_tool = await self.tool_manager.select_tool_by_llm(
-                prompt=prompt,
+                messages=messages,
+                post_process_func=ToolManager.parse_bounding_json_list,
             )
         except Exception as e:
             logger.error(f"Error in tool_selection: {e}")
             next_tool = {"error": str(e)}
+        if isinstance(next_tool, list):
+            # final_report需要单独使用，与其他工具同时出现时先执行其他工具
+            tool_calls = [tool_call for tool_call in next_tool if tool_call["tool_name"] != "final_report"] or next_tool[:1]
+            if len(tool_calls) > self.config.max_parallel_tools:
+                logger.warning(f"Too many parallel tool calls ({len(tool_calls)}), keep first {self.config.max_parallel_tools}")
+                tool_calls = tool_calls[:self.config.max_parallel_tools]
+            next_tool = tool_calls[0] if len(tool_calls) == 1 else tool_calls
+            # 以规范化的JSON记录实际执行的工具调用，历史轮次与LLM原始输出的格式细节无关
+            reply = f"<Output>\n{json.dumps(next_tool, ensure_ascii=False)}\n</Output>"
+            self._commit_turn(state, messages, reply)
         state["selected_tool"] = next_tool
         return state
 
@@ -244,21 +291,26 @@ class ResearchAgent:
     async def _enough_information(self, state: ResearchAgentState) -> str:
         """判断是否足够信息"""
         try:
-            estimated_context = prompt_for_research_write_result.format(
-                current_time=state["trigger_time"],
-                task=state["task"],
-                background_information=state["background_information"],
-                plan=state["plan_result"],
-                tool_call_context=state["tool_call_context"],
-                tools_info=self.tool_manager.build_toolcall_context(),
+            # 历史轮次不变，增量计数避免每一步重新编码整个对话
+            token_counter = state.get("token_counter") or IncrementalTokenCounter()
+            estimated_tokens = sum(
+                token_counter.count_field(f"message_{i}", message["content"])
+                for i, message in enumerate(state["react_messages"])
+            )
+            estimated_tokens += token_counter.count_field("pending_observation", state["pending_observation"])
+            estimated_tokens += token_counter.count_format(
+                prompt_for_research_write_result,
                 output_format=self.get_output_format(),
                 output_language=self.config.output_language,
             )
 
-            if count_tokens(estimated_context) > 128000:
+            if estimated_tokens > 128000:
                 return "enough_information"
 
             selected_tool = state["selected_tool"]
+            if isinstance(selected_tool, list):
+                # 并发的多个工具调用中不含final_report
+                return "enough_information" if state["tool_call_count"] >= self.config.max_react_step else "not_enough_information"
             if "error" in selected_tool:
                 return "not_enough_information"
             if selected_tool["tool_name"] == "final_report" or \
@@ -269,41 +321,59 @@ class ResearchAgent:
         return "not_enough_information"
 
 
+    @track_node
     async def _call_tool(self, state: ResearchAgentState) -> ResearchAgentState:
-        """调用工具"""
+        """调用工具，同一步内的多个独立工具并发执行，结果按选择顺序追加"""
         selected_tool = state["selected_tool"]
+        tool_calls = selected_tool if isinstance(selected_tool, list) else [selected_tool]
         try:
-            print('Begin to call tool: ', selected_tool)
-            tool_name = selected_tool["tool_name"]
-            tool_args = selected_tool["properties"]
-            tool_result = await self.tool_manager.call_tool(tool_name, tool_args, state["trigger_time"])
-            print("tool_result: ", tool_result)
+            print('Begin to call tool: ', tool_calls)
+            tool_results = await self.tool_manager.call_tools(tool_calls, state["trigger_time"])
+            print("tool_result: ", tool_results)
         except Exception as e:
             logger.error(f"Error in call_tool: {e}")
-            tool_result = {"error": str(e)}
+            tool_results = [{"error": str(e)}] * len(tool_calls)
         
+        # max_react_step 按步数计算，一步内的并发调用只计一次
         state["tool_call_count"] += 1
-        state["tool_call_context"] += json.dumps({"tool_called":selected_tool,\
-                                            "tool_result":tool_result}, ensure_ascii=False) + "\n"
+        for tool_called, tool_result in zip(tool_calls, tool_results):
+            tool_call = json.dumps({"tool_called":tool_called,\
+                                    "tool_result":tool_result}, ensure_ascii=False)
+            state["tool_call_context"] += tool_call + "\n"
+            state["pending_observation"] += prompt_for_research_tool_result.format(tool_result=tool_call)
         return state
 
 
+    async def _merge_factors(self, state: ResearchAgentState) -> ResearchAgentState:
+        """流水线模式下，写报告前把迟到的因子合并进背景信息"""
+        factor_stream = state.get("factor_stream")
+        if factor_stream is None:
+            return state
+        try:
+            factors = await factor_stream.wait_all()
+            if len(factors) > state["factor_count"]:
+                print(f"合并迟到的因子: {state['factor_count']} -> {len(factors)}")
+                # 迟到的因子作为新的轮次追加，不改动system前缀
+                state["pending_observation"] += prompt_for_research_late_factors.format(
+                    global_market_information=self.format_factors(state["trigger_time"], factors[state["factor_count"]:]))
+                state["background_information"] = self.build_background_information(
+                    state["trigger_time"], state["belief"], factors)
+                state["factor_count"] = len(factors)
+        except Exception as e:
+            logger.error(f"Error in merge_factors: {e}")
+        return state
+
+    @track_node
     async def _write_result(self, state: ResearchAgentState) -> ResearchAgentState:
         """写结果"""
         try:
             if self.get_output_format() is None:
                 state["output_format"] = "xxxx"
             prompt = prompt_for_research_write_result.format(
-                current_time=state["trigger_time"],
-                task=state["task"],
-                background_information=state["background_information"],
-                plan=state["plan_result"],
-                tool_call_context=state["tool_call_context"],
-                tools_info=self.tool_manager.build_toolcall_context(),
                 output_format=self.get_output_format(),
                 output_language=self.config.output_language,
             )
-            messages = [{"role": "user", "content": prompt}]
+            messages = self._build_messages(state, prompt)
             if cfg.llm_thinking.get("api_key", None):
                 result_result = await GLOBAL_THINKING_LLM.a_run(messages, verbose=False, thinking=True, max_retries=5)
             else:
@@ -339,9 +409,8 @@ class ResearchAgent:
             traceback.print_exc()
         return state
 
-    def build_background_information(self, trigger_time: str, belief: str, factors: List):
-        """构建背景信息"""
-        
+    def format_factors(self, trigger_time: str, factors: List) -> str:
+        """把因子格式化为 <global_summary> 块"""
         global_market_information = ""
         for factor in factors:
             # 处理不同的factor类型
@@ -368,6 +437,12 @@ class ResearchAgent:
             <content>{factor_context}</content>
             </global_summary>
             """)
+        return global_market_information
+
+    def build_background_information(self, trigger_time: str, belief: str, factors: List):
+        """构建背景信息"""
+        
+        global_market_information = self.format_factors(trigger_time, factors)
 
         target_market = GLOBAL_MARKET_MANAGER.get_target_symbol_context(trigger_time)
         
@@ -405,8 +480,14 @@ class ResearchAgent:
             task=self.get_invest_prompt(),
             belief=self.config.belief,
             background_information=input.background_information,
+            factor_stream=input.factor_stream,
+            factor_count=input.factor_count,
+            run_budget=input.run_budget,
+            token_counter=IncrementalTokenCounter(),
             plan_result="",
             tool_call_context="",
+            react_messages=[],
+            pending_observation="",
             selected_tool={},
             tool_call_count=0,
             step_count=0,
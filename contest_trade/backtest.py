@@ -0,0 +1,292 @@
+"""
+Backtest Runner - 在一个日期区间内批量运行 SimpleTradeCompany
+
+1. 公司(所有Agent和工作流)只构建一次，所有触发时间共用
+2. 每个触发时间拆成两个阶段:
+   - 研究阶段: run_data_agents -> run_research_agents(流水线模式下为 run_streaming_agents)，
+     不同交易日之间互不依赖，可以并发
+   - 决策阶段: run_judger_critic -> run_contest -> finalize，需要过去window_m天的研究报告，
+     等待窗口内的研究阶段全部完成后再运行
+3. 所有阶段共用一个有界的worker池
+4. 支持断点续跑: Agent 已有的 factors / reports 文件会直接复用，已有 final_result 的交易日跳过评分
+5. 结束后在 agents_workspace/backtest 下输出汇总结果表，并按每日最佳信号模拟组合净值(contest.portfolio_simulator)
+"""
+import json
+import time
+import asyncio
+import pandas as pd
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from langchain_core.runnables import RunnableConfig
+
+from .config.config import cfg
+from .main import SimpleTradeCompany
+from models.llm_usage import GLOBAL_USAGE_TRACKER
+from utils.market_manager import GLOBAL_MARKET_MANAGER
+from contest.portfolio_simulator import PortfolioSimulator, decisions_from_states
+
+DECISION_STEPS = ["run_judger_critic", "run_contest", "finalize"]
+
+
+class BacktestRunner:
+    """多交易日回测调度器"""
+
+    def __init__(self, start_date: str, end_date: str, time_of_day: str = None, workers: int = None,
+                 market_name: str = "CN-Stock", company: Optional[SimpleTradeCompany] = None):
+        backtest_config = getattr(cfg, "backtest_config", None) or {}
+        self.market_name = market_name
+        self.time_of_day = time_of_day or backtest_config.get("time_of_day", "09:00:00")
+        self.workers = workers or backtest_config.get("workers", 4)
+        self.window_m = cfg.researcher_contest_config.get("window_m", 5)
+        self.contest_mode = cfg.researcher_contest_config["contest_mode"]
+        self.simulate_portfolio = backtest_config.get("simulate_portfolio", True)
+        self.initial_cash = backtest_config.get("initial_cash", 1_000_000)
+
+        calendar = GLOBAL_MARKET_MANAGER.get_trading_calendar(market_name)
+        self.trade_dates = calendar.range(start_date, end_date)
+        self.trigger_times = [
+            f"{datetime.strptime(d, '%Y%m%d').strftime('%Y-%m-%d')} {self.time_of_day}"
+            for d in self.trade_dates
+        ]
+
+        self.company = company or SimpleTradeCompany()
+        self.workspace_dir = Path(self.company.workspace_dir)
+        self.research_steps = [step for step in self.company.company_steps if step not in DECISION_STEPS]
+        self.output_dir = self.workspace_dir / "backtest"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _file_timestamp(trigger_time: str) -> str:
+        return trigger_time.replace(" ", "_").replace(":", "-")
+
+    def _final_result_file(self, trigger_time: str) -> Path:
+        timestamp = trigger_time.replace(" ", "_").replace(":", "")
+        return self.workspace_dir / "final_result" / f"final_result_{timestamp}.json"
+
+    def is_research_done(self, trigger_time: str) -> bool:
+        """所有research agent的报告是否都已存在"""
+        timestamp = self._file_timestamp(trigger_time)
+        return all(
+            (agent.signal_dir / f"{timestamp}.json").exists()
+            for agent in self.company.research_agents.values()
+        )
+
+    def is_decision_done(self, trigger_time: str) -> bool:
+        """评分结果是否已存在(非contest模式下决策阶段无需外部结果)"""
+        if not self.contest_mode:
+            return False
+        return self._final_result_file(trigger_time).exists()
+
+    def get_dependencies(self, trigger_time: str) -> List[str]:
+        """
+        决策阶段依赖的研究阶段: 当天以及过去window_m个自然日内在本次回测区间中的触发时间
+        (与 SignalJudger.check_missing_signals 的回看口径一致)
+        """
+        if not self.contest_mode:
+            return [trigger_time]
+        current = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
+        window_start = (current - timedelta(days=self.window_m)).strftime("%Y-%m-%d %H:%M:%S")
+        return [t for t in self.trigger_times if window_start <= t <= trigger_time]
+
+    def _window_covered(self, trigger_time: str) -> bool:
+        """回看窗口是否全部落在回测区间内(否则judger会自行补全缺失信号)"""
+        current = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
+        window_start = (current - timedelta(days=self.window_m)).strftime("%Y-%m-%d %H:%M:%S")
+        return bool(self.trigger_times) and self.trigger_times[0] <= window_start
+
+    def _load_decision_state(self, trigger_time: str) -> Dict:
+        """从已有的final_result恢复评分结果"""
+        with open(self._final_result_file(trigger_time), "r", encoding="utf-8") as f:
+            final_result = json.load(f)
+        judger_scores = final_result.get("consensus_scores", {})
+        optimized_weights = final_result.get("optimized_weights", {})
+        return {
+            "judger_scores": judger_scores,
+            "optimized_weights": optimized_weights,
+            "judger_critic": {
+                "status": "success",
+                "resumed": True,
+                "scores_count": len(judger_scores),
+                "weights_count": len(optimized_weights),
+                "avg_score": sum(judger_scores.values()) / len(judger_scores) if judger_scores else 0,
+                "consensus_scores": judger_scores,
+                "optimized_weights": optimized_weights,
+            },
+        }
+
+    async def _run_research(self, trigger_time: str, worker_pool: asyncio.Semaphore) -> Dict:
+        async with worker_pool:
+            resumed = self.is_research_done(trigger_time)
+            print(f"📅 [{trigger_time}] 研究阶段开始{'(复用已有报告)' if resumed else ''}")
+            start = time.time()
+            workflow = self.company.get_company_workflow(self.research_steps)
+            state = await workflow.ainvoke(
+                self.company.create_initial_state(trigger_time),
+                config=RunnableConfig(recursion_limit=50),
+            )
+            state["step_results"]["research_resumed"] = resumed
+            state["step_results"]["research_seconds"] = time.time() - start
+            print(f"✅ [{trigger_time}] 研究阶段完成，耗时 {time.time() - start:.1f}s")
+            return state
+
+    async def _run_decision(self, trigger_time: str, research_tasks: Dict[str, asyncio.Task],
+                            worker_pool: asyncio.Semaphore, backfill_lock: asyncio.Lock) -> Dict:
+        try:
+            # 等待窗口内的研究阶段，只有当天的研究失败时决策才失败
+            dependencies = self.get_dependencies(trigger_time)
+            results = await asyncio.gather(*(research_tasks[t] for t in dependencies), return_exceptions=True)
+            failed = [t for t, result in zip(dependencies, results)
+                      if isinstance(result, BaseException) and t != trigger_time]
+            if failed:
+                print(f"⚠️ [{trigger_time}] 窗口内 {len(failed)} 个研究阶段失败，judger将自行补全这些信号: {failed}")
+            state = research_tasks[trigger_time].result()
+
+            async with worker_pool:
+                start = time.time()
+                if self.is_decision_done(trigger_time):
+                    print(f"📅 [{trigger_time}] 决策阶段复用已有评分结果")
+                    decision = self._load_decision_state(trigger_time)
+                    step_results = {**state["step_results"], "judger_critic": decision["judger_critic"]}
+                    state = {
+                        **state,
+                        "judger_scores": decision["judger_scores"],
+                        "optimized_weights": decision["optimized_weights"],
+                        "step_results": step_results,
+                    }
+                    workflow = self.company.get_company_workflow(DECISION_STEPS[1:])
+                else:
+                    print(f"📅 [{trigger_time}] 决策阶段开始")
+                    workflow = self.company.get_company_workflow(DECISION_STEPS)
+
+                # 回看窗口超出回测区间或窗口内有研究失败时judger会自行补全缺失信号，这些交易日串行执行，避免重复补全同一天
+                if self.contest_mode and (failed or not self._window_covered(trigger_time)):
+                    async with backfill_lock:
+                        state = await workflow.ainvoke(state, config=RunnableConfig(recursion_limit=50))
+                else:
+                    state = await workflow.ainvoke(state, config=RunnableConfig(recursion_limit=50))
+                state["step_results"]["decision_seconds"] = time.time() - start
+                print(f"✅ [{trigger_time}] 决策阶段完成，耗时 {time.time() - start:.1f}s")
+                return state
+        finally:
+            # 研究阶段创建的预算在决策阶段结束(或任一阶段失败)后注销
+            GLOBAL_USAGE_TRACKER.unregister_budget(trigger_time)
+
+    def _summarize(self, trigger_time: str, state: Optional[Dict], error: Optional[BaseException]) -> Dict:
+        """单个触发时间的汇总行"""
+        row = {"trigger_time": trigger_time, "status": "failed" if error else "success",
+               "error": str(error) if error else ""}
+        if state is None:
+            return row
+
+        step_results = state.get("step_results", {})
+        judger = step_results.get("judger_critic", {})
+        best_signals = step_results.get("contest", {}).get("best_signals", [])
+        weights = state.get("optimized_weights", {}) or {}
+        top_signal = max(weights.items(), key=lambda x: x[1])[0] if weights else ""
+        row.update({
+            "data_factors": len(state.get("data_factors", [])),
+            "research_signals": len(state.get("research_signals", [])),
+            "judger_status": judger.get("status", "skipped"),
+            "scored_signals": judger.get("scores_count", 0),
+            "avg_score": judger.get("avg_score", 0),
+            "top_signal": top_signal,
+            "best_signals": ";".join(
+                f"{s.get('symbol_code', '')}:{s.get('action', '')}"
+                for s in best_signals if s.get("has_opportunity", "").lower() == "yes"
+            ),
+            "research_resumed": step_results.get("research_resumed", False),
+            "decision_resumed": judger.get("resumed", False),
+            "research_seconds": round(step_results.get("research_seconds", 0), 2),
+            "decision_seconds": round(step_results.get("decision_seconds", 0), 2),
+            "llm_calls": step_results.get("llm_usage", {}).get("calls", 0),
+            "llm_tokens": step_results.get("llm_usage", {}).get("total_tokens", 0),
+            "llm_cost": round(step_results.get("llm_usage", {}).get("cost", 0.0), 4),
+            "budget_ratio": step_results.get("run_budget", {}).get("usage_ratio", 0),
+            "degradations": len(step_results.get("run_budget", {}).get("degradations", [])),
+        })
+        return row
+
+    def save_results(self, rows: List[Dict], states: Dict[str, Dict]) -> Path:
+        """保存汇总表(csv)和每个交易日的详细结果(json)"""
+        name = f"backtest_{self.trade_dates[0]}_{self.trade_dates[-1]}"
+        table_file = self.output_dir / f"{name}.csv"
+        pd.DataFrame(rows).to_csv(table_file, index=False, encoding="utf-8-sig")
+
+        details = {
+            trigger_time: {
+                "step_results": state.get("step_results", {}),
+                "judger_scores": state.get("judger_scores", {}),
+                "optimized_weights": state.get("optimized_weights", {}),
+            }
+            for trigger_time, state in states.items()
+        }
+        with open(self.output_dir / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(details, f, ensure_ascii=False, indent=2, default=str)
+
+        print(f"回测结果已保存到: {table_file}")
+        return table_file
+
+    def save_portfolio(self, states: Dict[str, Dict]) -> Optional[Path]:
+        """按每日最佳信号和权重模拟组合，保存每日净值/换手率/回撤"""
+        decisions = decisions_from_states(states)
+        if not decisions:
+            return None
+        simulator = PortfolioSimulator(self.market_name, initial_cash=self.initial_cash)
+        result = simulator.run(decisions, self.trade_dates[0], self.trade_dates[-1])
+        nav_file = self.output_dir / f"backtest_{self.trade_dates[0]}_{self.trade_dates[-1]}_nav.csv"
+        result.daily.to_csv(nav_file, index=False, encoding="utf-8-sig")
+        summary = result.summary
+        print(f"组合模拟: 总收益 {summary['total_return']:.2%}，最大回撤 {summary['max_drawdown']:.2%}，"
+              f"平均换手率 {summary['avg_turnover']:.2%}，费用 {summary['total_fees']:.2f}")
+        print(f"组合净值已保存到: {nav_file}")
+        return nav_file
+
+    async def run(self) -> pd.DataFrame:
+        """运行回测，返回汇总结果表"""
+        if not self.trigger_times:
+            print("⚠️ 回测区间内没有交易日")
+            return pd.DataFrame()
+
+        print(f"🚀 开始回测: {self.trigger_times[0]} ~ {self.trigger_times[-1]}，"
+              f"共 {len(self.trigger_times)} 个交易日，workers={self.workers}")
+        worker_pool = asyncio.Semaphore(self.workers)
+        backfill_lock = asyncio.Lock()
+
+        research_tasks = {
+            trigger_time: asyncio.create_task(self._run_research(trigger_time, worker_pool))
+            for trigger_time in self.trigger_times
+        }
+        decision_tasks = {
+            trigger_time: asyncio.create_task(
+                self._run_decision(trigger_time, research_tasks, worker_pool, backfill_lock)
+            )
+            for trigger_time in self.trigger_times
+        }
+        results = await asyncio.gather(*decision_tasks.values(), return_exceptions=True)
+
+        rows = []
+        states = {}
+        for trigger_time, result in zip(self.trigger_times, results):
+            if isinstance(result, BaseException):
+                print(f"❌ [{trigger_time}] 运行失败: {result}")
+                research_task = research_tasks[trigger_time]
+                state = research_task.result() if research_task.done() and not research_task.exception() else None
+                rows.append(self._summarize(trigger_time, state, result))
+            else:
+                rows.append(self._summarize(trigger_time, result, None))
+                states[trigger_time] = result
+        self.save_results(rows, states)
+        if self.simulate_portfolio:
+            try:
+                self.save_portfolio(states)
+            except Exception as e:
+                print(f"⚠️ 组合模拟失败: {e}")
+        return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import sys
+    start_date, end_date = sys.argv[1], sys.argv[2]
+    result_df = asyncio.run(BacktestRunner(start_date, end_date).run())
+    print(result_df.to_string(index=False))
@@ -12,7 +12,6 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import requests
-import concurrent.futures
 import warnings
 import re
 from collections import defaultdict
@@ -22,7 +21,11 @@ from config.config import cfg, PROJECT_ROOT
 from contest.judger_weight_optimizer import WeightOptimizer
 from agents.research_agent import ResearchAgentInput
 from config.config import cfg
-from models.llm_model import GLOBAL_LLM
+from contest.judger_fanout import fan_out_judgers, get_judger_llm
+from contest.return_engine import sharpe_ratio
+from contest.performance_ledger import get_performance_ledger
+from models.llm_usage import usage_tags
+from contest.signal_parser import Signal, parse_final_result
 
 warnings.filterwarnings('ignore')
 
@@ -135,91 +138,11 @@ class DataFormatConverter:
     def _parse_final_result(self, final_result: str) -> Optional[Dict]:
         """解析final_result字符串，提取结构化数据"""
         try:
-            # 移除<Output>标签
-            if '<Output>' in final_result:
-                final_result = final_result.split('<Output>')[-1].strip()
-            
-            # 提取各个字段
-            has_opportunity = self._extract_field(final_result, 'has_opportunity')
-            action = self._extract_field(final_result, 'action')
-            symbol_code = self._extract_field(final_result, 'symbol_code')
-            symbol_name = self._extract_field(final_result, 'symbol_name')
-            probability = self._extract_field(final_result, 'probability')
-            
-            # 提取evidence_list
-            evidence_list = self._extract_evidence_list(final_result)
-            
-            # 提取limitations
-            limitations = self._extract_limitations(final_result)
-            
-            return {
-                'has_opportunity': has_opportunity,
-                'action': action,
-                'symbol_code': symbol_code,
-                'symbol_name': symbol_name,
-                'evidence_list': evidence_list,
-                'limitations': limitations,
-                'probability': probability
-            }
+            parsed_signal = parse_final_result(final_result)
+            return parsed_signal.to_dict() if parsed_signal else Signal().to_dict()
         except Exception as e:
             print(f"解析final_result失败: {e}")
             return None
-    
-    def _extract_field(self, text: str, field_name: str) -> str:
-        """提取单个字段"""
-        pattern = f"<{field_name}>(.*?)</{field_name}>"
-        match = re.search(pattern, text, flags=re.DOTALL)
-        return match.group(1).strip() if match else ''
-    
-    def _extract_evidence_list(self, text: str) -> List[Dict]:
-        """提取evidence_list"""
-        evidence_list = []
-        
-        # 提取整个evidence_list内容
-        evidence_list_match = re.search(r"<evidence_list>(.*?)</evidence_list>", text, flags=re.DOTALL)
-        if not evidence_list_match:
-            return evidence_list
-        
-        evidence_list_content = evidence_list_match.group(1)
-        
-        # 分割每个evidence块
-        evidence_blocks = re.split(r"<evidence>", evidence_list_content)
-        
-        for block in evidence_blocks:
-            if '</evidence>' in block:
-                evidence_parts = block.split('</evidence>')
-                if len(evidence_parts) >= 1:
-                    evidence_content = evidence_parts[0].strip()
-                    
-                    # 提取time和from_source
-                    time_match = re.search(r"<time>(.*?)</time>", evidence_parts[0] if len(evidence_parts) > 1 else block, flags=re.DOTALL)
-                    source_match = re.search(r"<from_source>(.*?)</from_source>", evidence_parts[0] if len(evidence_parts) > 1 else block, flags=re.DOTALL)
-                    
-                    evidence_list.append({
-                        'description': evidence_content,
-                        'time': time_match.group(1).strip() if time_match else '',
-                        'from_source': source_match.group(1).strip() if source_match else ''
-                    })
-        
-        return evidence_list
-    
-    def _extract_limitations(self, text: str) -> List[str]:
-        """提取limitations"""
-        limitations = []
-        
-        # 提取整个limitations内容
-        limitations_match = re.search(r"<limitations>(.*?)</limitations>", text, flags=re.DOTALL)
-        if not limitations_match:
-            return limitations
-        
-        limitations_content = limitations_match.group(1)
-        
-        # 提取每个limitation
-        limitation_matches = re.findall(r"<limitation>(.*?)</limitation>", limitations_content, flags=re.DOTALL)
-        for limitation in limitation_matches:
-            limitations.append(limitation.strip())
-        
-        return limitations
 
 
 class SignalJudger:
@@ -235,14 +158,22 @@ class SignalJudger:
         self.num_judgers = self.contest_config.get('num_judgers', 5)
         self.judger_config_name = self.contest_config.get('judger_config', 'llm')
         
-        # 获取LLM配置
+        # 提前结束: judger_quorum个judger评分一致(分差不超过tolerance)时取消其余judger，0表示等待全部
+        self.judger_quorum = self.contest_config.get('judger_quorum', 0)
+        self.judger_quorum_tolerance = self.contest_config.get('judger_quorum_tolerance', 10)
+        
+        # 获取LLM配置，同一配置的所有judger共享一个异步客户端
         self.llm_config = getattr(cfg, self.judger_config_name)
+        self.llm = get_judger_llm(self.judger_config_name)
         
         # 创建输出目录
         self.judger_scores_dir.mkdir(parents=True, exist_ok=True)
         
         # 初始化数据转换器
         self.data_converter = DataFormatConverter(workspace_dir)
+        
+        # 历史信号表现账本(增量同步，只查询窗口内的信号)
+        self.ledger = get_performance_ledger(self.workspace_dir)
     
     def build_scoring_prompt(self, signals: Dict[str, Dict], historical_returns: Optional[Dict[str, float]] = None) -> str:
         """
@@ -351,16 +282,18 @@ Format Instructions:
 """
         return prompt
     
-    def call_llm_for_scoring(self, prompt: str, judger_id: int, max_retries: int = 3) -> str:
-        """调用LLM进行评分"""
+    async def call_llm_for_scoring(self, prompt: str, judger_id: int) -> str:
+        """调用LLM进行评分(流式读取，被取消时关闭连接)"""
         messages = [
             {'role': 'user', 'content': prompt}
         ]
         
         try:
-            print(f"调用judger_{judger_id} (GLOBAL_LLM)...")
+            print(f"调用judger_{judger_id} ({self.llm.model_name})...")
             
-            result = GLOBAL_LLM.run(messages, max_tokens=10000, temperature=0.1)
+            # 多个judger使用相同prompt，按judger_id区分缓存，避免回放时所有judger得到同一份评分
+            with usage_tags(agent="judger", node=f"judger_{judger_id}"):
+                result = await self.llm.a_run(messages, max_tokens=10000, temperature=0.1, cache_variant=f"judger_{judger_id}")
             
             if result and hasattr(result, 'content'):
                 return result.content
@@ -530,55 +463,21 @@ Format Instructions:
             Dict[signal_name, avg_return]: 历史平均收益率字典，None表示数据不足
         """
         try:
-            from utils.market_manager import MarketManager, MarketManagerConfig
-            
-            # 初始化市场管理器
-            market_config = MarketManagerConfig.from_config_file()
-            market_manager = MarketManager(market_config)
-            
             # 解析当前时间
             current_date = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
             
-            # 获取所有agent的历史收益
-            historical_returns = {}
+            # 过去window_m天的信号(从昨天开始，不包含今天)，价格一次批量读取
+            signal_times = [(current_date - timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")
+                            for i in range(1, self.window_m + 1)]
+            agent_returns = self.ledger.signal_returns(
+                self.ledger.agent_names(), signal_times, "lookback",
+                accept=lambda signal: signal.action in ['buy', 'sell'])
             
-            # 遍历所有agent目录
-            reports_dir = self.workspace_dir / "reports"
-            if reports_dir.exists():
-                for agent_dir in reports_dir.iterdir():
-                    if agent_dir.is_dir() and agent_dir.name.startswith('agent_'):
-                        agent_name = agent_dir.name
-                        returns = []
-                        
-                        # 获取过去window_m天的信号
-                        for i in range(1, self.window_m + 1):
-                            check_date = current_date - timedelta(days=i)
-                            check_time = check_date.strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # 加载信号数据
-                            signal_file = agent_dir / f"{check_time.replace(' ', '_')}.json"
-                            if signal_file.exists():
-                                try:
-                                    with open(signal_file, 'r', encoding='utf-8') as f:
-                                        signal_data = json.load(f)
-                                    
-                                    # 解析信号
-                                    parsed_signal = self.data_converter._parse_final_result(signal_data.get('final_result', ''))
-                                    if parsed_signal and parsed_signal.get('action') in ['buy', 'sell']:
-                                        # 计算收益率
-                                        return_value = self._calculate_signal_return(
-                                            parsed_signal, check_time, market_manager
-                                        )
-                                        if return_value is not None:
-                                            returns.append(return_value)
-                                except Exception as e:
-                                    print(f"计算历史收益失败 {agent_name} {check_time}: {e}")
-                        
-                        # 计算平均收益率
-                        if returns:
-                            historical_returns[agent_name] = np.mean(returns)
-                        else:
-                            historical_returns[agent_name] = None
+            # 计算平均收益率
+            historical_returns = {}
+            for agent_name, signal_returns in agent_returns.items():
+                returns = [value for _, value in signal_returns if value is not None]
+                historical_returns[agent_name] = float(np.mean(returns)) if returns else None
             
             return historical_returns if historical_returns else None
             
@@ -586,113 +485,6 @@ Format Instructions:
             print(f"历史收益计算失败: {e}")
             return None
     
-    def _calculate_signal_return(self, signal_data: Dict, signal_time: str, market_manager) -> Optional[float]:
-        """
-        计算信号的过去五个交易日收益率（基于开盘价）
-        
-        对于buy信号：计算过去5个交易日的正向收益率
-        对于sell信号：计算过去5个交易日的反向收益率（股价下跌对应正收益）
-        
-        Args:
-            signal_data: 信号数据
-            signal_time: 信号时间  
-            market_manager: 市场管理器
-            
-        Returns:
-            float: 过去五个交易日的累计收益率，None表示无法计算
-        """
-        try:
-            action = signal_data.get('action', '')
-            symbol_code = signal_data.get('symbol_code', '')
-            
-            if not action or not symbol_code:
-                print(f"信号数据不完整: action={action}, symbol_code={symbol_code}")
-                return None
-            
-            print(f"计算{symbol_code}的5日收益率，信号时间: {signal_time}, 操作: {action}")
-            
-            # 获取过去5个交易日的价格数据（需要6个点：T-5到T0）
-            open_prices = []
-            for i in range(6):  # 需要6个数据点来计算5个交易日的收益率
-                try:
-                    price_data = market_manager.get_symbol_price("CN-Stock", symbol_code, signal_time, -i)
-                    if not price_data:
-                        print(f"  T-{i}: 无法获取价格数据")
-                        break
-                    
-                    open_price = price_data.get('open')
-                    trade_date = price_data.get('trade_date', f'Day-{i}')
-                    if open_price is not None and open_price > 0:
-                        open_prices.append(open_price)
-                        print(f"  T-{i}: {trade_date} 开盘价 {open_price:.2f}")
-                    else:
-                        print(f"  T-{i}: 开盘价无效 {open_price}")
-                        break
-                except Exception as e:
-                    print(f"  T-{i}: 获取价格异常 {e}")
-                    break
-            
-            # 需要至少6个价格点来计算5个交易日收益率
-            if len(open_prices) < 6:
-                print(f"数据不足，仅获取到{len(open_prices)}个价格点，需要6个")
-                # 如果数据不足，尝试计算可用天数的收益率
-                if len(open_prices) >= 2:
-                    print(f"使用{len(open_prices)-1}个交易日计算收益率")
-                    start_price = open_prices[-1]  # 最早的开盘价
-                    end_price = open_prices[0]     # 当前日的开盘价
-                    
-                    # 计算基础收益率
-                    base_return = (end_price - start_price) / start_price
-                    print(f"  基础收益率: ({end_price:.2f} - {start_price:.2f}) / {start_price:.2f} = {base_return:.4f}")
-                    
-                    # 根据action调整收益率
-                    if action.lower() == 'buy':
-                        # buy信号：股价上涨为正收益
-                        final_return = base_return
-                        print(f"  买入信号，保持收益率: {final_return:.4f}")
-                    elif action.lower() == 'sell':
-                        # sell信号：股价下跌为正收益，所以取负值
-                        final_return = -base_return
-                        print(f"  卖出信号，收益率取反: {final_return:.4f}")
-                    else:
-                        print(f"  未知操作类型: {action}")
-                        return None
-                    
-                    # 限制收益率在合理范围内
-                    return max(-1.0, min(1.0, final_return))
-                else:
-                    return None
-            
-            # 计算完整5个交易日的累计收益率
-            start_price = open_prices[5]  # 5个交易日前的开盘价
-            end_price = open_prices[0]    # 当前日的开盘价
-            
-            # 计算基础收益率
-            base_return = (end_price - start_price) / start_price
-            print(f"  完整5日收益率: ({end_price:.2f} - {start_price:.2f}) / {start_price:.2f} = {base_return:.4f}")
-            
-            # 根据action调整收益率
-            if action.lower() == 'buy':
-                # buy信号：股价上涨为正收益
-                final_return = base_return
-                print(f"  买入信号，保持收益率: {final_return:.4f}")
-            elif action.lower() == 'sell':
-                # sell信号：股价下跌为正收益，所以取负值
-                final_return = -base_return
-                print(f"  卖出信号，收益率取反: {final_return:.4f}")
-            else:
-                print(f"  未知操作类型: {action}")
-                return None
-            
-            # 限制收益率在合理范围内（5日累计收益率限制在±100%）
-            final_return = max(-1.0, min(1.0, final_return))
-            
-            return final_return
-            
-        except Exception as e:
-            print(f"计算信号过去5个交易日收益率失败: {e}")
-            return None
-    
     def calculate_expected_sharpe_ratios(self, trigger_time: str, window_n: int = 3) -> Optional[Dict[str, float]]:
         """
         计算预期夏普比率
@@ -705,64 +497,21 @@ Format Instructions:
             Dict[signal_name, sharpe_ratio]: 预期夏普比率字典，None表示数据不足
         """
         try:
-            from utils.market_manager import MarketManager, MarketManagerConfig
-            
-            # 初始化市场管理器
-            market_config = MarketManagerConfig.from_config_file()
-            market_manager = MarketManager(market_config)
-            
             # 解析当前时间
             current_date = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
             
-            # 获取所有agent的预期夏普比率
-            expected_sharpe_ratios = {}
+            # 未来window_n天的信号（只考虑buy信号），价格一次批量读取
+            signal_times = [(current_date + timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")
+                            for i in range(window_n)]
+            agent_returns = self.ledger.signal_returns(
+                self.ledger.agent_names(), signal_times, "lookback",
+                accept=lambda signal: signal.action == 'buy')
             
-            # 遍历所有agent目录
-            reports_dir = self.workspace_dir / "reports"
-            if reports_dir.exists():
-                for agent_dir in reports_dir.iterdir():
-                    if agent_dir.is_dir() and agent_dir.name.startswith('agent_'):
-                        agent_name = agent_dir.name
-                        daily_returns = []
-                        
-                        # 获取未来window_n天的信号（只考虑buy信号）
-                        for i in range(window_n):
-                            future_date = current_date + timedelta(days=i)
-                            future_time = future_date.strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # 加载信号数据
-                            signal_file = agent_dir / f"{future_time.replace(' ', '_')}.json"
-                            if signal_file.exists():
-                                try:
-                                    with open(signal_file, 'r', encoding='utf-8') as f:
-                                        signal_data = json.load(f)
-                                    
-                                    # 解析信号
-                                    parsed_signal = self.data_converter._parse_final_result(signal_data.get('final_result', ''))
-                                    if parsed_signal and parsed_signal.get('action') == 'buy':
-                                        # 计算收益率
-                                        return_value = self._calculate_signal_return(
-                                            parsed_signal, future_time, market_manager
-                                        )
-                                        if return_value is not None:
-                                            daily_returns.append(return_value)
-                                except Exception as e:
-                                    print(f"计算预期夏普失败 {agent_name} {future_time}: {e}")
-                        
-                        # 计算夏普比率
-                        if len(daily_returns) > 1:
-                            mean_return = np.mean(daily_returns)
-                            std_return = np.std(daily_returns)
-                            if std_return > 0:
-                                # 年化夏普比率（假设252个交易日）
-                                sharpe_ratio = (mean_return / std_return) * np.sqrt(252)
-                                expected_sharpe_ratios[agent_name] = sharpe_ratio
-                            else:
-                                expected_sharpe_ratios[agent_name] = 0.0
-                        elif len(daily_returns) == 1:
-                            expected_sharpe_ratios[agent_name] = 0.0
-                        else:
-                            expected_sharpe_ratios[agent_name] = 0.0  # 改为0.0而不是None
+            # 年化夏普比率（假设252个交易日），少于2个收益时为0.0
+            expected_sharpe_ratios = {}
+            for agent_name, signal_returns in agent_returns.items():
+                daily_returns = [value for _, value in signal_returns if value is not None]
+                expected_sharpe_ratios[agent_name] = sharpe_ratio(daily_returns)
             
             return expected_sharpe_ratios if expected_sharpe_ratios else None
             
@@ -805,40 +554,20 @@ Format Instructions:
         # 构建prompt
         prompt = self.build_scoring_prompt(converted_signals, historical_returns)
         
-        # 并发调用多个judger
-        all_scores = {}
-        all_responses = {}
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_judgers) as executor:
-            # 提交所有judger任务
-            future_to_judger = {}
-            for judger_id in range(self.num_judgers):
-                future = executor.submit(self._score_with_single_judger, judger_id, prompt)
-                future_to_judger[future] = judger_id
-            
-            # 收集结果
-            for future in concurrent.futures.as_completed(future_to_judger):
-                judger_id = future_to_judger[future]
-                try:
-                    response, scores = future.result()
-                    judger_name = f"judger_{judger_id}"
-                    all_scores[judger_name] = scores
-                    all_responses[judger_name] = response
-                    print(f"  judger_{judger_id} 完成评分，解析了 {len(scores)} 个信号")
-                except Exception as exc:
-                    print(f"  judger_{judger_id} 评分失败: {exc}")
-                    judger_name = f"judger_{judger_id}"
-                    all_scores[judger_name] = {}
-                    all_responses[judger_name] = f"评分失败: {exc}"
+        # 异步并发调用多个judger，达成quorum后取消其余judger
+        with usage_tags(trigger_time=trigger_time):
+            all_scores, all_responses = await fan_out_judgers(
+                lambda judger_id: self._score_with_single_judger(judger_id, prompt),
+                self.num_judgers, quorum=self.judger_quorum, tolerance=self.judger_quorum_tolerance)
         
         # 保存结果
         self._save_judge_results(trigger_time, all_scores, all_responses)
         
         return all_scores, all_responses
     
-    def _score_with_single_judger(self, judger_id: int, prompt: str) -> Tuple[str, Dict]:
+    async def _score_with_single_judger(self, judger_id: int, prompt: str) -> Tuple[str, Dict]:
         """单个judger评分的辅助方法"""
-        response = self.call_llm_for_scoring(prompt, judger_id)
+        response = await self.call_llm_for_scoring(prompt, judger_id)
         scores = self.parse_llm_scores(response)
         return response, scores
     
@@ -2,9 +2,9 @@
 数据格式转换器
 """
 import json
-import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Optional
+from contest.signal_parser import Signal, parse_final_result
 
 class DataFormatConverter:
     """数据格式转换器，将新格式数据转换为评分系统所需格式"""
@@ -115,89 +115,9 @@ class DataFormatConverter:
     def _parse_final_result(self, final_result: str) -> Optional[Dict]:
         """解析final_result字符串，提取结构化数据"""
         try:
-            # 移除<Output>标签
-            if '<Output>' in final_result:
-                final_result = final_result.split('<Output>')[-1].strip()
-            
-            # 提取各个字段
-            has_opportunity = self._extract_field(final_result, 'has_opportunity')
-            action = self._extract_field(final_result, 'action')
-            symbol_code = self._extract_field(final_result, 'symbol_code')
-            symbol_name = self._extract_field(final_result, 'symbol_name')
-            probability = self._extract_field(final_result, 'probability')
-            
-            # 提取evidence_list
-            evidence_list = self._extract_evidence_list(final_result)
-            
-            # 提取limitations
-            limitations = self._extract_limitations(final_result)
-            
-            return {
-                'has_opportunity': has_opportunity,
-                'action': action,
-                'symbol_code': symbol_code,
-                'symbol_name': symbol_name,
-                'evidence_list': evidence_list,
-                'limitations': limitations,
-                'probability': probability
-            }
+            parsed_signal = parse_final_result(final_result)
+            return parsed_signal.to_dict() if parsed_signal else Signal().to_dict()
         except Exception as e:
             print(f"解析final_result失败: {e}")
             return None
-    
-    def _extract_field(self, text: str, field_name: str) -> str:
-        """提取单个字段"""
-        pattern = f"<{field_name}>(.*?)</{field_name}>"
-        match = re.search(pattern, text, flags=re.DOTALL)
-        return match.group(1).strip() if match else ''
-    
-    def _extract_evidence_list(self, text: str) -> List[Dict]:
-        """提取evidence_list"""
-        evidence_list = []
-        
-        # 提取整个evidence_list内容
-        evidence_list_match = re.search(r"<evidence_list>(.*?)</evidence_list>", text, flags=re.DOTALL)
-        if not evidence_list_match:
-            return evidence_list
-        
-        evidence_list_content = evidence_list_match.group(1)
-        
-        # 分割每个evidence块
-        evidence_blocks = re.split(r"<evidence>", evidence_list_content)
-        
-        for block in evidence_blocks:
-            if '</evidence>' in block:
-                evidence_parts = block.split('</evidence>')
-                if len(evidence_parts) >= 1:
-                    evidence_content = evidence_parts[0].strip()
-                    
-                    # 提取time和from_source
-                    time_match = re.search(r"<time>(.*?)</time>", evidence_parts[0] if len(evidence_parts) > 1 else block, flags=re.DOTALL)
-                    source_match = re.search(r"<from_source>(.*?)</from_source>", evidence_parts[0] if len(evidence_parts) > 1 else block, flags=re.DOTALL)
-                    
-                    evidence_list.append({
-                        'description': evidence_content,
-                        'time': time_match.group(1).strip() if time_match else '',
-                        'from_source': source_match.group(1).strip() if source_match else ''
-                    })
-        
-        return evidence_list
-    
-    def _extract_limitations(self, text: str) -> List[str]:
-        """提取limitations"""
-        limitations = []
-        
-        # 提取整个limitations内容
-        limitations_match = re.search(r"<limitations>(.*?)</limitations>", text, flags=re.DOTALL)
-        if not limitations_match:
-            return limitations
-        
-        limitations_content = limitations_match.group(1)
-        
-        # 提取每个limitation
-        limitation_matches = re.findall(r"<limitation>(.*?)</limitation>", limitations_content, flags=re.DOTALL)
-        for limitation in limitation_matches:
-            limitations.append(limitation.strip())
-        
-        return limitations
 
@@ -137,9 +137,8 @@ def get_signal_details(trigger_time: str, workspace_dir: str, signal_names: List
     signal_details = {}
     
     try:
-        import json
-        import re
         from pathlib import Path
+        from contest.signal_parser import load_report_signal
         
         workspace_path = Path(workspace_dir)
         reports_dir = workspace_path / "agents_workspace" / "reports"
@@ -151,21 +150,12 @@ def get_signal_details(trigger_time: str, workspace_dir: str, signal_names: List
             try:
                 report_file = reports_dir / signal_name / f"{timestamp}.json"
                 if report_file.exists():
-                    with open(report_file, 'r', encoding='utf-8') as f:
-                        report_data = json.load(f)
-                        final_result = report_data.get('final_result', '')
-                        
-                        # 解析symbol_name和action
-                        symbol_name_match = re.search(r'<symbol_name>(.*?)</symbol_name>', final_result, re.DOTALL)
-                        action_match = re.search(r'<action>(.*?)</action>', final_result, re.DOTALL)
-                        
-                        symbol_name = symbol_name_match.group(1).strip() if symbol_name_match else 'N/A'
-                        action = action_match.group(1).strip() if action_match else 'N/A'
-                        
-                        signal_details[signal_name] = {
-                            'symbol_name': symbol_name,
-                            'action': action
-                        }
+                    # 读取symbol_name和action
+                    parsed_signal = load_report_signal(report_file)
+                    signal_details[signal_name] = {
+                        'symbol_name': (parsed_signal and parsed_signal.symbol_name) or 'N/A',
+                        'action': (parsed_signal and parsed_signal.action) or 'N/A'
+                    }
                         
             except Exception as e:
                 signal_details[signal_name] = {'symbol_name': 'N/A', 'action': 'N/A'}
@@ -0,0 +1,122 @@
+"""
+Judger Fan-out: 多个judger的异步并发评分
+
+1. 每个judger是事件循环上的一个task，共用模型的 AsyncOpenAI 连接池(流式读取，带首token/空闲/总超时)
+2. 提前达成quorum: 已成功的judger中存在任意k个judger，给出相同的信号集合且每个信号的分差不超过tolerance时，
+   取消其余仍在运行的judger(取消时底层HTTP流会被关闭)。其余已完成judger的评分不一致也不影响，
+   评分阶段耗时最快为第k快的judger而不是最慢的
+3. 找不到这样的k个judger时继续等待，直到全部judger完成，结果与不使用quorum时相同
+
+可选配置 researcher_contest_config: judger_quorum(0表示等待全部judger) / judger_quorum_tolerance
+"""
+import asyncio
+import itertools
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from config.config import cfg
+from models.llm_model import LLMModel, LLMModelConfig, GLOBAL_LLM, GLOBAL_THINKING_LLM, _optional_model_settings
+
+CANCELLED_RESPONSE = "已取消: 其他judger已达成一致"
+
+_judger_llms: Dict[str, LLMModel] = {"llm": GLOBAL_LLM, "llm_thinking": GLOBAL_THINKING_LLM}
+_judger_llms_lock = threading.Lock()
+
+
+def get_judger_llm(config_name: str) -> LLMModel:
+    """按配置名返回judger使用的模型，同一配置的所有judger共享一个模型(及其连接池)"""
+    with _judger_llms_lock:
+        llm = _judger_llms.get(config_name)
+        if llm is None:
+            model_cfg = getattr(cfg, config_name)
+            llm = LLMModel(LLMModelConfig(
+                model_name=model_cfg["model_name"],
+                api_key=model_cfg["api_key"],
+                base_url=model_cfg["base_url"],
+                **_optional_model_settings(model_cfg)
+            ))
+            _judger_llms[config_name] = llm
+        return llm
+
+
+def scores_consistent(score_sets: List[Dict[str, Dict]], tolerance: float) -> bool:
+    """所有judger都给出了相同的信号集合，且每个信号的最高分与最低分之差不超过tolerance"""
+    if not score_sets or not all(score_sets):
+        return False
+    signal_names = set(score_sets[0])
+    if any(set(scores) != signal_names for scores in score_sets[1:]):
+        return False
+    for signal_name in signal_names:
+        values = [scores[signal_name]['score'] for scores in score_sets]
+        if max(values) - min(values) > tolerance:
+            return False
+    return True
+
+
+def find_consistent_subset(score_sets: List[Dict[str, Dict]], k: int, tolerance: float) -> Optional[List[int]]:
+    """在score_sets中找任意k个评分一致的judger，返回其下标，找不到时返回None"""
+    # 只有信号集合相同的judger之间才可能一致
+    groups: Dict[frozenset, List[int]] = {}
+    for index, scores in enumerate(score_sets):
+        if scores:
+            groups.setdefault(frozenset(scores), []).append(index)
+    for indices in groups.values():
+        # judger数量很少(通常不超过10个)，直接枚举组合
+        for subset in itertools.combinations(indices, k):
+            if scores_consistent([score_sets[i] for i in subset], tolerance):
+                return list(subset)
+    return None
+
+
+async def fan_out_judgers(score_one: Callable[[int], Awaitable[Tuple[str, Dict]]], num_judgers: int,
+                          quorum: Optional[int] = None, tolerance: float = 10.0) -> Tuple[Dict, Dict]:
+    """
+    并发运行num_judgers个judger
+
+    Args:
+        score_one: 协程函数 judger_id -> (原始响应, 解析后的评分)
+        num_judgers: judger数量
+        quorum: 提前结束需要的一致judger数，None/0 或不小于num_judgers时等待全部judger
+        tolerance: 判断一致的最大分差
+
+    Returns:
+        tuple: (评分结果, 原始响应)，被取消的judger不出现在评分结果中，响应为 CANCELLED_RESPONSE
+    """
+    use_quorum = bool(quorum) and 0 < quorum < num_judgers
+    tasks = {asyncio.create_task(score_one(judger_id)): judger_id for judger_id in range(num_judgers)}
+    all_scores: Dict[str, Dict] = {}
+    all_responses: Dict[str, str] = {}
+    succeeded: List[Dict] = []
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                judger_name = f"judger_{tasks[task]}"
+                try:
+                    response, scores = task.result()
+                    all_scores[judger_name] = scores
+                    all_responses[judger_name] = response
+                    if scores:
+                        succeeded.append(scores)
+                    print(f"  {judger_name} 完成评分，解析了 {len(scores)} 个信号")
+                except Exception as exc:
+                    print(f"  {judger_name} 评分失败: {exc}")
+                    all_scores[judger_name] = {}
+                    all_responses[judger_name] = f"评分失败: {exc}"
+
+            if use_quorum and pending and len(succeeded) >= quorum \
+                    and find_consistent_subset(succeeded, quorum, tolerance) is not None:
+                print(f"  {len(succeeded)}/{num_judgers} 个judger已完成，其中 {quorum} 个评分一致，"
+                      f"取消其余 {len(pending)} 个judger")
+                break
+    finally:
+        # 正常提前结束或自身被取消时都要取消仍在运行的judger，并等待其关闭连接
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    for task in pending:
+        all_responses[f"judger_{tasks[task]}"] = CANCELLED_RESPONSE
+    return all_scores, all_responses
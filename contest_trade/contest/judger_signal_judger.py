@@ -4,9 +4,6 @@
 """
 import json
 import re
-import time
-import concurrent.futures
-import requests
 import numpy as np
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -14,6 +11,9 @@ from typing import Dict, List, Any, Optional, Tuple
 
 from config.config import cfg
 from .judger_data_converter import DataFormatConverter
+from .judger_fanout import fan_out_judgers, get_judger_llm
+from .return_engine import sharpe_ratio
+from .performance_ledger import get_performance_ledger
 
 class SignalJudger:
     """信号评分器 - 使用多个LLM对信号进行评分"""
@@ -28,14 +28,22 @@ class SignalJudger:
         self.num_judgers = self.contest_config.get('num_judgers', 5)
         self.judger_config_name = self.contest_config.get('judger_config', 'llm')
         
-        # 获取LLM配置
+        # 提前结束: judger_quorum个judger评分一致(分差不超过tolerance)时取消其余judger，0表示等待全部
+        self.judger_quorum = self.contest_config.get('judger_quorum', 0)
+        self.judger_quorum_tolerance = self.contest_config.get('judger_quorum_tolerance', 10)
+        
+        # 获取LLM配置，同一配置的所有judger共享一个异步客户端
         self.llm_config = getattr(cfg, self.judger_config_name)
+        self.llm = get_judger_llm(self.judger_config_name)
         
         # 创建输出目录
         self.judger_scores_dir.mkdir(parents=True, exist_ok=True)
         
         # 初始化数据转换器
         self.data_converter = DataFormatConverter(workspace_dir)
+        
+        # 历史信号表现账本(增量同步，只查询窗口内的信号)
+        self.ledger = get_performance_ledger(self.workspace_dir)
     
     def build_scoring_prompt(self, signals: Dict[str, Dict], historical_returns: Optional[Dict[str, float]] = None) -> str:
         """
@@ -140,60 +148,20 @@ Format Instructions:
 """
         return prompt
     
-    def call_llm_for_scoring(self, prompt: str, judger_id: int, max_retries: int = 3) -> str:
-        """调用LLM进行评分"""
-        headers = {
-            'Authorization': f'Bearer {self.llm_config["api_key"]}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            'model': self.llm_config["model_name"],
-            'messages': [{'role': 'user', 'content': prompt}],
-            'max_tokens': 10000,
-            'temperature': 0.1
-        }
-        
-        for attempt in range(max_retries + 1):
-            try:
-                print(f"    调用judger_{judger_id} ({self.llm_config['model_name']}) (尝试 {attempt + 1}/{max_retries + 1})...")
-                
-                response = requests.post(
-                    f"{self.llm_config['base_url']}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=180
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        choice = result['choices'][0]
-                        if 'message' in choice and 'content' in choice['message']:
-                            return choice['message']['content']
-                        else:
-                            print(f"    警告: judger_{judger_id} 响应格式异常")
-                            return f"错误: 无法解析响应内容"
-                    else:
-                        print(f"    错误: judger_{judger_id} API响应格式错误")
-                        return f"错误: API响应格式错误"
-                else:
-                    print(f"    错误: judger_{judger_id} HTTP {response.status_code}: {response.text}")
-                    if attempt < max_retries:
-                        time.sleep(2)
-                        continue
-                    else:
-                        return f"错误: HTTP {response.status_code}"
-                        
-            except Exception as e:
-                print(f"    错误: judger_{judger_id} 调用失败: {e}")
-                if attempt < max_retries:
-                    time.sleep(2)
-                    continue
-                else:
-                    return f"错误: {e}"
-        
-        return f"错误: 经过{max_retries + 1}次尝试后仍然失败"
+    async def call_llm_for_scoring(self, prompt: str, judger_id: int) -> str:
+        """调用LLM进行评分(共享异步客户端，流式读取，重试和限流由模型处理)"""
+        messages = [{'role': 'user', 'content': prompt}]
+        try:
+            print(f"    调用judger_{judger_id} ({self.llm.model_name})...")
+            result = await self.llm.a_run(messages, max_tokens=10000, temperature=0.1,
+                                          cache_variant=f"judger_{judger_id}")
+            if result and result.content:
+                return result.content
+            print(f"    警告: judger_{judger_id} 响应格式异常")
+            return f"错误: 无法解析响应内容"
+        except Exception as e:
+            print(f"    错误: judger_{judger_id} 调用失败: {e}")
+            return f"错误: {e}"
     
     def parse_llm_scores(self, content: str) -> Dict[str, Dict]:
         """解析LLM返回的评分结果"""
@@ -433,55 +401,21 @@ Your submission should should include following parts:
             Dict[signal_name, avg_return]: 历史平均收益率字典，None表示数据不足
         """
         try:
-            from utils.market_manager import MarketManager, MarketManagerConfig
-            
-            # 初始化市场管理器
-            market_config = MarketManagerConfig.from_config_file()
-            market_manager = MarketManager(market_config)
-            
             # 解析当前时间
             current_date = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
             
-            # 获取所有agent的历史收益
-            historical_returns = {}
+            # 过去window_m天的信号(从昨天开始，不包含今天)，价格一次批量读取
+            signal_times = [(current_date - timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")
+                            for i in range(1, self.window_m + 1)]
+            agent_returns = self.ledger.signal_returns(
+                self.ledger.agent_names(), signal_times, "lookback",
+                accept=lambda signal: signal.action in ['buy', 'sell'])
             
-            # 使用正确的路径访问reports目录
-            reports_dir = self.workspace_dir / "reports"
-            if reports_dir.exists():
-                for agent_dir in reports_dir.iterdir():
-                    if agent_dir.is_dir() and agent_dir.name.startswith('agent_'):
-                        agent_name = agent_dir.name
-                        returns = []
-                        
-                        # 获取过去window_m天的信号（从昨天开始，不包含今天）
-                        for i in range(1, self.window_m + 1):
-                            check_date = current_date - timedelta(days=i)
-                            check_time = check_date.strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # 加载信号数据
-                            signal_file = agent_dir / f"{check_time.replace(' ', '_')}.json"
-                            if signal_file.exists():
-                                try:
-                                    with open(signal_file, 'r', encoding='utf-8') as f:
-                                        signal_data = json.load(f)
-                                    
-                                    # 解析信号
-                                    parsed_signal = self.data_converter._parse_final_result(signal_data.get('final_result', ''))
-                                    if parsed_signal and parsed_signal.get('action') in ['buy', 'sell']:
-                                        # 计算收益率
-                                        return_value = self._calculate_signal_return(
-                                            parsed_signal, check_time, market_manager
-                                        )
-                                        if return_value is not None:
-                                            returns.append(return_value)
-                                except Exception as e:
-                                    print(f"计算历史收益失败 {agent_name} {check_time}: {e}")
-                        
-                        # 计算平均收益率
-                        if returns:
-                            historical_returns[agent_name] = np.mean(returns)
-                        else:
-                            historical_returns[agent_name] = 0.0  # 改为0.0而不是None
+            # 计算平均收益率
+            historical_returns = {}
+            for agent_name, signal_returns in agent_returns.items():
+                returns = [value for _, value in signal_returns if value is not None]
+                historical_returns[agent_name] = float(np.mean(returns)) if returns else 0.0
             
             return historical_returns if historical_returns else None
             
@@ -489,95 +423,6 @@ Your submission should should include following parts:
             print(f"历史收益计算失败: {e}")
             return None
     
-    def _calculate_signal_return(self, signal_data: Dict, signal_time: str, market_manager) -> Optional[float]:
-        """
-        计算信号的过去五个交易日收益率（基于开盘价）
-        
-        对于buy信号：计算过去5个交易日的正向收益率
-        对于sell信号：计算过去5个交易日的反向收益率（股价下跌对应正收益）
-        
-        Args:
-            signal_data: 信号数据
-            signal_time: 信号时间  
-            market_manager: 市场管理器
-            
-        Returns:
-            float: 过去五个交易日的累计收益率，None表示无法计算
-        """
-        try:
-            action = signal_data.get('action', '')
-            symbol_code = signal_data.get('symbol_code', '')
-            
-            if not action or not symbol_code:
-                return None
-            
-            # 获取过去5个交易日的价格数据（需要6个点：T-5到T0）
-            open_prices = []
-            for i in range(6):  # 需要6个数据点来计算5个交易日的收益率
-                try:
-                    price_data = market_manager.get_symbol_price("CN-Stock", symbol_code, signal_time, -i)
-                    if not price_data:
-                        break
-                    
-                    open_price = price_data.get('open')
-                    if open_price is not None and open_price > 0:
-                        open_prices.append(open_price)
-                    else:
-                        break
-                except:
-                    break
-            
-            # 需要至少6个价格点来计算5个交易日收益率
-            if len(open_prices) < 6:
-                # 如果数据不足，尝试计算可用天数的收益率
-                if len(open_prices) >= 2:
-                    start_price = open_prices[-1]  # 最早的开盘价
-                    end_price = open_prices[0]     # 当前日的开盘价
-                    
-                    # 计算基础收益率
-                    base_return = (end_price - start_price) / start_price
-                    
-                    # 根据action调整收益率
-                    if action.lower() == 'buy':
-                        # buy信号：股价上涨为正收益
-                        final_return = base_return
-                    elif action.lower() == 'sell':
-                        # sell信号：股价下跌为正收益，所以取负值
-                        final_return = -base_return
-                    else:
-                        return None
-                    
-                    # 限制收益率在合理范围内
-                    return max(-1.0, min(1.0, final_return))
-                else:
-                    return None
-            
-            # 计算完整5个交易日的累计收益率
-            start_price = open_prices[5]  # 5个交易日前的开盘价
-            end_price = open_prices[0]    # 当前日的开盘价
-            
-            # 计算基础收益率
-            base_return = (end_price - start_price) / start_price
-            
-            # 根据action调整收益率
-            if action.lower() == 'buy':
-                # buy信号：股价上涨为正收益
-                final_return = base_return
-            elif action.lower() == 'sell':
-                # sell信号：股价下跌为正收益，所以取负值
-                final_return = -base_return
-            else:
-                return None
-            
-            # 限制收益率在合理范围内（5日累计收益率限制在±100%）
-            final_return = max(-1.0, min(1.0, final_return))
-            
-            return final_return
-            
-        except Exception as e:
-            print(f"计算信号过去5个交易日收益率失败: {e}")
-            return None
-    
     def calculate_expected_sharpe_ratios(self, trigger_time: str, window_n: int = 3) -> Optional[Dict[str, float]]:
         """
         计算预期夏普比率
@@ -590,63 +435,21 @@ Your submission should should include following parts:
             Dict[signal_name, sharpe_ratio]: 预期夏普比率字典，None表示数据不足
         """
         try:
-            from utils.market_manager import MarketManager, MarketManagerConfig
-            
-            # 初始化市场管理器
-            market_config = MarketManagerConfig.from_config_file()
-            market_manager = MarketManager(market_config)
-            
             # 解析当前时间
             current_date = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
             
-            # 获取所有agent的预期夏普比率
-            expected_sharpe_ratios = {}
+            # 未来window_n天的信号（只考虑buy信号），价格一次批量读取
+            signal_times = [(current_date + timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S")
+                            for i in range(window_n)]
+            agent_returns = self.ledger.signal_returns(
+                self.ledger.agent_names(), signal_times, "lookback",
+                accept=lambda signal: signal.action == 'buy')
             
-            # 遍历所有agent目录
-            if self.data_converter.reports_dir.exists():
-                for agent_dir in self.data_converter.reports_dir.iterdir():
-                    if agent_dir.is_dir() and agent_dir.name.startswith('agent_'):
-                        agent_name = agent_dir.name
-                        daily_returns = []
-                        
-                        # 获取未来window_n天的信号（只考虑buy信号）
-                        for i in range(window_n):
-                            future_date = current_date + timedelta(days=i)
-                            future_time = future_date.strftime("%Y-%m-%d %H:%M:%S")
-                            
-                            # 加载信号数据
-                            signal_file = agent_dir / f"{future_time.replace(' ', '_')}.json"
-                            if signal_file.exists():
-                                try:
-                                    with open(signal_file, 'r', encoding='utf-8') as f:
-                                        signal_data = json.load(f)
-                                    
-                                    # 解析信号
-                                    parsed_signal = self.data_converter._parse_final_result(signal_data.get('final_result', ''))
-                                    if parsed_signal and parsed_signal.get('action') == 'buy':
-                                        # 计算收益率
-                                        return_value = self._calculate_signal_return(
-                                            parsed_signal, future_time, market_manager
-                                        )
-                                        if return_value is not None:
-                                            daily_returns.append(return_value)
-                                except Exception as e:
-                                    print(f"计算预期夏普失败 {agent_name} {future_time}: {e}")
-                        
-                        # 计算夏普比率
-                        if len(daily_returns) > 1:
-                            mean_return = np.mean(daily_returns)
-                            std_return = np.std(daily_returns)
-                            if std_return > 0:
-                                # 年化夏普比率（假设252个交易日）
-                                sharpe_ratio = (mean_return / std_return) * np.sqrt(252)
-                                expected_sharpe_ratios[agent_name] = sharpe_ratio
-                            else:
-                                expected_sharpe_ratios[agent_name] = 0.0
-                        elif len(daily_returns) == 1:
-                            expected_sharpe_ratios[agent_name] = 0.0
-                        else:
-                            expected_sharpe_ratios[agent_name] = 0.0  # 改为0.0而不是None
+            # 年化夏普比率（假设252个交易日），少于2个收益时为0.0
+            expected_sharpe_ratios = {}
+            for agent_name, signal_returns in agent_returns.items():
+                daily_returns = [value for _, value in signal_returns if value is not None]
+                expected_sharpe_ratios[agent_name] = sharpe_ratio(daily_returns)
             
             return expected_sharpe_ratios if expected_sharpe_ratios else None
             
@@ -689,40 +492,19 @@ Your submission should should include following parts:
         # 构建prompt
         prompt = self.build_scoring_prompt(converted_signals, historical_returns)
         
-        # 并发调用多个judger
-        all_scores = {}
-        all_responses = {}
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_judgers) as executor:
-            # 提交所有judger任务
-            future_to_judger = {}
-            for judger_id in range(self.num_judgers):
-                future = executor.submit(self._score_with_single_judger, judger_id, prompt)
-                future_to_judger[future] = judger_id
-            
-            # 收集结果
-            for future in concurrent.futures.as_completed(future_to_judger):
-                judger_id = future_to_judger[future]
-                try:
-                    response, scores = future.result()
-                    judger_name = f"judger_{judger_id}"
-                    all_scores[judger_name] = scores
-                    all_responses[judger_name] = response
-                    print(f"  judger_{judger_id} 完成评分，解析了 {len(scores)} 个信号")
-                except Exception as exc:
-                    print(f"  judger_{judger_id} 评分失败: {exc}")
-                    judger_name = f"judger_{judger_id}"
-                    all_scores[judger_name] = {}
-                    all_responses[judger_name] = f"评分失败: {exc}"
+        # 异步并发调用多个judger，达成quorum后取消其余judger
+        all_scores, all_responses = await fan_out_judgers(
+            lambda judger_id: self._score_with_single_judger(judger_id, prompt),
+            self.num_judgers, quorum=self.judger_quorum, tolerance=self.judger_quorum_tolerance)
         
         # 保存结果
         self._save_judge_results(trigger_time, all_scores, all_responses)
         
         return all_scores, all_responses
     
-    def _score_with_single_judger(self, judger_id: int, prompt: str) -> Tuple[str, Dict]:
+    async def _score_with_single_judger(self, judger_id: int, prompt: str) -> Tuple[str, Dict]:
         """单个judger评分的辅助方法"""
-        response = self.call_llm_for_scoring(prompt, judger_id)
+        response = await self.call_llm_for_scoring(prompt, judger_id)
         scores = self.parse_llm_scores(response)
         return response, scores
     
@@ -4,9 +4,10 @@
 import json
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional
-import re
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from contest.return_engine import cumulative_return, max_drawdown
+from contest.performance_ledger import get_performance_ledger
 
 class WeightOptimizer:
     """权重优化器 - 基于共识评分和过去5天收益率的综合评分调整权重"""
@@ -16,6 +17,8 @@ class WeightOptimizer:
         self.judger_scores_dir = self.workspace_dir / "judger_scores"
         self.final_result_dir = self.workspace_dir / "final_result"
         self.reports_dir = self.workspace_dir / "reports"
+        # 历史信号表现账本(增量同步，只查询窗口内的信号)
+        self.ledger = get_performance_ledger(self.workspace_dir)
         
         # 创建输出目录
         self.final_result_dir.mkdir(parents=True, exist_ok=True)
@@ -43,157 +46,57 @@ class WeightOptimizer:
         
         return consensus_scores
     
-    def get_signal_historical_returns(self, signal_name: str, trigger_time: str) -> Optional[float]:
+    def get_historical_returns(self, signal_names: List[str], trigger_time: str) -> Dict[str, Optional[float]]:
         """
-        获取某个agent过去5天信号执行的累计收益率
+        批量获取多个agent过去5天信号执行的累计收益率(价格一次批量读取)
+        
+        每个有机会的信号在信号日开盘建仓、次日开盘平仓，逐日复利累计
         
         Args:
-            signal_name: 信号名称 (如 agent_1, agent_2)
+            signal_names: 信号名称列表 (如 agent_1, agent_2)
             trigger_time: 触发时间
             
         Returns:
-            float: 过去5天信号执行的累计收益率，如果无法获取则返回None
+            Dict[signal_name, total_return]: 无有效信号数据的agent为None
         """
+        trigger_dt = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
+        # 过去5天，从-1天到-5天
+        signal_times = [(trigger_dt - timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S") for i in range(1, 6)]
+        
+        def accept(signal) -> bool:
+            return None not in (signal.symbol_code, signal.action, signal.has_opportunity) and signal.is_opportunity
+        
         try:
-            from datetime import datetime, timedelta
-            import sys
-            from pathlib import Path
-            
-            # 添加trade_agent目录到sys.path
-            trade_agent_path = Path(__file__).parent.parent
-            if str(trade_agent_path) not in sys.path:
-                sys.path.insert(0, str(trade_agent_path))
-            
-            from utils.market_manager import GLOBAL_MARKET_MANAGER
-            
-            # 解析触发时间
-            trigger_dt = datetime.strptime(trigger_time, "%Y-%m-%d %H:%M:%S")
-            
-            print(f"   📊 计算{signal_name}过去5天信号执行收益率...")
-            
-            # 获取过去5个交易日的信号数据
-            daily_returns = []
-            cumulative_return = 1.0  # 初始资金为1
-            
-            for i in range(1, 6):  # 过去5天，从-1天到-5天
-                # 计算历史日期
-                past_date = trigger_dt - timedelta(days=i)
-                past_date_str = past_date.strftime("%Y-%m-%d %H:%M:%S")
-                past_timestamp = past_date_str.replace(' ', '_')
-                
-                # 读取该日期的信号报告
-                report_file = self.reports_dir / signal_name / f"{past_timestamp}.json"
-                
-                if not report_file.exists():
-                    print(f"     ⚠️  缺少{past_date.strftime('%Y-%m-%d')}的信号数据")
-                    continue
-                
-                try:
-                    with open(report_file, 'r', encoding='utf-8') as f:
-                        report_data = json.load(f)
-                        final_result = report_data.get('final_result', '')
-                        
-                        # 解析symbol_code和action
-                        symbol_code_match = re.search(r'<symbol_code>(.*?)</symbol_code>', final_result, re.DOTALL)
-                        action_match = re.search(r'<action>(.*?)</action>', final_result, re.DOTALL)
-                        has_opportunity_match = re.search(r'<has_opportunity>(.*?)</has_opportunity>', final_result, re.DOTALL)
-                        
-                        if not symbol_code_match or not action_match or not has_opportunity_match:
-                            print(f"     ⚠️  {past_date.strftime('%Y-%m-%d')}信号格式错误")
-                            continue
-                        
-                        has_opportunity = has_opportunity_match.group(1).strip().lower()
-                        if has_opportunity != 'yes':
-                            print(f"     📊 {past_date.strftime('%Y-%m-%d')}: 无机会信号，跳过")
-                            continue
-                        
-                        symbol_code = symbol_code_match.group(1).strip()
-                        action = action_match.group(1).strip()
-                        
-                        # 计算该信号的单日收益率
-                        daily_return = self._calculate_signal_daily_return(
-                            symbol_code, action, past_date_str, trigger_dt
-                        )
-                        
-                        if daily_return is not None:
-                            daily_returns.append(daily_return)
-                            cumulative_return *= (1 + daily_return)
-                            print(f"     📊 {past_date.strftime('%Y-%m-%d')}: {symbol_code} {action} -> {daily_return:.2%}")
-                        
-                except Exception as e:
-                    print(f"     ❌ 解析{past_date.strftime('%Y-%m-%d')}信号失败: {e}")
-                    continue
-            
+            agent_returns = self.ledger.signal_returns(signal_names, signal_times, "next_day", accept)
+        except Exception as e:
+            print(f"获取历史收益率失败: {e}")
+            return {signal_name: None for signal_name in signal_names}
+        
+        historical_returns = {}
+        for signal_name in signal_names:
+            daily_returns = [value for _, value in agent_returns.get(signal_name, []) if value is not None]
             if not daily_returns:
                 print(f"   ⚠️  {signal_name}过去5天无有效信号数据")
-                return None
-            
-            # 计算5天累计收益率
-            total_return = cumulative_return - 1.0
-            print(f"   📊 {signal_name}过去{len(daily_returns)}天累计收益率: {total_return:.2%}")
-            
-            return total_return
-                
-        except Exception as e:
-            print(f"获取{signal_name}历史收益率失败: {e}")
-            return None
+                historical_returns[signal_name] = None
+                continue
+            total_return = cumulative_return(daily_returns)
+            print(f"   📊 {signal_name}过去{len(daily_returns)}天累计收益率: {total_return:.2%}, "
+                  f"最大回撤: {max_drawdown(daily_returns):.2%}")
+            historical_returns[signal_name] = total_return
+        return historical_returns
     
-    def _calculate_signal_daily_return(self, symbol_code: str, action: str, 
-                                     signal_time: str, current_time: datetime) -> Optional[float]:
+    def get_signal_historical_returns(self, signal_name: str, trigger_time: str) -> Optional[float]:
         """
-        计算单个信号的日收益率（持有一天）
+        获取某个agent过去5天信号执行的累计收益率
         
         Args:
-            symbol_code: 股票代码
-            action: 操作类型 (buy/sell)
-            signal_time: 信号时间
-            current_time: 当前时间（用于计算持有期）
+            signal_name: 信号名称 (如 agent_1, agent_2)
+            trigger_time: 触发时间
             
         Returns:
-            float: 该信号的日收益率
+            float: 过去5天信号执行的累计收益率，如果无法获取则返回None
         """
-        try:
-            from datetime import datetime, timedelta
-            import sys
-            from pathlib import Path
-            
-            # 添加trade_agent目录到sys.path
-            trade_agent_path = Path(__file__).parent.parent
-            if str(trade_agent_path) not in sys.path:
-                sys.path.insert(0, str(trade_agent_path))
-            
-            from utils.market_manager import GLOBAL_MARKET_MANAGER
-            
-            # 解析信号日期
-            signal_dt = datetime.strptime(signal_time, "%Y-%m-%d %H:%M:%S")
-            
-            # 获取信号日开盘价（买入/卖出价格）
-            entry_price_data = GLOBAL_MARKET_MANAGER.get_symbol_price("CN-Stock", symbol_code, signal_time, 0)
-            if not entry_price_data or 'open' not in entry_price_data:
-                return None
-            entry_price = float(entry_price_data['open'])
-            
-            # 获取次日开盘价（平仓价格）
-            next_day = signal_dt + timedelta(days=1)
-            next_day_str = next_day.strftime("%Y-%m-%d %H:%M:%S")
-            exit_price_data = GLOBAL_MARKET_MANAGER.get_symbol_price("CN-Stock", symbol_code, next_day_str, 0)
-            if not exit_price_data or 'open' not in exit_price_data:
-                return None
-            exit_price = float(exit_price_data['open'])
-            
-            # 计算收益率
-            if action.lower() == 'buy':
-                # 买入信号：次日开盘价相对于当日开盘价的涨幅
-                return (exit_price - entry_price) / entry_price
-            elif action.lower() == 'sell':
-                # 卖出信号：当日开盘价相对于次日开盘价的涨幅（做空收益）
-                return (entry_price - exit_price) / entry_price
-            else:
-                return None
-                
-        except Exception as e:
-            print(f"     ❌ 计算{symbol_code}日收益率失败: {e}")
-            return None
+        return self.get_historical_returns([signal_name], trigger_time)[signal_name]
     
     def optimize_weights(self, consensus_scores: Dict[str, float], trigger_time: str) -> Dict[str, float]:
         """
@@ -216,11 +119,12 @@ class WeightOptimizer:
         # 计算每个信号的综合评分
         composite_scores = {}
         
+        # 一次批量获取所有信号的历史收益率
+        historical_returns = self.get_historical_returns(signal_names, trigger_time)
+        
         for signal_name in signal_names:
             consensus_score = consensus_scores[signal_name]
-            
-            # 获取历史收益率
-            historical_return = self.get_signal_historical_returns(signal_name, trigger_time)
+            historical_return = historical_returns[signal_name]
             
             if historical_return is None:
                 print(f"   📊 {signal_name}: 共识评分={consensus_score:.1f}, 历史收益率=无数据 -> 综合评分=0")
@@ -0,0 +1,282 @@
+"""
+Performance Ledger: agent历史信号表现的追加式账本(SQLite)
+
+1. signals 表: 每个 (agent, trigger_time) 一行，保存解析后的信号，报告被重新生成时才会替换
+2. returns 表: 每个 (agent, trigger_time, 收益口径) 一行，记录建仓/平仓日期和价格、
+   毛收益和扣除滑点与交易成本后的净收益；只写入能算出的收益，价格尚未出来的口径之后的同步中补上。
+   lookback 价格不足6个时先写入已有连续价格的收益(settled=0)，之后的同步重新计算并替换
+3. SignalJudger / WeightOptimizer 只同步并查询窗口内的 (agent, trigger_time)，不再重新扫描和解析全部报告
+4. leaderboard 按任意时间区间汇总各agent的表现
+
+收益口径与 contest.return_engine 一致: lookback / next_day / fwd_1 / fwd_3 / fwd_5，
+lookback 不是实际交易，净收益等于毛收益。
+
+可选配置 performance_ledger_config: db_path / notional(计算交易成本的名义本金)
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.config import cfg
+from contest.signal_parser import Signal
+from contest.return_engine import LOOKBACK_DAYS, SignalReturnEngine, get_return_engine, signal_side
+from utils.trading_calendar import to_trade_date
+
+_ledger_config = getattr(cfg, "performance_ledger_config", None) or {}
+
+HORIZONS = ("lookback", "next_day", "fwd_1", "fwd_3", "fwd_5")
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS signals ("
+    "agent TEXT, trigger_time TEXT, trade_date TEXT, fingerprint TEXT, "
+    "has_opportunity TEXT, action TEXT, symbol_code TEXT, symbol_name TEXT, probability TEXT, "
+    "signal_json TEXT, recorded_at REAL, PRIMARY KEY (agent, trigger_time))",
+    "CREATE TABLE IF NOT EXISTS returns ("
+    "agent TEXT, trigger_time TEXT, horizon TEXT, entry_date TEXT, entry_price REAL, "
+    "exit_date TEXT, exit_price REAL, gross_return REAL, net_return REAL, recorded_at REAL, settled INTEGER, "
+    "PRIMARY KEY (agent, trigger_time, horizon))",
+    "CREATE INDEX IF NOT EXISTS idx_returns_horizon_time ON returns(horizon, trigger_time)",
+]
+
+
+def _placeholders(values: List) -> str:
+    return ",".join("?" * len(values))
+
+
+class PerformanceLedger:
+    """按 (agent, trigger_time) 记录信号及其实现收益"""
+
+    def __init__(self, db_path, reports_dir, market_name: str = "CN-Stock", notional: float = 100000.0,
+                 engine: Optional[SignalReturnEngine] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.reports_dir = Path(reports_dir)
+        self.market_name = market_name
+        self.notional = notional
+        self.engine = engine or get_return_engine(reports_dir, market_name)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    def agent_names(self) -> List[str]:
+        return self.engine.agent_names()
+
+    # ---------------- 同步 ----------------
+    def _report_fingerprint(self, agent_name: str, signal_time: str) -> Optional[str]:
+        report_file = self.reports_dir / agent_name / f"{signal_time.replace(' ', '_')}.json"
+        try:
+            stat = report_file.stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _sync_signals(self, agent_names: List[str], signal_times: List[str]):
+        """记录窗口内新出现(或被重新生成)的报告信号"""
+        rows = self._conn.execute(
+            f"SELECT agent, trigger_time, fingerprint FROM signals "
+            f"WHERE agent IN ({_placeholders(agent_names)}) AND trigger_time IN ({_placeholders(signal_times)})",
+            agent_names + signal_times).fetchall()
+        known = {(agent, trigger_time): fingerprint for agent, trigger_time, fingerprint in rows}
+
+        now = datetime.now().timestamp()
+        for agent_name in agent_names:
+            for signal_time in signal_times:
+                fingerprint = self._report_fingerprint(agent_name, signal_time)
+                if fingerprint is None or known.get((agent_name, signal_time)) == fingerprint:
+                    continue
+                try:
+                    signal = self.engine.load_signal(agent_name, signal_time)
+                except Exception as e:
+                    print(f"读取信号失败 {agent_name} {signal_time}: {e}")
+                    continue
+                if (agent_name, signal_time) in known:
+                    # 报告被重新生成，旧信号的收益一并作废
+                    self._conn.execute("DELETE FROM returns WHERE agent = ? AND trigger_time = ?", (agent_name, signal_time))
+                record = signal or Signal()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (agent_name, signal_time, to_trade_date(signal_time), fingerprint,
+                     record.has_opportunity, record.action, record.symbol_code, record.symbol_name, record.probability,
+                     json.dumps(signal.to_json(), ensure_ascii=False) if signal else None, now))
+        self._conn.commit()
+
+    def _net_return(self, action: str, symbol: str, entry_price: float, exit_price: float) -> Optional[float]:
+        """按名义本金整手交易，扣除滑点和双边交易成本后的收益率"""
+        market_manager = self.engine.market_manager
+        shares = market_manager.calculate_tradable_shares(self.market_name, self.notional, entry_price)
+        if shares <= 0:
+            return None
+        close_action = "sell" if action == "buy" else "buy"
+        entry_fill = market_manager.apply_slippage(self.market_name, entry_price, action, symbol)
+        exit_fill = market_manager.apply_slippage(self.market_name, exit_price, close_action, symbol)
+        costs = market_manager.calculate_trading_costs(self.market_name, action, shares, entry_fill, symbol)["total_cost"] \
+            + market_manager.calculate_trading_costs(self.market_name, close_action, shares, exit_fill, symbol)["total_cost"]
+        side = 1.0 if action == "buy" else -1.0
+        pnl = side * (exit_fill - entry_fill) * shares - costs
+        return pnl / (entry_fill * shares)
+
+    def _sync_returns(self, agent_names: List[str], signal_times: List[str], horizons: Iterable[str]):
+        """为窗口内可交易的信号写入已经能够算出的收益，没有记录或未定型(settled=0)的重新计算"""
+        now = datetime.now().timestamp()
+        for horizon in horizons:
+            pending = self._conn.execute(
+                f"SELECT s.agent, s.trigger_time, s.trade_date, LOWER(s.action), s.symbol_code FROM signals s "
+                f"LEFT JOIN returns r ON r.agent = s.agent AND r.trigger_time = s.trigger_time AND r.horizon = ? "
+                f"WHERE s.agent IN ({_placeholders(agent_names)}) AND s.trigger_time IN ({_placeholders(signal_times)}) "
+                f"AND LOWER(s.action) IN ('buy', 'sell') AND s.symbol_code IS NOT NULL AND s.symbol_code != '' "
+                f"AND (r.horizon IS NULL OR r.settled = 0)",
+                [horizon] + agent_names + signal_times).fetchall()
+            if not pending:
+                continue
+
+            signal_dates = [row[2] for row in pending]
+            symbols = [row[4] for row in pending]
+            sides = np.array([signal_side(Signal(action=row[3])) for row in pending])
+            try:
+                dates, opens = self.engine.price_paths(symbols, signal_dates, horizon)
+            except Exception as e:
+                print(f"读取{horizon}收益所需价格失败: {e}")
+                continue
+            returns = self.engine.compute_returns(horizon, opens, sides)
+
+            records = []
+            for i, (agent_name, signal_time, _, action, symbol) in enumerate(pending):
+                if not np.isfinite(returns[i]):
+                    continue
+                gross, settled = float(returns[i]), 1
+                if horizon == "lookback":
+                    # 从信号日往前连续有效价格中最早的一个为起点，不足 LOOKBACK_DAYS+1 个时之后重新计算
+                    valid = np.cumprod(np.isfinite(opens[i]) & (opens[i] > 0))
+                    start = int(valid.sum()) - 1
+                    settled = int(start == LOOKBACK_DAYS)
+                    entry_date, entry_price = dates[i, start], opens[i, start]
+                    exit_date, exit_price = dates[i, 0], opens[i, 0]
+                    net = gross
+                else:
+                    entry_date, entry_price = dates[i, 0], opens[i, 0]
+                    exit_date, exit_price = dates[i, 1], opens[i, 1]
+                    net = self._net_return(action, symbol, float(entry_price), float(exit_price))
+                records.append((agent_name, signal_time, horizon, entry_date, float(entry_price), exit_date,
+                                float(exit_price), gross, net, now, settled))
+            self._conn.executemany("INSERT OR REPLACE INTO returns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self._conn.commit()
+
+    def sync(self, agent_names: Iterable[str], signal_times: Iterable[str], horizons: Iterable[str] = HORIZONS):
+        """增量同步窗口内的信号和收益"""
+        agent_names, signal_times = list(agent_names), list(signal_times)
+        if not agent_names or not signal_times:
+            return
+        with self._lock:
+            self._sync_signals(agent_names, signal_times)
+            self._sync_returns(agent_names, signal_times, horizons)
+
+    # ---------------- 查询 ----------------
+    def signal_returns(self, agent_names: Iterable[str], signal_times: Iterable[str], kind: str,
+                       accept: Callable[[Signal], bool], net: bool = False) -> Dict[str, List[Tuple[str, Optional[float]]]]:
+        """
+        查询各agent在各信号时间的信号收益
+
+        Args:
+            agent_names: agent列表
+            signal_times: 信号时间列表(YYYY-MM-DD HH:MM:SS)，结果按此顺序排列
+            kind: 收益口径，见 HORIZONS
+            accept: 参与计算的信号过滤条件
+            net: 是否返回扣除交易成本后的净收益
+
+        Returns:
+            {agent_name: [(signal_time, return), ...]}，只包含存在且被accept接受的信号，无法计算的收益为None
+        """
+        agent_names, signal_times = list(agent_names), list(signal_times)
+        self.sync(agent_names, signal_times, horizons=[kind])
+        results: Dict[str, List[Tuple[str, Optional[float]]]] = {agent_name: [] for agent_name in agent_names}
+        if not agent_names or not signal_times:
+            return results
+
+        value_column = "net_return" if net else "gross_return"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT s.agent, s.trigger_time, s.signal_json, r.{value_column} FROM signals s "
+                f"LEFT JOIN returns r ON r.agent = s.agent AND r.trigger_time = s.trigger_time AND r.horizon = ? "
+                f"WHERE s.agent IN ({_placeholders(agent_names)}) AND s.trigger_time IN ({_placeholders(signal_times)}) "
+                f"AND s.signal_json IS NOT NULL",
+                [kind] + agent_names + signal_times).fetchall()
+
+        found = {(agent, trigger_time): (signal_json, value) for agent, trigger_time, signal_json, value in rows}
+        for agent_name in agent_names:
+            for signal_time in signal_times:
+                if (agent_name, signal_time) not in found:
+                    continue
+                signal_json, value = found[(agent_name, signal_time)]
+                if accept(Signal.from_json(json.loads(signal_json))):
+                    results[agent_name].append((signal_time, value))
+        return results
+
+    def leaderboard(self, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                    horizon: str = "fwd_5", net: bool = True) -> pd.DataFrame:
+        """
+        各agent在 [start_time, end_time] 内已记录信号的表现汇总(只查询账本，不同步)
+
+        Returns:
+            pd.DataFrame: agent, signals, avg_return, total_return(逐笔复利), win_rate, best, worst，按avg_return降序
+        """
+        value_column = "net_return" if net else "gross_return"
+        conditions, params = ["horizon = ?", f"{value_column} IS NOT NULL"], [horizon]
+        if start_time:
+            conditions.append("trigger_time >= ?")
+            params.append(start_time)
+        if end_time:
+            conditions.append("trigger_time <= ?")
+            params.append(end_time)
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT agent, trigger_time, {value_column} AS value FROM returns "
+                f"WHERE {' AND '.join(conditions)} ORDER BY agent, trigger_time",
+                self._conn, params=params)
+        columns = ["agent", "signals", "avg_return", "total_return", "win_rate", "best", "worst"]
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        grouped = df.groupby("agent")["value"]
+        board = pd.DataFrame({
+            "signals": grouped.size(),
+            "avg_return": grouped.mean(),
+            "total_return": grouped.apply(lambda values: float(np.prod(1 + values.to_numpy()) - 1.0)),
+            "win_rate": grouped.apply(lambda values: float((values > 0).mean())),
+            "best": grouped.max(),
+            "worst": grouped.min(),
+        }).reset_index()
+        return board[columns].sort_values("avg_return", ascending=False, kind="stable").reset_index(drop=True)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_ledgers: Dict[str, PerformanceLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_performance_ledger(workspace_dir, market_name: str = "CN-Stock") -> PerformanceLedger:
+    """同一工作目录共享一个账本，默认保存在 <workspace_dir>/performance_ledger.sqlite"""
+    workspace_dir = Path(workspace_dir)
+    db_path = Path(_ledger_config.get("db_path") or workspace_dir / "performance_ledger.sqlite")
+    key = f"{db_path.resolve()}|{market_name}"
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = PerformanceLedger(db_path, workspace_dir / "reports", market_name=market_name,
+                                       notional=_ledger_config.get("notional", 100000.0))
+            _ledgers[key] = ledger
+        return ledger
+
+
+if __name__ == "__main__":
+    from config.config import PROJECT_ROOT
+    print(get_performance_ledger(PROJECT_ROOT / "agents_workspace").leaderboard().to_string(index=False))
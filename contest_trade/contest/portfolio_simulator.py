@@ -0,0 +1,271 @@
+"""
+Portfolio Simulator: 基于每日最佳信号的组合回测
+
+1. 每个触发时间的目标组合来自 run_contest_step 的 best_signals 和 optimized_weights:
+   有机会的buy信号按agent权重分配(权重都为0时等权)，其余持仓清仓
+2. 在触发日开盘按目标组合调仓: 先卖后买，整手交易，开盘涨停不能买入、跌停不能卖出，
+   成交价计入滑点，按市场规则收取佣金/印花税/过户费，现金不足时按比例缩减买入
+3. 价格一次批量读取为 (交易日数, 股票数) 的NumPy矩阵，只在调仓日逐日计算，
+   非调仓日的持仓、净值、回撤全部向量化得到
+4. 输出每日净值、现金、市值、换手率、费用和回撤
+
+整手、滑点、交易成本直接使用 MarketManager 的 get_lot_size / apply_slippage_array /
+calculate_trading_costs_array(与单笔的 apply_slippage / calculate_trading_costs 共用同一套规则)。
+价格来自 MarketManager.get_prices，目前只支持A股(SUPPORTED_MARKETS)。
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from contest.return_engine import sharpe_ratio
+from utils.trading_calendar import to_trade_date
+
+# 与 MarketManager.get_prices 支持的市场一致
+SUPPORTED_MARKETS = ["CN-Stock", "CSI300", "CSI500", "CSI1000"]
+# 浮点误差容忍: 开盘价达到涨停价(跌停价)视为封板
+_LIMIT_EPS = 1e-6
+
+
+@dataclass
+class SimulationResult:
+    """组合回测结果"""
+    daily: pd.DataFrame        # trade_date, nav, cash, market_value, turnover, fees, drawdown
+    positions: pd.DataFrame    # 调仓后的持股数，index为调仓日，columns为股票代码
+    summary: Dict
+
+
+def build_targets(decisions: Dict[str, Dict]) -> Dict[str, Dict[str, float]]:
+    """
+    从每个触发时间的决策构建目标权重
+
+    Args:
+        decisions: {trigger_time: {"best_signals": [...], "optimized_weights": {agent_name: weight}}}
+
+    Returns:
+        {trade_date(YYYYMMDD): {symbol_code: weight}}，权重和为1，没有买入信号时为空(清仓)
+    """
+    targets = {}
+    for trigger_time, decision in decisions.items():
+        weights = decision.get("optimized_weights") or {}
+        picks = {}
+        for signal in decision.get("best_signals") or []:
+            if (signal.get("has_opportunity") or "").lower() != "yes" or (signal.get("action") or "").lower() != "buy":
+                continue
+            symbol = signal.get("symbol_code")
+            if not symbol:
+                continue
+            agent_name = signal.get("agent_name") or f"agent_{signal.get('agent_id')}"
+            weight = weights.get(agent_name, weights.get(f"agent_{signal.get('agent_id')}", 0.0))
+            picks[symbol] = picks.get(symbol, 0.0) + max(float(weight or 0.0), 0.0)
+        total = sum(picks.values())
+        if picks and total <= 0:
+            picks = {symbol: 1.0 for symbol in picks}
+            total = float(len(picks))
+        targets[to_trade_date(trigger_time)] = {symbol: weight / total for symbol, weight in picks.items()}
+    return targets
+
+
+class PortfolioSimulator:
+    """按交易日调仓的组合模拟器"""
+
+    def __init__(self, market_name: str = "CN-Stock", initial_cash: float = 1_000_000.0, market_manager=None):
+        if market_name not in SUPPORTED_MARKETS:
+            raise ValueError(f"组合模拟不支持的市场类型: {market_name}，支持: {SUPPORTED_MARKETS}")
+        self.market_name = market_name
+        self.initial_cash = initial_cash
+        self._market_manager = market_manager
+
+    @property
+    def market_manager(self):
+        if self._market_manager is None:
+            from utils.market_manager import GLOBAL_MARKET_MANAGER
+            self._market_manager = GLOBAL_MARKET_MANAGER
+        return self._market_manager
+
+    # ---------------- 交易规则(向量化，规则和配置都来自MarketManager) ----------------
+    def slippage_prices(self, prices: np.ndarray, is_buy: bool) -> np.ndarray:
+        """买入价格上滑，卖出价格下滑"""
+        return self.market_manager.apply_slippage_array(self.market_name, prices, "buy" if is_buy else "sell")
+
+    def trading_costs(self, shares: np.ndarray, prices: np.ndarray, is_buy: bool) -> np.ndarray:
+        """各位置的交易总成本，shares为0(未成交)的位置成本为0"""
+        costs = self.market_manager.calculate_trading_costs_array(
+            self.market_name, "buy" if is_buy else "sell", shares, prices)["total_cost"]
+        return np.where(shares > 0, costs, 0.0)
+
+    # ---------------- 价格 ----------------
+    def load_prices(self, symbols: List[str], trade_dates: List[str]) -> Dict[str, np.ndarray]:
+        """
+        一次批量读取价格矩阵(前复权)
+
+        Returns:
+            {"open", "close", "up_limit", "down_limit"}: 形状为 (交易日数, 股票数)，缺失(停牌)为NaN
+        """
+        shape = (len(trade_dates), len(symbols))
+        matrices = {name: np.full(shape, np.nan) for name in ["open", "close", "up_limit", "down_limit"]}
+        if not symbols or not trade_dates:
+            return matrices
+        prices = self.market_manager.get_prices(self.market_name, symbols, trade_dates)
+        if prices is None or prices.empty:
+            return matrices
+
+        date_idx = pd.Index(trade_dates).get_indexer(prices["trade_date"])
+        symbol_idx = pd.Index(symbols).get_indexer(prices["ts_code"])
+        ok = (date_idx >= 0) & (symbol_idx >= 0)
+        date_idx, symbol_idx = date_idx[ok], symbol_idx[ok]
+        prices = prices[ok]
+        qfq_factor = prices["qfq_factor"].to_numpy(dtype=float) if "qfq_factor" in prices else 1.0
+        matrices["open"][date_idx, symbol_idx] = prices["open"].to_numpy(dtype=float)
+        matrices["close"][date_idx, symbol_idx] = prices["close"].to_numpy(dtype=float)
+        matrices["up_limit"][date_idx, symbol_idx] = prices["limit_price"].to_numpy(dtype=float)
+        if "down_limit" in prices:
+            matrices["down_limit"][date_idx, symbol_idx] = prices["down_limit"].to_numpy(dtype=float) * qfq_factor
+        return matrices
+
+    # ---------------- 模拟 ----------------
+    def simulate(self, targets: Dict[str, Dict[str, float]], trade_dates: List[str],
+                 prices: Optional[Dict[str, np.ndarray]] = None, symbols: Optional[List[str]] = None) -> SimulationResult:
+        """
+        在给定交易日上模拟组合
+
+        Args:
+            targets: {trade_date: {symbol: weight}}，不在trade_dates中的调仓日忽略
+            trade_dates: 升序的交易日(YYYYMMDD)
+            prices: load_prices 格式的价格矩阵，为None时批量读取
+            symbols: prices 的列顺序，为None时取targets中出现的全部股票(按首次出现顺序)
+        """
+        trade_dates = [to_trade_date(d) for d in trade_dates]
+        if symbols is None:
+            symbols = list(dict.fromkeys(symbol for weights in targets.values() for symbol in weights))
+        if prices is None:
+            prices = self.load_prices(symbols, trade_dates)
+        n_days, n_symbols = len(trade_dates), len(symbols)
+        symbol_pos = {symbol: i for i, symbol in enumerate(symbols)}
+        lot = self.market_manager.get_lot_size(self.market_name)
+
+        opens, closes = prices["open"], prices["close"]
+        # 停牌日沿用最近的收盘价估值
+        close_filled = pd.DataFrame(closes).ffill().fillna(0.0).to_numpy()
+        prev_close = np.vstack([np.zeros((1, n_symbols)), close_filled[:-1]])
+        open_value = np.where(np.isfinite(opens), opens, prev_close)
+        can_buy = np.isfinite(opens) & ~(opens >= prices["up_limit"] - _LIMIT_EPS)
+        can_sell = np.isfinite(opens) & ~(opens <= prices["down_limit"] + _LIMIT_EPS)
+        buy_fills = self.slippage_prices(open_value, is_buy=True)
+        sell_fills = self.slippage_prices(open_value, is_buy=False)
+
+        rebalance_days = [d for d, trade_date in enumerate(trade_dates) if trade_date in targets]
+        positions = np.zeros((len(rebalance_days), n_symbols), dtype=np.int64)
+        cash_after = np.zeros(len(rebalance_days))
+        traded_value = np.zeros(n_days)
+        fees = np.zeros(n_days)
+        blocked = 0
+
+        shares = np.zeros(n_symbols, dtype=np.int64)
+        cash = float(self.initial_cash)
+        for r, d in enumerate(rebalance_days):
+            # 只计算持仓或目标中的股票
+            target = targets[trade_dates[d]]
+            cols = np.union1d(np.flatnonzero(shares), [symbol_pos[symbol] for symbol in target]).astype(np.int64)
+            weights = np.zeros(len(cols))
+            for symbol, weight in target.items():
+                weights[np.searchsorted(cols, symbol_pos[symbol])] = weight
+            held_shares = shares[cols]
+            nav = cash + float(held_shares @ open_value[d, cols])
+            buy_fill, sell_fill = buy_fills[d, cols], sell_fills[d, cols]
+            buyable, sellable = can_buy[d, cols], can_sell[d, cols]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                target_shares = np.where(buy_fill > 0, np.floor(weights * nav / buy_fill / lot) * lot, 0).astype(np.int64)
+            delta = target_shares - held_shares
+
+            # 先卖出
+            sell_qty = np.where((delta < 0) & sellable, -delta, 0)
+            sell_amount = sell_qty * sell_fill
+            sell_costs = self.trading_costs(sell_qty, sell_fill, is_buy=False)
+            cash += float(sell_amount.sum() - sell_costs.sum())
+
+            # 再买入，现金不足时按比例缩减
+            buy_qty = np.where((delta > 0) & buyable, delta, 0)
+            buy_costs = self.trading_costs(buy_qty, buy_fill, is_buy=True)
+            need = float((buy_qty * buy_fill).sum() + buy_costs.sum())
+            if need > cash and need > 0:
+                buy_qty = (np.floor(buy_qty * (cash / need) / lot) * lot).astype(np.int64)
+                buy_costs = self.trading_costs(buy_qty, buy_fill, is_buy=True)
+            buy_amount = buy_qty * buy_fill
+            cash -= float(buy_amount.sum() + buy_costs.sum())
+            shares[cols] = held_shares - sell_qty + buy_qty
+
+            blocked += int(((delta < 0) & ~sellable).sum() + ((delta > 0) & ~buyable).sum())
+            traded_value[d] = float(sell_amount.sum() + buy_amount.sum())
+            fees[d] = float(sell_costs.sum() + buy_costs.sum())
+            positions[r] = shares
+            cash_after[r] = cash
+
+        # 非调仓日沿用最近一次调仓后的持仓
+        last_rebalance = np.full(n_days, -1)
+        last_rebalance[rebalance_days] = np.arange(len(rebalance_days))
+        last_rebalance = np.maximum.accumulate(last_rebalance)
+        held = last_rebalance >= 0
+        daily_shares = np.zeros((n_days, n_symbols), dtype=np.int64)
+        daily_shares[held] = positions[last_rebalance[held]]
+        daily_cash = np.full(n_days, float(self.initial_cash))
+        daily_cash[held] = cash_after[last_rebalance[held]]
+
+        market_value = (daily_shares * close_filled).sum(axis=1)
+        nav = daily_cash + market_value
+        prev_nav = np.concatenate([[float(self.initial_cash)], nav[:-1]])
+        turnover = np.divide(traded_value, prev_nav, out=np.zeros(n_days), where=prev_nav > 0)
+        peak = np.maximum.accumulate(np.concatenate([[float(self.initial_cash)], nav]))[1:]
+        drawdown = nav / peak - 1.0
+
+        daily = pd.DataFrame({
+            "trade_date": trade_dates,
+            "nav": nav / self.initial_cash,
+            "cash": daily_cash,
+            "market_value": market_value,
+            "turnover": turnover,
+            "fees": fees,
+            "drawdown": drawdown,
+        })
+        daily_returns = nav / prev_nav - 1.0 if n_days else np.array([])
+        summary = {
+            "start_date": trade_dates[0] if trade_dates else None,
+            "end_date": trade_dates[-1] if trade_dates else None,
+            "days": n_days,
+            "rebalances": len(rebalance_days),
+            "total_return": float(nav[-1] / self.initial_cash - 1.0) if n_days else 0.0,
+            "sharpe": sharpe_ratio(daily_returns),
+            "max_drawdown": float(-drawdown.min()) if n_days else 0.0,
+            "avg_turnover": float(turnover[rebalance_days].mean()) if rebalance_days else 0.0,
+            "total_fees": float(fees.sum()),
+            "blocked_orders": blocked,
+        }
+        positions_df = pd.DataFrame(positions, index=[trade_dates[d] for d in rebalance_days], columns=symbols)
+        return SimulationResult(daily=daily, positions=positions_df, summary=summary)
+
+    def run(self, decisions: Dict[str, Dict], start_date: Optional[str] = None,
+            end_date: Optional[str] = None) -> SimulationResult:
+        """
+        从每个触发时间的决策运行组合回测
+
+        Args:
+            decisions: {trigger_time: {"best_signals": [...], "optimized_weights": {...}}}
+            start_date / end_date: 回测区间，默认为第一个决策日到最后一个决策日
+        """
+        targets = build_targets(decisions)
+        if not targets:
+            raise ValueError("没有可用于模拟的决策")
+        start_date = to_trade_date(start_date or min(targets))
+        end_date = to_trade_date(end_date or max(targets))
+        trade_dates = self.market_manager.get_trading_calendar(self.market_name).range(start_date, end_date)
+        return self.simulate(targets, trade_dates)
+
+
+def decisions_from_states(states: Dict[str, Dict]) -> Dict[str, Dict]:
+    """从工作流状态(或回测保存的详细结果)中提取决策"""
+    return {
+        trigger_time: {
+            "best_signals": state.get("step_results", {}).get("contest", {}).get("best_signals", []),
+            "optimized_weights": state.get("optimized_weights", {}) or {},
+        }
+        for trigger_time, state in states.items()
+    }
@@ -0,0 +1,152 @@
+"""
+Return Engine: 历史信号收益的批量计算
+
+1. 先收集窗口内所有 (agent, 信号时间) 的信号，得到需要的 (symbol, 交易日) 组合，
+   通过 MarketManager.get_prices 一次批量读取开盘价(每个交易日分区只加载一次)
+2. 开盘价排成 (信号数, 交易日数) 的矩阵，收益率、夏普比率和最大回撤都用NumPy一次算完
+3. 计算结果由 contest.performance_ledger 记录，引擎本身不缓存
+
+收益口径:
+- lookback: 信号日开盘价相对于前5个交易日开盘价的收益(价格不足6个时使用已有的连续价格)，卖出信号取反，限制在±100%
+- next_day: 信号日开盘买入/卖出，下一自然日开盘平仓的收益(下一自然日不是交易日时无法计算)
+- fwd_N: 信号日开盘买入/卖出，第N个交易日开盘平仓的收益(如 fwd_1 / fwd_3 / fwd_5)
+"""
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from contest.signal_parser import Signal, load_report_signal
+
+LOOKBACK_DAYS = 5
+TRADING_DAYS_PER_YEAR = 252
+
+
+def signal_side(signal: Signal) -> float:
+    """买入为1，卖出为-1(下跌为正收益)，其他操作为NaN"""
+    return {"buy": 1.0, "sell": -1.0}.get((signal.action or "").lower(), np.nan)
+
+
+def sharpe_ratio(returns: Iterable[float], periods: int = TRADING_DAYS_PER_YEAR) -> float:
+    """年化夏普比率，少于2个收益或波动为0时返回0.0"""
+    returns = np.asarray(list(returns), dtype=float)
+    if len(returns) < 2:
+        return 0.0
+    std = returns.std()
+    return float(returns.mean() / std * np.sqrt(periods)) if std > 0 else 0.0
+
+
+def cumulative_return(returns: Iterable[float]) -> float:
+    """逐笔复利的累计收益率"""
+    returns = np.asarray(list(returns), dtype=float)
+    return float(np.prod(1 + returns) - 1.0) if len(returns) else 0.0
+
+
+def max_drawdown(returns: Iterable[float]) -> float:
+    """复利净值曲线(起点为1)的最大回撤，返回非负数"""
+    returns = np.asarray(list(returns), dtype=float)
+    if not len(returns):
+        return 0.0
+    nav = np.concatenate([[1.0], np.cumprod(1 + returns)])
+    return float(np.max(1 - nav / np.maximum.accumulate(nav)))
+
+
+class SignalReturnEngine:
+    """reports目录下所有agent历史信号的收益计算"""
+
+    def __init__(self, reports_dir, market_name: str = "CN-Stock", market_manager=None):
+        self.reports_dir = Path(reports_dir)
+        self.market_name = market_name
+        self._market_manager = market_manager
+
+    @property
+    def market_manager(self):
+        if self._market_manager is None:
+            from utils.market_manager import GLOBAL_MARKET_MANAGER
+            self._market_manager = GLOBAL_MARKET_MANAGER
+        return self._market_manager
+
+    def agent_names(self) -> List[str]:
+        """reports目录下的所有agent"""
+        if not self.reports_dir.exists():
+            return []
+        return sorted(d.name for d in self.reports_dir.iterdir() if d.is_dir() and d.name.startswith('agent_'))
+
+    def load_signal(self, agent_name: str, signal_time: str) -> Optional[Signal]:
+        report_file = self.reports_dir / agent_name / f"{signal_time.replace(' ', '_')}.json"
+        return load_report_signal(report_file)
+
+    def _price_dates(self, signal_dates: List[str], kind: str) -> np.ndarray:
+        """(信号数, 价格点数) 的交易日矩阵，无效位置为空字符串"""
+        calendar = self.market_manager.get_trading_calendar(self.market_name)
+        if kind == "lookback":
+            # T0 必须是交易日，T-i 为严格早于信号日的第i个交易日
+            columns = [calendar.shift_many(signal_dates, -i) for i in range(LOOKBACK_DAYS + 1)]
+        elif kind == "next_day":
+            next_dates = [(datetime.strptime(d, "%Y%m%d") + timedelta(days=1)).strftime("%Y%m%d")
+                          for d in signal_dates]
+            columns = [calendar.shift_many(signal_dates, 0), calendar.shift_many(next_dates, 0)]
+        elif kind.startswith("fwd_"):
+            columns = [calendar.shift_many(signal_dates, 0), calendar.shift_many(signal_dates, int(kind[4:]))]
+        else:
+            raise ValueError(f"Invalid return kind: {kind}")
+        return np.stack(columns, axis=1)
+
+    def price_paths(self, symbols: List[str], signal_dates: List[str], kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次批量读取一组信号计算收益所需的开盘价
+
+        Returns:
+            tuple: (交易日矩阵, 开盘价矩阵)，第0列为信号日；lookback 其余列依次向前，其他口径第1列为平仓日
+        """
+        dates = self._price_dates(signal_dates, kind)
+        return dates, self._open_matrix(symbols, dates)
+
+    def _open_matrix(self, symbols: List[str], dates: np.ndarray) -> np.ndarray:
+        """一次批量查询，返回与dates同形状的开盘价矩阵，缺失为NaN"""
+        opens = np.full(dates.shape, np.nan)
+        needed_dates = sorted(set(dates[dates != ""].tolist()))
+        if not symbols or not needed_dates:
+            return opens
+        prices = self.market_manager.get_prices(self.market_name, list(set(symbols)), needed_dates)
+        if prices is None or prices.empty:
+            return opens
+        lookup = dict(zip(zip(prices["ts_code"], prices["trade_date"]), prices["open"].astype(float)))
+        for row, symbol in enumerate(symbols):
+            for col, trade_date in enumerate(dates[row].tolist()):
+                if trade_date:
+                    opens[row, col] = lookup.get((symbol, trade_date), np.nan)
+        return opens
+
+    @staticmethod
+    def compute_returns(kind: str, opens: np.ndarray, sides: np.ndarray) -> np.ndarray:
+        """按口径计算收益，无法计算的位置为NaN"""
+        valid = np.isfinite(opens) & (opens > 0)
+        if kind == "lookback":
+            # 从信号日往前连续有效的价格个数，至少2个才能计算
+            run_length = np.cumprod(valid, axis=1).sum(axis=1)
+            last = np.clip(run_length - 1, 0, None)
+            start_price = opens[np.arange(len(opens)), last]
+            base_return = (opens[:, 0] - start_price) / start_price
+            returns = np.clip(base_return * sides, -1.0, 1.0)
+            returns[run_length < 2] = np.nan
+        else:
+            entry, exit_ = opens[:, 0], opens[:, 1]
+            returns = (exit_ - entry) / entry * sides
+            returns[~(valid[:, 0] & valid[:, 1])] = np.nan
+        return returns
+
+
+_engines: Dict[str, SignalReturnEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_return_engine(reports_dir, market_name: str = "CN-Stock") -> SignalReturnEngine:
+    """同一reports目录共享一个引擎"""
+    key = f"{Path(reports_dir).resolve()}|{market_name}"
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = SignalReturnEngine(reports_dir, market_name)
+            _engines[key] = engine
+        return engine
@@ -0,0 +1,232 @@
+"""
+Signal Parser: 研究报告 final_result 的统一解析
+
+1. 预编译的标签正则只扫描一遍文本，按标签栈解析出 <signal> 块及其中的
+   has_opportunity / action / symbol_code / symbol_name / evidence_list / limitations / probability
+2. 每个字段取块内第一次出现的值(与原来 re.search(..., DOTALL) 非贪婪匹配的结果一致)
+3. 解析结果为带 __slots__ 的 Signal 记录
+4. 历史报告的解析结果写在报告旁边(<报告名>.signal)，报告未修改时直接读取，不再重复解析
+"""
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+SCALAR_FIELDS = ("has_opportunity", "action", "symbol_code", "symbol_name", "probability")
+REQUIRED_FIELDS = SCALAR_FIELDS + ("evidence_list", "limitations")
+
+_TAG_PATTERN = re.compile(
+    r"<(/?)(signal|has_opportunity|action|symbol_code|symbol_name|probability"
+    r"|evidence_list|evidence|time|from_source|limitations|limitation)>"
+)
+_OUTPUT_TAG = "<Output>"
+# 修改解析规则时递增，使旧的 .signal 文件失效
+PARSER_VERSION = 1
+
+
+class Signal:
+    """单个交易信号，缺失的标量字段为None，缺失的列表字段为None"""
+
+    __slots__ = ("has_opportunity", "action", "symbol_code", "symbol_name", "probability",
+                 "evidence_list", "limitations")
+
+    def __init__(self, has_opportunity: Optional[str] = None, action: Optional[str] = None,
+                 symbol_code: Optional[str] = None, symbol_name: Optional[str] = None,
+                 probability: Optional[str] = None, evidence_list: Optional[List[Dict[str, str]]] = None,
+                 limitations: Optional[List[str]] = None):
+        self.has_opportunity = has_opportunity
+        self.action = action
+        self.symbol_code = symbol_code
+        self.symbol_name = symbol_name
+        self.probability = probability
+        self.evidence_list = evidence_list
+        self.limitations = limitations
+
+    def is_complete(self) -> bool:
+        """所有字段都存在(研究Agent输出的信号块要求完整)"""
+        return all(getattr(self, field) is not None for field in REQUIRED_FIELDS)
+
+    @property
+    def is_opportunity(self) -> bool:
+        return (self.has_opportunity or "").lower() == "yes"
+
+    def to_dict(self) -> Dict:
+        """缺失字段转为空字符串/空列表"""
+        return {
+            **{field: getattr(self, field) or "" for field in SCALAR_FIELDS},
+            "evidence_list": [dict(e) for e in self.evidence_list or []],
+            "limitations": list(self.limitations or []),
+        }
+
+    def to_json(self) -> Dict:
+        """保留缺失信息的序列化形式，与 from_json 对应"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "Signal":
+        return cls(**{field: data.get(field) for field in cls.__slots__})
+
+    def __repr__(self):
+        return f"Signal(action={self.action!r}, symbol_code={self.symbol_code!r}, symbol_name={self.symbol_name!r})"
+
+
+def _has_fields(signal: Signal) -> bool:
+    return any(getattr(signal, field) is not None for field in Signal.__slots__)
+
+
+def parse_signals(text: str) -> List[Signal]:
+    """
+    单遍解析文本中所有的 <signal> 块
+
+    没有 <signal> 块时把整个文本当作一个信号解析，字段都不存在时返回空列表。
+    没有闭合的 <signal> 块(例如LLM输出被截断)只要解析到了字段也会保留
+    """
+    signals: List[Signal] = []
+    implicit: Optional[Signal] = None
+    current: Optional[Signal] = None
+    # 当前打开的标签 -> 内容起始位置
+    open_tags: Dict[str, int] = {}
+    # 已经结束的 evidence_list / limitations，只取每个信号的第一个
+    closed_lists: set = set()
+
+    for match in _TAG_PATTERN.finditer(text or ""):
+        is_close, tag = match.group(1), match.group(2)
+
+        if tag == "signal":
+            if current is not None and (is_close or _has_fields(current)):
+                signals.append(current)
+            current = None if is_close else Signal()
+            open_tags.clear()
+            closed_lists.clear()
+            continue
+
+        if current is None:
+            # 已经有信号块时忽略块外的标签
+            if signals:
+                continue
+            if implicit is None:
+                implicit = Signal()
+        target = current if current is not None else implicit
+
+        if not is_close:
+            if tag in closed_lists:
+                continue
+            open_tags.setdefault(tag, match.end())
+            if tag == "evidence_list" and target.evidence_list is None:
+                target.evidence_list = []
+            elif tag == "limitations" and target.limitations is None:
+                target.limitations = []
+            continue
+
+        start = open_tags.pop(tag, None)
+        if start is None:
+            continue
+        value = text[start:match.start()].strip()
+
+        if tag in SCALAR_FIELDS:
+            if getattr(target, tag) is None:
+                setattr(target, tag, value)
+        elif tag in ("evidence_list", "limitations"):
+            closed_lists.add(tag)
+        elif tag == "evidence" and "evidence_list" in open_tags:
+            target.evidence_list.append({"description": value, "time": "", "from_source": ""})
+        elif tag in ("time", "from_source") and "evidence_list" in open_tags and target.evidence_list:
+            evidence = target.evidence_list[-1]
+            if not evidence[tag]:
+                evidence[tag] = value
+        elif tag == "limitation" and "limitations" in open_tags:
+            target.limitations.append(value)
+
+    # 文本结束时仍未闭合的信号块
+    if current is not None and _has_fields(current):
+        signals.append(current)
+    if signals:
+        return signals
+    return [implicit] if implicit is not None else []
+
+
+def parse_final_result(final_result: str) -> Optional[Signal]:
+    """解析final_result(<Output>之后的部分)中的第一个信号"""
+    if _OUTPUT_TAG in (final_result or ""):
+        final_result = final_result.split(_OUTPUT_TAG)[-1].strip()
+    signals = parse_signals(final_result)
+    return signals[0] if signals else None
+
+
+def signal_file_of(report_file: Union[str, Path]) -> Path:
+    """报告旁边的解析结果文件"""
+    report_file = Path(report_file)
+    return report_file.with_name(report_file.stem + ".signal")
+
+
+class ReportSignalStore:
+    """历史报告解析结果的缓存: 进程内 + 报告旁边的 .signal 文件，按报告的修改时间和大小校验"""
+
+    def __init__(self):
+        self._memory: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(report_file: Path) -> List[int]:
+        stat = report_file.stat()
+        return [stat.st_mtime_ns, stat.st_size, PARSER_VERSION]
+
+    def load(self, report_file: Union[str, Path]) -> Optional[Signal]:
+        """读取报告的解析结果，报告不存在或没有可解析的信号时返回None"""
+        report_file = Path(report_file)
+        try:
+            fingerprint = self._fingerprint(report_file)
+        except FileNotFoundError:
+            return None
+
+        key = str(report_file)
+        with self._lock:
+            cached = self._memory.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        signal = self._read_signal_file(report_file, fingerprint)
+        if signal is False:
+            with open(report_file, "r", encoding="utf-8") as f:
+                report_data = json.load(f)
+            signal = parse_final_result(report_data.get("final_result", ""))
+            self._write_signal_file(report_file, fingerprint, signal)
+
+        with self._lock:
+            self._memory[key] = (fingerprint, signal)
+        return signal
+
+    @staticmethod
+    def _read_signal_file(report_file: Path, fingerprint: List[int]):
+        """返回Signal / None(报告中没有信号)，文件不存在或已过期返回False"""
+        signal_file = signal_file_of(report_file)
+        try:
+            with open(signal_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        if data.get("fingerprint") != fingerprint:
+            return False
+        return Signal.from_json(data["signal"]) if data.get("signal") is not None else None
+
+    @staticmethod
+    def _write_signal_file(report_file: Path, fingerprint: List[int], signal: Optional[Signal]):
+        signal_file = signal_file_of(report_file)
+        tmp_file = signal_file.with_name(f"{signal_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "signal": signal.to_json() if signal else None},
+                          f, ensure_ascii=False)
+            os.replace(tmp_file, signal_file)
+        except OSError as e:
+            print(f"写入信号解析结果失败 {signal_file}: {e}")
+
+
+GLOBAL_SIGNAL_STORE = ReportSignalStore()
+
+
+def load_report_signal(report_file: Union[str, Path]) -> Optional[Signal]:
+    """读取历史报告的信号(优先使用已保存的解析结果)"""
+    return GLOBAL_SIGNAL_STORE.load(report_file)
@@ -18,6 +18,7 @@ package_root = os.path.dirname(current_dir)
 if package_root not in sys.path:
     sys.path.insert(0, package_root)
 from data_source.data_source_base import DataSourceBase
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
 from loguru import logger
 
 
@@ -129,7 +130,7 @@ class EastmoneyCommunityCrawl(DataSourceBase):
         try:
             url = f"https://guba.eastmoney.com/list,{stock_code}_{page}.html"
             
-            await asyncio.sleep(random.uniform(2, 4))
+            await GLOBAL_RATE_LIMITER.aacquire("eastmoney")
             async with session.get(url, headers=self.headers) as response:
                 if response.status == 200:
                     html_content = await response.text()
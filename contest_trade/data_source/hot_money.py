@@ -6,8 +6,10 @@ import pandas as pd
 import asyncio
 from datetime import datetime
 from utils.date_utils import get_previous_trading_date
+from utils.market_manager import GLOBAL_MARKET_MANAGER
 from data_source.data_source_base import DataSourceBase
 from utils.tushare_provider import TushareDataProvider
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from models.llm_model import GLOBAL_LLM
 from loguru import logger
 
@@ -54,11 +56,8 @@ class HotMoney(DataSourceBase):
             
             logger.info(f"异步获取 {trade_date} 的热钱市场数据")
             
-            # 由于tushare数据获取是同步的，我们在异步方法中使用线程池来避免阻塞
-            loop = asyncio.get_event_loop()
-            
-            # 使用线程池执行同步的数据获取
-            df = await loop.run_in_executor(None, self._get_data_sync, trigger_time)
+            # 由于tushare数据获取是同步的，在共享的数据线程池中执行来避免阻塞
+            df = await GLOBAL_SDK_CLIENT.fetch("tushare", self._get_data_sync, trigger_time)
             
             return df
                 
@@ -159,22 +158,18 @@ class HotMoney(DataSourceBase):
             DataFrame: 热钱市场数据汇总
         """
         try:
-            from trade_agent.utils.tushare_utils import get_trade_date
-            
             # 获取交易日期列表
-            trade_dates = get_trade_date()
-            target_dates = [d for d in trade_dates if start_date <= d <= end_date]
+            target_dates = GLOBAL_MARKET_MANAGER.get_trading_calendar("CN-Stock").range(start_date, end_date)
             
             logger.info(f"异步获取 {start_date} 到 {end_date} 的热钱市场数据，共 {len(target_dates)} 个交易日")
             
             # 使用线程池并发获取数据
-            loop = asyncio.get_event_loop()
             tasks = []
             
             for trade_date in target_dates:
                 # 构造trigger_time格式
                 trigger_time = f"{trade_date[:4]}-{trade_date[4:6]}-{trade_date[6:8]} 10:00:00"
-                task = loop.run_in_executor(None, self._get_data_sync, trigger_time)
+                task = GLOBAL_SDK_CLIENT.fetch("tushare", self._get_data_sync, trigger_time)
                 tasks.append(task)
             
             # 等待所有任务完成
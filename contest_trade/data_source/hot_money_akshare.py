@@ -15,6 +15,7 @@ import traceback
 from datetime import datetime, timedelta
 from data_source.data_source_base import DataSourceBase
 from utils.akshare_utils import akshare_cached
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from models.llm_model import GLOBAL_LLM
 from loguru import logger
 from utils.date_utils import get_previous_trading_date
@@ -182,13 +183,15 @@ class HotMoneyAkshare(DataSourceBase):
         try:
             logger.info(f"获取 {trade_date} 的热钱市场LLM分析总结")
             
-            # 获取各类数据
-            zt_data = self.get_zt_data(trade_date)
-            dt_data = self.get_dt_data(trade_date)
-            lhb_data = self.get_lhb_data(trade_date)
-            lhb_jg_data = self.get_lhb_jg_data(trade_date)
-            concept_data = self.get_concept_data()
-            yyb_data = self.get_yyb_data()
+            # 并发获取各类数据
+            zt_data, dt_data, lhb_data, lhb_jg_data, concept_data, yyb_data = await asyncio.gather(
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_zt_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_dt_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_lhb_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_lhb_jg_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_concept_data),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_yyb_data),
+            )
             
             # 构建分析文本
             analysis_text = self._construct_analysis_text(
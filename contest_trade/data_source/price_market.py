@@ -8,6 +8,7 @@ import traceback
 from datetime import datetime
 from data_source.data_source_base import DataSourceBase
 from utils.tushare_provider import TushareDataProvider
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from models.llm_model import GLOBAL_LLM, GLOBAL_VISION_LLM
 from loguru import logger
 from config.config import cfg
@@ -207,11 +208,11 @@ class PriceMarket(DataSourceBase):
         try:
             logger.info(f"获取 {trade_date} 的价格市场LLM分析总结")
             
-            kline_data = TushareDataProvider.get_kline_data(trade_date)
-            
-            current_day_data = TushareDataProvider.get_current_day_kline_data(trade_date)
-            
-            sector_summary = TushareDataProvider.get_sector_moneyflow_summary(trade_date)
+            kline_data, current_day_data, sector_summary = await asyncio.gather(
+                GLOBAL_SDK_CLIENT.fetch("tushare", TushareDataProvider.get_kline_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("tushare", TushareDataProvider.get_current_day_kline_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("tushare", TushareDataProvider.get_sector_moneyflow_summary, trade_date),
+            )
             
             kline_charts_base64 = self.generate_kline_charts_base64(kline_data, trade_date)
             
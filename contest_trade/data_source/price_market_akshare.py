@@ -8,6 +8,7 @@ import traceback
 from datetime import datetime
 from data_source.data_source_base import DataSourceBase
 from utils.akshare_utils import akshare_cached
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from models.llm_model import GLOBAL_LLM, GLOBAL_VISION_LLM
 from loguru import logger
 from config.config import cfg
@@ -365,14 +366,12 @@ class PriceMarketAkshare(DataSourceBase):
         try:
             logger.info(f"获取 {trade_date} 的价格市场LLM分析总结")
             
-            # 获取K线数据
-            kline_data = self.get_kline_data(trade_date)
-            
-            # 获取当日数据
-            current_day_data = self.get_current_day_data(trade_date)
-            
-            # 获取板块资金流向摘要
-            sector_summary = self.get_sector_summary(trade_date)
+            # 并发获取K线数据、当日数据和板块资金流向摘要
+            kline_data, current_day_data, sector_summary = await asyncio.gather(
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_kline_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_current_day_data, trade_date),
+                GLOBAL_SDK_CLIENT.fetch("akshare", self.get_sector_summary, trade_date),
+            )
             
             # 生成K线图
             kline_charts_base64 = self.generate_kline_charts_base64(kline_data, trade_date)
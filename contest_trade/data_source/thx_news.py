@@ -15,7 +15,7 @@ class ThxNews(DataSourceBase):
 
     async def get_data(self, trigger_time: str) -> pd.DataFrame:
         previous_trading_datetime = get_previous_trading_date(trigger_time, output_format="%Y-%m-%d %H:%M:%S")
-        df = tushare_cached.run(
+        df = await tushare_cached.arun(
             func_name="major_news", 
             func_kwargs={
                 "src": "同花顺",
@@ -2,14 +2,13 @@
 thx news data crawler
 """
 import asyncio
-import requests
+import httpx
 import json
 import re
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Any
 import time
-import random
 import os
 import sys
 from loguru import logger
@@ -19,6 +18,7 @@ if package_root not in sys.path:
     sys.path.insert(0, package_root)
 
 from data_source.data_source_base import DataSourceBase
+from utils.async_clients import GLOBAL_HTTP_CLIENT
 from crawl4ai import *
 
 
@@ -106,7 +106,7 @@ class ThxNewsCrawl(DataSourceBase):
         except:
             return ""
 
-    def get_news_data(self, page: int = 1, pagesize: int = 400) -> List[Dict[str, Any]]:
+    async def get_news_data(self, page: int = 1, pagesize: int = 400) -> List[Dict[str, Any]]:
         url = "https://news.10jqka.com.cn/tapp/news/push/stock/"
         
         headers = {
@@ -131,7 +131,7 @@ class ThxNewsCrawl(DataSourceBase):
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = await GLOBAL_HTTP_CLIENT.fetch("thx", "GET", url, headers=headers, params=params, timeout=30)
             response.raise_for_status()
             data = response.json()
             news_list = data.get('data', {}).get('list', [])
@@ -154,7 +154,7 @@ class ThxNewsCrawl(DataSourceBase):
             
             return processed_news
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"请求失败: {e}")
             return []
         except json.JSONDecodeError as e:
@@ -164,19 +164,17 @@ class ThxNewsCrawl(DataSourceBase):
             print(f"未知错误: {e}")
             return []
 
-    def crawl_multiple_pages(self) -> List[Dict[str, Any]]:
+    async def crawl_multiple_pages(self) -> List[Dict[str, Any]]:
         all_news = []
         
         for page in range(1, self.max_pages + 1):
-            page_news = self.get_news_data(page=page, pagesize=400)
+            page_news = await self.get_news_data(page=page, pagesize=400)
             
             if not page_news:
                 break
                 
+            # 翻页间隔由共享HTTP客户端的thx限流控制
             all_news.extend(page_news)
-            if page < self.max_pages:
-                delay = random.uniform(1, 3)
-                time.sleep(delay)
         
         return all_news
 
@@ -224,7 +222,7 @@ class ThxNewsCrawl(DataSourceBase):
 
     async def get_data(self, trigger_time: str) -> pd.DataFrame:
         tasks = [
-            asyncio.to_thread(self.crawl_multiple_pages),  # API爬取
+            self.crawl_multiple_pages(),  # API爬取
             self.crawl_frontend_pages()  # 前端爬取
         ]
         
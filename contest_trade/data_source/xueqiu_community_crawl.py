@@ -8,7 +8,6 @@ import json
 import os
 import time
 from datetime import datetime, timedelta
-import random
 import pandas as pd
 import sys
 from typing import List, Dict
@@ -17,6 +16,7 @@ package_root = os.path.dirname(current_dir)
 if package_root not in sys.path:
     sys.path.insert(0, package_root)
 from data_source.data_source_base import DataSourceBase
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
 from loguru import logger
 
 
@@ -60,7 +60,7 @@ class XueqiuCommunityCrawl(DataSourceBase):
                 token = cookies.get('xq_a_token')
                 if token:
                     self.headers['Cookie'] = f'xq_a_token={token.value}'
-                await asyncio.sleep(random.uniform(1, 2))
+                await GLOBAL_RATE_LIMITER.aacquire("xueqiu")
         except Exception as e:
             logger.warning(f"获取雪球token失败: {e}")
 
@@ -75,7 +75,7 @@ class XueqiuCommunityCrawl(DataSourceBase):
         }
         
         try:
-            await asyncio.sleep(random.uniform(2, 4))  # 增加延迟避免被封
+            await GLOBAL_RATE_LIMITER.aacquire("xueqiu")  # 限制请求频率避免被封
             async with session.get(self.timeline_url, headers=self.headers, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
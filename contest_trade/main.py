@@ -1,10 +1,9 @@
 """
 Simplified Trade Company - 合并所有冗余代码，包装成LangGraph工作流
 """
-import re
 import json
 import asyncio
-from typing import List, Dict, TypedDict
+from typing import Any, List, Dict, TypedDict
 from langgraph.graph import END, StateGraph
 from langchain_core.runnables import RunnableConfig
 from langchain_core.callbacks import dispatch_custom_event
@@ -13,9 +12,13 @@ from .config.config import cfg, PROJECT_ROOT
 from .agents.data_analysis_agent import DataAnalysisAgent, DataAnalysisAgentConfig, DataAnalysisAgentInput
 from .agents.research_agent import ResearchAgent, ResearchAgentConfig, ResearchAgentInput
 from contest.judger_data_converter import DataFormatConverter
+from contest.signal_parser import Signal, parse_signals
 from contest.judger_executor import run_judger_critic_pipeline
 from contest.judger_executor import get_signal_details, format_signal_output
 from utils.market_manager import GLOBAL_MARKET_MANAGER
+from utils.factor_stream import FactorStream
+from models.llm_usage import GLOBAL_USAGE_TRACKER
+from models.run_budget import RunBudget
 
 # 统一的状态定义
 class CompanyState(TypedDict):
@@ -26,6 +29,14 @@ class CompanyState(TypedDict):
     optimized_weights: Dict
     all_events: List[Dict]
     step_results: Dict
+    run_budget: Any  # RunBudget，本次运行的token/耗时预算
+
+# 公司工作流的节点顺序
+COMPANY_STEPS = ["run_data_agents", "run_research_agents", "run_judger_critic", "run_contest", "finalize"]
+# 流水线模式: data agent与research agent在同一个节点内边产出边消费
+STREAMING_COMPANY_STEPS = ["run_streaming_agents", "run_judger_critic", "run_contest", "finalize"]
+
+_pipeline_config = getattr(cfg, "pipeline_config", None) or {}
 
 class SimpleTradeCompany:
     def __init__(self):
@@ -60,6 +71,19 @@ class SimpleTradeCompany:
         
         # 初始化数据转换器
         self.data_converter = DataFormatConverter(self.workspace_dir)
+        
+        # 编译好的工作流缓存，多次运行(如回测)时复用
+        self._workflows = {}
+        
+        # 执行模式: batch(所有data agent完成后再运行research) / streaming(因子到达即开始研究)
+        self.pipeline_mode = _pipeline_config.get("mode", "batch")
+        self.factor_deadline = _pipeline_config.get("factor_deadline", None)
+        self.min_factors = _pipeline_config.get("min_factors", 1)
+
+    @property
+    def company_steps(self) -> List[str]:
+        """当前执行模式下的完整节点顺序"""
+        return STREAMING_COMPANY_STEPS if self.pipeline_mode == "streaming" else COMPANY_STEPS
 
     # LangGraph节点函数
     async def run_data_agents_step(self, state: CompanyState, config: RunnableConfig) -> CompanyState:
@@ -71,7 +95,7 @@ class SimpleTradeCompany:
         # 创建并发任务
         agent_tasks = []
         for agent_id, agent in self.data_agents.items():
-            task = self._run_single_data_agent(agent_id, agent, trigger_time, config)
+            task = self._run_single_data_agent(agent_id, agent, trigger_time, config, state.get("run_budget"))
             agent_tasks.append(task)
         
         # 并发执行
@@ -110,7 +134,8 @@ class SimpleTradeCompany:
         # 创建并发任务
         agent_tasks = []
         for agent_id, agent in self.research_agents.items():
-            task = self._run_single_research_agent(agent_id, agent, trigger_time, data_factors, config)
+            task = self._run_single_research_agent(agent_id, agent, trigger_time, data_factors, config,
+                                                   run_budget=state.get("run_budget"))
             agent_tasks.append(task)
         
         # 并发执行
@@ -139,6 +164,75 @@ class SimpleTradeCompany:
             "step_results": step_results
         }
 
+    async def run_streaming_agents_step(self, state: CompanyState, config: RunnableConfig) -> CompanyState:
+        """流水线模式: research agent拿到已到达的因子即开始规划和调用工具，写报告前合并迟到的因子"""
+        trigger_time = state["trigger_time"]
+        run_budget = state.get("run_budget")
+        factor_stream = FactorStream(
+            expected=len(self.data_agents),
+            deadline_seconds=self.factor_deadline,
+            min_factors=self.min_factors,
+        )
+        
+        print("开始流水线运行Data Agents和Research Agents...")
+        
+        async def run_data_agent(agent_id, agent):
+            result = None
+            try:
+                result = await self._run_single_data_agent(agent_id, agent, trigger_time, config, run_budget)
+            except Exception as e:
+                print(f"❌ Data Agent {agent_id} 运行失败: {e}")
+            await factor_stream.put(result["factor"] if result else None)
+            return result
+        
+        async def run_research_agent(agent_id, agent):
+            factors = await factor_stream.wait_ready()
+            print(f"Research Agent {agent_id} 基于 {len(factors)}/{factor_stream.expected} 个因子开始运行")
+            return await self._run_single_research_agent(agent_id, agent, trigger_time, factors, config,
+                                                         factor_stream=factor_stream, run_budget=run_budget)
+        
+        data_tasks = [asyncio.create_task(run_data_agent(agent_id, agent)) for agent_id, agent in self.data_agents.items()]
+        research_results = await asyncio.gather(*[
+            run_research_agent(agent_id, agent) for agent_id, agent in self.research_agents.items()
+        ])
+        
+        # 超过截止时间仍未完成的data agent直接丢弃
+        await factor_stream.wait_all()
+        for task in data_tasks:
+            if not task.done():
+                task.cancel()
+        data_results = await asyncio.gather(*data_tasks, return_exceptions=True)
+        
+        # 收集结果
+        all_factors = factor_stream.snapshot()
+        all_signals = []
+        all_events = []
+        for result in data_results:
+            if result and not isinstance(result, BaseException):
+                all_events.extend(result["events"])
+        for result in research_results:
+            if result and result["signals"]:
+                all_signals.extend(result["signals"])
+                all_events.extend(result["events"])
+        
+        print(f"✅ 流水线完成，有效因子: {len(all_factors)}，有效信号总数: {len(all_signals)}")
+        
+        # 更新状态
+        all_events_state = state["all_events"].copy()
+        all_events_state.extend(all_events)
+        
+        step_results = state["step_results"].copy()
+        step_results["data_team"] = {"factors_count": len(all_factors), "events_count": len(all_events),
+                                     "dropped_count": factor_stream.dropped}
+        step_results["research_team"] = {"signals_count": len(all_signals)}
+        
+        return {
+            "data_factors": all_factors,
+            "research_signals": all_signals,
+            "all_events": all_events_state,
+            "step_results": step_results
+        }
+
     async def run_judger_critic_step(self, state: CompanyState, config: RunnableConfig) -> CompanyState:
         """运行JudgerCritic步骤 - 调用子脚本函数"""
         trigger_time = state["trigger_time"]
@@ -253,6 +347,23 @@ class SimpleTradeCompany:
             "step_results": step_results
         }
 
+        # 运行预算使用情况
+        run_budget = state.get("run_budget")
+        if run_budget is not None:
+            GLOBAL_USAGE_TRACKER.unregister_budget(trigger_time)
+            step_results = {**step_results, "run_budget": run_budget.summary()}
+
+        # 本次运行的LLM用量报告
+        try:
+            # save_report 写入后会清除该触发时间的记录，先取汇总
+            step_results = {**step_results, "llm_usage": GLOBAL_USAGE_TRACKER.summary(trigger_time)}
+            usage_report = GLOBAL_USAGE_TRACKER.save_report(trigger_time)
+            usage = step_results["llm_usage"]
+            print(f"📈 LLM用量: {usage['calls']} 次调用, prompt {usage['prompt_tokens']} / completion {usage['completion_tokens']} tokens，"
+                  f"前缀缓存命中率 {usage['cache_hit_rate']:.1%}，报告已保存到: {usage_report}")
+        except Exception as e:
+            print(f"保存LLM用量报告失败: {e}")
+
         print("✅ 最终结果步骤完成")
         
         return {
@@ -260,11 +371,12 @@ class SimpleTradeCompany:
         }
 
     # 辅助函数
-    async def _run_single_data_agent(self, agent_id: int, agent, trigger_time: str, config: RunnableConfig):
+    async def _run_single_data_agent(self, agent_id: int, agent, trigger_time: str, config: RunnableConfig,
+                                     run_budget: RunBudget = None):
         """运行单个data agent"""
         print(f"开始运行Data Agent {agent_id} ({agent.config.agent_name})...")
         
-        agent_input = DataAnalysisAgentInput(trigger_time=trigger_time)
+        agent_input = DataAnalysisAgentInput(trigger_time=trigger_time, run_budget=run_budget)
         agent_events = []
         agent_output = None
         
@@ -296,7 +408,8 @@ class SimpleTradeCompany:
             factor = agent_output['result']
         return {"factor": factor, "events": agent_events} if factor else None
 
-    async def _run_single_research_agent(self, agent_id: int, agent, trigger_time: str, factors: List, config: RunnableConfig):
+    async def _run_single_research_agent(self, agent_id: int, agent, trigger_time: str, factors: List, config: RunnableConfig,
+                                         factor_stream: FactorStream = None, run_budget: RunBudget = None):
         """运行单个research agent"""
         print(f"开始运行Research Agent {agent_id} ({agent.config.agent_name})...")
         
@@ -304,7 +417,10 @@ class SimpleTradeCompany:
         background_information = agent.build_background_information(trigger_time, agent.config.belief, factors)
         agent_input = ResearchAgentInput(
             trigger_time=trigger_time,
-            background_information=background_information
+            background_information=background_information,
+            factor_stream=factor_stream,
+            factor_count=len(factors),
+            run_budget=run_budget
         )
         
         agent_events = []
@@ -360,12 +476,10 @@ class SimpleTradeCompany:
         
         signals = []
         try:
-            # 查找所有signal块
-            signal_blocks = re.findall(r'<signal>(.*?)</signal>', output, flags=re.DOTALL)
-            
-            for signal_block in signal_blocks:
+            # 单遍解析所有signal块
+            for parsed_signal in parse_signals(output):
                 try:
-                    signal = self._parse_single_signal_block(signal_block, thinking)
+                    signal = self._parse_single_signal_block(parsed_signal, thinking)
                     if signal:
                         signals.append(signal)
                 except Exception as e:
@@ -377,85 +491,86 @@ class SimpleTradeCompany:
         
         return signals
 
-    def _parse_single_signal_block(self, signal_block: str, thinking: str):
-        """解析单个信号块"""
+    def _parse_single_signal_block(self, parsed_signal: Signal, thinking: str):
+        """把解析出的单个信号转为结果字典，字段不完整的信号丢弃"""
         try:
-            has_opportunity = re.search(r"<has_opportunity>(.*?)</has_opportunity>", signal_block, flags=re.DOTALL).group(1).strip()
-            action = re.search(r"<action>(.*?)</action>", signal_block, flags=re.DOTALL).group(1).strip()
-            symbol_code = re.search(r"<symbol_code>(.*?)</symbol_code>", signal_block, flags=re.DOTALL).group(1).strip()
-            symbol_name = re.search(r"<symbol_name>(.*?)</symbol_name>", signal_block, flags=re.DOTALL).group(1).strip()
-            
-            # 解析evidence_list
-            evidence_list_str = re.search(r"<evidence_list>(.*?)</evidence_list>", signal_block, flags=re.DOTALL).group(1)
-            evidence_list = []
-            for item in evidence_list_str.split("<evidence>"):
-                if '</evidence>' not in item:
-                    continue
-                evidence_description = item.split("</evidence>")[0].strip()
-                try:
-                    evidence_time = re.search(r"<time>(.*?)</time>", item, flags=re.DOTALL).group(1).strip()
-                except:
-                    evidence_time = "N/A"
-                try:
-                    evidence_from_source = re.search(r"<from_source>(.*?)</from_source>", item, flags=re.DOTALL).group(1).strip()
-                except:
-                    evidence_from_source = "N/A"
-                    
-                evidence_list.append({
-                    "description": evidence_description,
-                    "time": evidence_time,
-                    "from_source": evidence_from_source,
-                })
-
-            # 解析limitations
-            limitations_str = re.search(r"<limitations>(.*?)</limitations>", signal_block, flags=re.DOTALL).group(1)
-            limitations = re.findall(r"<limitation>(.*?)</limitation>", limitations_str, flags=re.DOTALL)
-            limitations = [l.strip() for l in limitations]
-            
-            # 解析probability
-            probability = re.search(r"<probability>(.*?)</probability>", signal_block, flags=re.DOTALL).group(1).strip()
+            if not parsed_signal.is_complete():
+                print(f"Error parsing single signal block: incomplete signal {parsed_signal}")
+                return None
             
             # 修正symbol信息
-            symbol_name, symbol_code = GLOBAL_MARKET_MANAGER.fix_symbol_code("CN-Stock", symbol_name, symbol_code)
+            symbol_name, symbol_code = GLOBAL_MARKET_MANAGER.fix_symbol_code(
+                "CN-Stock", parsed_signal.symbol_name, parsed_signal.symbol_code)
             
             return {
                 "thinking": thinking,
-                "has_opportunity": has_opportunity,
-                "action": action,   
+                "has_opportunity": parsed_signal.has_opportunity,
+                "action": parsed_signal.action,   
                 "symbol_code": symbol_code,
                 "symbol_name": symbol_name,
-                "evidence_list": evidence_list,
-                "limitations": limitations,
-                "probability": probability,
+                "evidence_list": [{
+                    "description": evidence["description"],
+                    "time": evidence["time"] or "N/A",
+                    "from_source": evidence["from_source"] or "N/A",
+                } for evidence in parsed_signal.evidence_list],
+                "limitations": list(parsed_signal.limitations),
+                "probability": parsed_signal.probability,
             }
         except Exception as e:
             print(f"Error parsing single signal block: {e}")
             return None
 
     # LangGraph工作流创建
-    def create_company_workflow(self):
-        """创建公司工作流"""
+    def create_company_workflow(self, steps: List[str] = None):
+        """创建公司工作流，steps为按顺序串联的节点子集，默认为当前执行模式下的完整流程"""
+        steps = list(steps or self.company_steps)
+        step_funcs = {
+            "run_streaming_agents": self.run_streaming_agents_step,
+            "run_data_agents": self.run_data_agents_step,
+            "run_research_agents": self.run_research_agents_step,
+            "run_judger_critic": self.run_judger_critic_step,
+            "run_contest": self.run_contest_step,
+            "finalize": self.finalize_step,
+        }
         workflow = StateGraph(CompanyState)
         
         # 添加节点
-        workflow.add_node("run_data_agents", self.run_data_agents_step)
-        workflow.add_node("run_research_agents", self.run_research_agents_step)
-        workflow.add_node("run_judger_critic", self.run_judger_critic_step)
-        workflow.add_node("run_contest", self.run_contest_step)
-        workflow.add_node("finalize", self.finalize_step)
+        for step in steps:
+            workflow.add_node(step, step_funcs[step])
         
         # 设置入口点
-        workflow.set_entry_point("run_data_agents")
+        workflow.set_entry_point(steps[0])
         
         # 定义边
-        workflow.add_edge("run_data_agents", "run_research_agents")
-        workflow.add_edge("run_research_agents", "run_judger_critic")
-        workflow.add_edge("run_judger_critic", "run_contest")
-        workflow.add_edge("run_contest", "finalize")
-        workflow.add_edge("finalize", END)
+        for prev_step, next_step in zip(steps, steps[1:]):
+            workflow.add_edge(prev_step, next_step)
+        workflow.add_edge(steps[-1], END)
         
         return workflow.compile()
 
+    def get_company_workflow(self, steps: List[str] = None):
+        """获取编译好的工作流，同一组节点只编译一次"""
+        key = tuple(steps or self.company_steps)
+        if key not in self._workflows:
+            self._workflows[key] = self.create_company_workflow(list(key))
+        return self._workflows[key]
+
+    @staticmethod
+    def create_initial_state(trigger_time: str) -> CompanyState:
+        """创建初始状态，并为本次运行创建并注册预算；调用方负责在工作流结束后注销"""
+        run_budget = RunBudget.from_config()
+        GLOBAL_USAGE_TRACKER.register_budget(trigger_time, run_budget)
+        return CompanyState(
+            trigger_time=trigger_time,
+            data_factors=[],
+            research_signals=[],
+            judger_scores={},
+            optimized_weights={},
+            all_events=[],
+            step_results={},
+            run_budget=run_budget
+        )
+
     async def run_company(self, trigger_time: str, config: RunnableConfig = None):
         """运行整个公司流程"""
         print("开始运行Simplified TradeCompany...")
@@ -464,19 +579,14 @@ class SimpleTradeCompany:
             config = RunnableConfig(recursion_limit=50)
         
         # 创建初始状态
-        initial_state = CompanyState(
-            trigger_time=trigger_time,
-            data_factors=[],
-            research_signals=[],
-            judger_scores={},
-            optimized_weights={},
-            all_events=[],
-            step_results={}
-        )
+        initial_state = self.create_initial_state(trigger_time)
         
-        # 运行工作流
-        workflow = self.create_company_workflow()
-        final_state = await workflow.ainvoke(initial_state, config=config)
+        # 运行工作流，无论成功与否都注销本次运行的预算
+        workflow = self.get_company_workflow()
+        try:
+            final_state = await workflow.ainvoke(initial_state, config=config)
+        finally:
+            GLOBAL_USAGE_TRACKER.unregister_budget(trigger_time)
         
         print("✅ Simplified TradeCompany完成")
         print(f"📊 最终结果:")
@@ -502,20 +612,15 @@ class SimpleTradeCompany:
             config = RunnableConfig(recursion_limit=50)
         
         # 创建初始状态
-        initial_state = CompanyState(
-            trigger_time=trigger_time,
-            data_factors=[],
-            research_signals=[],
-            judger_scores={},
-            optimized_weights={},
-            all_events=[],
-            step_results={}
-        )
+        initial_state = self.create_initial_state(trigger_time)
         
-        # 运行工作流并返回事件流
-        workflow = self.create_company_workflow()
-        async for event in workflow.astream_events(initial_state, version="v2", config=config):
-            yield event
+        # 运行工作流并返回事件流，无论成功与否都注销本次运行的预算
+        workflow = self.get_company_workflow()
+        try:
+            async for event in workflow.astream_events(initial_state, version="v2", config=config):
+                yield event
+        finally:
+            GLOBAL_USAGE_TRACKER.unregister_budget(trigger_time)
 
 if __name__ == "__main__":
     from datetime import datetime
@@ -7,7 +7,7 @@ All model implementations should inherit from this class.
 
 from abc import ABC, abstractmethod
 import asyncio
-from typing import Any, Dict, List, Optional, Union, AsyncIterator, Iterator, TypeVar, Generic
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union, AsyncIterator, Iterator, TypeVar, Generic
 
 T = TypeVar('T')  # Type variable for response content
 
@@ -15,7 +15,8 @@ T = TypeVar('T')  # Type variable for response content
 class ModelResponse(Generic[T]):
     """Base class for model responses."""
     
-    def __init__(self, content: T, reasoning_content: T, model_name: str, raw_response: Any = None, proc_response: Any = None):
+    def __init__(self, content: T, reasoning_content: T, model_name: str, raw_response: Any = None, proc_response: Any = None,
+                 timings: Optional[Dict[str, Any]] = None, usage: Optional[Dict[str, Any]] = None):
         """
         Initialize a model response.
         
@@ -23,12 +24,16 @@ class ModelResponse(Generic[T]):
             content: The content of the response
             model_name: The name of the model that generated the response
             raw_response: The raw response from the model provider (optional)
+            timings: Per-call latency info, e.g. first_token_seconds / total_seconds / attempts (optional)
+            usage: Token usage, e.g. prompt_tokens / completion_tokens / reasoning_tokens (optional)
         """
         self.content = content
         self.reasoning_content = reasoning_content
         self.model_name = model_name
         self.raw_response = raw_response
         self.proc_response = proc_response
+        self.timings = timings or {}
+        self.usage = usage or {}
 
 
 
@@ -72,21 +77,38 @@ class ResponseStream(Generic[T]):
 class AsyncResponseStream(Generic[T]):
     """Class for asynchronous streaming responses."""
     
-    def __init__(self, iterator: AsyncIterator[StreamingChunk[T]], model_name: str):
+    def __init__(self, iterator: AsyncIterator[StreamingChunk[T]], model_name: str,
+                 close: Optional[Callable[[], Awaitable[None]]] = None):
         """
         Initialize an async response stream.
         
         Args:
             iterator: An async iterator yielding StreamingChunk objects
             model_name: The name of the model generating the stream
+            close: Coroutine function releasing the underlying connection (optional)
         """
         self._iterator = iterator
+        self._close = close
         self.model_name = model_name
+        # Token usage reported by the provider at the end of the stream, if any
+        self.usage = None
     
     def __aiter__(self) -> AsyncIterator[StreamingChunk[T]]:
         """Return the async iterator."""
         return self._iterator
 
+    async def aclose(self):
+        """Stop iteration and release the underlying HTTP stream. Safe to call more than once."""
+        if hasattr(self._iterator, "aclose"):
+            try:
+                await self._iterator.aclose()
+            except RuntimeError:
+                # the generator is still running in another task; closing the connection below stops it
+                pass
+        if self._close is not None:
+            close, self._close = self._close, None
+            await close()
+
 
 class BaseAgentModel(ABC):
     """
@@ -0,0 +1,89 @@
+"""
+LLM Cache: 按请求内容寻址的LLM响应缓存
+
+key 为 (model_name, messages, temperature, max_tokens, thinking 及其他请求参数) 的哈希，
+存储复用 utils.cache_engine.CacheEngine(内存LRU + SQLite索引磁盘层)，缓存永不过期。
+
+模式(config.yaml 的 llm_cache_config.mode):
+- off: 不使用缓存(默认)
+- read_write: 命中直接返回，未命中调用模型并写入
+- replay: 只读回放，命中直接返回，未命中调用模型但不写入
+- record: 总是调用模型并覆盖写入，用于重新录制
+"""
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from config.config import cfg, PROJECT_ROOT
+from utils.cache_engine import CacheEngine
+
+LLM_CACHE_MODES = ["off", "read_write", "replay", "record"]
+
+_llm_cache_config = getattr(cfg, "llm_cache_config", None) or {}
+
+
+def _never_expire(func_name: str, func_kwargs: dict) -> Optional[float]:
+    return None
+
+
+class LLMCache:
+    """LLM响应缓存"""
+
+    def __init__(self, cache_dir=None, mode: str = "off"):
+        # YAML 中未加引号的 off 会被解析为 False
+        mode = "off" if mode in (None, False) else str(mode)
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown llm cache mode: {mode}, expected one of {LLM_CACHE_MODES}")
+        self.mode = mode
+        self.cache_dir = Path(cache_dir) if cache_dir else PROJECT_ROOT / "agents_workspace" / "llm_cache"
+        self._engine = None
+
+    @property
+    def engine(self) -> CacheEngine:
+        # 延迟创建，mode=off 时不产生任何磁盘文件
+        if self._engine is None:
+            self._engine = CacheEngine(self.cache_dir, default_policy=_never_expire)
+        return self._engine
+
+    @property
+    def readable(self) -> bool:
+        return self.mode in ("read_write", "replay")
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ("read_write", "record")
+
+    @staticmethod
+    def make_request(model_name: str, messages: List[Dict[str, Any]], temperature: float,
+                     max_tokens: Optional[int], **kwargs) -> Tuple[str, dict]:
+        """返回 (func_name, func_kwargs)，kwargs中的thinking等请求参数都参与哈希"""
+        request = {
+            "model_name": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "thinking": kwargs.pop("thinking", None),
+            "extra": kwargs,
+        }
+        return f"llm:{model_name}", request
+
+    async def aget(self, func_name: str, request: dict) -> Optional[dict]:
+        """读取缓存的响应，未命中返回None"""
+        if not self.readable:
+            return None
+        key = CacheEngine.make_key(func_name, request)
+        hit, value = await asyncio.to_thread(self.engine.get, key)
+        return value if hit else None
+
+    async def aset(self, func_name: str, request: dict, content: str, reasoning_content: str):
+        """写入模型的原始输出(未经过postprocess)"""
+        if not self.writable:
+            return
+        key = CacheEngine.make_key(func_name, request)
+        value = {"content": content, "reasoning_content": reasoning_content}
+        await asyncio.to_thread(self.engine.set, key, func_name, value)
+
+
+GLOBAL_LLM_CACHE = LLMCache(
+    cache_dir=_llm_cache_config.get("cache_dir"),
+    mode=_llm_cache_config.get("mode", "off"),
+)
@@ -9,6 +9,7 @@ import os
 import sys
 import httpx
 import openai
+import time
 import asyncio
 from pathlib import Path
 from openai import OpenAI, AsyncOpenAI
@@ -18,6 +19,9 @@ PROJECT_ROOT = Path(__file__).parent.parent.resolve()
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 from config.config import cfg
+from utils.rate_limiter import GLOBAL_RATE_LIMITER, llm_provider
+from models.llm_cache import GLOBAL_LLM_CACHE
+from models.llm_usage import GLOBAL_USAGE_TRACKER, usage_from_response
 
 from models.base_agent_model import (
     BaseAgentModel,
@@ -26,9 +30,15 @@ from models.base_agent_model import (
     ModelResponse
 )
 
+class LLMStreamTimeoutError(TimeoutError):
+    """流式响应超过首token/空闲/总时长预算"""
+
+
 class LLMModelConfig:
     def __init__(self, model_name: str, api_key: str, base_url: str,
-                 max_retries: int = 3, retry_delay: float = 20.0, timeout: float = 60.0, extra_headers: dict = None, proxys: dict = None):
+                 max_retries: int = 3, retry_delay: float = 20.0, timeout: float = 60.0, extra_headers: dict = None, proxys: dict = None,
+                 first_token_timeout: Optional[float] = 60.0, idle_timeout: Optional[float] = 60.0,
+                 total_timeout: Optional[float] = 600.0, stream_usage: bool = True):
         self.model_name = model_name
         self.api_key = api_key
         self.base_url = base_url
@@ -37,6 +47,37 @@ class LLMModelConfig:
         self.timeout = timeout
         self.extra_headers = extra_headers
         self.proxys = proxys
+        # 流式响应的时间预算(秒)，None表示不限制
+        self.first_token_timeout = first_token_timeout  # 发出请求到收到第一个token
+        self.idle_timeout = idle_timeout  # 相邻两个chunk之间
+        self.total_timeout = total_timeout  # 单次尝试从发出请求到读完响应
+        # 请求流式响应末尾返回usage(stream_options.include_usage)，不支持的服务可以关闭
+        self.stream_usage = stream_usage
+
+
+def _optional_model_settings(model_cfg: dict) -> dict:
+    """从 config.yaml 的模型配置中读取可选的流式超时和usage设置"""
+    keys = ["first_token_timeout", "idle_timeout", "total_timeout", "stream_usage"]
+    return {key: model_cfg[key] for key in keys if key in model_cfg}
+
+
+def _estimate_usage(messages: List[Dict], content: str, reasoning_content: str) -> Dict:
+    """provider未返回usage时用tiktoken估算"""
+    # 延迟导入: llm_utils 在导入时加载tiktoken编码
+    from utils.llm_utils import count_tokens
+    prompt_tokens = sum(
+        count_tokens(message.get("content")) for message in messages if isinstance(message.get("content"), str)
+    )
+    reasoning_tokens = count_tokens(reasoning_content)
+    completion_tokens = count_tokens(content) + reasoning_tokens
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "reasoning_tokens": reasoning_tokens,
+        "cached_tokens": 0,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "estimated": True,
+    }
 
 
 class LLMModel(BaseAgentModel):
@@ -74,6 +115,9 @@ class LLMModel(BaseAgentModel):
             self.api_key = os.environ.get("OPENAI_API_KEY")
         if self.base_url is None:
             self.base_url = os.environ.get("OPENAI_BASE_URL")
+        # 同一个base_url的所有模型共享限流
+        self.rate_limit_provider = llm_provider(self.base_url)
+        self.llm_cache = GLOBAL_LLM_CACHE
 
         # Initialize synchronous client
         self.client = OpenAI(
@@ -158,6 +202,11 @@ class LLMModel(BaseAgentModel):
         retry_delay: Optional[float] = None,
         timeout: Optional[float] = None,
         post_process_func: Optional[Callable[[str], str]] = None,
+        use_cache: bool = True,
+        cache_variant: Optional[str] = None,
+        first_token_timeout: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
         **kwargs
     ) -> ModelResponse[str]:
         """
@@ -172,10 +221,15 @@ class LLMModel(BaseAgentModel):
             messages: List of message dictionaries with 'role' and 'content' keys
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum number of tokens to generate
+            use_cache: Whether this call may use the LLM response cache (see models/llm_cache.py)
+            cache_variant: Extra cache key component, for repeated samples of the same prompt
+            first_token_timeout: Seconds allowed from sending the request to the first token (default: config)
+            idle_timeout: Seconds allowed between two chunks (default: config)
+            total_timeout: Seconds allowed for one attempt, request to last chunk (default: config)
             **kwargs: Additional model-specific parameters
             
         Returns:
-            A ModelResponse containing the generated content
+            A ModelResponse containing the generated content, with latency info in `timings`
         """
 
         if max_retries is None:
@@ -184,9 +238,37 @@ class LLMModel(BaseAgentModel):
             retry_delay = getattr(self, 'config', LLMModelConfig("", "", "")).retry_delay
         if timeout is None:
             timeout = 60
+        model_config = getattr(self, 'config', LLMModelConfig("", "", ""))
+        if first_token_timeout is None:
+            first_token_timeout = model_config.first_token_timeout
+        if idle_timeout is None:
+            idle_timeout = model_config.idle_timeout
+        if total_timeout is None:
+            total_timeout = model_config.total_timeout
+        call_start = time.monotonic()
+
+        # 响应缓存
+        cache_name, cache_request = None, None
+        if use_cache and self.llm_cache.mode != "off":
+            cache_name, cache_request = self.llm_cache.make_request(
+                self.model_name, messages, temperature, max_tokens, cache_variant=cache_variant, **kwargs)
+            cached = await self.llm_cache.aget(cache_name, cache_request)
+            if cached is not None:
+                timings = {"cached": True, "first_token_seconds": 0.0,
+                           "total_seconds": time.monotonic() - call_start, "attempts": 0}
+                GLOBAL_USAGE_TRACKER.record(self.model_name, None, timings, response_cached=True)
+                return ModelResponse(
+                    content=self.postprocess_response(cached["content"]),
+                    reasoning_content=cached["reasoning_content"],
+                    model_name=self.model_name,
+                    raw_response=None,
+                    proc_response=post_process_func(cached["content"]) if post_process_func is not None else None,
+                    timings=timings
+                )
 
         for attempt in range(max_retries + 1):
             try:
+                attempt_start = time.monotonic()
                 # Get the stream
                 stream = await self.a_stream_run(
                     messages=messages,
@@ -196,45 +278,118 @@ class LLMModel(BaseAgentModel):
                     **kwargs
                 )
                 
-                # Collect all chunks
-                reasoning_content = ""
-                full_content = ""
-                raw_chunks = []
-                
-                async for chunk in stream:
-                    if chunk.is_reasoning:
-                        reasoning_content += chunk.content
-                    else:
-                        full_content += chunk.content
-                    if chunk.raw_chunk is not None:
-                        raw_chunks.append(chunk.raw_chunk)
-                        if verbose:
-                            print(chunk.content, end="", flush=True)
+                # Collect all chunks under the streaming deadlines
+                total_deadline = attempt_start + total_timeout if total_timeout is not None else None
+                reasoning_content, full_content, raw_chunks, first_token_at = await self._consume_stream(
+                    stream, first_token_timeout, idle_timeout, total_deadline, verbose)
+                finished_at = time.monotonic()
+                timings = {
+                    "cached": False,
+                    "first_token_seconds": first_token_at - attempt_start if first_token_at is not None else None,
+                    "stream_seconds": finished_at - first_token_at if first_token_at is not None else None,
+                    "attempt_seconds": finished_at - attempt_start,
+                    "total_seconds": finished_at - call_start,
+                    "attempts": attempt + 1,
+                }
+                usage = usage_from_response(stream.usage) or _estimate_usage(messages, full_content, reasoning_content)
+                GLOBAL_USAGE_TRACKER.record(self.model_name, usage, timings)
             
                 if post_process_func is not None:
                     proc_response = post_process_func(full_content)
                 else:
                     proc_response = None
 
+                if cache_request is not None and (full_content or reasoning_content):
+                    await self.llm_cache.aset(cache_name, cache_request, full_content, reasoning_content)
+
                 # Create a response with the collected content
                 return ModelResponse(
                     content=self.postprocess_response(full_content),
                     reasoning_content=reasoning_content,
                     model_name=self.model_name,
                     raw_response=raw_chunks if raw_chunks else None,
-                    proc_response=proc_response
+                    proc_response=proc_response,
+                    timings=timings,
+                    usage=usage
                 )
             except Exception as e:
                 if attempt < max_retries:
+                    delay = GLOBAL_RATE_LIMITER.backoff_delay(self.rate_limit_provider, attempt, e, max_delay=retry_delay)
                     print(f"🔄 LLM API调用失败 (尝试 {attempt + 1}/{max_retries + 1}): {type(e).__name__}: {e}")
-                    print(f"⏳ 等待 {retry_delay} 秒后重试...")
-                    await asyncio.sleep(retry_delay)
+                    print(f"⏳ 等待 {delay:.1f} 秒后重试...")
+                    await asyncio.sleep(delay)
                     continue
                 else:
                     print(f"❌ LLM API调用最终失败，已重试 {max_retries} 次: {type(e).__name__}: {e}")
                     raise
     
 
+    async def _consume_stream(
+        self,
+        stream: AsyncResponseStream[str],
+        first_token_timeout: Optional[float],
+        idle_timeout: Optional[float],
+        total_deadline: Optional[float] = None,
+        verbose: bool = False
+    ):
+        """
+        Read a response stream under first-token / idle / total deadlines.
+
+        first_token_timeout and idle_timeout are relative (seconds), total_deadline is an absolute
+        time.monotonic() value shared with stream creation.
+
+        The underlying HTTP stream is always closed on return, on expiry and on cancellation.
+
+        Returns:
+            (reasoning_content, full_content, raw_chunks, first_token_at)
+
+        Raises:
+            LLMStreamTimeoutError: a deadline expired before the stream finished
+        """
+        reasoning_content = ""
+        full_content = ""
+        raw_chunks = []
+        first_token_at = None
+        started_at = time.monotonic()
+        last_chunk_at = started_at
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                # 收到第一个token前按首token预算计时(空chunk不重置)，之后按相邻chunk的空闲时间计时
+                deadlines = []
+                if first_token_at is None and first_token_timeout is not None:
+                    deadlines.append((started_at + first_token_timeout, "first token"))
+                if first_token_at is not None and idle_timeout is not None:
+                    deadlines.append((last_chunk_at + idle_timeout, "idle"))
+                if total_deadline is not None:
+                    deadlines.append((total_deadline, "total"))
+                deadline, phase = min(deadlines) if deadlines else (None, None)
+                wait = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=wait)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise LLMStreamTimeoutError(
+                        f"{self.model_name} stream exceeded {phase} timeout after "
+                        f"{time.monotonic() - started_at:.1f}s ({len(full_content) + len(reasoning_content)} chars received)"
+                    )
+                last_chunk_at = time.monotonic()
+                if first_token_at is None and chunk.content:
+                    first_token_at = last_chunk_at
+
+                if chunk.is_reasoning:
+                    reasoning_content += chunk.content
+                else:
+                    full_content += chunk.content
+                if chunk.raw_chunk is not None:
+                    raw_chunks.append(chunk.raw_chunk)
+                    if verbose:
+                        print(chunk.content, end="", flush=True)
+        finally:
+            await stream.aclose()
+        return reasoning_content, full_content, raw_chunks, first_token_at
+
     async def a_stream_run(
         self,
         messages: List[Dict[str, str]],
@@ -256,7 +411,7 @@ class LLMModel(BaseAgentModel):
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum number of tokens to generate
             max_retries: Maximum number of retry attempts (default: 3)
-            retry_delay: Delay between retries in seconds (default: 20.0)
+            retry_delay: Upper bound of the jittered exponential backoff between retries in seconds (default: 20.0)
             timeout: Timeout for each attempt in seconds (default: 60.0)
             **kwargs: Additional model-specific parameters
             
@@ -273,6 +428,7 @@ class LLMModel(BaseAgentModel):
             timeout = getattr(self, 'config', LLMModelConfig("", "", "")).timeout
         
         for attempt in range(max_retries + 1):
+            await GLOBAL_RATE_LIMITER.aacquire(self.rate_limit_provider)
             try:
                 return await asyncio.wait_for(
                     self._internal_a_stream_run(messages, temperature, max_tokens, **kwargs),
@@ -282,13 +438,15 @@ class LLMModel(BaseAgentModel):
                 asyncio.TimeoutError,
                 openai.APITimeoutError,
                 openai.APIConnectionError,
+                openai.RateLimitError,
                 ConnectionError,
                 TimeoutError
             ) as e:
                 if attempt < max_retries:
+                    delay = GLOBAL_RATE_LIMITER.backoff_delay(self.rate_limit_provider, attempt, e, max_delay=retry_delay)
                     print(f"🔄 LLM API调用失败 (尝试 {attempt + 1}/{max_retries + 1}): {type(e).__name__}: {e}")
-                    print(f"⏳ 等待 {retry_delay} 秒后重试...")
-                    await asyncio.sleep(retry_delay)
+                    print(f"⏳ 等待 {delay:.1f} 秒后重试...")
+                    await asyncio.sleep(delay)
                     continue
                 else:
                     print(f"❌ LLM API调用最终失败，已重试 {max_retries} 次: {type(e).__name__}: {e}")
@@ -327,6 +485,8 @@ class LLMModel(BaseAgentModel):
         
         if max_tokens is not None:
             params["max_tokens"] = max_tokens
+        if self.config.stream_usage:
+            params.setdefault("stream_options", {"include_usage": True})
         
         # Make API call
         if 'thinking' in params:
@@ -341,19 +501,25 @@ class LLMModel(BaseAgentModel):
         # Create async iterator that processes chunks
         async def chunk_iterator() -> AsyncIterator[StreamingChunk[str]]:
             async for chunk in stream:
+                # include_usage 时最后一个chunk的choices为空，只携带usage
+                if getattr(chunk, "usage", None) is not None:
+                    response_stream.usage = chunk.usage
                 if not chunk.choices:
                     continue
                 yield self._process_chunk(chunk)
         
-        return AsyncResponseStream(
+        response_stream = AsyncResponseStream(
             iterator=chunk_iterator(),
-            model_name=self.model_name
+            model_name=self.model_name,
+            close=stream.close
         )
+        return response_stream
 
 GLOBAL_LLM_CONFIG = LLMModelConfig(
     model_name=cfg.llm["model_name"],
     api_key=cfg.llm["api_key"],
-    base_url=cfg.llm["base_url"]
+    base_url=cfg.llm["base_url"],
+    **_optional_model_settings(cfg.llm)
 )
 GLOBAL_LLM = LLMModel(GLOBAL_LLM_CONFIG)
 
@@ -361,7 +527,8 @@ try:
     GLOBAL_THINKING_LLM_CONFIG = LLMModelConfig(
         model_name=cfg.llm_thinking["model_name"],
         api_key=cfg.llm_thinking["api_key"],
-        base_url=cfg.llm_thinking["base_url"]
+        base_url=cfg.llm_thinking["base_url"],
+        **_optional_model_settings(cfg.llm_thinking)
     )
     GLOBAL_THINKING_LLM = LLMModel(GLOBAL_THINKING_LLM_CONFIG)
 except Exception as e:
@@ -372,7 +539,8 @@ try:
     GLOBAL_VLM_CONFIG = LLMModelConfig(
         model_name=cfg.vlm["model_name"],
         api_key=cfg.vlm["api_key"],
-        base_url=cfg.vlm["base_url"]
+        base_url=cfg.vlm["base_url"],
+        **_optional_model_settings(cfg.vlm)
     )
     GLOBAL_VISION_LLM = LLMModel(GLOBAL_VLM_CONFIG)
 except Exception as e:
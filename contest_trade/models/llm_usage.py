@@ -0,0 +1,209 @@
+"""
+LLM Usage: 所有LLM调用的token与耗时统计
+
+1. 标签: 通过 contextvars 传递 agent / node / trigger_time 等标签，协程和 asyncio 任务自动继承
+   - usage_tags(**tags): 上下文管理器，在作用域内追加标签
+   - track_node: 装饰器，把被装饰的异步方法名作为 node 标签
+2. 统计: LLMModel.a_run 每次调用结束后记录 prompt / completion / reasoning / cached tokens 与耗时，
+   provider 未返回 usage 时用 tiktoken 估算(estimated=True)
+3. 报告: 按 trigger_time 汇总写入 agents_workspace/usage/usage_<trigger_time>.json，写入后清除该触发时间的记录
+4. 预算: 注册到 trigger_time 的 RunBudget 会同步计入该触发时间的每次调用
+
+可选配置 llm_usage_config.prices: 按模型配置每百万token价格，用于估算费用
+"""
+import json
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+from config.config import cfg, PROJECT_ROOT
+
+_llm_usage_config = getattr(cfg, "llm_usage_config", None) or {}
+
+TOKEN_FIELDS = ["prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens", "total_tokens"]
+
+_usage_tags: contextvars.ContextVar = contextvars.ContextVar("llm_usage_tags", default={})
+
+
+def get_usage_tags() -> Dict[str, Any]:
+    return dict(_usage_tags.get())
+
+
+@contextmanager
+def usage_tags(**tags):
+    """在作用域内追加LLM调用标签，值为None的标签忽略"""
+    merged = {**_usage_tags.get(), **{k: v for k, v in tags.items() if v is not None}}
+    token = _usage_tags.set(merged)
+    try:
+        yield merged
+    finally:
+        _usage_tags.reset(token)
+
+
+def track_node(func):
+    """
+    Agent异步方法的装饰器: 方法名作为node标签，self.config.agent_name作为agent标签，
+    第一个参数是图状态(dict)时取其中的trigger_time
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        state = args[0] if args else None
+        with usage_tags(
+            agent=getattr(getattr(self, "config", None), "agent_name", None),
+            node=func.__name__,
+            trigger_time=state.get("trigger_time") if isinstance(state, dict) else None,
+        ):
+            return await func(self, *args, **kwargs)
+    return wrapper
+
+
+def usage_from_response(usage: Any) -> Optional[Dict[str, int]]:
+    """把 openai CompletionUsage(或兼容的dict)转为统一的token字典"""
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else dict(vars(usage))
+    prompt_details = usage.get("prompt_tokens_details") or {}
+    completion_details = usage.get("completion_tokens_details") or {}
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "reasoning_tokens": completion_details.get("reasoning_tokens") or 0,
+        # deepseek 使用 prompt_cache_hit_tokens，openai 使用 prompt_tokens_details.cached_tokens
+        "cached_tokens": usage.get("prompt_cache_hit_tokens") or prompt_details.get("cached_tokens") or 0,
+        "total_tokens": usage.get("total_tokens") or prompt_tokens + completion_tokens,
+        "estimated": False,
+    }
+
+
+class LLMUsageTracker:
+    """进程内的LLM调用统计"""
+
+    def __init__(self, report_dir=None, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self.report_dir = Path(report_dir) if report_dir else PROJECT_ROOT / "agents_workspace" / "usage"
+        self.prices = prices or {}
+        self._records: List[Dict[str, Any]] = []
+        self._budgets: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register_budget(self, trigger_time: str, budget):
+        """把该触发时间之后的调用计入budget(RunBudget)"""
+        with self._lock:
+            self._budgets[trigger_time] = budget
+
+    def unregister_budget(self, trigger_time: str):
+        with self._lock:
+            self._budgets.pop(trigger_time, None)
+
+    def estimate_cost(self, model_name: str, usage: Dict[str, int]) -> Optional[float]:
+        """按 llm_usage_config.prices 估算费用，未配置价格返回None"""
+        price = self.prices.get(model_name)
+        if not price:
+            return None
+        cached = usage.get("cached_tokens", 0)
+        prompt_price = price.get("prompt", 0.0)
+        cached_price = price.get("cached_prompt", prompt_price)
+        return (
+            (usage.get("prompt_tokens", 0) - cached) * prompt_price
+            + cached * cached_price
+            + usage.get("completion_tokens", 0) * price.get("completion", 0.0)
+        ) / 1e6
+
+    def record(self, model_name: str, usage: Optional[Dict[str, Any]], timings: Optional[Dict[str, Any]] = None,
+               response_cached: bool = False) -> Dict[str, Any]:
+        """记录一次LLM调用，标签取自当前上下文"""
+        usage = usage or {}
+        timings = timings or {}
+        record = {
+            "time": time.time(),
+            "model_name": model_name,
+            **get_usage_tags(),
+            **{field: usage.get(field, 0) for field in TOKEN_FIELDS},
+            "estimated": usage.get("estimated", False),
+            "response_cached": response_cached,
+            "latency_seconds": timings.get("total_seconds"),
+            "first_token_seconds": timings.get("first_token_seconds"),
+            "attempts": timings.get("attempts"),
+        }
+        record["cost"] = None if response_cached else self.estimate_cost(model_name, record)
+        with self._lock:
+            self._records.append(record)
+            budget = self._budgets.get(record.get("trigger_time"))
+        if budget is not None:
+            budget.add_usage(record)
+        return record
+
+    def records(self, trigger_time: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self._records)
+        if trigger_time is not None:
+            records = [r for r in records if r.get("trigger_time") == trigger_time]
+        return records
+
+    @staticmethod
+    def aggregate(records: Iterable[Dict[str, Any]], group_by: Iterable[str] = ("agent", "node")) -> List[Dict[str, Any]]:
+        """按标签分组汇总token、调用次数和耗时"""
+        group_by = list(group_by)
+        groups = defaultdict(lambda: {"calls": 0, "latency_seconds": 0.0, "cost": 0.0,
+                                      **{field: 0 for field in TOKEN_FIELDS}})
+        for record in records:
+            key = tuple(record.get(tag) for tag in group_by)
+            group = groups[key]
+            group["calls"] += 1
+            group["latency_seconds"] += record.get("latency_seconds") or 0.0
+            group["cost"] += record.get("cost") or 0.0
+            for field in TOKEN_FIELDS:
+                group[field] += record.get(field) or 0
+        rows = [{**dict(zip(group_by, key)), **values} for key, values in groups.items()]
+        for row in rows:
+            # provider前缀缓存命中的prompt token比例
+            row["cache_hit_rate"] = round(row["cached_tokens"] / row["prompt_tokens"], 4) if row["prompt_tokens"] else 0.0
+        return sorted(rows, key=lambda row: row["total_tokens"], reverse=True)
+
+    def summary(self, trigger_time: Optional[str] = None) -> Dict[str, Any]:
+        """整体汇总"""
+        records = self.records(trigger_time)
+        total = self.aggregate(records, group_by=[])
+        return total[0] if total else {"calls": 0, "latency_seconds": 0.0, "cost": 0.0,
+                                       **{field: 0 for field in TOKEN_FIELDS}, "cache_hit_rate": 0.0}
+
+    def save_report(self, trigger_time: Optional[str] = None) -> Path:
+        """写入单次运行的报告(trigger_time为None时包含全部记录)；指定trigger_time时写入后清除其记录"""
+        records = self.records(trigger_time)
+        report = {
+            "trigger_time": trigger_time,
+            "summary": self.summary(trigger_time),
+            "by_agent_node": self.aggregate(records, ("agent", "node")),
+            "by_model": self.aggregate(records, ("model_name",)),
+            "records": records,
+        }
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        name = trigger_time.replace(" ", "_").replace(":", "-") if trigger_time else time.strftime("%Y-%m-%d_%H-%M-%S")
+        report_file = self.report_dir / f"usage_{name}.json"
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if trigger_time is not None:
+            self.prune(trigger_time)
+        return report_file
+
+    def prune(self, trigger_time: str):
+        """清除该触发时间的记录，避免长时间运行(回测/定时任务)时记录无限增长"""
+        with self._lock:
+            self._records = [r for r in self._records if r.get("trigger_time") != trigger_time]
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._budgets.clear()
+
+
+GLOBAL_USAGE_TRACKER = LLMUsageTracker(
+    report_dir=_llm_usage_config.get("report_dir"),
+    prices=_llm_usage_config.get("prices"),
+)
@@ -0,0 +1,102 @@
+"""
+Run Budget: 单个触发时间(一次公司运行)的token与耗时预算
+
+1. SimpleTradeCompany 为每个触发时间创建一个 RunBudget，随状态传给所有Agent
+2. 预算注册到 GLOBAL_USAGE_TRACKER，LLMModel.a_run 每次调用记录的token按 trigger_time 计入对应预算
+3. 用量(token或耗时，取较高的比例)达到 degrade_ratio 后进入降级状态，Agent自行减少LLM调用:
+   - DataAnalysisAgent: 跳过LLM标题筛选，直接取 head()
+   - ResearchAgent: 跳过规划，提前结束ReAct循环直接写报告
+4. 预算只用于降级，不会中断已经发出的请求
+
+可选配置 run_budget_config: max_tokens / max_seconds / degrade_ratio，未配置上限时不降级
+"""
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from config.config import cfg
+
+_run_budget_config = getattr(cfg, "run_budget_config", None) or {}
+
+
+class RunBudget:
+    """单次运行的token/耗时预算"""
+
+    def __init__(self, max_tokens: Optional[int] = None, max_seconds: Optional[float] = None,
+                 degrade_ratio: float = 0.8):
+        """
+        Args:
+            max_tokens: 本次运行所有LLM调用的总token上限，None表示不限制
+            max_seconds: 本次运行的墙钟时间上限，None表示不限制
+            degrade_ratio: 用量达到上限的该比例后开始降级
+        """
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.degrade_ratio = degrade_ratio
+        self.started_at = time.monotonic()
+
+        self.used_tokens = 0
+        self.calls = 0
+        self.degradations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "RunBudget":
+        return cls(
+            max_tokens=_run_budget_config.get("max_tokens"),
+            max_seconds=_run_budget_config.get("max_seconds"),
+            degrade_ratio=_run_budget_config.get("degrade_ratio", 0.8),
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def add_usage(self, usage: Dict[str, Any]):
+        """计入一次LLM调用的用量(由 GLOBAL_USAGE_TRACKER 调用)"""
+        with self._lock:
+            self.used_tokens += usage.get("total_tokens") or 0
+            self.calls += 1
+
+    @property
+    def usage_ratio(self) -> float:
+        """token与耗时两者中较高的用量比例"""
+        ratios = [0.0]
+        if self.max_tokens:
+            ratios.append(self.used_tokens / self.max_tokens)
+        if self.max_seconds:
+            ratios.append(self.elapsed / self.max_seconds)
+        return max(ratios)
+
+    @property
+    def degraded(self) -> bool:
+        """是否应该降级"""
+        return self.usage_ratio >= self.degrade_ratio
+
+    @property
+    def exhausted(self) -> bool:
+        """是否已超出预算"""
+        return self.usage_ratio >= 1.0
+
+    def note_degradation(self, agent_name: str, action: str):
+        """记录降级行为，同一agent的同一降级只记录一次"""
+        with self._lock:
+            if any(d["agent"] == agent_name and d["action"] == action for d in self.degradations):
+                return
+            self.degradations.append({
+                "agent": agent_name,
+                "action": action,
+                "used_tokens": self.used_tokens,
+                "elapsed_seconds": round(self.elapsed, 2),
+            })
+        print(f"💸 [{agent_name}] 运行预算已用 {self.usage_ratio:.0%}，降级: {action}")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "max_seconds": self.max_seconds,
+            "used_tokens": self.used_tokens,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "calls": self.calls,
+            "usage_ratio": round(self.usage_ratio, 4),
+            "degradations": list(self.degradations),
+        }
@@ -19,7 +19,8 @@ class CompanyFinancialInput(BaseModel):
     description="Get the financial information of a company",
     args_schema=CompanyFinancialInput,
     max_output_len=4000,
-    timeout_seconds=30.0
+    timeout_seconds=30.0,
+    cacheable=True
 )
 async def company_financial_info(market: str, symbol: str, task: str, trigger_time: str=None) -> str:
     tools_config = ToolManagerConfig(tool_paths=[
@@ -72,7 +73,7 @@ async def company_income(market: str, symbol: str, period: str, trigger_time: st
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("income", func_kwargs=func_args)
+            df = await tushare_cached.arun("income", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for income."}
             return df.to_markdown()
@@ -80,7 +81,7 @@ async def company_income(market: str, symbol: str, period: str, trigger_time: st
             return {"error": "The period is not in the trigger time."}
     elif market == "US-Stock":
         period_date = period[:4] + '-' + period[4:6] + '-' + period[6:8]
-        datas = finnhub_cached.run('financials', {
+        datas = await finnhub_cached.arun('financials', {
             'symbol': symbol,
             'statement': 'ic',
             'freq': "quarterly"
@@ -110,7 +111,7 @@ async def company_balance_sheet(market: str, symbol: str, period: str, trigger_t
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("balancesheet", func_kwargs=func_args)
+            df = await tushare_cached.arun("balancesheet", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for balance sheet."}
             return df.to_markdown()
@@ -118,7 +119,7 @@ async def company_balance_sheet(market: str, symbol: str, period: str, trigger_t
             return {"error": "The period is not in the trigger time."}
     elif market == "US-Stock":
         period_date = period[:4] + '-' + period[4:6] + '-' + period[6:8]
-        datas = finnhub_cached.run('financials', {
+        datas = await finnhub_cached.arun('financials', {
             'symbol': symbol,
             'statement': 'bs',
             'freq': "quarterly"
@@ -148,7 +149,7 @@ async def company_cash_flow(market: str, symbol: str, period: str, trigger_time:
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("cashflow", func_kwargs=func_args)
+            df = await tushare_cached.arun("cashflow", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for cash flow."}
             return df.to_markdown()
@@ -156,7 +157,7 @@ async def company_cash_flow(market: str, symbol: str, period: str, trigger_time:
             return {"error": "The period is not in the trigger time."}
     elif market == "US-Stock":
         period_date = period[:4] + '-' + period[4:6] + '-' + period[6:8]
-        datas = finnhub_cached.run('financials', {
+        datas = await finnhub_cached.arun('financials', {
             'symbol': symbol,
             'statement': 'cf',
             'freq': "quarterly"
@@ -188,7 +189,7 @@ async def company_forecast(market: str, symbol: str, period: str, trigger_time:
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("forecast", func_kwargs=func_args)
+            df = await tushare_cached.arun("forecast", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for forecast."}
             return df.to_markdown()
@@ -219,7 +220,7 @@ async def company_express(market: str, symbol: str, period: str, trigger_time: s
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("express", func_kwargs=func_args)
+            df = await tushare_cached.arun("express", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for express."}
             return df.to_markdown()
@@ -250,7 +251,7 @@ async def company_dividend(market: str, symbol: str, period: str, trigger_time:
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("dividend", func_kwargs=func_args)
+            df = await tushare_cached.arun("dividend", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for dividend."}
             return df.to_markdown()
@@ -281,7 +282,7 @@ async def company_fina_indicator(market: str, symbol: str, period: str, trigger_
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("fina_indicator", func_kwargs=func_args)
+            df = await tushare_cached.arun("fina_indicator", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for fina_indicator."}
             return df.to_markdown()
@@ -312,7 +313,7 @@ async def company_fina_audit(market: str, symbol: str, period: str, trigger_time
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("fina_audit", func_kwargs=func_args)
+            df = await tushare_cached.arun("fina_audit", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for fina_audit."}
             return df.to_markdown()
@@ -343,7 +344,7 @@ async def company_fina_mainbz(market: str, symbol: str, period: str, trigger_tim
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("fina_mainbz", func_kwargs=func_args)
+            df = await tushare_cached.arun("fina_mainbz", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for fina_mainbz."}
             return df.to_markdown()
@@ -374,7 +375,7 @@ async def company_disclosure_date(market: str, symbol: str, period: str, trigger
                 "ts_code": symbol,
                 "period": period
             }
-            df = tushare_cached.run("disclosure_date", func_kwargs=func_args)
+            df = await tushare_cached.arun("disclosure_date", func_kwargs=func_args)
             if df.empty:
                 return {"error": f"No data found for disclosure_date."}
             return df.to_markdown()
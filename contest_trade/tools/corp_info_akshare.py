@@ -21,7 +21,8 @@ class CompanyFinancialInput(BaseModel):
     description="Get the financial information of a company (Akshare version). Currently only support CN-Stock.",
     args_schema=CompanyFinancialInput,
     max_output_len=4000,
-    timeout_seconds=30.0
+    timeout_seconds=30.0,
+    cacheable=True
 )
 async def company_financial_info(market: str, symbol: str, task: str, trigger_time: str=None) -> str:
     if market != "CN-Stock":
@@ -77,7 +78,7 @@ async def company_income(market: str, symbol: str, period: str, trigger_time: st
         if period < trigger_date:
             try:
                 # Akshare 利润表接口获取所有股票的利润表数据
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_lrb_em",
                     func_kwargs={"date": period},
                     verbose=False
@@ -121,7 +122,7 @@ async def company_balance_sheet(market: str, symbol: str, period: str, trigger_t
             try:
                 # Akshare 资产负债表接口获取特定股票的数据
                 base_symbol = symbol.split(".")[0]  # 600519.SH -> 600519
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_financial_debt_ths",
                     func_kwargs={"symbol": base_symbol, "indicator": "按季度"},
                     verbose=False
@@ -158,7 +159,7 @@ async def company_cash_flow(market: str, symbol: str, period: str, trigger_time:
         if period < trigger_date:
             try:
                 # Akshare 现金流量表接口获取所有股票的现金流量表数据
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_xjll_em",
                     func_kwargs={"date": period},
                     verbose=False
@@ -202,7 +203,7 @@ async def company_forecast(market: str, symbol: str, period: str, trigger_time:
         if period < trigger_date:
             try:
                 # Akshare 业绩预告接口
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_yjyg_em",
                     func_kwargs={"date": period},
                     verbose=False
@@ -246,7 +247,7 @@ async def company_express(market: str, symbol: str, period: str, trigger_time: s
         if period < trigger_date:
             try:
                 # Akshare 业绩快报接口
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_yjkb_em",
                     func_kwargs={"date": period},
                     verbose=False
@@ -290,7 +291,7 @@ async def company_dividend(market: str, symbol: str, period: str, trigger_time:
         if period < trigger_date:
             try:
                 # Akshare 分红配送接口
-                df = akshare_cached.run(
+                df = await akshare_cached.arun(
                     func_name="stock_fhps_em",
                     func_kwargs={"date": period},
                     verbose=False
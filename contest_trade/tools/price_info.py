@@ -6,6 +6,7 @@ import asyncio
 from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 from utils.market_manager import GLOBAL_MARKET_MANAGER
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from tools.tool_utils import smart_tool
 
 class PriceInfoInput(BaseModel):
@@ -17,7 +18,8 @@ class PriceInfoInput(BaseModel):
     description="Get the price information of a symbol.",
     args_schema=PriceInfoInput,
     max_output_len=2000,
-    timeout_seconds=3.0
+    timeout_seconds=3.0,
+    cacheable=True
 )
 async def price_info(market: str, symbol: str, trigger_time: str=None) -> str:
     triggle_date = trigger_time.split(" ")[0].replace("-", "")
@@ -27,7 +29,7 @@ async def price_info(market: str, symbol: str, trigger_time: str=None) -> str:
     if market in ["CN-Stock", "US-Stock", "CSI300", "CSI500", "CSI1000"]:
         # recent K line info
         try:
-            df = GLOBAL_MARKET_MANAGER.get_symbol_history_price(market, symbol, start_date, end_date)
+            df = await GLOBAL_SDK_CLIENT.fetch("tushare", GLOBAL_MARKET_MANAGER.get_symbol_history_price, market, symbol, start_date, end_date)
             return {"result": df.to_markdown()}
         except Exception as e:
             print(str(e))
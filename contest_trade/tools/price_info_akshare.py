@@ -18,7 +18,8 @@ class PriceInfoInput(BaseModel):
     description="Get the price information of a symbol. Currently only support CN-Stock and HK-Stock.",
     args_schema=PriceInfoInput,
     max_output_len=2000,
-    timeout_seconds=3.0
+    timeout_seconds=3.0,
+    cacheable=True
 )
 async def price_info(market: str, symbol: str, trigger_time: str=None) -> str:
     try:
@@ -34,7 +35,7 @@ async def price_info(market: str, symbol: str, trigger_time: str=None) -> str:
             # Normalize symbol like 600519.SH -> 600519
             base_symbol = symbol.split(".")[0]
             # Fetch via akshare with caching
-            df = akshare_cached.run(
+            df = await akshare_cached.arun(
                 func_name="stock_zh_a_hist",
                 func_kwargs={
                     "symbol": base_symbol,
@@ -5,7 +5,7 @@ use bocha and serpapi to search web
 import sys
 import os
 import asyncio
-import requests
+import httpx
 import textwrap
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -15,11 +15,12 @@ from loguru import logger
 import json
 from config.config import cfg
 from tools.tool_utils import smart_tool
+from utils.async_clients import GLOBAL_HTTP_CLIENT
 
 
 sys.path.append(str(Path(__file__).parent.parent.resolve()))
 
-def ask_bocha(payload: dict, BOCHA_API_KEY: str) -> list:
+async def ask_bocha(payload: dict, BOCHA_API_KEY: str) -> list:
     """
     Performs a search using the Bocha AI API.
     API Key must be provided as an argument.
@@ -48,7 +49,7 @@ def ask_bocha(payload: dict, BOCHA_API_KEY: str) -> list:
     }
 
     try:
-        response = requests.post(BOCHA_URL, headers=headers, json=bocha_payload, timeout=5)
+        response = await GLOBAL_HTTP_CLIENT.fetch("bocha", "POST", BOCHA_URL, headers=headers, json=bocha_payload, timeout=5)
         response.raise_for_status()  # For non-200 responses
 
         response_data = response.json()
@@ -65,12 +66,12 @@ def ask_bocha(payload: dict, BOCHA_API_KEY: str) -> list:
             })
         return standardized_results
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Bocha API request failed: {e}")
         return []
 
 
-def ask_google(payload: dict, SERP_API_KEY: str) -> list:
+async def ask_google(payload: dict, SERP_API_KEY: str) -> list:
     """
     Performs a search using the SerpAPI (Google Search).
     API Key must be provided as an argument.
@@ -95,7 +96,7 @@ def ask_google(payload: dict, SERP_API_KEY: str) -> list:
             params["tbs"] = f"cdr:1,cd_min:{start_formatted},cd_max:{end_formatted}"
 
         payload = json.dumps(params)
-        response = requests.request("POST", SERP_URL, headers=headers, data=payload)
+        response = await GLOBAL_HTTP_CLIENT.fetch("serper", "POST", SERP_URL, headers=headers, content=payload)
         response.raise_for_status()
         data = response.json()
 
@@ -111,7 +112,7 @@ def ask_google(payload: dict, SERP_API_KEY: str) -> list:
         
         print(standardized_results)
         return standardized_results
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"SerpAPI request failed: {e}")
         return []
 
@@ -179,13 +180,13 @@ async def search_web(query: str, topk: int = 3, trigger_time: str = None):
     # Priority 1: Try Google Search
     if serp_api_key:
         logger.info(f"Attempting search with Google (SerpAPI) for query: '{query}'")
-        response = ask_google(payload, serp_api_key)
+        response = await ask_google(payload, serp_api_key)
     
     # Priority 2: Fallback to Bocha if the first attempt fails
     if not response and bocha_api_key:
         logger.warning("Google search failed or was not configured. Falling back to Bocha AI.")
         logger.info(f"Attempting search with Bocha AI for query: '{query}'")
-        response = ask_bocha(payload, bocha_api_key)
+        response = await ask_bocha(payload, bocha_api_key)
     
     if not response:
         logger.warning("All configured search providers failed to return results.")
@@ -0,0 +1,299 @@
+"""
+Stock Filter Plan: stock_selector / stock_selector_akshare 共用的选股计划
+
+1. LLM 不再生成任意python代码，而是生成JSON选股计划:
+   {"filter": "<pandas query 表达式>", "sort_by": "<字段>", "ascending": false, "columns": [...]}
+2. filter 用 ast 校验，只允许白名单字段、常量、比较/布尔(and/or/not/&/|/~)/算术运算和少量 Series 方法
+   (str.contains / str.startswith / str.endswith / isin / isna / notna / between)，
+   校验通过后用 DataFrame.query(engine="python") 执行，不再 exec
+3. 计划与日期无关，按 (数据源, 规范化后的query) 缓存: 进程内共享 + 磁盘持久化(跨Agent、跨交易日、跨运行复用)，
+   相同query并发时只调用一次LLM
+4. 基础数据来自按交易日缓存的 utils.fundamentals_snapshot，计划执行不修改共享的快照，筛选结果都是新的DataFrame
+
+可选配置 stock_selector_config: persist / cache_dir / max_plans
+"""
+import re
+import ast
+import json
+import asyncio
+import threading
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import pandas as pd
+from config.config import cfg, PROJECT_ROOT
+from utils.cache_engine import CacheEngine
+from models.llm_model import GLOBAL_LLM
+
+_stock_selector_config = getattr(cfg, "stock_selector_config", None) or {}
+
+# 修改计划格式或提示词时递增，使旧的缓存计划失效
+PLAN_VERSION = 1
+
+_COMPARE_OPS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn)
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+# pandas query 中 & / | 与 and / or 等价，两边只能是字段、比较或方法调用等布尔表达式
+_BOOL_BIN_OPS = (ast.BitAnd, ast.BitOr)
+_BOOL_OPERANDS = (ast.Compare, ast.Call, ast.Name, ast.BoolOp, ast.UnaryOp)
+_UNARY_OPS = (ast.Not, ast.Invert, ast.USub, ast.UAdd)
+_STR_METHODS = {"contains", "startswith", "endswith"}
+_SERIES_METHODS = {"isin", "isna", "notna", "isnull", "notnull", "between"}
+_METHOD_KEYWORDS = {"na", "case", "regex", "inclusive"}
+
+
+def _never_expire(func_name: str, func_kwargs: dict) -> Optional[float]:
+    return None
+
+
+def normalize_query(query: str) -> str:
+    """规范化自然语言query: 全角转半角、小写、合并空白、去掉结尾标点"""
+    query = unicodedata.normalize("NFKC", query or "").lower()
+    query = re.sub(r"\s+", " ", query).strip()
+    return query.rstrip("。.!?;； ")
+
+
+def _check_constant(node: ast.AST):
+    if isinstance(node, ast.Constant) and (node.value is None or isinstance(node.value, (str, int, float, bool))):
+        return
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)) \
+            and isinstance(node.operand, ast.Constant) and isinstance(node.operand.value, (int, float)):
+        return
+    raise ValueError(f"only constants are allowed here, got: {ast.unparse(node)}")
+
+
+def _check_call(node: ast.Call, columns: set):
+    func = node.func
+    if not isinstance(func, ast.Attribute):
+        raise ValueError(f"function call is not allowed: {ast.unparse(node)}")
+    target = func.value
+    if func.attr in _STR_METHODS and isinstance(target, ast.Attribute) and target.attr == "str":
+        target = target.value
+    elif func.attr not in _SERIES_METHODS:
+        raise ValueError(f"method is not allowed: {func.attr}")
+    if not isinstance(target, ast.Name) or target.id not in columns:
+        raise ValueError(f"methods can only be called on columns: {ast.unparse(node)}")
+    for arg in node.args:
+        if isinstance(arg, (ast.List, ast.Tuple)):
+            for elt in arg.elts:
+                _check_constant(elt)
+        else:
+            _check_constant(arg)
+    for keyword in node.keywords:
+        if keyword.arg not in _METHOD_KEYWORDS:
+            raise ValueError(f"keyword argument is not allowed: {keyword.arg}")
+        _check_constant(keyword.value)
+
+
+def _check_node(node: ast.AST, columns: set):
+    if isinstance(node, ast.BoolOp):
+        for value in node.values:
+            _check_node(value, columns)
+    elif isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise ValueError(f"operator is not allowed: {type(node.op).__name__}")
+        _check_node(node.operand, columns)
+    elif isinstance(node, ast.BinOp) and isinstance(node.op, _BOOL_BIN_OPS):
+        for operand in (node.left, node.right):
+            if not (isinstance(operand, _BOOL_OPERANDS)
+                    or isinstance(operand, ast.BinOp) and isinstance(operand.op, _BOOL_BIN_OPS)):
+                raise ValueError(f"& and | can only combine columns or comparisons: {ast.unparse(node)}")
+            _check_node(operand, columns)
+    elif isinstance(node, ast.BinOp):
+        if not isinstance(node.op, _BIN_OPS):
+            raise ValueError(f"operator is not allowed: {type(node.op).__name__}")
+        _check_node(node.left, columns)
+        _check_node(node.right, columns)
+    elif isinstance(node, ast.Compare):
+        if not all(isinstance(op, _COMPARE_OPS) for op in node.ops):
+            raise ValueError(f"comparison is not allowed: {ast.unparse(node)}")
+        for operand in [node.left, *node.comparators]:
+            _check_node(operand, columns)
+    elif isinstance(node, (ast.List, ast.Tuple)):
+        for elt in node.elts:
+            _check_constant(elt)
+    elif isinstance(node, ast.Name):
+        if node.id not in columns:
+            raise ValueError(f"unknown column: {node.id}")
+    elif isinstance(node, ast.Call):
+        _check_call(node, columns)
+    else:
+        _check_constant(node)
+
+
+def validate_filter_expr(expr: str, columns: Iterable[str]):
+    """校验filter表达式，不合法时抛出ValueError"""
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid filter expression: {e}")
+    _check_node(tree.body, set(columns))
+
+
+def validate_plan(plan: Any, columns: Iterable[str]) -> Dict[str, Any]:
+    """校验并规范化LLM生成的选股计划，返回只包含已知字段的新dict"""
+    if not isinstance(plan, dict):
+        raise ValueError("plan must be a json object")
+    columns = list(columns)
+    expr = (plan.get("filter") or "").strip()
+    if expr:
+        validate_filter_expr(expr, columns)
+    sort_by = plan.get("sort_by") or None
+    if sort_by is not None and sort_by not in columns:
+        raise ValueError(f"unknown sort_by column: {sort_by}")
+    output_columns = [c for c in plan.get("columns") or [] if isinstance(c, str)]
+    unknown = [c for c in output_columns if c not in columns]
+    if unknown:
+        raise ValueError(f"unknown output columns: {unknown}")
+    # ts_code, name 总是输出
+    output_columns = list(dict.fromkeys(["ts_code", "name", *output_columns]))
+    return {
+        "filter": expr,
+        "sort_by": sort_by,
+        "ascending": bool(plan.get("ascending", False)),
+        "columns": output_columns,
+    }
+
+
+def parse_plan(response: str) -> Any:
+    """从LLM回复中解析JSON计划(允许包在 ```json``` 代码块中)"""
+    code_match = re.search(r"```(?:json)?(.*?)```", response, re.DOTALL)
+    text = code_match.group(1) if code_match else response
+    json_match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not json_match:
+        raise ValueError("no json plan found in response")
+    return json.loads(json_match.group(0))
+
+
+def apply_filter_plan(stock_df: pd.DataFrame, plan: Dict[str, Any], limit: int) -> pd.DataFrame:
+    """在基础数据上执行计划，不修改stock_df"""
+    result = stock_df
+    if plan["filter"]:
+        result = result.query(plan["filter"], engine="python", local_dict={}, global_dict={})
+    if plan["sort_by"]:
+        result = result.sort_values(plan["sort_by"], ascending=plan["ascending"], kind="stable", na_position="last")
+    columns = [c for c in plan["columns"] if c in result.columns]
+    return result.iloc[:limit][columns]
+
+
+async def generate_filter_plan(prompt: str, columns: Iterable[str], retry_times: int = 3) -> Dict[str, Any]:
+    """调用LLM生成计划，解析或校验失败时把错误反馈给LLM重试"""
+    messages = [{"role": "user", "content": prompt}]
+    error_msg = ""
+    for _ in range(retry_times):
+        response = await GLOBAL_LLM.a_run(messages, verbose=False, thinking=False)
+        try:
+            return validate_plan(parse_plan(response.content), columns)
+        except Exception as e:
+            error_msg = f"Invalid plan: {e}"
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": error_msg + "\n\nPlease try again."})
+    raise ValueError(error_msg)
+
+
+class FilterPlanCache:
+    """按 (数据源, 规范化query) 缓存选股计划，进程内共享，可持久化到磁盘"""
+
+    def __init__(self, max_entries: int = 1024, persist: bool = True, cache_dir=None):
+        self.max_entries = max_entries
+        self.persist = persist
+        self.cache_dir = Path(cache_dir) if cache_dir else PROJECT_ROOT / "agents_workspace" / "stock_filter_plans"
+        self._plans: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._engine = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def engine(self) -> CacheEngine:
+        if self._engine is None:
+            self._engine = CacheEngine(self.cache_dir, default_policy=_never_expire)
+        return self._engine
+
+    @staticmethod
+    def make_key(namespace: str, query: str) -> str:
+        return CacheEngine.make_key("stock_filter_plan", {
+            "namespace": namespace, "query": normalize_query(query), "version": PLAN_VERSION})
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+            return plan
+
+    def _memory_set(self, key: str, plan: Dict[str, Any]):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    async def _load_or_create(self, key: str, create: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        if self.persist:
+            hit, plan = await asyncio.to_thread(self.engine.get, key)
+            if hit:
+                self.hits += 1
+                self._memory_set(key, plan)
+                return plan
+        self.misses += 1
+        plan = await create()
+        self._memory_set(key, plan)
+        if self.persist:
+            await asyncio.to_thread(self.engine.set, key, "stock_filter_plan", plan)
+        return plan
+
+    async def aget_or_create(self, namespace: str, query: str,
+                             create: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        读取计划，未命中时执行create生成
+
+        Args:
+            namespace: 数据源(字段集合不同的选股工具互不共享)
+            query: 自然语言query，规范化后作为key
+            create: 无参协程函数，返回已校验的计划
+        """
+        key = self.make_key(namespace, query)
+        plan = self._memory_get(key)
+        if plan is not None:
+            self.hits += 1
+            return plan
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None or future.get_loop() is not loop
+            if is_owner:
+                future = loop.create_future()
+                self._inflight[key] = future
+        if not is_owner:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        try:
+            plan = await self._load_or_create(key, create)
+            future.set_result(plan)
+            return plan
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._plans), "hits": self.hits, "misses": self.misses}
+
+
+GLOBAL_FILTER_PLAN_CACHE = FilterPlanCache(
+    max_entries=_stock_selector_config.get("max_plans", 1024),
+    persist=_stock_selector_config.get("persist", True),
+    cache_dir=_stock_selector_config.get("cache_dir"),
+)
@@ -2,40 +2,30 @@
 stock selector tool that can be used to filter stocks based on natural language query and tushare stock basic data.
 
 """
-import re
 import json
 import asyncio
-import pandas as pd
 from pydantic import BaseModel, Field
 
 from tools.tool_utils import smart_tool
-from utils.tushare_utils import pro_cached
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.fundamentals_snapshot import GLOBAL_FUNDAMENTALS
 from utils.date_utils import get_previous_trading_date
 from tools.tool_prompts import STOCK_FILTER_PROMPT
-from models.llm_model import GLOBAL_LLM
+from tools.stock_filter_plan import GLOBAL_FILTER_PLAN_CACHE, apply_filter_plan, generate_filter_plan
+
+# 选股计划可以使用的字段
+STOCK_FILTER_COLUMNS = [
+    "ts_code", "name", "area", "industry", "turnover_rate", "turnover_rate_f", "volume_ratio",
+    "pe", "pe_ttm", "pb", "ps", "ps_ttm", "dv_ratio", "dv_ttm",
+    "total_share", "float_share", "free_share", "total_mv", "circ_mv",
+]
 
 def get_basic_stock_df(trggler_time: str):
+    """从交易日基础数据快照中取上市的非ST、非北交所股票"""
     trade_date = get_previous_trading_date(trggler_time)
-    df1 = pro_cached.run(
-        func_name="daily_basic",
-        func_kwargs={
-            "ts_code": "",
-            "trade_date": trade_date,
-            "fields": "ts_code,turnover_rate, turnover_rate_f, volume_ratio, pe, pe_ttm, pb, ps, ps_ttm, dv_ratio, dv_ttm, total_share, float_share, free_share, total_mv, circ_mv"
-        }
-    )
-    df2 = pro_cached.run(
-        func_name="stock_basic",
-        func_kwargs={
-            "exchange": "",
-            "list_status": "L",
-            "fields": "ts_code,name,area,industry"
-        }
-    )
-    df2 = df2[~(df2['name'].str.contains('ST'))]
-    df2 = df2[~(df2['ts_code'].str.contains('.BJ'))]
-    df = pd.merge(df2, df1, on='ts_code', how='left')
-    return df
+    df = GLOBAL_FUNDAMENTALS.load(trade_date)
+    df = df[(df['list_status'] == 'L') & ~df['name'].str.contains('ST', na=False) & ~df['ts_code'].str.contains('.BJ')]
+    return df[STOCK_FILTER_COLUMNS]
 
 class StockSelectorInput(BaseModel):
     market: str = Field(description="目标市场，当前仅支持 CN-Stock")
@@ -78,21 +68,15 @@ class StockSelectorInput(BaseModel):
 async def stock_selector(market: str, query: str, trigger_time: str, limit: int = 10) -> str:
     try:
         # get stock df
-        stock_df = get_basic_stock_df(trigger_time)
+        stock_df = await GLOBAL_SDK_CLIENT.fetch("tushare", get_basic_stock_df, trigger_time)
 
-        # gen search code
-        prompt = STOCK_FILTER_PROMPT.format(query=query)
-        messages = [{"role": "user", "content": prompt}]
-        response = await GLOBAL_LLM.a_run(messages, verbose=False, thinking=False)
+        # get (cached) filter plan
+        plan = await GLOBAL_FILTER_PLAN_CACHE.aget_or_create(
+            "tushare", query,
+            lambda: generate_filter_plan(STOCK_FILTER_PROMPT.format(query=query), STOCK_FILTER_COLUMNS))
 
-        # parse search code
-        code_match = re.search(r"```python(.*?)```", response.content, re.DOTALL)
-        code_str = code_match.group(1)
-        exec_globals = {}
-        code_str = f'import pandas as pd\n{code_str}'
-        exec(code_str, exec_globals)
-        filter_stock_func = exec_globals['filter_stock']
-        filter_stock_df = filter_stock_func(stock_df)[:min(20, limit)]
+        # apply filter plan
+        filter_stock_df = apply_filter_plan(stock_df, plan, min(20, limit))
         result_context = json.dumps(filter_stock_df.to_dict(orient='records'), ensure_ascii=False)
         return result_context
     except Exception as e:
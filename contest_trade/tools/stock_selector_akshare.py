@@ -2,103 +2,28 @@
 Stock Selector Tool (Akshare Version)
 Based on natural language query and akshare stock basic data.
 """
-import re
 import json
 import asyncio
 import pandas as pd
-import numpy as np
 from pydantic import BaseModel, Field
 
 from tools.tool_utils import smart_tool
-from utils.akshare_utils import akshare_cached
+from utils.fundamentals_snapshot import GLOBAL_FUNDAMENTALS_AKSHARE
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from tools.tool_prompts import STOCK_FILTER_PROMPT_AKSHARE
-from models.llm_model import GLOBAL_LLM
+from tools.stock_filter_plan import GLOBAL_FILTER_PLAN_CACHE, apply_filter_plan, generate_filter_plan
 
-def get_basic_stock_df_akshare(trigger_time: str):    
+# 选股计划可以使用的字段
+STOCK_FILTER_COLUMNS_AKSHARE = [
+    "ts_code", "name", "industry", "close", "pct_chg", "change", "vol", "amount", "amplitude",
+    "high", "low", "open", "pre_close", "volume_ratio", "turnover_rate", "pe", "pb",
+    "total_share", "float_share", "total_mv", "circ_mv",
+]
+
+def get_basic_stock_df_akshare(trigger_time: str):
+    """同一天的akshare基础数据只构建一次，返回共享的只读快照"""
     try:
-        df1 = akshare_cached.run(
-            func_name="stock_zh_a_spot_em",
-            func_kwargs={},
-            verbose=False
-        )
-        
-        if df1 is None or df1.empty:
-            raise Exception("Failed to fetch stock spot data from akshare")
-        
-        columns_mapping = {
-            '代码': 'ts_code',
-            '名称': 'name', 
-            '最新价': 'close',
-            '涨跌幅': 'pct_chg',
-            '涨跌额': 'change',
-            '成交量': 'vol',
-            '成交额': 'amount',
-            '振幅': 'amplitude',
-            '最高': 'high',
-            '最低': 'low',
-            '今开': 'open',
-            '昨收': 'pre_close',
-            '量比': 'volume_ratio',
-            '换手率': 'turnover_rate',
-            '市盈率-动态': 'pe',
-            '市净率': 'pb',
-            '总市值': 'total_mv',
-            '流通市值': 'circ_mv'
-        }
-        
-        existing_mapping = {k: v for k, v in columns_mapping.items() if k in df1.columns}
-        df1 = df1.rename(columns=existing_mapping)
-        
-        numeric_columns = ['close', 'pct_chg', 'change', 'vol', 'amount', 'amplitude', 
-                          'high', 'low', 'open', 'pre_close', 'volume_ratio', 'turnover_rate', 
-                          'pe', 'pb', 'total_mv', 'circ_mv']
-        
-        for col in numeric_columns:
-            if col in df1.columns:
-                df1[col] = pd.to_numeric(df1[col], errors='coerce')
-        
-        if 'name' in df1.columns:
-            df1 = df1[~df1['name'].str.contains('ST', na=False)]
-        if 'ts_code' in df1.columns:
-            df1 = df1[~df1['ts_code'].str.contains('.BJ', na=False)]
-        
-        if 'total_mv' in df1.columns:
-            df1['total_mv'] = df1['total_mv'] / 10000
-        if 'circ_mv' in df1.columns:
-            df1['circ_mv'] = df1['circ_mv'] / 10000
-        
-        important_stocks = df1.nlargest(200, 'total_mv')['ts_code'].tolist()
-        
-        stock_details = {}
-        for ts_code in important_stocks:
-            try:
-                detail_info = akshare_cached.run(
-                    func_name='stock_individual_info_em',
-                    func_kwargs={'symbol': ts_code},
-                    verbose=False
-                )
-                
-                if detail_info is not None and not detail_info.empty:
-                    info_dict = dict(zip(detail_info['item'], detail_info['value']))
-                    stock_details[ts_code] = info_dict
-                    
-            except Exception:
-                continue
-        
-        df1['industry'] = df1['ts_code'].apply(
-            lambda x: stock_details.get(x, {}).get('行业', '未知')
-        )
-        
-        df1['total_share'] = df1['ts_code'].apply(
-            lambda x: pd.to_numeric(stock_details.get(x, {}).get('总股本', np.nan), errors='coerce') / 10000 if pd.notna(stock_details.get(x, {}).get('总股本', np.nan)) else np.nan
-        )
-        
-        df1['float_share'] = df1['ts_code'].apply(
-            lambda x: pd.to_numeric(stock_details.get(x, {}).get('流通股', np.nan), errors='coerce') / 10000 if pd.notna(stock_details.get(x, {}).get('流通股', np.nan)) else np.nan
-        )
-        
-        return df1
-        
+        return GLOBAL_FUNDAMENTALS_AKSHARE.load(trigger_time)
     except Exception as e:
         return pd.DataFrame()
 
@@ -156,36 +81,19 @@ async def stock_selector(market: str, query: str, trigger_time: str, limit: int
         return f"Error: Currently only CN-Stock is supported for Akshare version."
     
     try:
-        stock_df = get_basic_stock_df_akshare(trigger_time)
-        print(stock_df['industry'].unique().tolist())
+        stock_df = await GLOBAL_SDK_CLIENT.fetch("akshare", get_basic_stock_df_akshare, trigger_time)
         
         if stock_df.empty:
             return f"Error: Failed to fetch stock data from akshare."
 
-        prompt = STOCK_FILTER_PROMPT_AKSHARE.format(query=query)
-        messages = [{"role": "user", "content": prompt}]
-        response = await GLOBAL_LLM.a_run(messages, verbose=False, thinking=False)
-        print(response.content)
+        try:
+            plan = await GLOBAL_FILTER_PLAN_CACHE.aget_or_create(
+                "akshare", query,
+                lambda: generate_filter_plan(STOCK_FILTER_PROMPT_AKSHARE.format(query=query), STOCK_FILTER_COLUMNS_AKSHARE))
+        except ValueError as e:
+            return f"Error: LLM did not generate a valid filter plan: {e}"
 
-        code_match = re.search(r"```python(.*?)```", response.content, re.DOTALL)
-        if not code_match:
-            return f"Error: Failed to parse filter code from LLM response."
-            
-        code_str = code_match.group(1)
-        exec_globals = {}
-        code_str = f'import pandas as pd\nimport numpy as np\n{code_str}'
-        exec(code_str, exec_globals)
-        
-        if 'filter_stock' not in exec_globals:
-            return f"Error: LLM did not generate a valid filter_stock function."
-            
-        filter_stock_func = exec_globals['filter_stock']
-        filtered_result = filter_stock_func(stock_df)
-        
-        if isinstance(filtered_result, pd.DataFrame):
-            filter_stock_df = filtered_result.iloc[:min(20, limit)]
-        else:
-            return f"Error: Filter function did not return a DataFrame."
+        filter_stock_df = apply_filter_plan(stock_df, plan, min(20, limit))
         
         result_context = json.dumps(filter_stock_df.to_dict(orient='records'), ensure_ascii=False)
         return result_context
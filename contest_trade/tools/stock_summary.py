@@ -11,6 +11,7 @@ from models.llm_model import GLOBAL_VISION_LLM
 from tools.search_web import search_web
 from utils.stock_data_provider import get_all_stock_data
 from tools.tool_utils import smart_tool
+from utils.async_clients import GLOBAL_SDK_CLIENT
 
 # --- Tool Setup ---
 TOOL_HOME = Path(__file__).parent.resolve()
@@ -56,7 +57,7 @@ async def analyze_stock_basic_info(market, symbol, stock_name, trigger_time):
     
     # 1. Get all data in one call
     print("📊  Fetching all stock data...")
-    all_data = get_all_stock_data(market, symbol, stock_name, trigger_time)
+    all_data = await GLOBAL_SDK_CLIENT.fetch("tushare", get_all_stock_data, market, symbol, stock_name, trigger_time)
     print("✅  Data fetching complete.")
 
     # 2. Get news data
@@ -151,7 +152,8 @@ async def analyze_stock_basic_info(market, symbol, stock_name, trigger_time):
     description="Get stock summerized info.股票基本信息综合分析工具。输入市场、股票代码、触发时间，返回多维度数据总结结果。股票代码格式：A股使用600519.SH格式，美股使用AAPL格式。所有图片仅在内存生成并base64传递，不保存任何中间文件。终端只输出分析状态和最终结果。分析维度包括：1. 分时走势分析 2. K线技术分析 3. 财务基本面分析 4. 所在板块资金流向 5. 个股资金流向（近三日） 6. 技术面因子分析 7. 相关新闻与事件",
     args_schema=StockSummaryInput,
     max_output_len=4000,
-    timeout_seconds=120.0
+    timeout_seconds=120.0,
+    cacheable=True
 )
 async def stock_summary(market: str, symbol: str, trigger_time: str) -> str:
     """New version of the stock summary tool with refactored logic."""
@@ -167,9 +169,10 @@ async def stock_summary(market: str, symbol: str, trigger_time: str) -> str:
     if cache_file.exists():
         return cache_file.read_text()
     else:
-        stock_name = get_stock_name_by_code(symbol, market)
+        stock_name = await GLOBAL_SDK_CLIENT.fetch("tushare", get_stock_name_by_code, symbol, market)
         result = await analyze_stock_basic_info(market, symbol, stock_name, trigger_time)
-        cache_file.write_text(result)
+        if not result.startswith('LLM分析失败'):
+            cache_file.write_text(result)
         return result
 
 
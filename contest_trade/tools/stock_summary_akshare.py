@@ -6,6 +6,7 @@ import hashlib
 from pathlib import Path
 from pydantic import BaseModel, Field
 from utils.akshare_utils import akshare_cached
+from utils.async_clients import GLOBAL_SDK_CLIENT
 from models.llm_model import GLOBAL_VISION_LLM
 from tools.tool_utils import smart_tool
 from tools.search_web import search_web
@@ -206,7 +207,7 @@ class StockSummaryInput(BaseModel):
 async def analyze_stock_basic_info(market, symbol, stock_name, trigger_time):
     """Main analysis function, redesigned for Akshare-available dimensions."""
     print("📊  Fetching K-line & indicators via Akshare...")
-    all_data = get_all_stock_data(market, symbol, stock_name, trigger_time)
+    all_data = await GLOBAL_SDK_CLIENT.fetch("akshare", get_all_stock_data, market, symbol, stock_name, trigger_time)
     print("✅  Data fetching complete.")
 
     # News data (optional)
@@ -255,7 +256,8 @@ async def analyze_stock_basic_info(market, symbol, stock_name, trigger_time):
     description="""Get stock summarized technical info (Akshare-based). 仅支持A股，返回基于K线与技术指标的分析报告。""",
     args_schema=StockSummaryInput,
     max_output_len=4000,
-    timeout_seconds=120.0
+    timeout_seconds=120.0,
+    cacheable=True
 )
 async def stock_summary(market: str, symbol: str, trigger_time: str) -> str:
     """Akshare-based stock summary tool, focusing on K-line and technical indicators."""
@@ -271,9 +273,10 @@ async def stock_summary(market: str, symbol: str, trigger_time: str) -> str:
     if cache_file.exists():
         return cache_file.read_text()
     else:
-        stock_name = get_stock_name_by_code(symbol, market)
+        stock_name = await GLOBAL_SDK_CLIENT.fetch("akshare", get_stock_name_by_code, symbol, market)
         result = await analyze_stock_basic_info(market, symbol, stock_name, trigger_time)
-        cache_file.write_text(result)
+        if not result.startswith('LLM分析失败'):
+            cache_file.write_text(result)
         return result
 
 
@@ -4,7 +4,6 @@ import asyncio
 import pandas as pd
 from typing import List, Dict, Any
 from functools import lru_cache
-import re
 
 sys.path.append(str(Path(__file__).parent.parent.resolve()))
 
@@ -12,6 +11,8 @@ from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 from utils.market_manager import GLOBAL_MARKET_MANAGER
 from tools.tool_utils import smart_tool
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.symbol_index import GLOBAL_SYMBOL_INDEX_CACHE
 
 class StockSymbolSearchInput(BaseModel):
     market: str = Field(description="The target market. e.g., CN-Stock, US-Stock, HK-Stock, CN-ETF")
@@ -24,67 +25,12 @@ def get_market_symbols_cached(market: str, trigger_date: str) -> pd.DataFrame:
     """Cache market symbols to avoid repeated API calls"""
     return GLOBAL_MARKET_MANAGER.get_market_symbols(market, f"{trigger_date} 15:00:00", full_market=True)
 
-def calculate_match_score(query: str, ts_code: str, name: str) -> tuple[str, float]:
-    """Calculate match score and type"""
-    query_lower = query.lower()
-    ts_code_lower = ts_code.lower()
-    name_lower = name.lower()
-    
-    # Exact match
-    if query == ts_code or query == name:
-        return "exact", 1.0
-    if query_lower == ts_code_lower or query_lower == name_lower:
-        return "exact", 1.0
-    
-    # Prefix match
-    if ts_code_lower.startswith(query_lower) or name_lower.startswith(query_lower):
-        return "prefix", 0.9
-    
-    # Contains match
-    if query_lower in ts_code_lower or query_lower in name_lower:
-        return "contains", 0.8
-    
-    # Fuzzy match for partial code
-    if re.search(re.escape(query_lower), ts_code_lower) or re.search(re.escape(query_lower), name_lower):
-        return "fuzzy", 0.7
-    
-    return "none", 0.0
-
-def search_single_query(symbols_df: pd.DataFrame, query: str, limit: int, match_mode: str, market: str) -> List[Dict[str, Any]]:
-    """Search for a single query"""
-    results = []
-    
-    for _, row in symbols_df.iterrows():
-        ts_code = row.get('ts_code', '')
-        name = row.get('name', '')
-        
-        match_type, score = calculate_match_score(query, ts_code, name)
-        
-        if match_mode == "exact" and match_type != "exact":
-            continue
-        
-        if score > 0:
-            results.append({
-                "ts_code": ts_code,
-                "name": name,
-                "market": market,
-                "match_type": match_type,
-                "match_score": score
-            })
-    
-    # Sort by score and match type priority
-    results.sort(key=lambda x: (x['match_score'], x['match_type'] == 'exact'), reverse=True)
-    
-    if match_mode == "best":
-        return results[:1]
-    else:
-        return results[:limit]
-
 @smart_tool(
     description="Search for stock symbols by company names or partial symbols in batch mode.",
     args_schema=StockSymbolSearchInput,
     max_output_len=4000,
-    timeout_seconds=3.0
+    timeout_seconds=3.0,
+    cacheable=True
 )
 async def stock_symbol_search(
     market: str, 
@@ -97,7 +43,7 @@ async def stock_symbol_search(
     try:
         trigger_date = trigger_time.split(" ")[0].replace("-", "")
         
-        symbols_df = get_market_symbols_cached(market, trigger_date)
+        symbols_df = await GLOBAL_SDK_CLIENT.fetch("tushare", get_market_symbols_cached, market, trigger_date)
         
         if symbols_df.empty:
             return {
@@ -107,19 +53,20 @@ async def stock_symbol_search(
                 "failed_queries": [{"query": q, "error": "No market data"} for q in queries]
             }
         
-        # Process each query
+        # Answer all queries in one pass over the prebuilt (market, date) index
+        symbol_index = await GLOBAL_SDK_CLIENT.fetch(
+            "default", GLOBAL_SYMBOL_INDEX_CACHE.get, ("tushare", market, trigger_date), symbols_df)
+        matches_by_query = symbol_index.search_many(queries, limit_per_query, match_mode, market)
+        
         results = {}
         failed_queries = []
         
         for query in queries:
-            try:
-                matches = search_single_query(symbols_df, query, limit_per_query, match_mode, market)
-                if matches:
-                    results[query] = matches
-                else:
-                    failed_queries.append({"query": query, "error": "No matches found"})
-            except Exception as e:
-                failed_queries.append({"query": query, "error": str(e)})
+            matches = matches_by_query.get(query)
+            if matches:
+                results[query] = matches
+            else:
+                failed_queries.append({"query": query, "error": "No matches found"})
         
         # Generate summary
         summary = {
@@ -3,7 +3,6 @@ Stock Symbol Search Tool (AKShare Version)
 Search for stock symbols by company names or partial symbols using AKShare data.
 Replaces the tushare-dependent version with better reliability.
 """
-import re
 import json
 import asyncio
 import pandas as pd
@@ -13,6 +12,8 @@ from functools import lru_cache
 
 from tools.tool_utils import smart_tool
 from utils.akshare_utils import akshare_cached
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.symbol_index import GLOBAL_SYMBOL_INDEX_CACHE
 
 class StockSymbolSearchAkshareInput(BaseModel):
     market: str = Field(description="The target market. Currently supports: CN-Stock")
@@ -61,73 +62,22 @@ def get_stock_basic_akshare():
         print(f"Error fetching stock basic data: {e}")
         return pd.DataFrame()
 
-def calculate_match_score(query: str, ts_code: str, name: str) -> tuple[str, float]:
-    """Calculate match score and type - matches original version exactly"""
-    query_lower = query.lower()
-    ts_code_lower = ts_code.lower()
-    name_lower = name.lower()
-    
-    # Exact match
-    if query == ts_code or query == name:
-        return "exact", 1.0
-    if query_lower == ts_code_lower or query_lower == name_lower:
-        return "exact", 1.0
-    
-    # Prefix match
-    if ts_code_lower.startswith(query_lower) or name_lower.startswith(query_lower):
-        return "prefix", 0.9
-    
-    # Contains match
-    if query_lower in ts_code_lower or query_lower in name_lower:
-        return "contains", 0.8
-    
-    # Fuzzy match for partial code
-    if re.search(re.escape(query_lower), ts_code_lower) or re.search(re.escape(query_lower), name_lower):
-        return "fuzzy", 0.7
-    
-    return "none", 0.0
+def get_symbol_index_akshare(market: str, symbols_df: pd.DataFrame):
+    """get_stock_basic_akshare 在进程内只拉取一次，索引同样只构建一次"""
+    index = GLOBAL_SYMBOL_INDEX_CACHE.get(("akshare", market))
+    if index is None:
+        codes = symbols_df['ts_code'].fillna('').astype(str)
+        names = symbols_df['name'].fillna('').astype(str)
+        index = GLOBAL_SYMBOL_INDEX_CACHE.get(("akshare", market), symbols_df[(codes != '') & (names != '')])
+    return index
 
-def search_single_query(symbols_df: pd.DataFrame, query: str, limit: int, match_mode: str, market: str) -> List[Dict[str, Any]]:
-    """Search for a single query in the symbols dataframe"""
-    results = []
-    
-    if symbols_df.empty:
-        return results
-    
-    for _, row in symbols_df.iterrows():
-        ts_code = str(row.get('ts_code', ''))
-        name = str(row.get('name', ''))
-        
-        if not ts_code or not name:
-            continue
-            
-        match_type, score = calculate_match_score(query, ts_code, name)
-        
-        if match_mode == "exact" and match_type != "exact":
-            continue
-        
-        if score > 0:
-            results.append({
-                "ts_code": ts_code,
-                "name": name,
-                "market": market,
-                "match_type": match_type,
-                "match_score": score
-            })
-    
-    # Sort by score and match type priority (matches original version)
-    results.sort(key=lambda x: (x['match_score'], x['match_type'] == 'exact'), reverse=True)
-    
-    if match_mode == "best":
-        return results[:1]
-    else:
-        return results[:limit]
 
 @smart_tool(
     description="Search for stock symbols by company names or partial symbols using AKShare data. Supports Chinese company names and stock codes.",
     args_schema=StockSymbolSearchAkshareInput,
     max_output_len=4000,
-    timeout_seconds=5.0
+    timeout_seconds=5.0,
+    cacheable=True
 )
 async def stock_symbol_search(
     market: str, 
@@ -161,7 +111,7 @@ async def stock_symbol_search(
             }
         
         # Get stock basic data
-        symbols_df = get_stock_basic_akshare()
+        symbols_df = await GLOBAL_SDK_CLIENT.fetch("akshare", get_stock_basic_akshare)
         
         if symbols_df.empty:
             return {
@@ -173,7 +123,11 @@ async def stock_symbol_search(
         
         print(f"Loaded {len(symbols_df)} stocks for search")
         
-        # Process each query
+        # Answer all queries in one pass over the prebuilt index (stocks without code or name are skipped)
+        symbol_index = await GLOBAL_SDK_CLIENT.fetch("default", get_symbol_index_akshare, market, symbols_df)
+        valid_queries = [query.strip() for query in queries if query and query.strip()]
+        matches_by_query = symbol_index.search_many(valid_queries, limit_per_query, match_mode, market)
+        
         results = {}
         failed_queries = []
         
@@ -182,17 +136,13 @@ async def stock_symbol_search(
                 failed_queries.append({"query": query, "error": "Empty query"})
                 continue
                 
-            try:
-                matches = search_single_query(symbols_df, query.strip(), limit_per_query, match_mode, market)
-                if matches:
-                    results[query] = matches
-                    print(f"Query '{query}': {len(matches)} matches found")
-                else:
-                    failed_queries.append({"query": query, "error": "No matches found"})
-                    print(f"Query '{query}': No matches found")
-            except Exception as e:
-                failed_queries.append({"query": query, "error": str(e)})
-                print(f"Query '{query}': Search error - {e}")
+            matches = matches_by_query.get(query.strip())
+            if matches:
+                results[query] = matches
+                print(f"Query '{query}': {len(matches)} matches found")
+            else:
+                failed_queries.append({"query": query, "error": "No matches found"})
+                print(f"Query '{query}': No matches found")
         
         # Generate summary (matches original version)
         summary = {
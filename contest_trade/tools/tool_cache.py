@@ -0,0 +1,193 @@
+"""
+Tool Result Cache: 所有ResearchAgent共享的工具结果缓存
+
+1. key 为 工具名 + 规范化后的参数 + trigger_time
+2. 只缓存 smart_tool(cacheable=True) 声明为可缓存的工具，并且只缓存成功的结果
+3. 相同调用并发时只执行一次(in-flight去重)，其余调用方等待并共享结果
+4. 进程内LRU在整个运行期间有效；tool_cache_config.persist 开启后，
+   trigger_time 早于今天的历史结果写入磁盘(utils.cache_engine.CacheEngine)，跨运行复用
+"""
+import copy
+import json
+import asyncio
+import threading
+from pathlib import Path
+from datetime import datetime
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from config.config import cfg, PROJECT_ROOT
+from utils.cache_engine import CacheEngine
+
+_tool_cache_config = getattr(cfg, "tool_cache_config", None) or {}
+
+
+def _never_expire(func_name: str, func_kwargs: dict) -> Optional[float]:
+    return None
+
+
+def _normalize(value: Any) -> Any:
+    """参数规范化: 去掉字符串首尾空白，dict按key排序由make_key完成"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+# 工具内部捕获异常后返回的失败结果，smart_tool 仍会包装成 success=True
+_FAILURE_PREFIXES = ("LLM分析失败", "错误：", "错误:")
+
+
+def _is_success(result: Any) -> bool:
+    """只有真正成功的结果才缓存: 排除带 error 字段的返回值和失败文本"""
+    if not (isinstance(result, dict) and result.get("success")):
+        return False
+    data = result.get("data")
+    if isinstance(data, dict):
+        return not data.get("error")
+    if not isinstance(data, str):
+        return True
+    text = data.strip()
+    if text.startswith(_FAILURE_PREFIXES):
+        return False
+    if text.startswith("{"):
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            return True
+        return not (isinstance(payload, dict) and payload.get("error"))
+    return True
+
+
+class ToolResultCache:
+    """跨Agent共享的异步工具结果缓存"""
+
+    def __init__(self, max_entries: int = 4096, persist: bool = False, cache_dir=None):
+        self.max_entries = max_entries
+        self.persist = persist
+        self.cache_dir = Path(cache_dir) if cache_dir else PROJECT_ROOT / "agents_workspace" / "tool_cache"
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._engine = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def engine(self) -> CacheEngine:
+        # 延迟创建，未开启persist时不产生磁盘文件
+        if self._engine is None:
+            self._engine = CacheEngine(self.cache_dir, default_policy=_never_expire)
+        return self._engine
+
+    @staticmethod
+    def make_key(tool_name: str, kwargs: dict, trigger_time: Optional[str]) -> str:
+        args = {k: v for k, v in kwargs.items() if k != "trigger_time"}
+        return CacheEngine.make_key(f"tool:{tool_name}", {"args": _normalize(args), "trigger_time": trigger_time})
+
+    @staticmethod
+    def is_historical(trigger_time: Optional[str]) -> bool:
+        """trigger_time 早于今天时结果不会再变化"""
+        return bool(trigger_time) and trigger_time[:10] < datetime.now().strftime("%Y-%m-%d")
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            if key not in self._memory:
+                return False, None
+            self._memory.move_to_end(key)
+            return True, self._memory[key]
+
+    def _memory_set(self, key: str, result: Any):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    async def _load_or_call(self, key: str, tool_name: str, trigger_time: Optional[str],
+                            call: Callable[[], Awaitable[Any]]) -> Any:
+        persist = self.persist and self.is_historical(trigger_time)
+        if persist:
+            hit, result = await asyncio.to_thread(self.engine.get, key)
+            if hit:
+                self.hits += 1
+                self._memory_set(key, result)
+                return result
+
+        self.misses += 1
+        result = await call()
+        if _is_success(result):
+            self._memory_set(key, result)
+            if persist:
+                await asyncio.to_thread(self.engine.set, key, f"tool:{tool_name}", result)
+        return result
+
+    async def aget_or_call(self, tool_name: str, kwargs: dict, trigger_time: Optional[str],
+                           call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        读取缓存，未命中时执行call
+
+        Args:
+            tool_name: 工具名
+            kwargs: 工具参数(trigger_time不参与参数部分的key)
+            trigger_time: 触发时间
+            call: 无参协程函数，真正执行工具
+        """
+        key = self.make_key(tool_name, kwargs, trigger_time)
+        hit, result = self._memory_get(key)
+        if hit:
+            self.hits += 1
+            return copy.deepcopy(result)
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._inflight.get(key)
+            is_owner = future is None or future.get_loop() is not loop
+            if is_owner:
+                future = loop.create_future()
+                self._inflight[key] = future
+
+        if not is_owner:
+            try:
+                result = await asyncio.shield(future)
+                self.hits += 1
+                return copy.deepcopy(result)
+            except asyncio.CancelledError:
+                # 执行方被取消时自己重新执行，自身被取消则继续抛出
+                if not future.cancelled():
+                    raise
+            return await call()
+
+        try:
+            result = await self._load_or_call(key, tool_name, trigger_time, call)
+            future.set_result(result)
+            return copy.deepcopy(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待方时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+
+GLOBAL_TOOL_CACHE = ToolResultCache(
+    max_entries=_tool_cache_config.get("max_entries", 4096),
+    persist=_tool_cache_config.get("persist", False),
+    cache_dir=_tool_cache_config.get("cache_dir"),
+)
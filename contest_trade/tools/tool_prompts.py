@@ -68,17 +68,17 @@ circ_mv            float    流通市值（万元）      432333.64
 </stock_dataframe_schema>
 
 <task>
-根据用户的query，生成一个函数用于筛选股票。这个函数会被python执行器执行。因此只需要生成函数即可。
-- 生成的代码满足output_template的模板。严格按照模板生成，不要有任何其他内容。
-- 最好是按照某个数值字段进行排序，系统会默认选取排序后的前面30只股票。
-- 只输出ts_code,name和进行过筛选的字段。其他字段不需要显示。
+根据用户的query，生成一个JSON选股计划。严格按照output_template的格式输出，不要有任何其他内容。
+- filter 是 pandas DataFrame.query 表达式，只能使用schema中的字段名、常量、比较运算(== != > >= < <= in, not in)、and / or / not、加减乘除，
+  以及字段方法 str.contains / str.startswith / str.endswith / isin / isna / notna / between，例如 industry.str.contains('银行') and pe < 20。
+  不能使用其他函数、变量或import。不需要筛选时filter为空字符串。
+- 最好是按照某个数值字段进行排序(sort_by，ascending为false表示降序)，系统会默认选取排序后的前面若干只股票。
+- columns 只输出ts_code,name和进行过筛选的字段。其他字段不需要显示。
 </task>
 
 <output_template>
-```python
-def filter_stock(stock_dataframe: pd.DataFrame) -> pd.DataFrame:
-    # your filter code here
-    return filtered_df
+```json
+{{"filter": "industry == '银行' and total_mv > 10000000", "sort_by": "total_mv", "ascending": false, "columns": ["ts_code", "name", "industry", "total_mv"]}}
 ```
 </output_template>
 
@@ -114,18 +114,18 @@ circ_mv            float    流通市值（万元）      432333.64
 </stock_dataframe_schema>
 
 <task>
-根据用户的query，生成一个函数用于筛选股票。这个函数会被python执行器执行。因此只需要生成函数即可。
-- 生成的代码满足output_template的模板。严格按照模板生成，不要有任何其他内容。
-- 最好是按照某个数值字段进行排序，系统会默认选取排序后的前面30只股票。
-- 输出字段必须包含：ts_code, name, industry，以及进行过筛选的关键字段。
+根据用户的query，生成一个JSON选股计划。严格按照output_template的格式输出，不要有任何其他内容。
+- filter 是 pandas DataFrame.query 表达式，只能使用schema中的字段名、常量、比较运算(== != > >= < <= in, not in)、and / or / not、加减乘除，
+  以及字段方法 str.contains / str.startswith / str.endswith / isin / isna / notna / between，例如 industry.str.contains('银行') and pe < 20。
+  不能使用其他函数、变量或import。不需要筛选时filter为空字符串。
+- 最好是按照某个数值字段进行排序(sort_by，ascending为false表示降序)，系统会默认选取排序后的前面若干只股票。
+- columns 必须包含：ts_code, name, industry，以及进行过筛选的关键字段。
 - 如果查询涉及特定行业，请确保使用industry字段进行筛选。
 </task>
 
 <output_template>
-```python
-def filter_stock(stock_dataframe: pd.DataFrame) -> pd.DataFrame:
-    # your filter code here
-    return filtered_df
+```json
+{{"filter": "industry == '银行' and total_mv > 10000000", "sort_by": "total_mv", "ascending": false, "columns": ["ts_code", "name", "industry", "total_mv"]}}
 ```
 </output_template>
 
@@ -17,6 +17,7 @@ from typing import Dict, List, Any, Callable, Optional, Union, Type
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 from models.llm_model import GLOBAL_LLM
+from tools.tool_cache import GLOBAL_TOOL_CACHE
 
 class ToolManagerConfig:
     def __init__(self, tool_paths: List[str]):
@@ -122,13 +123,21 @@ class ToolManager:
         return json.dumps(tool_schemas, indent=2, ensure_ascii=False)
     
     async def call_tool(self, tool_name: str, kwargs: dict, trigger_time: str=None) -> Any:
-        """Call tool"""
+        """Call tool, results of cacheable tools are shared by all agents through GLOBAL_TOOL_CACHE"""
         if trigger_time:
             kwargs['trigger_time'] = trigger_time
         tool_func = self.get_tool(tool_name)
         if not tool_func:
             raise ValueError(f"Tool {tool_name} not found")
         
+        if getattr(tool_func, 'cacheable', False):
+            return await GLOBAL_TOOL_CACHE.aget_or_call(
+                tool_name, kwargs, trigger_time,
+                lambda: self._invoke_tool(tool_name, tool_func, kwargs),
+            )
+        return await self._invoke_tool(tool_name, tool_func, kwargs)
+
+    async def _invoke_tool(self, tool_name: str, tool_func: Callable, kwargs: dict) -> Any:
         try:
             print("call tool", tool_name, kwargs)
             if hasattr(tool_func, 'invoke'):
@@ -142,10 +151,23 @@ class ToolManager:
             traceback.print_exc()
             return {"error": "Call tool Failed", "error_msg": str(e)}
 
-    def parse_bounding_json(response: str) -> dict:
-        """ parse tool call from llm response """
-        bounding_json = re.search(r"<Output>(.*)</Output>", response, flags=re.DOTALL).group(1)
-        parsed_output = json.loads(bounding_json)
+    async def call_tools(self, tool_calls: List[dict], trigger_time: str = None, default_timeout: float = 60.0) -> List[Any]:
+        """Call independent tools concurrently, results keep the order of tool_calls"""
+        async def call_one(tool_call: dict) -> Any:
+            # smart_tool already enforces timeout_seconds inside, this also bounds tools without it
+            timeout = getattr(self.get_tool(tool_call.get("tool_name")), "timeout_seconds", None) or default_timeout
+            try:
+                return await asyncio.wait_for(
+                    self.call_tool(tool_call["tool_name"], dict(tool_call["properties"]), trigger_time),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                return {"success": False, "error_message": f"执行超时（{timeout}秒）"}
+            except Exception as e:
+                return {"error": "Call tool Failed", "error_msg": str(e)}
+        return await asyncio.gather(*(call_one(tool_call) for tool_call in tool_calls))
+
+    def _check_tool_call(parsed_output: dict) -> dict:
         assert "tool_name" in parsed_output, "tool_name is required in the output"
         assert "properties" in parsed_output, "properties is required in the output"
         # market in properties
@@ -153,12 +175,27 @@ class ToolManager:
             parsed_output["properties"]["market"] = parsed_output["properties"]["market"].replace(" ", "")
         return parsed_output
 
+    def parse_bounding_json(response: str) -> dict:
+        """ parse tool call from llm response """
+        bounding_json = re.search(r"<Output>(.*)</Output>", response, flags=re.DOTALL).group(1)
+        parsed_output = json.loads(bounding_json)
+        return ToolManager._check_tool_call(parsed_output)
+
+    def parse_bounding_json_list(response: str) -> List[dict]:
+        """ parse one tool call or a list of independent tool calls from llm response, always return a list """
+        bounding_json = re.search(r"<Output>(.*)</Output>", response, flags=re.DOTALL).group(1)
+        parsed_output = json.loads(bounding_json)
+        tool_calls = parsed_output if isinstance(parsed_output, list) else [parsed_output]
+        assert tool_calls, "at least one tool call is required in the output"
+        return [ToolManager._check_tool_call(tool_call) for tool_call in tool_calls]
+
     async def select_tool_by_llm(self,
-                        prompt: str, 
+                        prompt: str = None, 
                         retry_times: int = 3,
-                        post_process_func: Callable = parse_bounding_json) -> str:
-        """ use llm to select inner tool and return the tool call """
-        messages = [{"role": "user", "content": prompt}]
+                        post_process_func: Callable = parse_bounding_json,
+                        messages: List[Dict[str, str]] = None) -> str:
+        """ use llm to select inner tool and return the tool call, messages: full conversation ending with a user turn """
+        messages = list(messages) if messages else [{"role": "user", "content": prompt}]
         error_msg = ""
         for i in range(retry_times):
             if error_msg:
@@ -203,6 +240,7 @@ def smart_tool(
     max_output_len: int = 4000,
     timeout_seconds: float = 30.0,
     args_schema: Optional[Type] = None,  # 新增：支持args_schema
+    cacheable: bool = False,
 ):
     """
     智能工具装饰器 - 支持持续状态和参数schema
@@ -212,6 +250,7 @@ def smart_tool(
         max_output_len: 最大输出上下文长度
         timeout_seconds: 超时时间（秒）
         args_schema: 参数schema类（如PriceInfoInput）
+        cacheable: 相同参数和trigger_time的结果是否确定，可以在所有Agent之间共享(GLOBAL_TOOL_CACHE)
     
     Returns:
         基础格式：
@@ -231,6 +270,7 @@ def smart_tool(
         func.description = description
         func.max_output_len = max_output_len
         func.timeout_seconds = timeout_seconds
+        func.cacheable = cacheable
         
         # 根据是否有args_schema选择不同的装饰方式
         if args_schema:
@@ -246,7 +286,8 @@ def smart_tool(
         
         async_wrapper.__dict__.update({
             'max_output_len': max_output_len,
-            'timeout_seconds': timeout_seconds
+            'timeout_seconds': timeout_seconds,
+            'cacheable': cacheable
         })
         return async_wrapper
     
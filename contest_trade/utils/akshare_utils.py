@@ -3,15 +3,20 @@ akshare 的工具函数
 
 """
 import json
+import functools
 import hashlib
-import pickle
 from pathlib import Path
 from pathlib import Path
 from config.config import cfg
+from utils.cache_engine import CacheEngine, permanent_policies
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
 
 import akshare as ak
 
 DEFAULT_AKSHARE_CACHE_DIR = Path(__file__).parent / "akshare_cache"
+# 不带日期参数的基础信息接口，永久缓存
+AKSHARE_PERMANENT_FUNCTIONS = ["stock_info_a_code_name"]
 
 class CachedAksharePro:
     def __init__(self, cache_dir=None):
@@ -21,32 +26,27 @@ class CachedAksharePro:
             self.cache_dir = Path(cache_dir)
         if not self.cache_dir.exists():
             self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = CacheEngine(self.cache_dir, policies=permanent_policies(AKSHARE_PERMANENT_FUNCTIONS))
 
     def run(self, func_name: str, func_kwargs: dict, verbose: bool = False):
         func_kwargs_str = json.dumps(func_kwargs)
         return self.run_with_cache(func_name, func_kwargs_str, verbose)
 
+    async def arun(self, func_name: str, func_kwargs: dict, verbose: bool = False):
+        """run 的异步版本，相同请求并发时只拉取一次"""
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, json.dumps(func_kwargs))
+        return await self.cache.aget_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose,
+                                              runner=functools.partial(GLOBAL_SDK_CLIENT.fetch, "akshare"))
+
     def run_with_cache(self, func_name: str, func_kwargs: str, verbose: bool = False):
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, func_kwargs)
+        return self.cache.get_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose)
+
+    def _prepare(self, func_name: str, func_kwargs: str):
         func_kwargs = json.loads(func_kwargs)
         args_hash = hashlib.md5(str(func_kwargs).encode()).hexdigest()
-        func_cache_dir = self.cache_dir / func_name
-        if not func_cache_dir.exists():
-            func_cache_dir.mkdir(parents=True, exist_ok=True)
-        func_cache_file = func_cache_dir / f"{args_hash}.pkl"
-        if func_cache_file.exists():
-            if verbose:
-                print(f"load result from {func_cache_file}")
-            with open(func_cache_file, "rb") as f:
-                return pickle.load(f)
-        else:
-            if verbose:
-                print(f"cache miss for {func_name} with args: {func_kwargs}")
-            result = getattr(ak, func_name)(**func_kwargs)
-            if verbose:
-                print(f"save result to {func_cache_file}")
-            with open(func_cache_file, "wb") as f:
-                pickle.dump(result, f)
-            return result
+        legacy_cache_file = self.cache_dir / func_name / f"{args_hash}.pkl"
+        return func_kwargs, lambda: GLOBAL_RATE_LIMITER.call("akshare", getattr(ak, func_name), **func_kwargs), legacy_cache_file
 
 akshare_cached = CachedAksharePro()
 
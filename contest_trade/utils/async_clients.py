@@ -0,0 +1,139 @@
+"""
+异步数据访问层
+
+1. AsyncHttpClient: 共享连接池的 httpx.AsyncClient，用于 bocha / serper / 同花顺等HTTP数据源
+2. AsyncSDKClient: 有界线程池，用于 tushare / akshare / fmp / finnhub 等同步SDK
+
+两者都按数据源(provider)限制并发，对外提供 awaitable 的 fetch 方法，
+避免单个慢接口阻塞所有智能体共享的事件循环。
+"""
+import asyncio
+import functools
+import threading
+import weakref
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from config.config import cfg
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
+
+_data_client_config = getattr(cfg, "data_client_config", None) or {}
+
+DEFAULT_PROVIDER_CONCURRENCY = {
+    "tushare": 4,
+    "akshare": 4,
+    "fmp": 4,
+    "finnhub": 2,
+    "bocha": 4,
+    "serper": 4,
+    "thx": 2,
+    "default": 8,
+}
+
+
+class _ProviderLimits:
+    """按事件循环维护每个provider的信号量(asyncio.Semaphore 不能跨事件循环使用)"""
+
+    def __init__(self, concurrency: Dict[str, int]):
+        self.concurrency = dict(DEFAULT_PROVIDER_CONCURRENCY)
+        self.concurrency.update(concurrency or {})
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loop_semaphores = self._semaphores.setdefault(loop, {})
+            if provider not in loop_semaphores:
+                limit = self.concurrency.get(provider, self.concurrency["default"])
+                loop_semaphores[provider] = asyncio.Semaphore(limit)
+            return loop_semaphores[provider]
+
+
+class AsyncHttpClient:
+    """共享连接池的异步HTTP客户端"""
+
+    def __init__(self, max_connections: int = 32, timeout: float = 30.0, concurrency: Dict[str, int] = None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.limits = _ProviderLimits(concurrency)
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get_client(self) -> httpx.AsyncClient:
+        """每个事件循环一个连接池"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    follow_redirects=True,
+                )
+                self._clients[loop] = client
+            return client
+
+    async def fetch(self, provider: str, method: str, url: str, max_retries: int = 3, **kwargs) -> httpx.Response:
+        """
+        发送HTTP请求，按provider限流，收到429时按Retry-After退避重试
+
+        Args:
+            provider: 数据源名称，用于并发限制和限流
+            method: HTTP方法
+            url: 请求地址
+            max_retries: 429时的最大重试次数
+            **kwargs: 透传给 httpx.AsyncClient.request 的参数(headers/params/json/data/timeout等)
+        """
+        for attempt in range(max_retries + 1):
+            await GLOBAL_RATE_LIMITER.aacquire(provider)
+            async with self.limits.get(provider):
+                response = await self.get_client().request(method, url, **kwargs)
+            if response.status_code != 429 or attempt >= max_retries:
+                return response
+            error = httpx.HTTPStatusError("429 Too Many Requests", request=response.request, response=response)
+            await asyncio.sleep(GLOBAL_RATE_LIMITER.backoff_delay(provider, attempt, error))
+        return response
+
+    async def aclose(self):
+        """关闭当前事件循环的连接池"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+class AsyncSDKClient:
+    """在有界线程池中执行同步SDK调用"""
+
+    def __init__(self, max_workers: int = 16, concurrency: Dict[str, int] = None):
+        self.max_workers = max_workers
+        self.limits = _ProviderLimits(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sdk_client")
+
+    async def fetch(self, provider: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行同步函数
+
+        Args:
+            provider: 数据源名称，用于并发限制
+            func: 同步函数
+        """
+        loop = asyncio.get_running_loop()
+        async with self.limits.get(provider):
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+
+GLOBAL_HTTP_CLIENT = AsyncHttpClient(
+    max_connections=_data_client_config.get("http_max_connections", 32),
+    timeout=_data_client_config.get("http_timeout", 30.0),
+    concurrency=_data_client_config.get("provider_concurrency"),
+)
+GLOBAL_SDK_CLIENT = AsyncSDKClient(
+    max_workers=_data_client_config.get("max_workers", 16),
+    concurrency=_data_client_config.get("provider_concurrency"),
+)
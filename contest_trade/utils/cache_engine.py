@@ -0,0 +1,341 @@
+"""
+Cache Engine: 数据接口的统一分层缓存
+
+1. 内存层：进程内按字节数限制的LRU，保存序列化后的结果，避免调用方修改缓存对象
+2. 磁盘层：SQLite索引 + zlib压缩的pickle数据文件，写入采用临时文件+rename保证原子性
+3. 过期策略：按函数配置TTL，默认涉及当天及以后日期(或不带日期参数)的数据视为实时数据会过期，历史数据永久有效；
+   各数据源把不带日期的基础信息接口(stock_basic 等)通过 permanent_policies 配置为永久有效
+4. 容量控制：磁盘层超过预算时按最近访问时间淘汰
+
+兼容旧的 md5 pickle 缓存：新缓存未命中时会读取旧文件并迁移进来。
+相同请求并发未命中时只拉取一次(single-flight)，线程和协程都共享同一个进行中的请求。
+"""
+import os
+import re
+import json
+import time
+import zlib
+import pickle
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import concurrent.futures
+from pathlib import Path
+from datetime import datetime
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+from config.config import cfg
+
+_DATE_PATTERN = re.compile(r"^(\d{4})-?(\d{2})-?(\d{2})")
+
+# 对外暴露的默认参数，可以通过 config.yaml 的 cache_config 覆盖
+_cache_config = getattr(cfg, "cache_config", None) or {}
+DEFAULT_MEMORY_MAX_BYTES = int(_cache_config.get("memory_max_mb", 256) * 1024 * 1024)
+DEFAULT_DISK_BUDGET_BYTES = int(_cache_config.get("disk_budget_mb", 4096) * 1024 * 1024)
+DEFAULT_LIVE_TTL = _cache_config.get("live_ttl_seconds", 6 * 3600)
+# 所有数据源额外永久缓存的函数名
+DEFAULT_PERMANENT_FUNCTIONS = list(_cache_config.get("permanent_functions") or [])
+
+TTLPolicy = Union[None, float, Callable[[str, dict], Optional[float]]]
+
+
+def _extract_dates(value) -> list:
+    """从参数中提取所有形如 YYYYMMDD / YYYY-MM-DD 的日期"""
+    dates = []
+    if isinstance(value, dict):
+        for v in value.values():
+            dates.extend(_extract_dates(v))
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            dates.extend(_extract_dates(v))
+    elif isinstance(value, str):
+        match = _DATE_PATTERN.match(value)
+        if match:
+            dates.append("".join(match.groups()))
+    return dates
+
+
+def historical_ttl_policy(live_ttl: Optional[float] = DEFAULT_LIVE_TTL) -> Callable[[str, dict], Optional[float]]:
+    """参数中的日期全部早于今天时永久缓存，否则按live_ttl过期"""
+    def policy(func_name: str, func_kwargs: dict) -> Optional[float]:
+        dates = _extract_dates(func_kwargs)
+        today = datetime.now().strftime("%Y%m%d")
+        if dates and all(d < today for d in dates):
+            return None
+        return live_ttl
+    return policy
+
+
+def permanent_policies(func_names) -> Dict[str, TTLPolicy]:
+    """func_names 以及 cache_config.permanent_functions 中的函数永久缓存"""
+    return {func_name: None for func_name in list(func_names) + DEFAULT_PERMANENT_FUNCTIONS}
+
+
+class CacheEngine:
+    """内存LRU + SQLite索引磁盘层的缓存引擎"""
+
+    def __init__(self, cache_dir, memory_max_bytes: int = DEFAULT_MEMORY_MAX_BYTES,
+                 disk_budget_bytes: int = DEFAULT_DISK_BUDGET_BYTES,
+                 default_policy: TTLPolicy = None, policies: Optional[Dict[str, TTLPolicy]] = None):
+        self.cache_dir = Path(cache_dir)
+        self.engine_dir = self.cache_dir / "_engine"
+        self.payload_dir = self.engine_dir / "payload"
+        self.payload_dir.mkdir(parents=True, exist_ok=True)
+
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.default_policy = default_policy if default_policy is not None else historical_ttl_policy()
+        self.policies = policies or {}
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+
+        self._conn = sqlite3.connect(str(self.engine_dir / "index.sqlite"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, func_name TEXT, size INTEGER, "
+            "created_at REAL, expires_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._conn.commit()
+        self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(func_name: str, func_kwargs: dict) -> str:
+        args_str = json.dumps(func_kwargs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(f"{func_name}:{args_str}".encode()).hexdigest()
+
+    def _payload_file(self, key: str) -> Path:
+        return self.payload_dir / key[:2] / f"{key}.pkl.z"
+
+    def get_ttl(self, func_name: str, func_kwargs: dict) -> Optional[float]:
+        policy = self.policies.get(func_name, self.default_policy)
+        if callable(policy):
+            return policy(func_name, func_kwargs)
+        return policy
+
+    # ---------------- 内存层 ----------------
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        data, expires_at = item
+        if expires_at is not None and expires_at < time.time():
+            self._memory_pop(key)
+            return None
+        self._memory.move_to_end(key)
+        return data
+
+    def _memory_pop(self, key: str):
+        item = self._memory.pop(key, None)
+        if item is not None:
+            self._memory_bytes -= len(item[0])
+
+    def _memory_set(self, key: str, data: bytes, expires_at: Optional[float]):
+        if len(data) > self.memory_max_bytes:
+            return
+        self._memory_pop(key)
+        self._memory[key] = (data, expires_at)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (old_data, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_data)
+
+    # ---------------- 磁盘层 ----------------
+    def _disk_get(self, key: str):
+        row = self._conn.execute("SELECT expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        expires_at = row[0]
+        if expires_at is not None and expires_at < time.time():
+            self._disk_delete(key)
+            return None
+        payload_file = self._payload_file(key)
+        try:
+            with open(payload_file, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            self._disk_delete(key)
+            return None
+        self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return data, expires_at
+
+    def _disk_delete(self, key: str):
+        row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._conn.commit()
+        self._disk_bytes -= row[0]
+        try:
+            self._payload_file(key).unlink()
+        except OSError:
+            pass
+
+    def _disk_set(self, key: str, func_name: str, data: bytes, created_at: float, expires_at: Optional[float]):
+        payload = zlib.compress(data, 3)
+        payload_file = self._payload_file(key)
+        payload_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = payload_file.with_name(f"{payload_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_file, payload_file)
+
+        row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._disk_bytes -= row[0]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (key, func_name, size, created_at, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, func_name, len(payload), created_at, expires_at, time.time())
+        )
+        self._conn.commit()
+        self._disk_bytes += len(payload)
+        if self._disk_bytes > self.disk_budget_bytes:
+            self._evict()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到低于预算的90%"""
+        target = self.disk_budget_bytes * 0.9
+        rows = self._conn.execute("SELECT key FROM entries ORDER BY last_access ASC").fetchall()
+        for (key,) in rows:
+            if self._disk_bytes <= target:
+                break
+            self._disk_delete(key)
+
+    # ---------------- 对外接口 ----------------
+    def get(self, key: str):
+        """返回 (是否命中, 结果)"""
+        with self._lock:
+            data = self._memory_get(key)
+            if data is None:
+                disk_item = self._disk_get(key)
+                if disk_item is None:
+                    return False, None
+                data, expires_at = disk_item
+                self._memory_set(key, data, expires_at)
+        return True, pickle.loads(data)
+
+    def set(self, key: str, func_name: str, value: Any, ttl: Optional[float] = None, created_at: Optional[float] = None) -> bytes:
+        """写入缓存，返回序列化后的结果"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        created_at = created_at or time.time()
+        expires_at = created_at + ttl if ttl is not None else None
+        if expires_at is not None and expires_at < time.time():
+            return data
+        with self._lock:
+            self._disk_set(key, func_name, data, created_at, expires_at)
+            self._memory_set(key, data, expires_at)
+        return data
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._memory_pop(key)
+            self._disk_delete(key)
+
+    def _load_or_fetch(self, key: str, func_name: str, func_kwargs: dict, fetch_func: Callable[[], Any],
+                       legacy_file: Optional[Path], verbose: bool):
+        """未命中时依次尝试旧版pickle缓存和fetch_func，返回 (结果, 序列化结果)"""
+        ttl = self.get_ttl(func_name, func_kwargs)
+        if legacy_file is not None and Path(legacy_file).exists():
+            created_at = Path(legacy_file).stat().st_mtime
+            if ttl is None or created_at + ttl > time.time():
+                if verbose:
+                    print(f"load result from {legacy_file}")
+                with open(legacy_file, "rb") as f:
+                    value = pickle.load(f)
+                return value, self.set(key, func_name, value, ttl=ttl, created_at=created_at)
+
+        if verbose:
+            print(f"cache miss for {func_name} with args: {func_kwargs}")
+        value = fetch_func()
+        return value, self.set(key, func_name, value, ttl=ttl)
+
+    def _acquire_inflight(self, key: str):
+        """返回 (future, 是否由当前调用方负责拉取)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = concurrent.futures.Future()
+            self._inflight[key] = future
+            return future, True
+
+    def get_or_fetch(self, func_name: str, func_kwargs: dict, fetch_func: Callable[[], Any],
+                     legacy_file: Optional[Path] = None, verbose: bool = False):
+        """
+        读取缓存，未命中时依次尝试旧版pickle缓存和fetch_func
+
+        同一个key同时只会有一个调用方真正执行fetch_func，其余调用方等待并共享结果(各自反序列化一份)。
+
+        Args:
+            func_name: 函数名/接口名，用于TTL策略
+            func_kwargs: 参数字典
+            fetch_func: 缓存未命中时调用的无参函数
+            legacy_file: 旧版 md5 pickle 缓存文件路径
+        """
+        key = self.make_key(func_name, func_kwargs)
+        hit, value = self.get(key)
+        if hit:
+            if verbose:
+                print(f"load result from cache {func_name} {key}")
+            return value
+
+        future, is_owner = self._acquire_inflight(key)
+        if not is_owner:
+            if verbose:
+                print(f"wait for in-flight request {func_name} with args: {func_kwargs}")
+            return pickle.loads(future.result())
+
+        try:
+            # 拿到拉取权之前其他调用方可能刚刚写入
+            hit, value = self.get(key)
+            if hit:
+                future.set_result(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                return value
+            value, data = self._load_or_fetch(key, func_name, func_kwargs, fetch_func, legacy_file, verbose)
+            future.set_result(data)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_fetch(self, func_name: str, func_kwargs: dict, fetch_func: Callable[[], Any],
+                            legacy_file: Optional[Path] = None, verbose: bool = False,
+                            runner: Optional[Callable[..., Awaitable[Any]]] = None):
+        """
+        get_or_fetch 的协程版本，不阻塞事件循环
+
+        内存命中直接返回；已有进行中的请求时等待其结果(不占用线程)；否则通过runner在线程中执行get_or_fetch。
+
+        Args:
+            runner: 形如 runner(func, *args) 的协程函数，默认 asyncio.to_thread
+        """
+        key = self.make_key(func_name, func_kwargs)
+        with self._lock:
+            data = self._memory_get(key)
+            future = self._inflight.get(key) if data is None else None
+        if data is not None:
+            return pickle.loads(data)
+        if future is not None:
+            return pickle.loads(await asyncio.wrap_future(future))
+        runner = runner or asyncio.to_thread
+        return await runner(self.get_or_fetch, func_name, func_kwargs, fetch_func, legacy_file, verbose)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": entries,
+                "disk_bytes": self._disk_bytes,
+            }
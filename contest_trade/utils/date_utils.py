@@ -21,12 +21,8 @@ def get_previous_trading_date(trigger_time: str, output_format: str = "%Y%m%d")
     trigger_datetime = datetime.strptime(trigger_time, '%Y-%m-%d %H:%M:%S')
     trigger_date = trigger_datetime.strftime('%Y%m%d')
     
-    # 获取交易日列表
-    trade_dates = GLOBAL_MARKET_MANAGER.get_trade_date(market_name="CN-Stock")
-    
     # 找到上一个交易日
-    previous_dates = [dt for dt in trade_dates if dt < trigger_date]
-    previous_trading_date = previous_dates[-1]
+    previous_trading_date = GLOBAL_MARKET_MANAGER.get_trading_calendar("CN-Stock").prev(trigger_date)
     previous_trading_datetime = previous_trading_date[:4] + "-" + previous_trading_date[4:6] + "-" + previous_trading_date[6:] + " " + trigger_time.split(" ")[1]
     previous_trading_date_formatted = datetime.strptime(previous_trading_datetime, "%Y-%m-%d %H:%M:%S").strftime(output_format)
     return previous_trading_date_formatted
@@ -0,0 +1,86 @@
+"""
+Factor Stream: 流水线模式下data agent与research agent之间的因子通道
+
+data agent 每完成一个因子就放入通道，research agent 不必等所有data agent完成:
+1. 至少拿到 min_factors 个因子(或到达截止时间)后即可开始规划和调用工具
+2. 写报告前再把迟到的因子合并进上下文，超过截止时间仍未到达的因子被丢弃
+"""
+import time
+import asyncio
+from typing import Any, List, Optional
+
+
+class FactorStream:
+    """单个触发时间内的因子通道"""
+
+    def __init__(self, expected: int, deadline_seconds: Optional[float] = None, min_factors: int = 1):
+        """
+        Args:
+            expected: 预期的因子数量(data agent数量)
+            deadline_seconds: 从创建通道开始等待因子的最长秒数，None表示一直等待
+            min_factors: research agent开始前至少需要的因子数
+        """
+        self.expected = expected
+        self.deadline_seconds = deadline_seconds
+        self.min_factors = min(min_factors, expected)
+        self.started_at = time.monotonic()
+
+        self._factors: List[Any] = []
+        self._finished = 0
+        self._late = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        """所有data agent都已结束(无论是否产出因子)"""
+        return self._finished >= self.expected
+
+    @property
+    def dropped(self) -> int:
+        """截止时间前未产出因子而被丢弃的data agent数量"""
+        return self.expected - self._finished + self._late
+
+    @property
+    def expired(self) -> bool:
+        """是否已过截止时间"""
+        return self._remaining() == 0.0
+
+    def _remaining(self) -> Optional[float]:
+        if self.deadline_seconds is None:
+            return None
+        return max(0.0, self.started_at + self.deadline_seconds - time.monotonic())
+
+    async def put(self, factor: Any = None):
+        """data agent结束时调用，factor为None表示该agent没有产出"""
+        async with self._changed:
+            # 截止时间之后到达的因子直接丢弃，保证所有research agent看到同一组因子
+            if factor is not None:
+                if self.expired:
+                    self._late += 1
+                else:
+                    self._factors.append(factor)
+            self._finished += 1
+            self._changed.notify_all()
+
+    def snapshot(self) -> List[Any]:
+        """当前已到达的因子"""
+        return list(self._factors)
+
+    async def _wait_for(self, predicate) -> List[Any]:
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(predicate), timeout=self._remaining())
+            except asyncio.TimeoutError:
+                pass
+            return list(self._factors)
+
+    async def wait_ready(self) -> List[Any]:
+        """等待到至少min_factors个因子(或全部结束/到达截止时间)，返回已到达的因子"""
+        return await self._wait_for(lambda: len(self._factors) >= self.min_factors or self.finished)
+
+    async def wait_all(self) -> List[Any]:
+        """等待全部data agent结束或到达截止时间，返回已到达的因子，未到达的视为丢弃"""
+        factors = await self._wait_for(lambda: self.finished)
+        if not self.finished:
+            print(f"⏰ 因子截止时间已到，{self.dropped} 个data agent未完成，丢弃其结果")
+        return factors
@@ -7,17 +7,22 @@ finnhub 的工具函数
 """
 import os
 import json
+import functools
 import pandas as pd
 import finnhub
 from pathlib import Path
 from datetime import datetime, timedelta
 from functools import lru_cache
 import hashlib
-import pickle
 import time
 from config.config import cfg
+from utils.cache_engine import CacheEngine, permanent_policies
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
 
 DEFAULT_FINNHUB_CACHE_DIR = Path(__file__).parent / "finnhub_cache"
+# 不带日期参数的基础信息接口，永久缓存
+FINNHUB_PERMANENT_FUNCTIONS = ["company_profile2"]
 
 class CachedFinnhubClient:
     def __init__(self, cache_dir=None, api_key=None):
@@ -33,7 +38,7 @@ class CachedFinnhubClient:
             api_key = cfg.finnhub_key
         
         self.client = finnhub.Client(api_key=api_key)
-        self.rate_limit_delay = 1.0  # API限制，每秒最多60次请求
+        self.cache = CacheEngine(self.cache_dir, policies=permanent_policies(FINNHUB_PERMANENT_FUNCTIONS))
 
     def run(self, func_name: str, func_kwargs: dict, verbose: bool = False):
         """
@@ -47,45 +52,37 @@ class CachedFinnhubClient:
         func_kwargs_str = json.dumps(func_kwargs, sort_keys=True)
         return self.run_with_cache(func_name, func_kwargs_str, verbose)
     
+    async def arun(self, func_name: str, func_kwargs: dict, verbose: bool = False):
+        """run 的异步版本，相同请求并发时只拉取一次"""
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, json.dumps(func_kwargs, sort_keys=True), verbose)
+        return await self.cache.aget_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose,
+                                              runner=functools.partial(GLOBAL_SDK_CLIENT.fetch, "finnhub"))
+
     def run_with_cache(self, func_name: str, func_kwargs: str, verbose: bool = False):
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, func_kwargs, verbose)
+        return self.cache.get_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose)
+
+    def _prepare(self, func_name: str, func_kwargs: str, verbose: bool = False):
         func_kwargs = json.loads(func_kwargs)
         
-        # 创建缓存文件路径
+        # 旧版缓存文件路径
         args_hash = hashlib.md5(str(func_kwargs).encode()).hexdigest()
-        func_cache_dir = self.cache_dir / func_name
-        if not func_cache_dir.exists():
-            func_cache_dir.mkdir(parents=True, exist_ok=True)
-        func_cache_file = func_cache_dir / f"{args_hash}.pkl"
-        
-        # 尝试从缓存加载
-        if func_cache_file.exists():
-            if verbose:
-                print(f"📁 从缓存加载: {func_cache_file}")
-            with open(func_cache_file, "rb") as f:
-                return pickle.load(f)
-        else:
+        legacy_cache_file = self.cache_dir / func_name / f"{args_hash}.pkl"
+
+        def fetch():
             if verbose:
                 print(f"🌐 API请求: {func_name} 参数: {func_kwargs}")
             
-            # 限制API请求频率
-            time.sleep(self.rate_limit_delay)
-            
             try:
-                # 调用finnhub客户端方法
-                result = getattr(self.client, func_name)(**func_kwargs)
-                
-                # 保存到缓存
-                if verbose:
-                    print(f"💾 保存缓存: {func_cache_file}")
-                with open(func_cache_file, "wb") as f:
-                    pickle.dump(result, f)
-                
-                return result
+                # 调用finnhub客户端方法，限制API请求频率(见 config.yaml 的 rate_limits.finnhub)
+                return GLOBAL_RATE_LIMITER.call("finnhub", getattr(self.client, func_name), **func_kwargs)
             except Exception as e:
                 if verbose:
                     print(f"❌ API请求失败: {e}")
                 raise e
 
+        return func_kwargs, fetch, legacy_cache_file
+
     def get_financials(self, symbol: str, statement: str = 'ic', freq: str = 'annual', verbose: bool = False):
         """
         获取财务数据
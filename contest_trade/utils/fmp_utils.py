@@ -7,18 +7,31 @@ FMP (Financial Modeling Prep) 的工具函数
 """
 import os
 import json
+import functools
 import pandas as pd
 import requests
 from pathlib import Path
 from datetime import datetime, timedelta
 from functools import lru_cache
 import hashlib
-import pickle
 import time
-from typing import List
+from typing import List, Optional
 from config.config import cfg
+from utils.cache_engine import CacheEngine, historical_ttl_policy, permanent_policies
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
 
 DEFAULT_FMP_CACHE_DIR = Path(__file__).parent / "fmp_cache"
+# 不带日期参数的基础信息接口，永久缓存。缓存的函数名为 endpoint_symbol(如 profile_AAPL)，按endpoint前缀匹配
+FMP_PERMANENT_ENDPOINTS = ["profile"]
+_historical_policy = historical_ttl_policy()
+
+
+def fmp_ttl_policy(endpoint_clean: str, params: dict) -> Optional[float]:
+    if endpoint_clean.split("_")[0] in FMP_PERMANENT_ENDPOINTS:
+        return None
+    return _historical_policy(endpoint_clean, params)
+
 
 class CachedFMPClient:
     def __init__(self, cache_dir=None, api_key=None):
@@ -35,7 +48,7 @@ class CachedFMPClient:
         
         self.api_key = api_key
         self.base_url = "https://financialmodelingprep.com/api/v3"
-        self.rate_limit_delay = 0.2  # API限制，每秒最多5次请求
+        self.cache = CacheEngine(self.cache_dir, default_policy=fmp_ttl_policy, policies=permanent_policies([]))
 
     def run(self, endpoint: str, params: dict, verbose: bool = False):
         """
@@ -49,52 +62,48 @@ class CachedFMPClient:
         params_str = json.dumps(params, sort_keys=True)
         return self.run_with_cache(endpoint, params_str, verbose)
     
+    async def arun(self, endpoint: str, params: dict, verbose: bool = False):
+        """run 的异步版本，相同请求并发时只拉取一次"""
+        endpoint_clean, params, fetch, legacy_cache_file = self._prepare(endpoint, json.dumps(params, sort_keys=True), verbose)
+        return await self.cache.aget_or_fetch(endpoint_clean, params, fetch, legacy_file=legacy_cache_file, verbose=verbose,
+                                              runner=functools.partial(GLOBAL_SDK_CLIENT.fetch, "fmp"))
+
     def run_with_cache(self, endpoint: str, params_str: str, verbose: bool = False):
+        endpoint_clean, params, fetch, legacy_cache_file = self._prepare(endpoint, params_str, verbose)
+        return self.cache.get_or_fetch(endpoint_clean, params, fetch, legacy_file=legacy_cache_file, verbose=verbose)
+
+    def _prepare(self, endpoint: str, params_str: str, verbose: bool = False):
         params = json.loads(params_str)
         
-        # 创建缓存文件路径
+        # 旧版缓存文件路径
         endpoint_clean = endpoint.replace('/', '_').lstrip('_')  # 清理endpoint路径
         cache_key = f"{endpoint_clean}_{hashlib.md5(params_str.encode()).hexdigest()}"
-        endpoint_cache_dir = self.cache_dir / endpoint_clean
-        if not endpoint_cache_dir.exists():
-            endpoint_cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_file = endpoint_cache_dir / f"{cache_key}.pkl"
-        
-        # 尝试从缓存加载
-        if cache_file.exists():
-            if verbose:
-                print(f"📁 从缓存加载: {cache_file}")
-            with open(cache_file, "rb") as f:
-                return pickle.load(f)
-        else:
+        legacy_cache_file = self.cache_dir / endpoint_clean / f"{cache_key}.pkl"
+
+        def fetch():
             if verbose:
                 print(f"🌐 API请求: {endpoint} 参数: {params}")
             
-            # 限制API请求频率
-            time.sleep(self.rate_limit_delay)
-            
-            try:
+            def request():
                 # 构建完整URL
                 url = f"{self.base_url}{endpoint}"
-                params['apikey'] = self.api_key
+                request_params = dict(params, apikey=self.api_key)
                 
                 # 发送请求
-                response = requests.get(url, params=params)
+                response = requests.get(url, params=request_params)
                 response.raise_for_status()
-                result = response.json()
-                
-                # 保存到缓存
-                if verbose:
-                    print(f"💾 保存缓存: {cache_file}")
-                with open(cache_file, "wb") as f:
-                    pickle.dump(result, f)
-                
-                return result
+                return response.json()
+
+            try:
+                # 限制API请求频率(见 config.yaml 的 rate_limits.fmp)
+                return GLOBAL_RATE_LIMITER.call("fmp", request)
             except Exception as e:
                 if verbose:
                     print(f"❌ API请求失败: {e}")
                 raise e
 
+        return endpoint_clean, params, fetch, legacy_cache_file
+
     def get_historical_price(self, symbol: str, from_date: str = None, to_date: str = None, 
                            adjusted: bool = True, adj_base_date: str = None, verbose: bool = False):
         """
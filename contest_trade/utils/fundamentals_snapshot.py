@@ -0,0 +1,373 @@
+"""
+Fundamentals Snapshot: 按交易日构建的A股基础数据快照表
+
+选股工具、证券列表、名称映射等原来各自拉取并合并 stock_basic / daily_basic / bak_basic / 曾用名，
+现在统一从这里读取:
+
+1. load_stock_basic(): 股票基本信息，优先使用离线缓存，fallback到tushare，进程内只加载一次
+2. build_stock_mapping(): 由股票基本信息和曾用名生成 名称->代码 / 代码->名称 映射
+3. FundamentalsSnapshot.load(trade_date): 一个交易日一张宽表，每只股票一行
+   - 基本信息: ts_code / symbol / name / area / industry / list_date / list_status / fullname
+   - 当日信息(bak_basic): name_at_date(当日名称) / listed_at_date(当日是否在市)
+   - 估值(daily_basic): turnover_rate / pe / pe_ttm / pb / ps / dv_ratio / total_mv / circ_mv 等
+   - 指数成分: in_csi300 / in_csi500 / in_csi1000
+   area / industry / list_status 为字典编码(category)
+
+存储: 安装了 pyarrow 时写入未压缩的 Arrow IPC 文件，加载时内存映射(memory_map)；
+未安装时退化为 pickle。只持久化早于今天的交易日，当天数据仍在变化只保存在内存中。
+akshare 数据源(source="akshare")为实时行情，只在进程内按日期缓存。
+任一组成部分(估值、指数成分等)拉取失败时，快照照常返回但不写盘也不进内存缓存，下次重新构建。
+
+可选配置 fundamentals_config: cache_dir / max_entries
+"""
+import os
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+from functools import lru_cache
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.config import cfg
+from utils.tushare_utils import pro_cached
+
+try:
+    import pyarrow as pa
+except ImportError:  # 未安装pyarrow时使用pickle存储
+    pa = None
+
+_fundamentals_config = getattr(cfg, "fundamentals_config", None) or {}
+
+MARKET_CACHE_DIR = Path(__file__).parent / "cache" / "market_manager"
+DEFAULT_SNAPSHOT_DIR = Path(__file__).parent / "tushare_cache" / "fundamentals"
+
+BASIC_COLUMNS = ["ts_code", "symbol", "name", "area", "industry", "list_date", "list_status", "fullname"]
+VALUATION_COLUMNS = [
+    "turnover_rate", "turnover_rate_f", "volume_ratio", "pe", "pe_ttm", "pb", "ps", "ps_ttm",
+    "dv_ratio", "dv_ttm", "total_share", "float_share", "free_share", "total_mv", "circ_mv",
+]
+DICTIONARY_COLUMNS = ["area", "industry", "list_status"]
+INDEX_MEMBERSHIP = {
+    "000300.SH": ("in_csi300", "csi300_components_cache.json"),
+    "000905.SH": ("in_csi500", "csi500_components_cache.json"),
+    "000852.SH": ("in_csi1000", "csi1000_components_cache.json"),
+}
+
+
+def _read_json_cache(filename: str) -> Optional[pd.DataFrame]:
+    cache_path = MARKET_CACHE_DIR / filename
+    try:
+        if cache_path.exists():
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return pd.DataFrame(json.load(f))
+        print(f"离线缓存不存在: {cache_path}")
+    except Exception as e:
+        print(f"读取离线缓存失败 {cache_path}: {e}")
+    return None
+
+
+@lru_cache(maxsize=1)
+def load_stock_basic() -> pd.DataFrame:
+    """股票基本信息(上市状态)，优先使用离线缓存，fallback到tushare"""
+    stock_df = _read_json_cache("stock_basic_cache.json")
+    if stock_df is None:
+        stock_df = pro_cached.run(
+            func_name="stock_basic",
+            func_kwargs={
+                "exchange": "",
+                "fields": ",".join(BASIC_COLUMNS)
+            }
+        )
+    return stock_df
+
+
+@lru_cache(maxsize=8)
+def load_index_members(index_code: str) -> Optional[pd.DataFrame]:
+    """指数成分股，优先使用离线缓存，fallback到tushare，返回包含ts_code的DataFrame"""
+    df = _read_json_cache(INDEX_MEMBERSHIP[index_code][1]) if index_code in INDEX_MEMBERSHIP else None
+    if df is None:
+        df = pro_cached.run(
+            func_name="index_weight",
+            func_kwargs={
+                "index_code": index_code,
+                "trade_date": "20250630",
+            }
+        )
+    if df is not None and 'con_code' in df.columns and 'ts_code' not in df.columns:
+        df['ts_code'] = df['con_code']
+    return df
+
+
+def build_stock_mapping(stock_df: pd.DataFrame, name2code: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """生成 (名称->代码, 代码->名称) 映射，name2code 为曾用名(包括ST)"""
+    stock_name2code = {}
+    stock_code2name = {}
+    for ts_code, stock_name in zip(stock_df['ts_code'].tolist(), stock_df['name'].tolist()):
+        stock_name2code[stock_name] = ts_code
+        if '-' in stock_name:
+            stock_name = stock_name.split('-')[0]
+        stock_name2code[stock_name] = ts_code
+        stock_code2name[ts_code] = stock_name
+
+    for name, code in name2code.items():
+        stock_name2code[name] = code
+    return stock_name2code, stock_code2name
+
+
+def _encode_dictionary(df: pd.DataFrame) -> pd.DataFrame:
+    for col in DICTIONARY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def build_tushare_fundamentals(trade_date: str) -> Tuple[pd.DataFrame, bool]:
+    """合并 stock_basic / bak_basic / daily_basic / 指数成分 为一张宽表，返回 (宽表, 是否完整)"""
+    complete = True
+    basic_df = load_stock_basic()
+    basic_df = basic_df[[c for c in BASIC_COLUMNS if c in basic_df.columns]]
+    bak_df = pro_cached.run(
+        func_name="bak_basic",
+        func_kwargs={
+            "trade_date": trade_date,
+            "fields": "ts_code,name"
+        }
+    )
+    bak_df = bak_df.rename(columns={"name": "name_at_date"}).drop_duplicates("ts_code")
+
+    df = pd.merge(basic_df, bak_df, on="ts_code", how="outer")
+    df["listed_at_date"] = df["ts_code"].isin(bak_df["ts_code"])
+    df["name"] = df["name"].fillna(df["name_at_date"])
+
+    # 估值和指数成分拉取失败时保留空列，不影响只需要基本信息的调用方
+    try:
+        daily_df = pro_cached.run(
+            func_name="daily_basic",
+            func_kwargs={
+                "ts_code": "",
+                "trade_date": trade_date,
+                "fields": "ts_code," + ",".join(VALUATION_COLUMNS)
+            }
+        )
+        df = pd.merge(df, daily_df, on="ts_code", how="left")
+    except Exception as e:
+        print(f"获取 daily_basic {trade_date} 失败: {e}")
+        complete = False
+    for col in VALUATION_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    for index_code, (column, _) in INDEX_MEMBERSHIP.items():
+        try:
+            members = load_index_members(index_code)
+            if members is None:
+                complete = False
+            df[column] = df["ts_code"].isin(members["ts_code"]) if members is not None else False
+        except Exception as e:
+            print(f"获取指数成分 {index_code} 失败: {e}")
+            df[column] = False
+            complete = False
+
+    df = df.sort_values("ts_code", kind="stable").reset_index(drop=True)
+    return _encode_dictionary(df), complete
+
+
+def build_akshare_fundamentals(trade_date: str) -> Tuple[pd.DataFrame, bool]:
+    """akshare 实时行情 + 市值前200股票的行业/股本，返回 (宽表, 是否完整)"""
+    from utils.akshare_utils import akshare_cached
+
+    df1 = akshare_cached.run(
+        func_name="stock_zh_a_spot_em",
+        func_kwargs={},
+        verbose=False
+    )
+
+    if df1 is None or df1.empty:
+        raise Exception("Failed to fetch stock spot data from akshare")
+
+    columns_mapping = {
+        '代码': 'ts_code',
+        '名称': 'name',
+        '最新价': 'close',
+        '涨跌幅': 'pct_chg',
+        '涨跌额': 'change',
+        '成交量': 'vol',
+        '成交额': 'amount',
+        '振幅': 'amplitude',
+        '最高': 'high',
+        '最低': 'low',
+        '今开': 'open',
+        '昨收': 'pre_close',
+        '量比': 'volume_ratio',
+        '换手率': 'turnover_rate',
+        '市盈率-动态': 'pe',
+        '市净率': 'pb',
+        '总市值': 'total_mv',
+        '流通市值': 'circ_mv'
+    }
+
+    existing_mapping = {k: v for k, v in columns_mapping.items() if k in df1.columns}
+    df1 = df1.rename(columns=existing_mapping)
+
+    numeric_columns = ['close', 'pct_chg', 'change', 'vol', 'amount', 'amplitude',
+                      'high', 'low', 'open', 'pre_close', 'volume_ratio', 'turnover_rate',
+                      'pe', 'pb', 'total_mv', 'circ_mv']
+
+    for col in numeric_columns:
+        if col in df1.columns:
+            df1[col] = pd.to_numeric(df1[col], errors='coerce')
+
+    if 'name' in df1.columns:
+        df1 = df1[~df1['name'].str.contains('ST', na=False)]
+    if 'ts_code' in df1.columns:
+        df1 = df1[~df1['ts_code'].str.contains('.BJ', na=False)]
+
+    if 'total_mv' in df1.columns:
+        df1['total_mv'] = df1['total_mv'] / 10000
+    if 'circ_mv' in df1.columns:
+        df1['circ_mv'] = df1['circ_mv'] / 10000
+
+    important_stocks = df1.nlargest(200, 'total_mv')['ts_code'].tolist()
+
+    stock_details = {}
+    complete = True
+    for ts_code in important_stocks:
+        try:
+            detail_info = akshare_cached.run(
+                func_name='stock_individual_info_em',
+                func_kwargs={'symbol': ts_code},
+                verbose=False
+            )
+
+            if detail_info is not None and not detail_info.empty:
+                info_dict = dict(zip(detail_info['item'], detail_info['value']))
+                stock_details[ts_code] = info_dict
+
+        except Exception:
+            complete = False
+            continue
+
+    def share(ts_code: str, item: str):
+        value = stock_details.get(ts_code, {}).get(item, np.nan)
+        return pd.to_numeric(value, errors='coerce') / 10000 if pd.notna(value) else np.nan
+
+    df1['industry'] = df1['ts_code'].apply(lambda x: stock_details.get(x, {}).get('行业', '未知'))
+    df1['total_share'] = df1['ts_code'].apply(lambda x: share(x, '总股本'))
+    df1['float_share'] = df1['ts_code'].apply(lambda x: share(x, '流通股'))
+    return _encode_dictionary(df1.reset_index(drop=True)), complete
+
+
+_BUILDERS: Dict[str, Callable[[str], Tuple[pd.DataFrame, bool]]] = {
+    "tushare": build_tushare_fundamentals,
+    "akshare": build_akshare_fundamentals,
+}
+
+
+class FundamentalsSnapshot:
+    """按交易日缓存的基础数据快照: 内存LRU -> 磁盘(Arrow IPC内存映射 / pickle) -> 构建"""
+
+    def __init__(self, source: str = "tushare", cache_dir=None, max_entries: int = 8, persist: bool = True):
+        """
+        Args:
+            source: 数据源，tushare / akshare
+            cache_dir: 快照文件目录
+            max_entries: 进程内缓存的交易日数
+            persist: 是否把历史交易日的快照写入磁盘
+        """
+        self.source = source
+        self.builder = _BUILDERS[source]
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_SNAPSHOT_DIR
+        self.max_entries = max_entries
+        self.persist = persist
+        self._frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._date_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _normalize_date(trade_date: str) -> str:
+        return trade_date.split(" ")[0].replace("-", "")
+
+    def _snapshot_file(self, trade_date: str) -> Path:
+        suffix = "arrow" if pa is not None else "pkl"
+        return self.cache_dir / f"{self.source}_{trade_date}.{suffix}"
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        if pa is not None:
+            # 内存映射读取，数值列不需要先整体读入内存
+            table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_pickle(path)
+
+    def _write(self, path: Path, df: pd.DataFrame):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+        if pa is not None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _load_or_build(self, trade_date: str) -> Tuple[pd.DataFrame, bool]:
+        """返回 (快照, 是否可缓存)；构建不完整的快照不写盘"""
+        path = self._snapshot_file(trade_date)
+        if self.persist and path.exists():
+            try:
+                return self._read(path), True
+            except Exception as e:
+                print(f"读取基础数据快照失败 {path}: {e}")
+
+        df, complete = self.builder(trade_date)
+        if not complete:
+            print(f"基础数据快照 {self.source}_{trade_date} 不完整，本次不缓存")
+        elif self.persist and not df.empty and trade_date < datetime.now().strftime("%Y%m%d"):
+            try:
+                self._write(path, df)
+            except Exception as e:
+                print(f"写入基础数据快照失败 {path}: {e}")
+        return df, complete
+
+    def load(self, trade_date: str) -> pd.DataFrame:
+        """
+        返回交易日的快照(YYYYMMDD / YYYY-MM-DD / 带时间均可)
+
+        快照在调用方之间共享，只读使用；需要修改时先copy
+        """
+        trade_date = self._normalize_date(trade_date)
+        with self._lock:
+            df = self._frames.get(trade_date)
+            if df is not None:
+                self._frames.move_to_end(trade_date)
+                return df
+            date_lock = self._date_locks.setdefault(trade_date, threading.Lock())
+
+        # 同一交易日只构建一次
+        with date_lock:
+            with self._lock:
+                df = self._frames.get(trade_date)
+            if df is not None:
+                return df
+            df, cacheable = self._load_or_build(trade_date)
+            if cacheable and not df.empty:
+                with self._lock:
+                    self._frames[trade_date] = df
+                    while len(self._frames) > self.max_entries:
+                        self._frames.popitem(last=False)
+                    self._date_locks.pop(trade_date, None)
+            return df
+
+
+GLOBAL_FUNDAMENTALS = FundamentalsSnapshot(
+    source="tushare",
+    cache_dir=_fundamentals_config.get("cache_dir"),
+    max_entries=_fundamentals_config.get("max_entries", 8),
+)
+GLOBAL_FUNDAMENTALS_AKSHARE = FundamentalsSnapshot(
+    source="akshare",
+    max_entries=_fundamentals_config.get("max_entries", 8),
+    persist=False,
+)
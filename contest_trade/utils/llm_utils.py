@@ -1,3 +1,6 @@
+import functools
+from string import Formatter
+from typing import Dict, List, Tuple
 import tiktoken
 encoding = tiktoken.get_encoding("cl100k_base")
 
@@ -19,3 +22,82 @@ def count_tokens(text):
     except Exception as e:
         print(f"Token计算错误: {e}")
         return 0
+
+
+def count_tokens_many(texts: List[str], num_threads: int = 8) -> List[int]:
+    """
+    批量计算token数量，使用tiktoken的多线程批量编码
+
+    Args:
+        texts (List[str]): 要计算token的文本列表，非字符串计为0
+        num_threads (int): 编码线程数
+
+    Returns:
+        List[int]: 与texts一一对应的token数量
+    """
+    indexes = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+    counts = [0] * len(texts)
+    if not indexes:
+        return counts
+    try:
+        encoded = encoding.encode_batch([texts[i] for i in indexes], num_threads=num_threads)
+        for i, tokens in zip(indexes, encoded):
+            counts[i] = len(tokens)
+    except Exception:
+        # 某个文本编码失败(如包含特殊token)时逐个计算，保持与count_tokens一致
+        for i in indexes:
+            counts[i] = count_tokens(texts[i])
+    return counts
+
+
+@functools.lru_cache(maxsize=256)
+def _count_segment_cached(text: str) -> int:
+    return count_tokens(text)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_template(template: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """拆分format模板，返回(字面量片段, 字段名)"""
+    literals, fields = [], []
+    for literal, field_name, _, _ in Formatter().parse(template):
+        literals.append(literal)
+        if field_name is not None:
+            fields.append(field_name)
+    return tuple(literals), tuple(fields)
+
+
+class IncrementalTokenCounter:
+    """
+    增量token计数器，用于反复估算同一个prompt模板渲染后的长度
+
+    1. 模板的字面量片段和不变的字段值(background_information / tools_info / output_format 等)
+       按内容缓存，只编码一次
+    2. 只追加内容的字段(如 tool_call_context)只编码新增的后缀
+
+    各片段分别编码后相加，片段边界处的BPE合并会带来个位数的误差，适合用于阈值判断
+    """
+
+    def __init__(self):
+        # 字段名 -> (上一次的值, token数)
+        self._fields: Dict[str, Tuple[str, int]] = {}
+
+    def count_field(self, name: str, text: str) -> int:
+        """计算单个字段的token数，新值以旧值为前缀时只编码新增部分"""
+        if not text or not isinstance(text, str):
+            return 0
+        previous = self._fields.get(name)
+        if previous is not None and text.startswith(previous[0]):
+            count = previous[1] + count_tokens(text[len(previous[0]):])
+        else:
+            count = _count_segment_cached(text)
+        self._fields[name] = (text, count)
+        return count
+
+    def count_format(self, template: str, **kwargs) -> int:
+        """估算 template.format(**kwargs) 的token数(模板字段只支持简单的 {name})"""
+        literals, fields = _parse_template(template)
+        total = sum(_count_segment_cached(literal) for literal in literals)
+        for name in fields:
+            value = kwargs[name]
+            total += self.count_field(name, value if isinstance(value, str) else str(value))
+        return total
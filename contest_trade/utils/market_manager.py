@@ -16,6 +16,7 @@ PROJECT_ROOT = Path(__file__).parent.parent.resolve()
 sys.path.append(str(PROJECT_ROOT))
 
 import textwrap
+import numpy as np
 import pandas as pd
 import yaml
 from functools import lru_cache
@@ -25,6 +26,9 @@ from enum import Enum
 from pathlib import Path
 from dataclasses import dataclass
 from utils.tushare_utils import pro_cached
+from utils.fundamentals_snapshot import build_stock_mapping, load_index_members, load_stock_basic
+from utils.price_store import GLOBAL_PRICE_STORE
+from utils.trading_calendar import TradingCalendar
 from utils.fmp_utils import get_us_stock_price, fmp_cached
 
 class Market(Enum):
@@ -171,6 +175,8 @@ class MarketManager:
         self.config = config
         self.cache_dir = Path(__file__).parent / "cache" / "market_manager"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.price_store = GLOBAL_PRICE_STORE
+        self._trading_calendars: Dict[str, TradingCalendar] = {}
         
         # 处理标准市场
         self.target_markets = []
@@ -348,58 +354,18 @@ class MarketManager:
                 raise ValueError(f"Unknown market: {market}")
 
         if market == Market.A_ALL:
+            # 当日在市的股票及当日名称，只需要bak_basic，不构建完整快照
             df = pro_cached.run(
-                func_name="bak_basic", 
+                func_name="bak_basic",
                 func_kwargs={
                     "trade_date": target_date,
                     "fields": "ts_code,name"
                 }
             )
-        elif market == Market.CSI300:
+        elif market in (Market.CSI300, Market.CSI500, Market.CSI1000):
             # 优先使用缓存，fallback到tushare
-            df = self._get_csi_components_cache("000300.SH")
-            if df is None:
-                df = pro_cached.run(
-                    func_name="index_weight", 
-                    func_kwargs={
-                        "index_code": "000300.SH",
-                        "trade_date": "20250630",
-                    }
-                )
-                df['ts_code'] = df['con_code']
-            # 确保ts_code列存在
-            if 'con_code' in df.columns and 'ts_code' not in df.columns:
-                df['ts_code'] = df['con_code']
-        elif market == Market.CSI500:
-            # 优先使用缓存，fallback到tushare
-            df = self._get_csi_components_cache("000905.SH")
-            if df is None:
-                df = pro_cached.run(
-                    func_name="index_weight", 
-                    func_kwargs={
-                        "index_code": "000905.SH",
-                        "trade_date": "20250630",
-                    }
-                )
-                df['ts_code'] = df['con_code']
-            # 确保ts_code列存在
-            if 'con_code' in df.columns and 'ts_code' not in df.columns:
-                df['ts_code'] = df['con_code']
-        elif market == Market.CSI1000:
-            # 优先使用缓存，fallback到tushare
-            df = self._get_csi_components_cache("000852.SH")
-            if df is None:
-                df = pro_cached.run(
-                    func_name="index_weight", 
-                    func_kwargs={
-                        "index_code": "000852.SH",
-                        "trade_date": "20250630",
-                    }
-                )
-                df['ts_code'] = df['con_code']
-            # 确保ts_code列存在
-            if 'con_code' in df.columns and 'ts_code' not in df.columns:
-                df['ts_code'] = df['con_code']
+            index_code = {Market.CSI300: "000300.SH", Market.CSI500: "000905.SH", Market.CSI1000: "000852.SH"}[market]
+            df = load_index_members(index_code).copy()
         elif market == Market.A_ETF:
             df = pro_cached.run(
                 func_name="fund_basic", 
@@ -439,8 +405,20 @@ class MarketManager:
             raise ValueError(f"Invalid market: {market}")
         return df
 
+    def get_trading_calendar(self, market_name: str = "CN-Stock", verbose: bool = False) -> TradingCalendar:
+        """获取市场的交易日历索引，每个市场只加载一次"""
+        calendar = self._trading_calendars.get(market_name)
+        if calendar is None:
+            calendar = TradingCalendar(self._load_trade_date(market_name, verbose=verbose))
+            self._trading_calendars[market_name] = calendar
+        return calendar
+
     def get_trade_date(self, market_name: str="CN-Stock", verbose: bool = False):
-        """获取交易日历，优先级：缓存文件 -> AKShare -> Tushare"""
+        """获取交易日列表(升序)，返回副本，调用方修改不会影响共享的交易日历"""
+        return self.get_trading_calendar(market_name, verbose=verbose).to_list()
+
+    def _load_trade_date(self, market_name: str="CN-Stock", verbose: bool = False):
+        """加载交易日历，优先级：缓存文件 -> AKShare -> Tushare"""
         
         # 方法1：尝试从缓存文件读取（A股相关市场）
         if market_name in ["CN-Stock", "CN-ETF", "CSI300", "CSI500", "CSI1000"]:
@@ -523,56 +501,14 @@ class MarketManager:
     def get_symbol_price(self, market_name: str, symbol: str, trigger_time: str, date_diff: int = 0):
         # get the open price of the symbol at given trigger_time
         triggle_trade_date = trigger_time.split(" ")[0].replace("-", "")
-        trade_dates = self.get_trade_date(market_name)
         try:
-            if date_diff == 0:
-                assert triggle_trade_date in trade_dates
-                target_trade_date = triggle_trade_date
-            elif date_diff > 0:
-                target_trade_date = [dt for dt in trade_dates if dt > triggle_trade_date][date_diff - 1]
-            elif date_diff < 0:
-                target_trade_date = [dt for dt in trade_dates if dt < triggle_trade_date][date_diff]
+            target_trade_date = self.get_trading_calendar(market_name).shift(triggle_trade_date, date_diff)
         except IndexError:
             raise ValueError(f"Invalid date_diff: {date_diff}")
 
         if market_name in ["CN-Stock", "CSI300", "CSI500", "CSI1000"]:
-            df = pro_cached.run(
-                func_name="daily",
-                func_kwargs={"ts_code": symbol,"trade_date": target_trade_date}
-            )
-            limit_df = pro_cached.run(
-                func_name="stk_limit",
-                func_kwargs={
-                    "trade_date": target_trade_date,
-                }
-            )
-            limit_price = limit_df[limit_df['ts_code'] == symbol]['up_limit'].values[0]
-
-            # calculate qfq price
-            if target_trade_date < "20250630":
-                # Calculate front-adjusted price using 20250630 as reference only support date before 20250630
-                target_adj_data = pro_cached.run(
-                    func_name='adj_factor', 
-                    func_kwargs={
-                        'ts_code': symbol,
-                        'start_date': target_trade_date,
-                        'end_date': '20250630'
-                    }
-                )
-                target_adj_data = target_adj_data.sort_values(by="trade_date", ascending=True)
-                qfq_factor = target_adj_data['adj_factor'].iloc[0] / target_adj_data['adj_factor'].iloc[-1]
-                for price_fields in ["open", "high", "low", "close", "pre_close"]:
-                    df[price_fields] = df[price_fields] * qfq_factor
-            else:
-                qfq_factor = 1.0
-
-
-            if len(df) > 0:
-                price_data = df.to_dict(orient="records")[0]
-                price_data["limit_price"] = limit_price * qfq_factor
-                return price_data
-            else:
-                return None
+            # 从按交易日分区的价格存储中读取，前复权口径以20250630为基准
+            return self.price_store.get_price(symbol, target_trade_date)
         elif market_name == "CN-ETF":
             return None
         elif market_name == "HK-Stock":
@@ -610,6 +546,12 @@ class MarketManager:
             raise ValueError(f"Invalid market: {market_name}")
 
     def get_symbol_history_price(self, market_name: str, symbol: str, start_date: str, end_date: str):
+        if market_name in ["CN-Stock", "CSI300", "CSI500", "CSI1000"]:
+            # 区间内的交易日分区都已在本地时直接从价格存储读取，否则按单只股票查询
+            trade_dates = self.get_trading_calendar(market_name).range(start_date, end_date)
+            if trade_dates and all(self.price_store.has_partition(dt) for dt in trade_dates):
+                return self.price_store.get_history(symbol, trade_dates)
+
         if market_name in ["CN-Stock", "CN-ETF", "CSI300", "CSI500", "CSI1000"]:
             df = pro_cached.run(
                 func_name="daily",
@@ -637,6 +579,12 @@ class MarketManager:
         else:
             raise ValueError(f"Invalid market: {market_name}")
 
+    def get_prices(self, market_name: str, symbols: List[str], dates: List[str], adjust: bool = True):
+        """批量获取多只股票在多个交易日的价格，返回单个DataFrame"""
+        if market_name in ["CN-Stock", "CSI300", "CSI500", "CSI1000"]:
+            return self.price_store.get_prices(symbols, dates, adjust=adjust)
+        raise ValueError(f"Invalid market: {market_name}")
+
     def accept_trade(self, symbol: str, action: str, trigger_time: str):
         # check if the trade is accepted by the market
         pass
@@ -644,9 +592,8 @@ class MarketManager:
     def is_market_trading(self, market_name: str, trigger_time: str):
         # check if the market is trading at given trigger_time  
         trigger_date = trigger_time.split(" ")[0].replace("-", "")
-        trade_date = self.get_trade_date(market_name)
         if market_name in ["CN-Stock", "CN-ETF", "US-Stock", "CSI300", "CSI500", "CSI1000"]:
-            return trigger_date in trade_date
+            return self.get_trading_calendar(market_name).is_trade_date(trigger_date)
         elif market_name == "HK-Stock":
             # Not supported yet
             return False
@@ -675,44 +622,51 @@ class MarketManager:
         """获取指定市场的交易成本配置"""
         return self.config.trading_configs.get(market_name, TradingCostConfig())
 
-    def calculate_tradable_shares(self, market_name: str, target_amount: float, price: float) -> int:
-        """计算可交易股数"""
-        config = self.get_trading_config(market_name)
-        
-        if market_name in ["CN-Stock", "CN-ETF", "CSI300", "CSI500", "CSI1000"]:
-            # A股：100股起，整手交易
-            shares_float = target_amount / price
-            return int(shares_float // 100) * 100
+    def get_lot_size(self, market_name: str) -> int:
+        """最小交易单位: A股/港股整手100股，美股1股"""
+        if market_name in ["CN-Stock", "CN-ETF", "CSI300", "CSI500", "CSI1000", "HK-Stock"]:
+            return 100
         elif market_name == "US-Stock":
-            # 美股：1股起，任意股数
-            return int(target_amount / price)
-        elif market_name == "HK-Stock":
-            # 港股：通常100股起
-            shares_float = target_amount / price
-            return int(shares_float // 100) * 100
+            return 1
         else:
             raise ValueError(f"不支持的市场类型: {market_name}")
+
+    def calculate_tradable_shares(self, market_name: str, target_amount: float, price: float) -> int:
+        """计算可交易股数(整手)"""
+        lot_size = self.get_lot_size(market_name)
+        return int(target_amount / price // lot_size) * lot_size
     
     def apply_slippage(self, market_name: str, price: float, action: str, symbol: str) -> float:
         """应用滑点计算实际成交价格"""
+        return float(self.apply_slippage_array(market_name, price, action))
+
+    def apply_slippage_array(self, market_name: str, prices, action: str) -> np.ndarray:
+        """apply_slippage 的向量化版本，prices 为价格数组(或标量)"""
         config = self.get_trading_config(market_name)
-        
+        prices = np.asarray(prices, dtype=float)
+
         if config.slippage_mode == "percentage":
-            slippage = price * config.slippage_rate
+            slippage = prices * config.slippage_rate
         else:  # fixed
             slippage = config.slippage_fixed
         
         # 买入时价格上滑，卖出时价格下滑
         if action == "buy":
-            return price + slippage
+            return prices + slippage
         else:  # sell
-            return price - slippage
+            return prices - slippage
     
     def calculate_trading_costs(self, market_name: str, action: str, shares: int, 
                               price: float, symbol: str) -> Dict[str, float]:
         """计算交易成本"""
+        costs = self.calculate_trading_costs_array(market_name, action, shares, price)
+        return {name: float(value) for name, value in costs.items()}
+
+    def calculate_trading_costs_array(self, market_name: str, action: str, shares, prices) -> Dict[str, np.ndarray]:
+        """calculate_trading_costs 的向量化版本，shares / prices 为同形状的数组(或标量)"""
         config = self.get_trading_config(market_name)
-        amount = shares * price
+        shares = np.asarray(shares, dtype=float)
+        amount = shares * np.asarray(prices, dtype=float)
         
         if market_name in ["CN-Stock", "CN-ETF", "CSI300", "CSI500", "CSI1000"]:
             return self._calculate_a_stock_costs(config, action, shares, amount)
@@ -724,13 +678,13 @@ class MarketManager:
             raise ValueError(f"不支持的市场类型: {market_name}")
     
     def _calculate_a_stock_costs(self, config: AStockTradingConfig, action: str, 
-                               shares: int, amount: float) -> Dict[str, float]:
+                               shares: np.ndarray, amount: np.ndarray) -> Dict[str, np.ndarray]:
         """计算A股交易成本"""
         # 佣金 (双向)
-        commission = max(amount * config.commission_rate, config.commission_min)
+        commission = np.maximum(amount * config.commission_rate, config.commission_min)
         
         # 印花税 (仅卖出，ETF可能为0)
-        stamp_tax = amount * config.stamp_tax_rate if action == "sell" else 0.0
+        stamp_tax = amount * config.stamp_tax_rate if action == "sell" else np.zeros_like(amount)
         
         # 过户费 (双向)
         transfer_fee = amount * config.transfer_fee_rate
@@ -741,33 +695,33 @@ class MarketManager:
             'commission': commission,
             'stamp_tax': stamp_tax,
             'transfer_fee': transfer_fee,
-            'slippage_cost': 0.0,  # 滑点在价格中已体现
+            'slippage_cost': np.zeros_like(amount),  # 滑点在价格中已体现
             'total_cost': total_cost
         }
     
     def _calculate_us_stock_costs(self, config: USStockTradingConfig, action: str, 
-                                shares: int, amount: float) -> Dict[str, float]:
+                                shares: np.ndarray, amount: np.ndarray) -> Dict[str, np.ndarray]:
         """计算美股交易成本"""
         if config.fee_type == "per_trade":
-            commission = config.commission_per_trade
+            commission = np.full_like(amount, config.commission_per_trade)
         elif config.fee_type == "per_share":
             commission = shares * config.commission_per_share
         else:  # zero_commission
-            commission = 0.0
+            commission = np.zeros_like(amount)
         
         return {
             'commission': commission,
-            'stamp_tax': 0.0,
-            'transfer_fee': 0.0,
-            'slippage_cost': 0.0,  # 滑点在价格中已体现
+            'stamp_tax': np.zeros_like(amount),
+            'transfer_fee': np.zeros_like(amount),
+            'slippage_cost': np.zeros_like(amount),  # 滑点在价格中已体现
             'total_cost': commission
         }
     
     def _calculate_hk_stock_costs(self, config: HKStockTradingConfig, action: str, 
-                                shares: int, amount: float) -> Dict[str, float]:
+                                shares: np.ndarray, amount: np.ndarray) -> Dict[str, np.ndarray]:
         """计算港股交易成本"""
         # 佣金
-        commission = max(amount * config.commission_rate, config.commission_min)
+        commission = np.maximum(amount * config.commission_rate, config.commission_min)
         
         # 印花税
         stamp_duty = amount * config.stamp_duty_rate
@@ -781,7 +735,7 @@ class MarketManager:
             'commission': commission,
             'stamp_tax': stamp_duty,
             'transfer_fee': trading_fee,
-            'slippage_cost': 0.0,  # 滑点在价格中已体现
+            'slippage_cost': np.zeros_like(amount),  # 滑点在价格中已体现
             'total_cost': total_cost
         }
     
@@ -808,78 +762,9 @@ class MarketManager:
     @lru_cache(maxsize=3)
     def get_stock_mapping(self, market_name: str):
         if market_name == "CN-Stock":
-            # 优先使用缓存，fallback到tushare
-            stock_df = self._get_stock_basic_cache()
-            if stock_df is None:
-                stock_df = pro_cached.run(
-                    func_name="stock_basic",
-                    func_kwargs={
-                        "exchange": "",
-                        "fields": 'ts_code,symbol,name,area,industry,list_date,list_status,fullname'
-                    }
-                )
-            stock_name2code = {}
-            stock_code2name = {}
-            stock_info_columns = stock_df.columns.tolist()
-            for stock in stock_df.values.tolist():
-                stock_info = {v:k for k,v in zip(stock, stock_info_columns)}
-                stock_name = stock_info['name']
-                stock_name2code[stock_name] = stock_info['ts_code']
-                if '-' in stock_name:
-                    stock_name = stock_name.split('-')[0]
-                stock_name2code[stock_name] = stock_info['ts_code']
-                stock_code2name[stock_info['ts_code']] = stock_name
-
-            # 读取曾用名, 包括ST
-            name2code = self.get_total_namechange(market_name)
-            for name, code in name2code.items():
-                stock_name2code[name] = code
-
-        return stock_name2code, stock_code2name
-
-    def _get_stock_basic_cache(self):
-        """获取股票基本信息缓存，优先使用离线缓存"""
-        cache_path = Path(__file__).parent / 'cache' / 'market_manager' / 'stock_basic_cache.json'
-        
-        try:
-            if cache_path.exists():
-                print(f"使用股票基本信息缓存: {cache_path}")
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                return pd.DataFrame(cache_data)
-            else:
-                print(f"股票基本信息缓存不存在: {cache_path}")
-                return None
-        except Exception as e:
-            print(f"读取股票基本信息缓存失败: {e}")
-            return None
-
-    def _get_csi_components_cache(self, index_code: str):
-        """获取指数成分股缓存，优先使用离线缓存"""
-        cache_file_map = {
-            "000300.SH": "csi300_components_cache.json",
-            "000905.SH": "csi500_components_cache.json", 
-            "000852.SH": "csi1000_components_cache.json"
-        }
-        
-        cache_filename = cache_file_map.get(index_code)
-        if not cache_filename:
-            return None
-            
-        cache_path = Path(__file__).parent / 'cache' / 'market_manager' / cache_filename
-        
-        try:
-            if cache_path.exists():
-                print(f"使用指数成分股缓存: {cache_path}")
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                return pd.DataFrame(cache_data)
-            else:
-                print(f"指数成分股缓存不存在: {cache_path}")
-                return None
-        except Exception as e:
-            print(f"读取指数成分股缓存失败: {e}")
-            return None
+            # 优先使用缓存，fallback到tushare；曾用名包括ST
+            return build_stock_mapping(load_stock_basic(), self.get_total_namechange(market_name))
+        return {}, {}
 
     def get_total_namechange(self, market_name: str):
 
@@ -0,0 +1,250 @@
+"""
+Price Store: 按交易日分区的本地价格存储
+
+每个交易日一个分区，分区内同时保存全市场的:
+1. 日线行情 (daily)
+2. 涨跌停价格 (stk_limit)
+3. 复权因子 (adj_factor)
+
+分区加载后按 ts_code 建立索引并保存在进程内LRU中，单只股票单日的价格查询无需再打开任何文件。
+同一交易日只构建一次，构建(拉取数据、写盘)时不阻塞其他交易日的查询。
+
+存储: 与 utils.fundamentals_snapshot 相同，安装了 pyarrow 时写入未压缩的 Arrow IPC 文件并内存映射读取，
+未安装时退化为 pickle。
+
+可选配置 price_store_config: max_partitions
+"""
+import os
+import threading
+import pandas as pd
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from config.config import cfg
+from utils.tushare_utils import pro_cached
+
+try:
+    import pyarrow as pa
+except ImportError:  # 未安装pyarrow时使用pickle存储
+    pa = None
+
+_price_store_config = getattr(cfg, "price_store_config", None) or {}
+
+DEFAULT_PRICE_STORE_DIR = Path(__file__).parent / "cache" / "price_store"
+
+# 前复权基准日，与原 get_symbol_price 的口径保持一致
+DEFAULT_QFQ_BASE_DATE = "20250630"
+
+PRICE_FIELDS = ["open", "high", "low", "close", "pre_close"]
+DAILY_COLUMNS = [
+    "ts_code", "trade_date", "open", "high", "low", "close", "pre_close",
+    "change", "pct_chg", "vol", "amount",
+]
+PARTITION_COLUMNS = DAILY_COLUMNS + ["up_limit", "down_limit", "adj_factor"]
+
+
+class PriceStore:
+    """按交易日分区的价格存储，提供单点查询与批量查询"""
+
+    def __init__(self, store_dir=None, qfq_base_date: str = DEFAULT_QFQ_BASE_DATE, max_partitions: int = 128):
+        self.store_dir = Path(store_dir) if store_dir else DEFAULT_PRICE_STORE_DIR
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.qfq_base_date = qfq_base_date
+        self.max_partitions = max_partitions
+
+        # trade_date -> (分区, 按ts_code索引的分区)，只缓存非空分区
+        self._partitions: "OrderedDict[str, Tuple[pd.DataFrame, pd.DataFrame]]" = OrderedDict()
+        # _lock 只保护LRU，构建分区时持有对应交易日的锁
+        self._lock = threading.Lock()
+        self._date_locks: Dict[str, threading.Lock] = {}
+
+    def _partition_file(self, trade_date: str) -> Path:
+        suffix = "arrow" if pa is not None else "pkl"
+        return self.store_dir / f"{trade_date}.{suffix}"
+
+    def has_partition(self, trade_date: str) -> bool:
+        """分区是否已在内存或磁盘中(空分区不缓存，返回False)"""
+        return trade_date in self._partitions or self._partition_file(trade_date).exists()
+
+    def _build_partition(self, trade_date: str) -> pd.DataFrame:
+        """从tushare拉取某交易日的全市场数据并合并为一个分区"""
+        daily_df = pro_cached.run(func_name="daily", func_kwargs={"trade_date": trade_date})
+        if daily_df is None or daily_df.empty:
+            return pd.DataFrame(columns=PARTITION_COLUMNS)
+
+        limit_df = pro_cached.run(func_name="stk_limit", func_kwargs={"trade_date": trade_date})
+        adj_df = pro_cached.run(func_name="adj_factor", func_kwargs={"trade_date": trade_date})
+
+        df = daily_df.copy()
+        if limit_df is not None and not limit_df.empty:
+            df = df.merge(limit_df[["ts_code", "up_limit", "down_limit"]], on="ts_code", how="left")
+        if adj_df is not None and not adj_df.empty:
+            df = df.merge(adj_df[["ts_code", "adj_factor"]], on="ts_code", how="left")
+        for col in PARTITION_COLUMNS:
+            if col not in df.columns:
+                df[col] = float("nan")
+        df["trade_date"] = df["trade_date"].astype(str)
+        return df[PARTITION_COLUMNS].reset_index(drop=True)
+
+    def _save_partition(self, trade_date: str, df: pd.DataFrame):
+        """原子写入：先写临时文件再rename"""
+        partition_file = self._partition_file(trade_date)
+        tmp_file = partition_file.with_suffix(partition_file.suffix + f".{os.getpid()}.tmp")
+        if pa is not None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(str(tmp_file), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        else:
+            df.to_pickle(tmp_file)
+        os.replace(tmp_file, partition_file)
+
+    def _read_partition(self, partition_file: Path) -> pd.DataFrame:
+        if pa is not None:
+            table = pa.ipc.open_file(pa.memory_map(str(partition_file), "r")).read_all()
+            return table.to_pandas(split_blocks=True)
+        return pd.read_pickle(partition_file)
+
+    def _cached_partition(self, trade_date: str) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        with self._lock:
+            entry = self._partitions.get(trade_date)
+            if entry is not None:
+                self._partitions.move_to_end(trade_date)
+            return entry
+
+    def _load(self, trade_date: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """加载交易日分区，优先内存，其次磁盘，最后从数据源构建"""
+        entry = self._cached_partition(trade_date)
+        if entry is not None:
+            return entry
+        with self._lock:
+            date_lock = self._date_locks.setdefault(trade_date, threading.Lock())
+
+        # 同一交易日只构建一次，其他交易日的查询不受影响
+        with date_lock:
+            entry = self._cached_partition(trade_date)
+            if entry is not None:
+                return entry
+
+            partition_file = self._partition_file(trade_date)
+            if partition_file.exists():
+                df = self._read_partition(partition_file)
+            else:
+                df = self._build_partition(trade_date)
+                # 空分区(未开盘/数据未发布)不落盘也不缓存，下次重新拉取
+                if not df.empty:
+                    self._save_partition(trade_date, df)
+
+            entry = (df, df.set_index("ts_code"))
+            if not df.empty:
+                with self._lock:
+                    self._partitions[trade_date] = entry
+                    while len(self._partitions) > self.max_partitions:
+                        self._partitions.popitem(last=False)
+                    self._date_locks.pop(trade_date, None)
+            return entry
+
+    def load_partition(self, trade_date: str) -> pd.DataFrame:
+        """加载交易日分区，优先内存，其次磁盘，最后从数据源构建"""
+        return self._load(trade_date)[0]
+
+    def get_bar(self, symbol: str, trade_date: str) -> Optional[dict]:
+        """获取原始(未复权)日线记录"""
+        indexed = self._load(trade_date)[1]
+        if symbol not in indexed.index:
+            return None
+        record = indexed.loc[symbol].to_dict()
+        record["ts_code"] = symbol
+        return record
+
+    def get_qfq_factor(self, symbol: str, trade_date: str) -> float:
+        """以qfq_base_date为基准的前复权因子，基准日及之后不复权"""
+        if trade_date >= self.qfq_base_date:
+            return 1.0
+
+        bar = self.get_bar(symbol, trade_date)
+        base_bar = self.get_bar(symbol, self.qfq_base_date)
+        if bar is not None and base_bar is not None \
+                and pd.notna(bar.get("adj_factor")) and pd.notna(base_bar.get("adj_factor")):
+            return bar["adj_factor"] / base_bar["adj_factor"]
+
+        # 基准日停牌等情况，回退到按区间查询复权因子
+        adj_df = pro_cached.run(
+            func_name="adj_factor",
+            func_kwargs={
+                "ts_code": symbol,
+                "start_date": trade_date,
+                "end_date": self.qfq_base_date,
+            }
+        )
+        adj_df = adj_df.sort_values(by="trade_date", ascending=True)
+        return adj_df["adj_factor"].iloc[0] / adj_df["adj_factor"].iloc[-1]
+
+    def get_price(self, symbol: str, trade_date: str, adjust: bool = True) -> Optional[dict]:
+        """
+        获取单只股票单日的价格数据
+
+        Returns:
+            dict: 日线字段 + limit_price(涨停价)，adjust=True时价格为前复权价格
+        """
+        bar = self.get_bar(symbol, trade_date)
+        if bar is None:
+            return None
+
+        qfq_factor = self.get_qfq_factor(symbol, trade_date) if adjust else 1.0
+        price_data = {col: bar[col] for col in DAILY_COLUMNS}
+        for price_field in PRICE_FIELDS:
+            price_data[price_field] = price_data[price_field] * qfq_factor
+        price_data["limit_price"] = bar["up_limit"] * qfq_factor
+        return price_data
+
+    def get_history(self, symbol: str, trade_dates: Iterable[str]) -> pd.DataFrame:
+        """获取单只股票在给定交易日上的原始日线，按trade_date降序(与tushare daily一致)"""
+        records = [self.get_bar(symbol, trade_date) for trade_date in trade_dates]
+        records = [record for record in records if record is not None]
+        df = pd.DataFrame(records, columns=PARTITION_COLUMNS)[DAILY_COLUMNS]
+        return df.sort_values(by="trade_date", ascending=False).reset_index(drop=True)
+
+    def get_prices(self, symbols: List[str], dates: List[str], adjust: bool = True) -> pd.DataFrame:
+        """
+        批量获取价格，每个交易日只加载一次分区
+
+        Args:
+            symbols: 股票代码列表
+            dates: 交易日列表，格式YYYYMMDD
+            adjust: 是否前复权
+
+        Returns:
+            pd.DataFrame: 每行一个(ts_code, trade_date)，缺失的组合不返回
+        """
+        symbols = list(dict.fromkeys(symbols))
+        frames = []
+        for trade_date in dict.fromkeys(dates):
+            df = self.load_partition(trade_date)
+            if df.empty:
+                continue
+            frames.append(df[df["ts_code"].isin(symbols)])
+        if not frames:
+            return pd.DataFrame(columns=PARTITION_COLUMNS + ["qfq_factor", "limit_price"])
+
+        prices = pd.concat(frames, ignore_index=True)
+        if adjust:
+            need_adjust = prices["trade_date"] < self.qfq_base_date
+            base_df = self.load_partition(self.qfq_base_date) if need_adjust.any() else pd.DataFrame()
+            base_adj = base_df.set_index("ts_code")["adj_factor"] if not base_df.empty else pd.Series(dtype=float)
+            prices["qfq_factor"] = (prices["adj_factor"] / prices["ts_code"].map(base_adj)).where(need_adjust, 1.0)
+
+            # 基准日缺失复权因子的股票逐个回退
+            missing = prices["qfq_factor"].isna()
+            for idx in prices.index[missing]:
+                prices.at[idx, "qfq_factor"] = self.get_qfq_factor(prices.at[idx, "ts_code"], prices.at[idx, "trade_date"])
+        else:
+            prices["qfq_factor"] = 1.0
+
+        for price_field in PRICE_FIELDS:
+            prices[price_field] = prices[price_field] * prices["qfq_factor"]
+        prices["limit_price"] = prices["up_limit"] * prices["qfq_factor"]
+        return prices
+
+
+GLOBAL_PRICE_STORE = PriceStore(max_partitions=_price_store_config.get("max_partitions", 128))
@@ -0,0 +1,178 @@
+"""
+Rate Limiter: 按数据源/模型服务统一限流与退避
+
+1. TokenBucket: 令牌桶，线程与协程共用，按预约的方式排队(不会出现惊群)
+2. RateLimitRegistry: 按provider管理令牌桶，配置来自 config.yaml 的 rate_limits
+3. 退避：带抖动的指数退避，遇到 429 / Retry-After 时整个provider暂停，所有调用方一起等待
+
+provider 命名：tushare / akshare / fmp / finnhub / bocha / serper / thx / xueqiu / eastmoney，
+LLM 按 base_url 的 host 区分，形如 "llm:api.deepseek.com"。
+"""
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+from config.config import cfg
+
+DEFAULT_RATE_LIMITS = {
+    "default": {"rate": 5.0, "burst": 5},
+    "llm": {"rate": 10.0, "burst": 10},
+    "tushare": {"rate": 3.0, "burst": 5},
+    "akshare": {"rate": 2.0, "burst": 4},
+    "fmp": {"rate": 5.0, "burst": 5},
+    "finnhub": {"rate": 1.0, "burst": 1},
+    "bocha": {"rate": 5.0, "burst": 5},
+    "serper": {"rate": 5.0, "burst": 5},
+    "thx": {"rate": 0.5, "burst": 1},
+    "xueqiu": {"rate": 0.33, "burst": 1},
+    "eastmoney": {"rate": 0.33, "burst": 1},
+}
+
+# tushare 等SDK的限流报错不是HTTP状态码，只能按报错信息识别；不匹配裸的"429"，避免误判包含该数字的报错
+RATE_LIMIT_MESSAGES = ["rate limit", "too many requests", "每分钟最多访问", "访问频率", "请求过于频繁"]
+
+
+class TokenBucket:
+    """令牌桶，rate为每秒补充的令牌数，burst为桶容量"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """预约令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """暂停整个桶(收到429时使用)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def llm_provider(base_url: Optional[str]) -> str:
+    """LLM服务的provider名称"""
+    host = urlparse(base_url or "").netloc or "default"
+    return f"llm:{host}"
+
+
+def get_retry_after(exc: BaseException) -> Optional[float]:
+    """从异常携带的HTTP响应中解析Retry-After(秒)"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """判断异常是否为限流"""
+    response = getattr(exc, "response", None)
+    status_code = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status_code == 429:
+        return True
+    message = str(exc).lower()
+    return any(keyword in message for keyword in RATE_LIMIT_MESSAGES)
+
+
+class RateLimitRegistry:
+    """按provider管理令牌桶和退避策略"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = dict(config or {})
+        self.backoff_base = float(config.pop("backoff_base", 1.0))
+        self.backoff_max = float(config.pop("backoff_max", 60.0))
+        self.limits = dict(DEFAULT_RATE_LIMITS)
+        self.limits.update(config)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _limit_for(self, provider: str) -> dict:
+        if provider in self.limits:
+            return self.limits[provider]
+        if provider.startswith("llm:"):
+            return self.limits["llm"]
+        return self.limits["default"]
+
+    def get(self, provider: str) -> TokenBucket:
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(provider)
+                if bucket is None:
+                    limit = self._limit_for(provider)
+                    bucket = TokenBucket(limit.get("rate", 5.0), limit.get("burst", 1))
+                    self._buckets[provider] = bucket
+        return bucket
+
+    def acquire(self, provider: str):
+        self.get(provider).acquire()
+
+    async def aacquire(self, provider: str):
+        await self.get(provider).aacquire()
+
+    def backoff_delay(self, provider: str, attempt: int, exc: Optional[BaseException] = None,
+                      max_delay: Optional[float] = None) -> float:
+        """
+        计算第attempt次(从0开始)失败后的等待时间
+
+        带full jitter的指数退避；异常为限流时优先使用Retry-After，并暂停整个provider。
+        """
+        max_delay = self.backoff_max if max_delay is None else max_delay
+        delay = random.uniform(0, min(max_delay, self.backoff_base * (2 ** attempt)))
+        if exc is not None and is_rate_limited(exc):
+            retry_after = get_retry_after(exc)
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, self.backoff_base)
+            else:
+                delay = max(delay, min(max_delay, self.backoff_base * (2 ** attempt)))
+            self.get(provider).pause(delay)
+        return delay
+
+    def call(self, provider: str, func: Callable[..., Any], *args, max_retries: int = 3, **kwargs) -> Any:
+        """限流调用同步函数，遇到限流错误时退避重试"""
+        for attempt in range(max_retries + 1):
+            self.acquire(provider)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= max_retries or not is_rate_limited(e):
+                    raise
+                delay = self.backoff_delay(provider, attempt, e)
+                print(f"⏳ {provider} 触发限流，{delay:.1f} 秒后重试 ({attempt + 1}/{max_retries}): {e}")
+                time.sleep(delay)
+
+
+GLOBAL_RATE_LIMITER = RateLimitRegistry(getattr(cfg, "rate_limits", None))
@@ -0,0 +1,166 @@
+"""
+Symbol Index: stock_symbol_search / stock_symbol_search_akshare 共用的证券代码检索索引
+
+每个 (market, date) 的证券列表只构建一次索引:
+1. 小写的代码/名称 NumPy 字符串数组，包含匹配对一批查询一次向量化完成
+2. 小写代码/名称的哈希表用于精确匹配(忽略大小写)，排序数组 + bisect(searchsorted) 用于前缀匹配
+3. 安装了 pypinyin 时额外建立中文名称的全拼/首字母索引，如 "gzmt" / "guizhoumaotai" -> 贵州茅台
+
+打分与原逐行匹配一致: exact 1.0 > prefix 0.9 > contains 0.8，拼音匹配 pinyin 0.75，
+同分按证券列表中的原始顺序排列。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装pypinyin时不建立拼音索引
+    lazy_pinyin = None
+
+MATCH_SCORES = {"exact": 1.0, "prefix": 0.9, "contains": 0.8, "pinyin": 0.75}
+# 得分矩阵中保存的匹配等级，等级越高分数越高
+MATCH_LEVELS = ["none", "pinyin", "contains", "prefix", "exact"]
+_LEVEL = {match_type: level for level, match_type in enumerate(MATCH_LEVELS)}
+# 前缀查询的上界: 任何以query开头的字符串都小于 query + _MAX_CHAR
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class _PrefixIndex:
+    """排序数组 + searchsorted 的前缀索引"""
+
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind="stable")
+        self.sorted_values = values[self.order]
+
+    def lookup(self, prefix: str) -> np.ndarray:
+        lo = np.searchsorted(self.sorted_values, prefix, side="left")
+        hi = np.searchsorted(self.sorted_values, prefix + _MAX_CHAR, side="left")
+        return self.order[lo:hi]
+
+
+def _exact_map(values: np.ndarray) -> Dict[str, List[int]]:
+    mapping: Dict[str, List[int]] = {}
+    for i, value in enumerate(values.tolist()):
+        mapping.setdefault(value, []).append(i)
+    return mapping
+
+
+class SymbolIndex:
+    """单个证券列表的检索索引"""
+
+    def __init__(self, symbols_df: pd.DataFrame):
+        """symbols_df 需包含 ts_code / name 两列"""
+        self.codes = symbols_df["ts_code"].fillna("").astype(str).to_numpy().astype(str)
+        self.names = symbols_df["name"].fillna("").astype(str).to_numpy().astype(str)
+        self.size = len(self.codes)
+
+        self.codes_lower = np.char.lower(self.codes)
+        self.names_lower = np.char.lower(self.names)
+        self._exact = [_exact_map(self.codes_lower), _exact_map(self.names_lower)]
+        self._prefix = [_PrefixIndex(self.codes_lower), _PrefixIndex(self.names_lower)]
+
+        self._pinyin: List[_PrefixIndex] = []
+        if lazy_pinyin is not None and self.size:
+            full = np.array(["".join(lazy_pinyin(name)).lower() for name in self.names.tolist()])
+            initials = np.array(["".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+                                 for name in self.names.tolist()])
+            self._pinyin = [_PrefixIndex(full), _PrefixIndex(initials)]
+
+    def _levels(self, queries: List[str]) -> np.ndarray:
+        """返回 (查询数, 证券数) 的匹配等级矩阵"""
+        levels = np.zeros((len(queries), self.size), dtype=np.int8)
+        if not self.size or not queries:
+            return levels
+        queries_lower = np.array([query.lower() for query in queries])
+
+        # 包含匹配(前缀和精确匹配也满足包含，随后用更高的分数覆盖)
+        contains = (np.char.find(self.codes_lower[None, :], queries_lower[:, None]) >= 0) | \
+                   (np.char.find(self.names_lower[None, :], queries_lower[:, None]) >= 0)
+        levels[contains] = _LEVEL["contains"]
+
+        for i, query_lower in enumerate(queries_lower.tolist()):
+            if self._pinyin and query_lower.isascii() and query_lower.isalpha():
+                for prefix_index in self._pinyin:
+                    rows = prefix_index.lookup(query_lower)
+                    levels[i, rows] = np.maximum(levels[i, rows], _LEVEL["pinyin"])
+            for prefix_index in self._prefix:
+                levels[i, prefix_index.lookup(query_lower)] = _LEVEL["prefix"]
+            for exact_map in self._exact:
+                levels[i, exact_map.get(query_lower, [])] = _LEVEL["exact"]
+        return levels
+
+    def search_many(self, queries: List[str], limit: int = 5, match_mode: str = "best",
+                    market: str = "") -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量检索
+
+        Args:
+            queries: 查询列表(代码或名称，支持部分匹配)
+            limit: match_mode 为 all/exact 时每个查询最多返回的结果数
+            match_mode: best(最佳匹配) / all(全部匹配) / exact(仅精确匹配)
+            market: 写入结果的市场名
+
+        Returns:
+            {query: [{"ts_code", "name", "market", "match_type", "match_score"}, ...]}，
+            与原逐行匹配一致，空字符串是所有代码的前缀，匹配全部证券
+        """
+        valid_queries = [query for query in queries if isinstance(query, str)]
+        levels = self._levels(valid_queries)
+        min_level = _LEVEL["exact"] if match_mode == "exact" else 1
+        results = {query: [] for query in queries}
+        for query, row_levels in zip(valid_queries, levels):
+            rows = np.flatnonzero(row_levels >= min_level)
+            # 按分数降序，同分保持原始顺序
+            rows = rows[np.argsort(-row_levels[rows], kind="stable")]
+            rows = rows[:1] if match_mode == "best" else rows[:limit]
+            matches = []
+            for row in rows.tolist():
+                match_type = MATCH_LEVELS[row_levels[row]]
+                matches.append({
+                    "ts_code": str(self.codes[row]),
+                    "name": str(self.names[row]),
+                    "market": market,
+                    "match_type": match_type,
+                    "match_score": MATCH_SCORES[match_type],
+                })
+            results[query] = matches
+        return results
+
+
+class SymbolIndexCache:
+    """按 key(如 (market, date)) 缓存已构建的索引"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[Hashable, SymbolIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[SymbolIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def get(self, key: Hashable, symbols_df: Optional[pd.DataFrame] = None) -> Optional[SymbolIndex]:
+        """返回key对应的索引，不存在且提供了symbols_df时构建(同时只构建一个，避免重复构建同一个key)"""
+        index = self._lookup(key)
+        if index is not None or symbols_df is None:
+            return index
+        with self._build_lock:
+            index = self._lookup(key)
+            if index is not None:
+                return index
+            index = SymbolIndex(symbols_df)
+            with self._lock:
+                self._indexes[key] = index
+                while len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+        return index
+
+
+GLOBAL_SYMBOL_INDEX_CACHE = SymbolIndexCache()
@@ -0,0 +1,107 @@
+"""
+Trading Calendar: 预计算的交易日历索引
+
+交易日历加载一次后保存为有序的NumPy数组和 date -> 序号 的字典，
+日期偏移、上一交易日、区间查询均为 O(1) / O(log n)，并提供对日期数组的向量化版本。
+"""
+import numpy as np
+from typing import Iterable, List
+
+
+def to_trade_date(date) -> str:
+    """将 'YYYYMMDD' / 'YYYY-MM-DD' / 'YYYY-MM-DD HH:MM:SS' 统一为 'YYYYMMDD'"""
+    return str(date).split(" ")[0].replace("-", "")
+
+
+class TradingCalendar:
+    """单个市场的交易日历"""
+
+    def __init__(self, trade_dates: Iterable[str]):
+        trade_dates = sorted(set(to_trade_date(d) for d in trade_dates))
+        self.trade_dates: List[str] = trade_dates
+        self.dates = np.array(trade_dates, dtype="<U8")
+        self._ordinal = {d: i for i, d in enumerate(trade_dates)}
+
+    def __len__(self):
+        return len(self.trade_dates)
+
+    def __contains__(self, date) -> bool:
+        return to_trade_date(date) in self._ordinal
+
+    def to_list(self) -> List[str]:
+        return list(self.trade_dates)
+
+    def is_trade_date(self, date) -> bool:
+        return to_trade_date(date) in self._ordinal
+
+    def ordinal(self, date) -> int:
+        """交易日在日历中的序号，非交易日抛出KeyError"""
+        return self._ordinal[to_trade_date(date)]
+
+    def shift(self, date, n: int) -> str:
+        """
+        日期偏移 n 个交易日
+
+        Args:
+            date: 基准日期，可以不是交易日
+            n: 0 表示date本身(必须是交易日)；n>0 表示严格晚于date的第n个交易日；
+               n<0 表示严格早于date的第|n|个交易日
+
+        Raises:
+            ValueError: n=0 且 date 不是交易日
+            IndexError: 偏移超出日历范围
+        """
+        date = to_trade_date(date)
+        if n == 0:
+            if date not in self._ordinal:
+                raise ValueError(f"{date} is not a trade date")
+            return date
+        if n > 0:
+            idx = int(np.searchsorted(self.dates, date, side="right")) + n - 1
+        else:
+            idx = int(np.searchsorted(self.dates, date, side="left")) + n
+        if idx < 0 or idx >= len(self.trade_dates):
+            raise IndexError(f"shift {date} by {n} is out of calendar range")
+        return self.trade_dates[idx]
+
+    def prev(self, date) -> str:
+        """严格早于date的上一个交易日"""
+        return self.shift(date, -1)
+
+    def next(self, date) -> str:
+        """严格晚于date的下一个交易日"""
+        return self.shift(date, 1)
+
+    def range(self, start_date, end_date) -> List[str]:
+        """[start_date, end_date] 闭区间内的交易日"""
+        lo = int(np.searchsorted(self.dates, to_trade_date(start_date), side="left"))
+        hi = int(np.searchsorted(self.dates, to_trade_date(end_date), side="right"))
+        return self.trade_dates[lo:hi]
+
+    def shift_many(self, dates, n: int) -> np.ndarray:
+        """
+        shift 的向量化版本
+
+        Returns:
+            np.ndarray: 与dates等长的 '<U8' 数组，无效(非交易日且n=0，或越界)的位置为空字符串
+        """
+        dates = np.array([to_trade_date(d) for d in dates], dtype="<U8")
+        result = np.full(dates.shape, "", dtype="<U8")
+        if n == 0:
+            idx = np.searchsorted(self.dates, dates, side="left")
+            valid = idx < len(self.dates)
+            valid[valid] = self.dates[idx[valid]] == dates[valid]
+        else:
+            side = "right" if n > 0 else "left"
+            idx = np.searchsorted(self.dates, dates, side=side) + (n - 1 if n > 0 else n)
+            valid = (idx >= 0) & (idx < len(self.dates))
+        result[valid] = self.dates[idx[valid]]
+        return result
+
+    def prev_many(self, dates) -> np.ndarray:
+        """prev 的向量化版本"""
+        return self.shift_many(dates, -1)
+
+    def next_many(self, dates) -> np.ndarray:
+        """next 的向量化版本"""
+        return self.shift_many(dates, 1)
@@ -4,7 +4,7 @@ Tushare数据提供模块
 """
 import pandas as pd
 from utils.tushare_utils import tushare_cached
-from utils.tushare_utils import get_trade_date
+from utils.tushare_utils import get_trading_calendar
 from loguru import logger
 
 class TushareDataProvider:
@@ -352,8 +352,7 @@ class TushareDataProvider:
             DataFrame: 合并后的数据
         """
         try:
-            trade_dates = get_trade_date()
-            target_dates = [d for d in trade_dates if start_date <= d <= end_date]
+            target_dates = get_trading_calendar().range(start_date, end_date)
             
             logger.info(f"获取 {start_date} 到 {end_date} 的数据，共 {len(target_dates)} 个交易日")
             
@@ -6,6 +6,7 @@ tushare 的工具函数
 """
 import os
 import json
+import functools
 import pandas as pd
 import tushare as ts
 from pathlib import Path
@@ -14,10 +15,16 @@ from pathlib import Path
 from functools import lru_cache
 from datetime import datetime, timedelta
 import hashlib
-import pickle
 from config.config import cfg
+from utils.cache_engine import CacheEngine, permanent_policies
+from utils.async_clients import GLOBAL_SDK_CLIENT
+from utils.rate_limiter import GLOBAL_RATE_LIMITER
+from utils.trading_calendar import TradingCalendar
 
 DEFAULT_TUSHARE_CACHE_DIR = Path(__file__).parent / "tushare_cache"
+# 不带日期参数的基础信息接口，永久缓存
+TUSHARE_PERMANENT_FUNCTIONS = ["stock_basic", "namechange", "fund_basic", "hk_basic", "us_basic",
+                               "index_basic", "stock_company"]
 
 class CachedTusharePro:
     def __init__(self, cache_dir=None):
@@ -27,6 +34,7 @@ class CachedTusharePro:
             self.cache_dir = Path(cache_dir)
         if not self.cache_dir.exists():
             self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = CacheEngine(self.cache_dir, policies=permanent_policies(TUSHARE_PERMANENT_FUNCTIONS))
         token = cfg.tushare_key
         ts.set_token(token)
         self.pro = ts.pro_api(token)
@@ -35,27 +43,21 @@ class CachedTusharePro:
         func_kwargs_str = json.dumps(func_kwargs)
         return self.run_with_cache(func_name, func_kwargs_str, verbose)
     
+    async def arun(self, func_name: str, func_kwargs: dict, verbose: bool = False):
+        """run 的异步版本，相同请求并发时只拉取一次"""
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, json.dumps(func_kwargs))
+        return await self.cache.aget_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose,
+                                              runner=functools.partial(GLOBAL_SDK_CLIENT.fetch, "tushare"))
+
     def run_with_cache(self, func_name: str, func_kwargs: str, verbose: bool = False):
+        func_kwargs, fetch, legacy_cache_file = self._prepare(func_name, func_kwargs)
+        return self.cache.get_or_fetch(func_name, func_kwargs, fetch, legacy_file=legacy_cache_file, verbose=verbose)
+
+    def _prepare(self, func_name: str, func_kwargs: str):
         func_kwargs = json.loads(func_kwargs)
         args_hash = hashlib.md5(str(func_kwargs).encode()).hexdigest()
-        func_cache_dir = self.cache_dir / func_name
-        if not func_cache_dir.exists():
-            func_cache_dir.mkdir(parents=True, exist_ok=True)
-        func_cache_file = func_cache_dir / f"{args_hash}.pkl"
-        if func_cache_file.exists():
-            if verbose:
-                print(f"load result from {func_cache_file}")
-            with open(func_cache_file, "rb") as f:
-                return pickle.load(f)
-        else:
-            if verbose:
-                print(f"cache miss for {func_name} with args: {func_kwargs}")
-            result = getattr(self.pro, func_name)(**func_kwargs)
-            if verbose:
-                print(f"save result to {func_cache_file}")
-            with open(func_cache_file, "wb") as f:
-                pickle.dump(result, f)
-            return result
+        legacy_cache_file = self.cache_dir / func_name / f"{args_hash}.pkl"
+        return func_kwargs, lambda: GLOBAL_RATE_LIMITER.call("tushare", getattr(self.pro, func_name), **func_kwargs), legacy_cache_file
 
 pro_cached = CachedTusharePro()
 
@@ -109,6 +111,11 @@ def get_trade_date(cache_dir=None, verbose=False):
     return trade_date_list
 
 
+@lru_cache(maxsize=1)
+def get_trading_calendar(cache_dir=None, verbose=False):
+    return TradingCalendar(get_trade_date(cache_dir=cache_dir, verbose=verbose))
+
+
 @lru_cache(maxsize=1)
 def get_stock_basic(update_date=None, cache_dir=None, detail=False, verbose=None):
     """
@@ -167,7 +174,7 @@ def get_daily_klines(stock_code, start_date, end_date, cache_dir=None, verbose=F
         df = df.sort_values(by="trade_date", ascending=False)
         trade_date = df["trade_date"].values.tolist()
         cur_date = datetime.now().strftime("%Y%m%d")
-        inner_trade_date = [d for d in get_trade_date(cache_dir=cache_dir, verbose=verbose) if d >= start_date and d <= end_date]
+        inner_trade_date = get_trading_calendar(cache_dir=cache_dir, verbose=verbose).range(start_date, end_date)
         inner_trade_date = [d for d in inner_trade_date if d < cur_date]
         inner_trade_date.sort()
         # check if the cache is valid
@@ -227,25 +234,10 @@ def get_daily_limit_price(date, stock_code=None, cache_dir=None, verbose=False):
 
 @lru_cache(maxsize=1)
 def get_stock_mapping():
-    stock_df = get_stock_basic(detail=True)
-    stock_name2code = {}
-    stock_code2name = {}
-    stock_info_columns = stock_df.columns.tolist()
-    for stock in stock_df.values.tolist():
-        stock_info = {v:k for k,v in zip(stock, stock_info_columns)}
-        stock_name = stock_info['name']
-        stock_name2code[stock_name] = stock_info['ts_code']
-        if '-' in stock_name:
-            stock_name = stock_name.split('-')[0]
-        stock_name2code[stock_name] = stock_info['ts_code']
-        stock_code2name[stock_info['ts_code']] = stock_name
+    from utils.fundamentals_snapshot import build_stock_mapping
 
     # 读取曾用名, 包括ST
-    name2code = get_total_namechange()
-    for name, code in name2code.items():
-        stock_name2code[name] = code
-
-    return stock_name2code, stock_code2name
+    return build_stock_mapping(get_stock_basic(detail=True), get_total_namechange())
 
 
 
@@ -265,11 +257,11 @@ def calc_pct(stock_code, buy_date, hold_days, buy_stg='open', sell_stg='open', b
             print(f"stock {stock_code} is not available at {buy_date}")
         return None
 
-    date_after = [d for d in get_trade_date(verbose=verbose) if d >= buy_date]
-    if buy_date not in date_after:
+    calendar = get_trading_calendar(verbose=verbose)
+    if not calendar.is_trade_date(buy_date):
         print(f"can't buy stock {stock_code} at {buy_date}")
         return None
-    sell_date = date_after[hold_days]
+    sell_date = calendar.shift(buy_date, hold_days)
 
     if verbose:
         print(f"get a trade to buy {stock_code} at {buy_date} and sell at {sell_date}")